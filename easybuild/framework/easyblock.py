@@ -49,17 +49,20 @@ import time
 import traceback
 from distutils.version import LooseVersion
 from vsc.utils import fancylogger
-from vsc.utils.missing import get_class_for
+from vsc.utils.missing import get_class_for, nub
 
 import easybuild.tools.environment as env
 from easybuild.tools import config, filetools
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
 from easybuild.framework.easyconfig.easyconfig import ITERATE_OPTIONS, EasyConfig, ActiveMNS, get_easyblock_class
 from easybuild.framework.easyconfig.easyconfig import get_module_path, letter_dir_for, resolve_template
+from easybuild.framework.easyconfig.fingerprint import BUILD_FINGERPRINT_FILENAME, det_build_fingerprint
+from easybuild.framework.easyconfig.fingerprint import write_build_fingerprint
 from easybuild.framework.easyconfig.format.format import INDENT_4SPACES
 from easybuild.framework.easyconfig.parser import fetch_parameters_from_easyconfig
 from easybuild.framework.easyconfig.tools import get_paths_for
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RUN_STEP
+from easybuild.tools.artifact_cache import det_artifact_key, find_artifact, restore_artifact, store_artifact
 from easybuild.tools.build_details import get_build_stats
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, dry_run_warning, dry_run_set_dirs
 from easybuild.tools.build_log import print_error, print_msg, print_warning
@@ -70,20 +73,24 @@ from easybuild.tools.environment import restore_env, sanitize_env
 from easybuild.tools.filetools import CHECKSUM_TYPE_MD5, CHECKSUM_TYPE_SHA256
 from easybuild.tools.filetools import adjust_permissions, apply_patch, back_up_file, change_dir, convert_name
 from easybuild.tools.filetools import compute_checksum, copy_file, derive_alt_pypi_url, diff_files, download_file
-from easybuild.tools.filetools import encode_class_name, extract_file, is_alt_pypi_url, mkdir, move_logs, read_file
+from easybuild.tools.filetools import encode_class_name, extract_file, find_glob_matches, is_alt_pypi_url, mkdir
+from easybuild.tools.filetools import move_file, move_logs, read_file
 from easybuild.tools.filetools import remove_file, rmtree2, verify_checksum, weld_paths, write_file
 from easybuild.tools.hooks import BUILD_STEP, CLEANUP_STEP, CONFIGURE_STEP, EXTENSIONS_STEP, FETCH_STEP, INSTALL_STEP
 from easybuild.tools.hooks import MODULE_STEP, PACKAGE_STEP, PATCH_STEP, PERMISSIONS_STEP, POSTPROC_STEP, PREPARE_STEP
-from easybuild.tools.hooks import READY_STEP, SANITYCHECK_STEP, SOURCE_STEP, TEST_STEP, TESTCASES_STEP, run_hook
+from easybuild.tools.hooks import READY_STEP, RESOURCE_USAGE, SANITYCHECK_STEP, SOURCE_STEP, TEST_STEP, TESTCASES_STEP
+from easybuild.tools.hooks import run_hook
 from easybuild.tools.run import run_cmd
 from easybuild.tools.jenkins import write_to_xml
-from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, module_generator, dependencies_for
+from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, ModuleStatements
+from easybuild.tools.module_generator import dependencies_for, module_generator
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.modules import Lmod, ROOT_ENV_VAR_NAME_PREFIX, VERSION_ENV_VAR_NAME_PREFIX, DEVEL_ENV_VAR_NAME_PREFIX
 from easybuild.tools.modules import invalidate_module_caches_for, get_software_root, get_software_root_env_var_name
 from easybuild.tools.modules import get_software_version_env_var_name, modules_tool
 from easybuild.tools.package.utilities import package
 from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.resource_usage import get_resource_usage, resource_usage_since, write_resource_usage_report
 from easybuild.tools.toolchain import DUMMY_TOOLCHAIN_NAME
 from easybuild.tools.systemtools import det_parallelism, use_group
 from easybuild.tools.utilities import quote_str, remove_unwanted_chars, trace_msg
@@ -203,6 +210,13 @@ class EasyBlock(object):
         # sanity check fail error messages to report (if any)
         self.sanity_check_fail_msgs = []
 
+        # session journal to keep track of progress in (if any), see resume_from for resuming an interrupted session
+        self.journal = None
+        self.resume_state = None
+
+        # resource usage (wall/CPU time, memory, I/O, subprocesses) for each step and extension
+        self.resource_usage = []
+
         # robot path
         self.robot_path = build_option('robot_path')
 
@@ -840,8 +854,11 @@ class EasyBlock(object):
             # avoid cleanup after installation
             self.cfg['cleanupoldinstall'] = False
 
-        # always make build dir
-        self.make_dir(self.builddir, self.cfg['cleanupoldbuild'])
+        if self.resume_state and os.path.isdir(self.builddir):
+            self.log.info("Reusing existing build dir %s to resume interrupted installation", self.builddir)
+        else:
+            # always make build dir
+            self.make_dir(self.builddir, self.cfg['cleanupoldbuild'])
 
         trace_msg("build dir: %s" % self.builddir)
 
@@ -1069,30 +1086,29 @@ class EasyBlock(object):
         :param altroot: path to use to define $EBROOT*
         :param altversion: version to use to define $EBVERSION*
         """
-        lines = ['']
+        mod_stmts = ModuleStatements()
 
         env_name = convert_name(self.name, upper=True)
 
         # $EBROOT<NAME>
         root_envvar = ROOT_ENV_VAR_NAME_PREFIX + env_name
         if altroot:
-            set_root_envvar = self.module_generator.set_environment(root_envvar, altroot)
+            mod_stmts.add('set_environment', root_envvar, altroot)
         else:
-            set_root_envvar = self.module_generator.set_environment(root_envvar, '', relpath=True)
-        lines.append(set_root_envvar)
+            mod_stmts.add('set_environment', root_envvar, '', relpath=True)
 
         # $EBVERSION<NAME>
         version_envvar = VERSION_ENV_VAR_NAME_PREFIX + env_name
-        lines.append(self.module_generator.set_environment(version_envvar, altversion or self.version))
+        mod_stmts.add('set_environment', version_envvar, altversion or self.version)
 
         # $EBDEVEL<NAME>
         devel_path = os.path.join(log_path(), ActiveMNS().det_devel_module_filename(self.cfg))
         devel_path_envvar = DEVEL_ENV_VAR_NAME_PREFIX + env_name
-        lines.append(self.module_generator.set_environment(devel_path_envvar, devel_path, relpath=True))
+        mod_stmts.add('set_environment', devel_path_envvar, devel_path, relpath=True)
 
-        lines.append('\n')
+        mod_stmts.add_text('\n')
         for (key, value) in self.cfg['modextravars'].items():
-            lines.append(self.module_generator.set_environment(key, value))
+            mod_stmts.add('set_environment', key, value)
 
         for (key, value) in self.cfg['modextrapaths'].items():
             if isinstance(value, basestring):
@@ -1100,15 +1116,15 @@ class EasyBlock(object):
             elif not isinstance(value, (tuple, list)):
                 raise EasyBuildError("modextrapaths dict value %s (type: %s) is not a list or tuple",
                                      value, type(value))
-            lines.append(self.module_generator.prepend_paths(key, value, allow_abs=self.cfg['allow_prepend_abs_path']))
+            mod_stmts.add('prepend_paths', key, value, allow_abs=self.cfg['allow_prepend_abs_path'])
 
         if self.cfg['modloadmsg']:
-            lines.append(self.module_generator.msg_on_load(self.cfg['modloadmsg']))
+            mod_stmts.add('msg_on_load', self.cfg['modloadmsg'])
 
         if self.cfg['modtclfooter']:
             if isinstance(self.module_generator, ModuleGeneratorTcl):
                 self.log.debug("Including Tcl footer in module: %s", self.cfg['modtclfooter'])
-                lines.extend([self.cfg['modtclfooter'], '\n'])
+                mod_stmts.add_text(self.cfg['modtclfooter'] + '\n')
             else:
                 self.log.warning("Not including footer in Tcl syntax in non-Tcl module file: %s",
                                  self.cfg['modtclfooter'])
@@ -1116,15 +1132,15 @@ class EasyBlock(object):
         if self.cfg['modluafooter']:
             if isinstance(self.module_generator, ModuleGeneratorLua):
                 self.log.debug("Including Lua footer in module: %s", self.cfg['modluafooter'])
-                lines.extend([self.cfg['modluafooter'], '\n'])
+                mod_stmts.add_text(self.cfg['modluafooter'] + '\n')
             else:
                 self.log.warning("Not including footer in Lua syntax in non-Lua module file: %s",
                                  self.cfg['modluafooter'])
 
         for (key, value) in self.cfg['modaliases'].items():
-            lines.append(self.module_generator.set_alias(key, value))
+            mod_stmts.add('set_alias', key, value)
 
-        txt = ''.join(lines)
+        txt = self.module_generator.render(mod_stmts)
         self.log.debug("make_module_extra added this: %s", txt)
 
         return txt
@@ -1213,34 +1229,42 @@ class EasyBlock(object):
 
         lines = ['\n']
         if os.path.isdir(self.installdir):
-            change_dir(self.installdir)
+            mod_stmts = ModuleStatements()
 
             if self.dry_run:
                 self.dry_run_msg("List of paths that would be searched and added to module file:\n")
                 note = "note: glob patterns are not expanded and existence checks "
                 note += "for paths are skipped for the statements below due to dry run"
-                lines.append(self.module_generator.comment(note))
+                mod_stmts.add('comment', note)
+
+            for key, reqs in requirements.items():
+                if isinstance(reqs, basestring):
+                    self.log.warning("Hoisting string value %s into a list before iterating over it", reqs)
+                    requirements[key] = [reqs]
+
+            if not self.dry_run:
+                # determine matching paths in installation directory for all (glob) patterns in a single pass,
+                # only use glob if the string is non-empty
+                patterns = nub([path for reqs in requirements.values() for path in reqs if path])
+                matches = find_glob_matches(self.installdir, patterns)
 
             for key in sorted(requirements):
                 if self.dry_run:
                     self.dry_run_msg(" $%s: %s" % (key, ', '.join(requirements[key])))
-                reqs = requirements[key]
-                if isinstance(reqs, basestring):
-                    self.log.warning("Hoisting string value %s into a list before iterating over it", reqs)
-                    reqs = [reqs]
 
-                for path in reqs:
-                    # only use glob if the string is non-empty
+                paths = []
+                for path in requirements[key]:
                     if path and not self.dry_run:
-                        paths = sorted(glob.glob(path))
+                        paths.extend(matches[path])
                     else:
                         # empty string is a valid value here (i.e. to prepend the installation prefix, cfr $CUDA_HOME)
-                        paths = [path]
+                        paths.append(path)
 
-                    lines.append(self.module_generator.prepend_paths(key, paths))
+                mod_stmts.add('prepend_paths', key, paths)
+
+            lines.append(self.module_generator.render(mod_stmts))
             if self.dry_run:
                 self.dry_run_msg('')
-            change_dir(self.orig_workdir)
 
         return ''.join(lines)
 
@@ -1898,16 +1922,21 @@ class EasyBlock(object):
                 self.dry_run_msg("defining build environment based on toolchain (options) and dependencies...")
             else:
                 # don't reload modules for toolchain, there is no need since they will be loaded already;
-                # the (fake) module for the parent software gets loaded before installing extensions
-                inst.toolchain.prepare(onlymod=self.cfg['onlytcmod'], silent=True, loadmod=False,
-                                       rpath_filter_dirs=self.rpath_filter_dirs)
+                # the (fake) module for the parent software gets loaded before installing extensions;
+                # build environment is the same for every extension (unless toolchain is changed, e.g. its options),
+                # so it is only determined once, and reapplied for subsequent extensions
+                inst.toolchain.prepare_from_snapshot(onlymod=self.cfg['onlytcmod'], silent=True,
+                                                     rpath_filter_dirs=self.rpath_filter_dirs)
 
             # real work
+            start_usage = get_resource_usage()
             inst.prerun()
             txt = inst.run()
             if txt:
                 self.module_extra_extensions += txt
             inst.postrun()
+            if not self.dry_run:
+                self.record_resource_usage(start_usage, ext['name'], 'extension')
 
             # append so we can make us of it later (in sanity_check_step)
             self.ext_instances.append(inst)
@@ -1941,6 +1970,56 @@ class EasyBlock(object):
         else:
             self.log.info("Skipping package step (not enabled)")
 
+    def restore_from_artifact_cache(self, cache_dir, fingerprint):
+        """
+        Restore installation (directory + module file) from artifact cache (cfr. --artifact-cache),
+        if an artifact for the specified build fingerprint is available.
+
+        :param cache_dir: location of artifact cache
+        :param fingerprint: build fingerprint for this installation
+        :return: True if installation was restored, False otherwise
+        """
+        res = False
+        key = det_artifact_key(fingerprint)[0]
+        if find_artifact(cache_dir, key) is not None:
+            self.make_installdir()
+            res = restore_artifact(cache_dir, key, self.installdir, self.mod_filepath)
+
+        if res:
+            # artifact may have been created with other permission settings (--group, --read-only-installdir, ...)
+            self.permissions_step()
+
+            # invalidate relevant module caches & create symlinks, like in make_module_step
+            modpath = self.module_generator.get_modules_path()
+            paths = [modpath]
+            if self.mod_subdir:
+                paths.append(os.path.join(modpath, self.mod_subdir))
+            for path in paths:
+                invalidate_module_caches_for(path)
+            self.modules_tool.update()
+
+            self.module_generator.create_symlinks(ActiveMNS().det_module_symlink_paths(self.cfg))
+
+            if build_option('set_default_module'):
+                self._set_module_as_default()
+
+        return res
+
+    def store_in_artifact_cache(self, cache_dir, fingerprint):
+        """
+        Store installation (directory + module file) in artifact cache (cfr. --artifact-cache).
+
+        :param cache_dir: location of artifact cache
+        :param fingerprint: build fingerprint for this installation
+        """
+        key, key_components = det_artifact_key(fingerprint)
+        metadata = {
+            'full_mod_name': self.full_mod_name,
+            'install_subdir': self.install_subdir,
+            'key_components': key_components,
+        }
+        store_artifact(cache_dir, key, self.installdir, self.mod_filepath, metadata=metadata)
+
     def post_install_step(self):
         """
         Do some postprocessing
@@ -2410,6 +2489,40 @@ class EasyBlock(object):
             self.cfg.template_values[name[0]] = str(getattr(self, name[0], None))
         self.cfg.generate_template_values()
 
+    def resume_from(self, resume_state):
+        """
+        Prepare for resuming an installation that was interrupted in a previous session.
+
+        :param resume_state: dict with build directory, index of last completed step and paths to unpacked sources
+        """
+        builddir = resume_state.get('builddir')
+        if builddir and os.path.isdir(builddir):
+            self.log.info("Resuming installation after step %s (#%d), using build dir %s",
+                          resume_state['step'], resume_state['step_idx'], builddir)
+            self.builddir = builddir
+            self.resume_state = resume_state
+        else:
+            self.log.warning("Build dir %s to resume from is no longer there, starting from scratch", builddir)
+
+    def _skip_completed_step(self, step_idx, step, skippable):
+        """Decide whether or not to skip the specified step, because it was completed in a resumed session."""
+        skip = False
+        if skippable and self.resume_state and step_idx <= self.resume_state['step_idx']:
+            self.log.info("Skipping %s step, already completed in resumed session", step)
+            skip = True
+
+            # restore paths to unpacked sources when skipping source step, since later steps rely on them
+            if step == SOURCE_STEP:
+                for src, finalpath in zip(self.src, self.resume_state['src_finalpaths']):
+                    src['finalpath'] = finalpath
+
+        return skip
+
+    def _step_completed(self, step_idx, step):
+        """Keep track of completed step in session journal (if any)."""
+        if self.journal is not None and not self.dry_run:
+            self.journal.step_completed(self, step_idx, step)
+
     def _skip_step(self, step, skippable):
         """Dedice whether or not to skip the specified step."""
         module_only = build_option('module_only')
@@ -2439,11 +2552,25 @@ class EasyBlock(object):
 
         return skip
 
+    def record_resource_usage(self, start_usage, name, kind):
+        """
+        Record resource usage since specified snapshot, and pass it to the resource usage hook (if defined).
+
+        :param start_usage: snapshot of resource usage (obtained via get_resource_usage)
+        :param name: name of step/extension
+        :param kind: 'step' or 'extension'
+        """
+        usage = resource_usage_since(start_usage, name, kind)
+        self.log.info("Resource usage for %s %s: %s", kind, name, usage)
+        self.resource_usage.append(usage)
+        run_hook(RESOURCE_USAGE, self.hooks, args=[self, usage])
+
     def run_step(self, step, step_methods):
         """
         Run step, returns false when execution should be stopped
         """
         self.log.info("Starting %s step", step)
+        start_usage = get_resource_usage()
         self.update_config_template_run_step()
 
         run_hook(step, self.hooks, pre_step_hook=True, args=[self])
@@ -2473,6 +2600,9 @@ class EasyBlock(object):
 
         run_hook(step, self.hooks, post_step_hook=True, args=[self])
 
+        if not self.dry_run:
+            self.record_resource_usage(start_usage, step, 'step')
+
         if self.cfg['stop'] == step:
             self.log.info("Stopping after %s step.", step)
             raise StopException(step)
@@ -2585,16 +2715,24 @@ class EasyBlock(object):
         print_msg("building and installing %s..." % self.full_mod_name, log=self.log, silent=self.silent)
         trace_msg("installation prefix: %s" % self.installdir)
         try:
-            for (step_name, descr, step_methods, skippable) in steps:
+            for (step_idx, (step_name, descr, step_methods, skippable)) in enumerate(steps):
                 if self._skip_step(step_name, skippable):
                     print_msg("%s [skipped]" % descr, log=self.log, silent=self.silent)
+                elif self._skip_completed_step(step_idx, step_name, skippable):
+                    print_msg("%s [completed in previous session]" % descr, log=self.log, silent=self.silent)
                 else:
                     if self.dry_run:
                         self.dry_run_msg("%s... [DRY RUN]\n", descr)
                     else:
                         print_msg("%s..." % descr, log=self.log, silent=self.silent)
                     self.current_step = step_name
-                    self.run_step(step_name, step_methods)
+                    try:
+                        self.run_step(step_name, step_methods)
+                    except StopException:
+                        # step was completed before stopping, so keep track of it
+                        self._step_completed(step_idx, step_name)
+                        raise
+                    self._step_completed(step_idx, step_name)
 
         except StopException:
             pass
@@ -2617,11 +2755,13 @@ def print_dry_run_note(loc, silent=True):
     dry_run_msg(msg, silent=silent)
 
 
-def build_and_install_one(ecdict, init_env, hooks=None):
+def build_and_install_one(ecdict, init_env, hooks=None, journal=None):
     """
     Build the software
     :param ecdict: dictionary contaning parsed easyconfig + metadata
     :param init_env: original environment (used to reset environment)
+    :param hooks: list of defined pre- and post-step hooks
+    :param journal: session journal to keep track of progress in (SessionJournal instance)
     """
     silent = build_option('silent')
 
@@ -2672,13 +2812,36 @@ def build_and_install_one(ecdict, init_env, hooks=None):
         _log.debug("Skip set to %s" % skip)
         app.cfg['skip'] = skip
 
+    # keep track of progress in session journal, and resume interrupted installation if possible
+    if journal is not None and not dry_run:
+        app.journal = journal
+        resume_state = journal.resume_state(app.full_mod_name)
+        if resume_state:
+            app.resume_from(resume_state)
+
+    # restore installation from artifact cache rather than building it, if possible (cfr. --artifact-cache)
+    artifact_cache = build_option('artifact_cache')
+    use_artifact_cache = artifact_cache and not dry_run and not app.cfg['stop'] and not build_option('module_only')
+    restored = False
+    if use_artifact_cache:
+        try:
+            restored = app.restore_from_artifact_cache(artifact_cache, det_build_fingerprint(app.cfg)['fingerprint'])
+        except EasyBuildError, err:
+            print_warning("Failed to restore installation from artifact cache, building it instead: %s" % err.msg,
+                          silent=silent)
+        if restored:
+            print_msg("restored installation from artifact cache at %s" % artifact_cache, log=_log, silent=silent)
+
     # build easyconfig
     errormsg = '(no error)'
     # timing info
     start_time = time.time()
     try:
-        run_test_cases = not build_option('skip_test_cases') and app.cfg['tests']
-        result = app.run_all_steps(run_test_cases=run_test_cases)
+        if restored:
+            result = True
+        else:
+            run_test_cases = not build_option('skip_test_cases') and app.cfg['tests']
+            result = app.run_all_steps(run_test_cases=run_test_cases)
     except EasyBuildError, err:
         first_n = 300
         errormsg = "build failed (first %d chars): %s" % (first_n, err.msg[:first_n])
@@ -2686,6 +2849,13 @@ def build_and_install_one(ecdict, init_env, hooks=None):
         result = False
     app.close_log()
 
+    # write machine-readable report on resource usage for each step/extension next to the log file
+    # (for a successful installation, it is moved to the final log directory together with the log file)
+    usage_report = None
+    if not dry_run:
+        usage_report = '%s_resource_usage.json' % os.path.splitext(app.logfile)[0]
+        write_resource_usage_report(usage_report, app.full_mod_name, app.resource_usage)
+
     ended = 'ended'
 
     # make sure we're back in original directory before we finish up
@@ -2708,7 +2878,8 @@ def build_and_install_one(ecdict, init_env, hooks=None):
             new_log_dir = os.path.join(app.installdir, config.log_path())
             if build_option('read_only_installdir'):
                 # temporarily re-enable write permissions for copying log/easyconfig to install dir
-                adjust_permissions(new_log_dir, stat.S_IWUSR, add=True, recursive=False)
+                # (a restored installation already includes these files, which are overwritten)
+                adjust_permissions(new_log_dir, stat.S_IWUSR, add=True, recursive=restored)
 
             # collect build stats
             _log.info("Collecting build stats...")
@@ -2743,6 +2914,7 @@ def build_and_install_one(ecdict, init_env, hooks=None):
         log_fn = os.path.basename(get_log_filename(app.name, app.version))
         application_log = os.path.join(new_log_dir, log_fn)
         move_logs(app.logfile, application_log)
+        move_file(usage_report, '%s_resource_usage.json' % os.path.splitext(application_log)[0])
 
         newspec = os.path.join(new_log_dir, ec_filename)
         copy_file(spec, newspec)
@@ -2754,9 +2926,23 @@ def build_and_install_one(ecdict, init_env, hooks=None):
             copy_file(patch['path'], target)
             _log.debug("Copied patch %s to %s", patch['path'], target)
 
+        # write build fingerprint, used to determine whether installation is stale later on (cfr. --rebuild-stale)
+        if not app.cfg['stop']:
+            build_fingerprint = det_build_fingerprint(app.cfg)
+            fingerprint_path = os.path.join(new_log_dir, BUILD_FINGERPRINT_FILENAME)
+            write_build_fingerprint(fingerprint_path, build_fingerprint)
+            _log.debug("Build fingerprint for %s written to %s", app.full_mod_name, fingerprint_path)
+
         if build_option('read_only_installdir'):
             # take away user write permissions (again)
-            adjust_permissions(new_log_dir, stat.S_IWUSR, add=False, recursive=False)
+            adjust_permissions(new_log_dir, stat.S_IWUSR, add=False, recursive=restored)
+
+        # store installation in artifact cache, so it can be reused elsewhere (cfr. --artifact-cache)
+        if use_artifact_cache and not restored:
+            try:
+                app.store_in_artifact_cache(artifact_cache, build_fingerprint['fingerprint'])
+            except EasyBuildError, err:
+                print_warning("Failed to store installation in artifact cache: %s" % err.msg, silent=silent)
 
     if result:
         success = True
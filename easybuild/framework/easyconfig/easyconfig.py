@@ -39,6 +39,9 @@ Easyconfig module that contains the EasyConfig class.
 import copy
 import difflib
 import functools
+import glob
+import imp
+import logging
 import os
 import re
 import shutil
@@ -53,12 +56,14 @@ from easybuild.framework.easyconfig.default import DEFAULT_CONFIG
 from easybuild.framework.easyconfig.format.convert import Dependency
 from easybuild.framework.easyconfig.format.format import DEPENDENCY_PARAMETERS
 from easybuild.framework.easyconfig.format.one import retrieve_blocks_in_spec
+from easybuild.framework.easyconfig.index import EASYCONFIG_INDEX_FILENAME, EasyconfigIndex
 from easybuild.framework.easyconfig.licenses import EASYCONFIG_LICENSES_DICT
 from easybuild.framework.easyconfig.parser import DEPRECATED_PARAMETERS, REPLACED_PARAMETERS
 from easybuild.framework.easyconfig.parser import EasyConfigParser, fetch_parameters_from_easyconfig
+from easybuild.framework.easyconfig.parser import parse_easyconfig_header
 from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS, template_constant_dict
-from easybuild.toolchains.gcccore import GCCcore
-from easybuild.tools.build_log import EasyBuildError
+from easybuild.framework.easyconfig.toolchain_graph import TOOLCHAIN_GRAPH_FILENAME, ToolchainGraph
+from easybuild.tools.build_log import EasyBuildError, LazyLogValue
 from easybuild.tools.config import build_option, get_module_naming_scheme
 from easybuild.tools.filetools import copy_file, decode_class_name, encode_class_name, mkdir, read_file, write_file
 from easybuild.tools.module_naming_scheme import DEVEL_MODULE_SUFFIX
@@ -66,7 +71,7 @@ from easybuild.tools.module_naming_scheme.utilities import avail_module_naming_s
 from easybuild.tools.module_naming_scheme.utilities import det_hidden_modname, is_valid_module_name
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.ordereddict import OrderedDict
-from easybuild.tools.systemtools import check_os_dependency
+from easybuild.tools.systemtools import check_os_dependencies
 from easybuild.tools.toolchain import DUMMY_TOOLCHAIN_NAME, DUMMY_TOOLCHAIN_VERSION
 from easybuild.tools.toolchain.utilities import get_toolchain, search_toolchain
 from easybuild.tools.utilities import quote_py_str, remove_unwanted_chars
@@ -79,12 +84,16 @@ MANDATORY_PARAMS = ['name', 'version', 'homepage', 'description', 'toolchain']
 # set of configure/build/install options that can be provided as lists for an iterated build
 ITERATE_OPTIONS = ['preconfigopts', 'configopts', 'prebuildopts', 'buildopts', 'preinstallopts', 'installopts']
 
+# easyconfig parameters that determine the easyconfig filename
+FILENAME_PARAMETERS = ['name', 'toolchain', 'version', 'versionprefix', 'versionsuffix']
+
 # name of easyconfigs archive subdirectory
 EASYCONFIGS_ARCHIVE_DIR = '__archive__'
 
 
+# autopep8 is only imported when it is actually used (cfr. EasyConfig.dump), since importing it is quite expensive
 try:
-    import autopep8
+    imp.find_module('autopep8')
     HAVE_AUTOPEP8 = True
 except ImportError as err:
     _log.warning("Failed to import autopep8, dumping easyconfigs with reformatting enabled will not work: %s", err)
@@ -92,7 +101,9 @@ except ImportError as err:
 
 
 _easyconfig_files_cache = {}
+_easyconfig_index_lookup = {}
 _easyconfigs_cache = {}
+_toolchain_graphs = {}
 
 
 def handle_deprecated_or_replaced_easyconfig_parameters(ec_method):
@@ -135,6 +146,160 @@ def toolchain_hierarchy_cache(func):
     return cache_aware_func
 
 
+def det_subtoolchain(tc_name, tc_version, subtoolchain_name):
+    """
+    Determine direct subtoolchain for specified toolchain, by parsing the toolchain easyconfig
+    and searching the dependencies for a version of the subtoolchain.
+
+    :param tc_name: toolchain name
+    :param tc_version: toolchain version
+    :param subtoolchain_name: name of subtoolchain (cfr. SUBTOOLCHAIN attribute of toolchain class)
+    :return: tuple with name and version of subtoolchain, and list of easyconfig files that were consulted
+             (and of directories in which they were searched for, cfr. robot_candidate_dirs)
+    """
+    # grab the easyconfig of the current toolchain and search the dependencies for a version of the subtoolchain
+    path = robot_find_easyconfig(tc_name, tc_version)
+    if path is None:
+        raise EasyBuildError("Could not find easyconfig for %s toolchain version %s", tc_name, tc_version)
+    paths = [path] + robot_candidate_dirs(tc_name, tc_version)
+
+    # parse the easyconfig
+    parsed_ec = process_easyconfig(path, validate=False)[0]
+
+    # search for version of the subtoolchain in dependencies
+    # considers deps + toolchains of deps + deps of deps + toolchains of deps of deps
+    # consider both version and versionsuffix for dependencies
+    cands = []
+    for dep in parsed_ec['ec'].dependencies():
+        # skip dependencies that are marked as external modules
+        if dep['external_module']:
+            continue
+
+        # include dep and toolchain of dep as candidates
+        cands.extend([
+            {'name': dep['name'], 'version': dep['version'] + dep['versionsuffix']},
+            dep['toolchain'],
+        ])
+
+        # find easyconfig file for this dep and parse it
+        ecfile = robot_find_easyconfig(dep['name'], det_full_ec_version(dep))
+        if ecfile is None:
+            raise EasyBuildError("Could not find easyconfig for dependency %s with version %s",
+                                 dep['name'], det_full_ec_version(dep))
+        paths.append(ecfile)
+        paths.extend(robot_candidate_dirs(dep['name'], det_full_ec_version(dep)))
+        easyconfig = process_easyconfig(ecfile, validate=False)[0]['ec']
+
+        # include deps and toolchains of deps of this dep, but skip dependencies marked as external modules
+        for depdep in easyconfig.dependencies():
+            if depdep['external_module']:
+                continue
+
+            cands.append({'name': depdep['name'], 'version': depdep['version'] + depdep['versionsuffix']})
+            cands.append(depdep['toolchain'])
+
+    # only retain candidates that match subtoolchain name
+    cands = [c for c in cands if c['name'] == subtoolchain_name]
+
+    uniq_subtc_versions = set([subtc['version'] for subtc in cands])
+
+    if len(uniq_subtc_versions) == 1:
+        subtoolchain_version = cands[0]['version']
+
+    elif len(uniq_subtc_versions) == 0:
+        # only import toolchain classes when they're needed, importing them is relatively expensive
+        from easybuild.toolchains.gcccore import GCCcore
+
+        # only retain GCCcore as subtoolchain if version was found
+        if subtoolchain_name == GCCcore.NAME:
+            _log.info("No version found for %s; assuming legacy toolchain and skipping it as subtoolchain.",
+                      subtoolchain_name)
+            subtoolchain_name = GCCcore.SUBTOOLCHAIN
+            subtoolchain_version = ''
+        # dummy toolchain: end of the line
+        elif subtoolchain_name == DUMMY_TOOLCHAIN_NAME:
+            subtoolchain_version = ''
+        else:
+            raise EasyBuildError("No version found for subtoolchain %s in dependencies of %s",
+                                 subtoolchain_name, tc_name)
+    else:
+        if subtoolchain_name == DUMMY_TOOLCHAIN_NAME:
+            # Don't care about multiple versions of dummy
+            _log.info("Ignoring multiple versions of %s in toolchain hierarchy", DUMMY_TOOLCHAIN_NAME)
+            subtoolchain_version = ''
+        else:
+            raise EasyBuildError("Multiple versions of %s found in dependencies of toolchain %s: %s",
+                                 subtoolchain_name, tc_name, ', '.join(sorted(uniq_subtc_versions)))
+
+    return (subtoolchain_name, subtoolchain_version), nub(paths)
+
+
+def build_toolchain_graph(tc_graph, subtoolchains):
+    """
+    Populate toolchain graph in a single pass over all toolchain easyconfig files in the robot search path.
+
+    :param tc_graph: ToolchainGraph instance to populate
+    :param subtoolchains: dict with subtoolchain name for each known toolchain name
+    """
+    for tc_name, subtc_name in sorted(subtoolchains.items()):
+        if not subtc_name:
+            continue
+
+        prefix = '%s-' % tc_name
+        for path in tc_graph.search_paths:
+            for ec_path in nub(sorted(sum([glob.glob(p) for p in create_paths(path, tc_name, '*')], []))):
+                ec_fn = os.path.basename(ec_path)
+                if not ec_fn.startswith(prefix):
+                    continue
+
+                tc_version = ec_fn[len(prefix):-len('.eb')]
+                if tc_graph.get_subtoolchain(tc_name, tc_version) is None:
+                    try:
+                        subtc, paths = det_subtoolchain(tc_name, tc_version, subtc_name)
+                        tc_graph.add_subtoolchain(tc_name, tc_version, subtc[0], subtc[1], paths)
+                    except EasyBuildError as err:
+                        _log.info("Not including %s/%s in toolchain graph: %s", tc_name, tc_version, err)
+
+    _log.info("Toolchain graph for %s has %d edges", tc_graph.search_paths, len(tc_graph.edges))
+
+
+def get_toolchain_graph(subtoolchains):
+    """
+    Return toolchain graph for current robot search path.
+
+    If a cache directory is specified (cfr. --cache-dir), the graph is loaded from disk,
+    and fully built in a single pass if it's not available yet; otherwise, it is populated on demand.
+    Changes to the graph are only persisted via save_toolchain_graphs.
+
+    :param subtoolchains: dict with subtoolchain name for each known toolchain name
+    """
+    search_paths = robot_search_paths()
+    key = tuple(search_paths)
+
+    if key not in _toolchain_graphs:
+        cache_dir = build_option('cache_dir')
+        if cache_dir:
+            tc_graph = ToolchainGraph.load(os.path.join(cache_dir, TOOLCHAIN_GRAPH_FILENAME), search_paths)
+        else:
+            tc_graph = ToolchainGraph(search_paths)
+
+        # register graph before building it, since parsing toolchain easyconfigs may trigger
+        # toolchain hierarchy lookups (for dependencies that use a minimal toolchain)
+        _toolchain_graphs[key] = tc_graph
+
+        if cache_dir and not tc_graph.edges:
+            build_toolchain_graph(tc_graph, subtoolchains)
+
+    return _toolchain_graphs[key]
+
+
+def save_toolchain_graphs():
+    """Persist toolchain graphs that were changed during this session (cfr. --cache-dir)."""
+    for tc_graph in _toolchain_graphs.values():
+        if tc_graph.path:
+            tc_graph.save()
+
+
 @toolchain_hierarchy_cache
 def get_toolchain_hierarchy(parent_toolchain):
     """
@@ -150,81 +315,22 @@ def get_toolchain_hierarchy(parent_toolchain):
     _, all_tc_classes = search_toolchain('')
     subtoolchains = dict((tc_class.NAME, getattr(tc_class, 'SUBTOOLCHAIN', None)) for tc_class in all_tc_classes)
 
+    tc_graph = get_toolchain_graph(subtoolchains)
+
     current_tc_name, current_tc_version = parent_toolchain['name'], parent_toolchain['version']
-    subtoolchain_name, subtoolchain_version = subtoolchains[current_tc_name], None
+    subtoolchain_name = subtoolchains[current_tc_name]
 
     # the parent toolchain is at the top of the hierarchy
     toolchain_hierarchy = [parent_toolchain]
 
     while subtoolchain_name:
-        # grab the easyconfig of the current toolchain and search the dependencies for a version of the subtoolchain
-        path = robot_find_easyconfig(current_tc_name, current_tc_version)
-        if path is None:
-            raise EasyBuildError("Could not find easyconfig for %s toolchain version %s",
-                                 current_tc_name, current_tc_version)
-
-        # parse the easyconfig
-        parsed_ec = process_easyconfig(path, validate=False)[0]
-
-        # search for version of the subtoolchain in dependencies
-        # considers deps + toolchains of deps + deps of deps + toolchains of deps of deps
-        # consider both version and versionsuffix for dependencies
-        cands = []
-        for dep in parsed_ec['ec'].dependencies():
-            # skip dependencies that are marked as external modules
-            if dep['external_module']:
-                continue
-
-            # include dep and toolchain of dep as candidates
-            cands.extend([
-                {'name': dep['name'], 'version': dep['version'] + dep['versionsuffix']},
-                dep['toolchain'],
-            ])
-
-            # find easyconfig file for this dep and parse it
-            ecfile = robot_find_easyconfig(dep['name'], det_full_ec_version(dep))
-            if ecfile is None:
-                raise EasyBuildError("Could not find easyconfig for dependency %s with version %s",
-                                     dep['name'], det_full_ec_version(dep))
-            easyconfig = process_easyconfig(ecfile, validate=False)[0]['ec']
-
-            # include deps and toolchains of deps of this dep, but skip dependencies marked as external modules
-            for depdep in easyconfig.dependencies():
-                if depdep['external_module']:
-                    continue
-
-                cands.append({'name': depdep['name'], 'version': depdep['version'] + depdep['versionsuffix']})
-                cands.append(depdep['toolchain'])
-
-        # only retain candidates that match subtoolchain name
-        cands = [c for c in cands if c['name'] == subtoolchain_name]
-
-        uniq_subtc_versions = set([subtc['version'] for subtc in cands])
+        # look up subtoolchain in toolchain graph, determine it (and add it to the graph) if it's not known yet
+        subtc = tc_graph.get_subtoolchain(current_tc_name, current_tc_version)
+        if subtc is None:
+            subtc, paths = det_subtoolchain(current_tc_name, current_tc_version, subtoolchain_name)
+            tc_graph.add_subtoolchain(current_tc_name, current_tc_version, subtc[0], subtc[1], paths)
 
-        if len(uniq_subtc_versions) == 1:
-            subtoolchain_version = cands[0]['version']
-
-        elif len(uniq_subtc_versions) == 0:
-            # only retain GCCcore as subtoolchain if version was found
-            if subtoolchain_name == GCCcore.NAME:
-                _log.info("No version found for %s; assuming legacy toolchain and skipping it as subtoolchain.",
-                          subtoolchain_name)
-                subtoolchain_name = GCCcore.SUBTOOLCHAIN
-                subtoolchain_version = ''
-            # dummy toolchain: end of the line
-            elif subtoolchain_name == DUMMY_TOOLCHAIN_NAME:
-                subtoolchain_version = ''
-            else:
-                raise EasyBuildError("No version found for subtoolchain %s in dependencies of %s",
-                                     subtoolchain_name, current_tc_name)
-        else:
-            if subtoolchain_name == DUMMY_TOOLCHAIN_NAME:
-                # Don't care about multiple versions of dummy
-                _log.info("Ignoring multiple versions of %s in toolchain hierarchy", DUMMY_TOOLCHAIN_NAME)
-                subtoolchain_version = ''
-            else:
-                raise EasyBuildError("Multiple versions of %s found in dependencies of toolchain %s: %s",
-                                     subtoolchain_name, current_tc_name, ', '.join(sorted(uniq_subtc_versions)))
+        subtoolchain_name, subtoolchain_version = subtc
 
         if subtoolchain_name == DUMMY_TOOLCHAIN_NAME and not build_option('add_dummy_to_minimal_toolchains'):
             # we're done
@@ -232,7 +338,7 @@ def get_toolchain_hierarchy(parent_toolchain):
 
         # add to hierarchy and move to next
         current_tc_name, current_tc_version = subtoolchain_name, subtoolchain_version
-        subtoolchain_name, subtoolchain_version = subtoolchains[current_tc_name], None
+        subtoolchain_name = subtoolchains[current_tc_name]
         toolchain_hierarchy.insert(0, {'name': current_tc_name, 'version': current_tc_version})
 
     _log.info("Found toolchain hierarchy for toolchain %s: %s", parent_toolchain, toolchain_hierarchy)
@@ -270,17 +376,17 @@ class EasyConfig(object):
         if rawtxt is None:
             self.path = path
             self.rawtxt = read_file(path)
-            self.log.debug("Raw contents from supplied easyconfig file %s: %s" % (path, self.rawtxt))
+            self.log.debug("Raw contents from supplied easyconfig file %s: %s", path, self.rawtxt)
         else:
             self.rawtxt = rawtxt
-            self.log.debug("Supplied raw easyconfig contents: %s" % self.rawtxt)
+            self.log.debug("Supplied raw easyconfig contents: %s", self.rawtxt)
 
         self.modules_tool = modules_tool()
 
         # use legacy module classes as default
         self.valid_module_classes = build_option('valid_module_classes')
         if self.valid_module_classes is not None:
-            self.log.info("Obtained list of valid module classes: %s" % self.valid_module_classes)
+            self.log.info("Obtained list of valid module classes: %s", self.valid_module_classes)
 
         self._config = copy.deepcopy(DEFAULT_CONFIG)
 
@@ -305,7 +411,7 @@ class EasyConfig(object):
 
         # set valid stops
         self.valid_stops = build_option('valid_stops')
-        self.log.debug("List of valid stops obtained: %s" % self.valid_stops)
+        self.log.debug("List of valid stops obtained: %s", self.valid_stops)
 
         # store toolchain
         self._toolchain = None
@@ -349,7 +455,7 @@ class EasyConfig(object):
     def extend_params(self, extra, overwrite=True):
         """Extend list of known parameters via provided list of extra easyconfig parameters."""
 
-        self.log.debug("Extending list of known easyconfig parameters with: %s", ' '.join(extra.keys()))
+        self.log.debug("Extending list of known easyconfig parameters with: %s", LazyLogValue(' '.join, extra.keys()))
 
         if overwrite:
             self._config.update(extra)
@@ -406,12 +512,12 @@ class EasyConfig(object):
         else:
             raise EasyBuildError("Specifications should be specified using a dictionary, got %s",
                                  type(self.build_specs))
-        self.log.debug("Obtained specs dict %s" % arg_specs)
+        self.log.debug("Obtained specs dict %s", arg_specs)
 
-        self.log.info("Parsing easyconfig file %s with rawcontent: %s" % (self.path, self.rawtxt))
+        self.log.info("Parsing easyconfig file %s", self.path)
         self.parser.set_specifications(arg_specs)
         local_vars = self.parser.get_config_dict()
-        self.log.debug("Parsed easyconfig as a dictionary: %s" % local_vars)
+        self.log.debug("Parsed easyconfig as a dictionary: %s", local_vars)
 
         # make sure all mandatory parameters are defined
         # this includes both generic mandatory parameters and software-specific parameters defined via extra_options
@@ -441,12 +547,14 @@ class EasyConfig(object):
                     self[key] = [self._parse_dependency(dep, hidden=True) for dep in local_vars[key]]
                 else:
                     self[key] = local_vars[key]
-                self.log.info("setting config option %s: value %s (type: %s)", key, self[key], type(self[key]))
+                # (templated) value is only determined when it's actually going to be logged
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug("setting config option %s: value %s (type: %s)", key, self[key], type(self[key]))
             elif key in REPLACED_PARAMETERS:
                 _log.nosupport("Easyconfig parameter '%s' is replaced by '%s'" % (key, REPLACED_PARAMETERS[key]), '2.0')
 
             else:
-                self.log.debug("Ignoring unknown config option %s (value: %s)" % (key, local_vars[key]))
+                self.log.debug("Ignoring unknown config option %s (value: %s)", key, local_vars[key])
 
         # update templating dictionary
         self.generate_template_values()
@@ -509,7 +617,7 @@ class EasyConfig(object):
         validate presence of OS dependencies
         osdependencies should be a single list
         """
-        not_found = []
+        os_deps = []
         for dep in self['osdependencies']:
             # make sure we have a tuple
             if isinstance(dep, basestring):
@@ -517,14 +625,16 @@ class EasyConfig(object):
             elif not isinstance(dep, tuple):
                 raise EasyBuildError("Non-tuple value type for OS dependency specification: %s (type %s)",
                                      dep, type(dep))
+            os_deps.append(dep)
 
-            if not any([check_os_dependency(cand_dep) for cand_dep in dep]):
-                not_found.append(dep)
+        # check all (alternative) OS dependencies at once
+        found = check_os_dependencies([cand_dep for dep in os_deps for cand_dep in dep])
+        not_found = [dep for dep in os_deps if not any(found[cand_dep] for cand_dep in dep)]
 
         if not_found:
             raise EasyBuildError("One or more OS dependencies were not found: %s", not_found)
         else:
-            self.log.info("OS dependencies ok: %s" % self['osdependencies'])
+            self.log.info("OS dependencies ok: %s", self['osdependencies'])
 
         return True
 
@@ -605,7 +715,7 @@ class EasyConfig(object):
 
         # if filter-deps option is provided we "clean" the list of dependencies for
         # each processed easyconfig to remove the unwanted dependencies
-        self.log.debug("Dependencies BEFORE filtering: %s" % deps)
+        self.log.debug("Dependencies BEFORE filtering: %s", deps)
         filter_deps = build_option('filter_deps')
         if filter_deps:
             filtered_deps = []
@@ -613,8 +723,8 @@ class EasyConfig(object):
                 if dep['name'] not in filter_deps:
                     filtered_deps.append(dep)
                 else:
-                    self.log.info("filtered out dependency %s" % dep)
-            self.log.debug("Dependencies AFTER filtering: %s" % filtered_deps)
+                    self.log.info("filtered out dependency %s", dep)
+            self.log.debug("Dependencies AFTER filtering: %s", filtered_deps)
             deps = filtered_deps
 
         return deps
@@ -663,7 +773,7 @@ class EasyConfig(object):
             self._toolchain = get_toolchain(self['toolchain'], self['toolchainopts'],
                                             mns=ActiveMNS(), tcdeps=tcdeps, modtool=self.modules_tool)
             tc_dict = self._toolchain.as_dict()
-            self.log.debug("Initialized toolchain: %s (opts: %s)" % (tc_dict, self['toolchainopts']))
+            self.log.debug("Initialized toolchain: %s (opts: %s)", tc_dict, self['toolchainopts'])
         return self._toolchain
 
     @property
@@ -701,6 +811,7 @@ class EasyConfig(object):
         self.log.debug("Dumped easyconfig: %s", ectxt)
 
         if build_option('dump_autopep8'):
+            import autopep8
             autopep8_opts = {
                 'aggressive': 1,  # enable non-whitespace changes, but don't be too aggressive
                 'max_line_length': 120,
@@ -755,7 +866,7 @@ class EasyConfig(object):
         :param build_only: indicate whether this is a build-only dependency
         """
         # convert tuple to string otherwise python might complain about the formatting
-        self.log.debug("Parsing %s as a dependency" % str(dep))
+        self.log.debug("Parsing %s as a dependency", dep)
 
         attr = ['name', 'version', 'versionsuffix', 'toolchain']
         dependency = {
@@ -1254,7 +1365,7 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
     easyconfigs = []
     for spec in blocks:
         # process for dependencies and real installversionname
-        _log.debug("Processing easyconfig %s" % spec)
+        _log.debug("Processing easyconfig %s", spec)
 
         # create easyconfig
         try:
@@ -1285,23 +1396,23 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
 
             # add build dependencies
             for dep in ec['builddependencies']:
-                _log.debug("Adding build dependency %s for app %s." % (dep, name))
+                _log.debug("Adding build dependency %s for app %s.", dep, name)
                 easyconfig['builddependencies'].append(dep)
 
             # add hidden dependencies
             for dep in ec['hiddendependencies']:
-                _log.debug("Adding hidden dependency %s for app %s." % (dep, name))
+                _log.debug("Adding hidden dependency %s for app %s.", dep, name)
                 easyconfig['hiddendependencies'].append(dep)
 
             # add dependencies (including build & hidden dependencies)
             for dep in ec.dependencies():
-                _log.debug("Adding dependency %s for app %s." % (dep, name))
+                _log.debug("Adding dependency %s for app %s.", dep, name)
                 easyconfig['dependencies'].append(dep)
 
             # add toolchain as dependency too
             if ec['toolchain']['name'] != DUMMY_TOOLCHAIN_NAME:
                 tc = ec.toolchain.as_dict()
-                _log.debug("Adding toolchain %s as dependency for app %s." % (tc, name))
+                _log.debug("Adding toolchain %s as dependency for app %s.", tc, name)
                 easyconfig['dependencies'].append(tc)
 
     if cache_key is not None:
@@ -1344,15 +1455,18 @@ def create_paths(path, name, version):
     return ['%s.eb' % os.path.join(path, *cand_path) for cand_path in cand_paths]
 
 
-def robot_find_easyconfig(name, version):
+def robot_candidate_dirs(name, version):
     """
-    Find an easyconfig for module in path, returns (absolute) path to easyconfig file (or None, if none is found).
+    Return list of directories in the robot search path in which an easyconfig file for the specified software
+    could be located (cfr. create_paths), whether it exists or not.
     """
-    key = (name, version)
-    if key in _easyconfig_files_cache:
-        _log.debug("Obtained easyconfig path from cache for %s: %s" % (key, _easyconfig_files_cache[key]))
-        return _easyconfig_files_cache[key]
+    return nub([os.path.dirname(p) for path in robot_search_paths() for p in create_paths(path, name, version)])
 
+
+def robot_search_paths():
+    """
+    Return list of paths that are searched for easyconfig files (in order), based on the robot search path.
+    """
     paths = build_option('robot_path')
     if paths is None:
         paths = []
@@ -1363,13 +1477,25 @@ def robot_find_easyconfig(name, version):
     if build_option('consider_archived_easyconfigs'):
         paths = paths + [os.path.join(p, EASYCONFIGS_ARCHIVE_DIR) for p in paths]
 
+    return list(paths)
+
+
+def robot_find_easyconfig(name, version):
+    """
+    Find an easyconfig for module in path, returns (absolute) path to easyconfig file (or None, if none is found).
+    """
+    key = (name, version)
+    if key in _easyconfig_files_cache:
+        _log.debug("Obtained easyconfig path from cache for %s: %s", key, _easyconfig_files_cache[key])
+        return _easyconfig_files_cache[key]
+
     res = None
-    for path in paths:
+    for path in robot_search_paths():
         easyconfigs_paths = create_paths(path, name, version)
         for easyconfig_path in easyconfigs_paths:
-            _log.debug("Checking easyconfig path %s" % easyconfig_path)
+            _log.debug("Checking easyconfig path %s", easyconfig_path)
             if os.path.isfile(easyconfig_path):
-                _log.debug("Found easyconfig file for name %s, version %s at %s" % (name, version, easyconfig_path))
+                _log.debug("Found easyconfig file for name %s, version %s at %s", name, version, easyconfig_path)
                 _easyconfig_files_cache[key] = os.path.abspath(easyconfig_path)
                 res = _easyconfig_files_cache[key]
                 break
@@ -1393,7 +1519,24 @@ def verify_easyconfig_filename(path, specs, parsed_ec=None):
     elif isinstance(parsed_ec, (list, tuple)):
         ecs = parsed_ec
     elif parsed_ec is None:
-        ecs = process_easyconfig(path)
+        # a lightweight parse is sufficient, if the relevant parameters can be determined statically
+        try:
+            ec = parse_easyconfig_header(read_file(path), params=FILENAME_PARAMETERS, strict=True)
+        except EasyBuildError as err:
+            _log.debug("Lightweight parse of %s failed, falling back to full parse: %s", path, err)
+            ec = None
+
+        if ec is not None:
+            toolchain = ec['toolchain']
+            if not all(isinstance(ec[key], basestring) for key in ['name', 'version']):
+                ec = None
+            elif not isinstance(toolchain, dict) or 'name' not in toolchain or 'version' not in toolchain:
+                ec = None
+
+        if ec is None:
+            ecs = process_easyconfig(path)
+        else:
+            ecs = [{'ec': ec}]
     else:
         raise EasyBuildError("Unexpected value type for parsed_ec: %s (%s)", type(parsed_ec), parsed_ec)
 
@@ -1427,6 +1570,110 @@ def verify_easyconfig_filename(path, specs, parsed_ec=None):
     _log.info("Contents of %s verified against easyconfig filename, matches %s", path, specs)
 
 
+def toolchains_with_easyconfig_cache(func):
+    """
+    Function decorator to cache (and retrieve cached) results of looking for easyconfigs for a dependency
+    in a toolchain hierarchy; the same dependency is usually resolved many times during a single run.
+    """
+    cache = {}
+
+    @functools.wraps(func)
+    def cache_aware_func(dep, toolchain_hierarchy):
+        """Look up result in cache first, determine and cache it if it's not available yet."""
+        cache_key = (dep['name'], dep['version'], dep.get('versionprefix', ''), dep.get('versionsuffix', ''),
+                     tuple((tc['name'], tc['version']) for tc in toolchain_hierarchy))
+        if cache_key not in cache:
+            cache[cache_key] = func(dep, toolchain_hierarchy)
+        return cache[cache_key]
+
+    def clear():
+        """Clear cache, including lookup table for easyconfig files obtained from the easyconfig index."""
+        cache.clear()
+        _easyconfig_index_lookup.clear()
+
+    # expose clear method of cache to wrapped function
+    cache_aware_func.clear = clear
+
+    return cache_aware_func
+
+
+def easyconfig_index_lookup():
+    """
+    Determine lookup table for easyconfig files in the robot search path, based on the metadata (name, version,
+    versionsuffix, toolchain) in the (persistent) easyconfig index (cfr. --cache-dir).
+
+    :return: None if no cache directory is used, or tuple with set of filenames of easyconfig files that match
+             with their metadata, and set of filenames of other easyconfig files (e.g. because metadata is unknown,
+             a version prefix is used, or the easyconfig file is located at <path>/<name>/<version>.eb)
+    """
+    cache_dir = build_option('cache_dir')
+    if not cache_dir:
+        return None
+
+    paths = robot_search_paths()
+    key = (cache_dir, tuple(paths))
+    if key not in _easyconfig_index_lookup:
+        ignore_dirs = build_option('ignore_dirs')
+        if ignore_dirs is None:
+            ignore_dirs = ['.git', '.svn']
+
+        index = EasyconfigIndex.load(os.path.join(cache_dir, EASYCONFIG_INDEX_FILENAME))
+        index.update(paths, ignore_dirs=ignore_dirs, threads=build_option('search_threads') or 1)
+
+        matching, other = set(), set()
+        for path in paths:
+            for ec_path in index.files(path, ignore_dirs=ignore_dirs):
+                filename = os.path.basename(ec_path)
+                if not filename.endswith('.eb'):
+                    continue
+
+                metadata = index.get_metadata(ec_path)
+                if all(metadata[param] is not None for param in ['name', 'toolchain', 'version']):
+                    tc_name, tc_version = metadata['toolchain'].split('/', 1)
+                    metadata = dict(metadata, toolchain={'name': tc_name, 'version': tc_version})
+                    if filename == '%s-%s.eb' % (metadata['name'], det_full_ec_version(metadata)):
+                        matching.add(filename)
+                        continue
+                other.add(filename)
+
+        index.save()
+        _log.debug("Easyconfig index lookup for %s: %d matching easyconfigs, %d others", paths, len(matching),
+                   len(other))
+        _easyconfig_index_lookup[key] = (matching, other)
+
+    return _easyconfig_index_lookup[key]
+
+
+@toolchains_with_easyconfig_cache
+def find_toolchains_with_easyconfig(dep, toolchain_hierarchy):
+    """
+    Determine for which toolchains in the specified toolchain hierarchy an easyconfig file is available
+    for the specified dependency.
+
+    :param dep: dependency specification (dict)
+    :param toolchain_hierarchy: list of toolchains (dicts) to consider
+    :return: list of toolchains for which an easyconfig file is available (in same order as in toolchain hierarchy)
+    """
+    # if the easyconfig index is available, only check for easyconfig files that are known to exist (cfr. --cache-dir)
+    index_lookup = easyconfig_index_lookup()
+
+    res = []
+    newdep = copy.deepcopy(dep)
+    for tc in toolchain_hierarchy:
+        newdep['toolchain'] = tc
+        full_version = det_full_ec_version(newdep)
+        if index_lookup is not None:
+            matching, other = index_lookup
+            filenames = ['%s-%s.eb' % (newdep['name'], full_version), '%s.eb' % full_version]
+            if filenames[0] not in matching and not any(fn in other for fn in filenames):
+                continue
+        if robot_find_easyconfig(newdep['name'], full_version) is not None:
+            res.append(tc)
+
+    _log.debug("Toolchains for which easyconfig for %s is available: %s", dep['name'], res)
+    return res
+
+
 def robot_find_minimal_toolchain_of_dependency(dep, modtool, parent_tc=None, parent_first=False):
     """
     Find the minimal toolchain of a dependency
@@ -1439,38 +1686,39 @@ def robot_find_minimal_toolchain_of_dependency(dep, modtool, parent_tc=None, par
     if parent_tc is None:
         parent_tc = dep['toolchain']
 
-    avail_modules = []
-    if build_option('use_existing_modules') and not build_option('retain_all_deps'):
-        avail_modules = modtool.available()
+    use_existing_modules = build_option('use_existing_modules') and not build_option('retain_all_deps')
 
-    newdep = copy.deepcopy(dep)
+    avail_modules = set()
+    if use_existing_modules:
+        avail_modules = set(modtool.available())
 
     toolchain_hierarchy = get_toolchain_hierarchy(parent_tc)
-    if parent_first:
-        toolchain_hierarchy = toolchain_hierarchy[::-1]
 
     possible_toolchains = []
     # start with subtoolchains first, i.e. first (dummy or) compiler-only toolchain, etc.
-    for tc in toolchain_hierarchy:
-        newdep['toolchain'] = tc
-        eb_file = robot_find_easyconfig(newdep['name'], det_full_ec_version(newdep))
-        if eb_file is not None:
-            module_exists = False
-            # if necessary check if module exists
-            if build_option('use_existing_modules') and not build_option('retain_all_deps'):
-                full_mod_name = ActiveMNS().det_full_module_name(newdep)
-                # fallback to checking with modtool.exist is required,
-                # for hidden modules and external modules where module name may be partial
-                module_exists = full_mod_name in avail_modules or modtool.exist([full_mod_name], skip_avail=True)[0]
-            # add the toolchain to list of possibilities
-            possible_toolchains.append({'toolchain': tc, 'module_exists': module_exists})
+    toolchains = find_toolchains_with_easyconfig(dep, toolchain_hierarchy)
+    if parent_first:
+        toolchains = toolchains[::-1]
+
+    newdep = copy.deepcopy(dep) if use_existing_modules else None
+    for tc in toolchains:
+        module_exists = False
+        # if necessary check if module exists
+        if use_existing_modules:
+            newdep['toolchain'] = tc
+            full_mod_name = ActiveMNS().det_full_module_name(newdep)
+            # fallback to checking with modtool.exist is required,
+            # for hidden modules and external modules where module name may be partial
+            module_exists = full_mod_name in avail_modules or modtool.exist([full_mod_name], skip_avail=True)[0]
+        # add the toolchain to list of possibilities
+        possible_toolchains.append({'toolchain': tc, 'module_exists': module_exists})
 
     if possible_toolchains:
         _log.debug("List of possible minimal toolchains for %s: %s", dep, possible_toolchains)
 
         # select the toolchain to return, defaulting to the first element (lowest possible toolchain)
         minimal_toolchain = possible_toolchains[0]['toolchain']
-        if build_option('use_existing_modules') and not build_option('retain_all_deps'):
+        if use_existing_modules:
             # take the last element in the case of using existing modules (allows for potentially better optimisation)
             filtered_possibilities = [tc for tc in possible_toolchains if tc['module_exists']]
             if filtered_possibilities:
@@ -1596,7 +1844,7 @@ class ActiveMNS(object):
 
         # determine active module naming scheme
         avail_mnss = avail_module_naming_schemes()
-        self.log.debug("List of available module naming schemes: %s" % avail_mnss.keys())
+        self.log.debug("List of available module naming schemes: %s", avail_mnss.keys())
         sel_mns = get_module_naming_scheme()
         if sel_mns in avail_mnss:
             self.mns = avail_mnss[sel_mns]()
@@ -1613,14 +1861,14 @@ class ActiveMNS(object):
         Obtain a full parsed easyconfig file to pass to naming scheme methods if provided keys are insufficient.
         """
         if not isinstance(ec, EasyConfig) and self.requires_full_easyconfig(ec.keys()):
-            self.log.debug("A parsed easyconfig is required by the module naming scheme, so finding one for %s" % ec)
+            self.log.debug("A parsed easyconfig is required by the module naming scheme, so finding one for %s", ec)
             # fetch/parse easyconfig file if deemed necessary
             eb_file = robot_find_easyconfig(ec['name'], det_full_ec_version(ec))
             if eb_file is not None:
                 parsed_ec = process_easyconfig(eb_file, parse_only=True, hidden=ec['hidden'])
                 if len(parsed_ec) > 1:
                     self.log.warning("More than one parsed easyconfig obtained from %s, only retaining first" % eb_file)
-                    self.log.debug("Full list of parsed easyconfigs: %s" % parsed_ec)
+                    self.log.debug("Full list of parsed easyconfigs: %s", parsed_ec)
                 ec = parsed_ec[0]['ec']
             else:
                 raise EasyBuildError("Failed to find easyconfig file '%s-%s.eb' when determining module name for: %s",
@@ -1673,7 +1921,7 @@ class ActiveMNS(object):
 
     def det_full_module_name(self, ec, force_visible=False):
         """Determine full module name by selected module naming scheme, based on supplied easyconfig."""
-        self.log.debug("Determining full module name for %s (force_visible: %s)" % (ec, force_visible))
+        self.log.debug("Determining full module name for %s (force_visible: %s)", ec, force_visible)
         if ec.get('external_module', False):
             # external modules have the module name readily available, and may lack the info required by the MNS
             mod_name = ec['full_mod_name']
@@ -1701,9 +1949,9 @@ class ActiveMNS(object):
 
     def det_short_module_name(self, ec, force_visible=False):
         """Determine short module name according to module naming scheme."""
-        self.log.debug("Determining short module name for %s (force_visible: %s)" % (ec, force_visible))
+        self.log.debug("Determining short module name for %s (force_visible: %s)", ec, force_visible)
         mod_name = self._det_module_name_with(self.mns.det_short_module_name, ec, force_visible=force_visible)
-        self.log.debug("Obtained valid short module name %s" % mod_name)
+        self.log.debug("Obtained valid short module name %s", mod_name)
 
         # sanity check: obtained module name should pass the 'is_short_modname_for' check
         if 'modaltsoftname' in ec and not self.is_short_modname_for(mod_name, ec['modaltsoftname'] or ec['name']):
@@ -1713,9 +1961,9 @@ class ActiveMNS(object):
 
     def det_module_subdir(self, ec):
         """Determine module subdirectory according to module naming scheme."""
-        self.log.debug("Determining module subdir for %s" % ec)
+        self.log.debug("Determining module subdir for %s", ec)
         mod_subdir = self.mns.det_module_subdir(self.check_ec_type(ec))
-        self.log.debug("Obtained subdir %s" % mod_subdir)
+        self.log.debug("Obtained subdir %s", mod_subdir)
         return mod_subdir
 
     def det_module_symlink_paths(self, ec):
@@ -1726,9 +1974,9 @@ class ActiveMNS(object):
 
     def det_modpath_extensions(self, ec):
         """Determine modulepath extensions according to module naming scheme."""
-        self.log.debug("Determining modulepath extensions for %s" % ec)
+        self.log.debug("Determining modulepath extensions for %s", ec)
         modpath_extensions = self.mns.det_modpath_extensions(self.check_ec_type(ec))
-        self.log.debug("Obtained modulepath extensions: %s" % modpath_extensions)
+        self.log.debug("Obtained modulepath extensions: %s", modpath_extensions)
         return modpath_extensions
 
     def det_user_modpath_extensions(self, ec):
@@ -1740,9 +1988,9 @@ class ActiveMNS(object):
 
     def det_init_modulepaths(self, ec):
         """Determine initial modulepaths according to module naming scheme."""
-        self.log.debug("Determining initial module paths for %s" % ec)
+        self.log.debug("Determining initial module paths for %s", ec)
         init_modpaths = self.mns.det_init_modulepaths(self.check_ec_type(ec))
-        self.log.debug("Obtained initial module paths: %s" % init_modpaths)
+        self.log.debug("Obtained initial module paths: %s", init_modpaths)
         return init_modpaths
 
     def expand_toolchain_load(self, ec=None):
@@ -0,0 +1,204 @@
+##
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Build fingerprints for installations, which determine whether an installation is stale (cfr. --rebuild-stale).
+
+A build fingerprint is a hash over the contents of the easyconfig file, the contents of the source & patch files,
+the easyblock(s) used, the build fingerprints of all dependencies (incl. toolchain),
+and the build options that affect the installation.
+"""
+import hashlib
+import inspect
+import json
+import os
+from vsc.utils import fancylogger
+
+from easybuild.framework.easyconfig.easyconfig import ActiveMNS, get_easyblock_class, letter_dir_for
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import build_option, install_path, log_path, source_paths
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, read_file, write_file
+
+
+_log = fancylogger.getLogger('easyconfig.fingerprint', fname=False)
+
+BUILD_FINGERPRINT_FILENAME = 'build_fingerprint.json'
+
+# build options that affect the installation, and hence are taken into account in build fingerprints
+BUILD_FINGERPRINT_OPTIONS = ['filter_deps', 'filter_env_vars', 'hide_deps', 'minimal_toolchains', 'optarch',
+                             'rpath', 'rpath_filter', 'use_existing_modules']
+
+
+def build_fingerprint_path(ec):
+    """
+    Determine path to build fingerprint for installation of specified easyconfig (or dependency).
+
+    :param ec: parsed easyconfig (EasyConfig instance or dict with dependency specification)
+    """
+    installdir = os.path.join(os.path.abspath(install_path()), ActiveMNS().det_install_subdir(ec))
+    return os.path.join(installdir, log_path(), BUILD_FINGERPRINT_FILENAME)
+
+
+def read_build_fingerprint(ec):
+    """
+    Read build fingerprint for installation of specified easyconfig (or dependency).
+
+    :param ec: parsed easyconfig (EasyConfig instance or dict with dependency specification)
+    :return: build fingerprint (or None if installation has no (valid) build fingerprint)
+    """
+    res = None
+    if not ec.get('external_module', False):
+        path = build_fingerprint_path(ec)
+        if os.path.isfile(path):
+            try:
+                res = json.loads(read_file(path))['fingerprint']
+            except (KeyError, TypeError, ValueError) as err:
+                _log.warning("Ignoring build fingerprint %s which could not be parsed: %s", path, err)
+    return res
+
+
+def write_build_fingerprint(path, fingerprint):
+    """
+    Write build fingerprint to specified location.
+
+    :param path: location to write build fingerprint to
+    :param fingerprint: build fingerprint, as obtained via det_build_fingerprint
+    """
+    write_file(path, json.dumps(fingerprint, indent=2, sort_keys=True))
+
+
+def find_file(ec, filename):
+    """
+    Find source/patch file with specified name for specified easyconfig, next to the easyconfig file or in source paths.
+
+    :return: path to file (or None if it was not found)
+    """
+    cand_dirs = []
+    if ec.path:
+        cand_dirs.append(os.path.dirname(ec.path))
+    for srcpath in source_paths():
+        cand_dirs.extend([os.path.join(srcpath, letter_dir_for(ec['name']), ec['name']),
+                          os.path.join(srcpath, ec['name'])])
+
+    for cand_dir in cand_dirs:
+        path = os.path.join(cand_dir, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def det_file_checksums(ec, filenames):
+    """
+    Determine SHA256 checksums for specified source/patch files of specified easyconfig.
+
+    :return: dict with SHA256 checksum for each file (or None for files that were not found)
+    """
+    res = {}
+    for filename in filenames:
+        path = find_file(ec, filename)
+        if path is None:
+            _log.debug("File %s not found, only taking into account its name in build fingerprint", filename)
+            res[filename] = None
+        else:
+            res[filename] = compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)
+    return res
+
+
+def source_filenames(ec):
+    """Return list of names of source files for specified easyconfig."""
+    res = []
+    for source in ec['sources']:
+        if isinstance(source, dict):
+            source = source.get('filename')
+        elif isinstance(source, (list, tuple)):
+            source = source[0]
+        if source:
+            res.append(source)
+    return res
+
+
+def det_easyblock_checksums(ec):
+    """
+    Determine SHA256 checksums for the easyblock modules that are used for specified easyconfig,
+    i.e. the module providing the easyblock and those providing the easyblocks it derives from.
+
+    :return: dict with SHA256 checksum for each easyblock module (or None if easyblock could not be determined)
+    """
+    easyblock = build_option('easyblock') or ec['easyblock']
+    try:
+        app_class = get_easyblock_class(easyblock, name=ec['name'])
+    except EasyBuildError as err:
+        _log.debug("Failed to determine easyblock for %s, not taking it into account: %s", ec['name'], err.msg)
+        return None
+
+    res = {}
+    for klass in inspect.getmro(app_class):
+        if klass.__module__.startswith('easybuild.easyblocks.'):
+            path = inspect.getsourcefile(klass)
+            if path:
+                res[klass.__module__] = compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)
+    return res
+
+
+def det_build_fingerprint(ec, dep_fingerprints=None):
+    """
+    Determine build fingerprint for specified easyconfig.
+
+    :param ec: parsed easyconfig (EasyConfig instance)
+    :param dep_fingerprints: dict with build fingerprints for dependencies (by full module name);
+                             for other dependencies, the build fingerprint of the installation is used (if any)
+    :return: dict with build fingerprint ('fingerprint') and the components it is based on ('components')
+    """
+    if dep_fingerprints is None:
+        dep_fingerprints = {}
+
+    patch_names = []
+    for patch in ec['patches']:
+        if isinstance(patch, (list, tuple)):
+            patch = patch[0]
+        patch_names.append(patch)
+
+    deps = {}
+    for dep in ec.all_dependencies:
+        dep_mod_name = dep.get('full_mod_name') or ActiveMNS().det_full_module_name(dep)
+        if dep_mod_name in dep_fingerprints:
+            deps[dep_mod_name] = dep_fingerprints[dep_mod_name]
+        else:
+            deps[dep_mod_name] = read_build_fingerprint(dep)
+
+    components = {
+        'build_options': dict((opt, build_option(opt, default=None)) for opt in BUILD_FINGERPRINT_OPTIONS),
+        'dependencies': deps,
+        'easyblocks': det_easyblock_checksums(ec),
+        'easyconfig': hashlib.sha256(ec.rawtxt).hexdigest(),
+        'patches': det_file_checksums(ec, patch_names),
+        'sources': det_file_checksums(ec, source_filenames(ec)),
+    }
+    fingerprint = hashlib.sha256(json.dumps(components, sort_keys=True)).hexdigest()
+    _log.debug("Build fingerprint for %s: %s (components: %s)", ec.path, fingerprint, components)
+
+    return {
+        'fingerprint': fingerprint,
+        'components': components,
+    }
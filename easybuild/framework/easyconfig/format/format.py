@@ -38,7 +38,6 @@ from easybuild.framework.easyconfig.format.version import EasyVersion, OrderedVe
 from easybuild.framework.easyconfig.format.version import ToolchainVersionOperator, VersionOperator
 from easybuild.framework.easyconfig.format.convert import Dependency
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.configobj import Section
 
 
 INDENT_4SPACES = ' ' * 4
@@ -242,6 +241,9 @@ class EBConfigObj(object):
         :param toparse: a Section (or ConfigObj) instance, basically a dict of (unparsed) sections
         :param current: the current NestedDict 
         """
+        # configobj is only imported when it's needed, to keep startup time low
+        from easybuild.tools.configobj import Section
+
         # note: configobj already converts comma-separated strings in lists
         #
         # list of supported keywords, all else will fail
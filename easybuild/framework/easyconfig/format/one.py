@@ -368,7 +368,7 @@ def retrieve_blocks_in_spec(spec, only_blocks, silent=False):
     ec_format_version = get_format_version(txt)
     if ec_format_version is None:
         ec_format_version = FORMAT_DEFAULT_VERSION
-    _log.debug("retrieve_blocks_in_spec: derived easyconfig format version: %s" % ec_format_version)
+    _log.debug("retrieve_blocks_in_spec: derived easyconfig format version: %s", ec_format_version)
 
     # blocks in easyconfigs are only supported in easyconfig format 1.0
     if pieces and ec_format_version == EasyVersion('1.0'):
@@ -424,7 +424,7 @@ def retrieve_blocks_in_spec(spec, only_blocks, silent=False):
 
             specs.append(block_path)
 
-        _log.debug("Found %s block(s) in %s" % (len(specs), spec))
+        _log.debug("Found %s block(s) in %s", len(specs), spec)
         return specs
     else:
         # no blocks, one file
@@ -29,7 +29,12 @@ The main easyconfig format class
 :author: Stijn De Weirdt (Ghent University)
 :author: Kenneth Hoste (Ghent University)
 """
+import hashlib
+import imp
+import marshal
+import os
 import re
+import stat
 import sys
 
 from vsc.utils import fancylogger
@@ -39,12 +44,36 @@ from easybuild.framework.easyconfig.format.format import get_format_version, Eas
 from easybuild.framework.easyconfig.licenses import EASYCONFIG_LICENSES_DICT
 from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.configobj import ConfigObj
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import mkdir, read_file
 from easybuild.tools.systemtools import get_shared_lib_ext
 
 
 _log = fancylogger.getLogger('easyconfig.format.pyheaderconfigobj', fname=False)
 
+# name of subdirectory of cache directory (cfr. --cache-dir) in which compiled Python headers are stored
+PYHEADER_CODE_CACHE_DIRNAME = 'pyheader_code'
+
+# cache for (constant) environment used to exec Python headers, indexed by allowed builtins
+_pyheader_env_cache = {}
+
+# cache for compiled Python headers, indexed by checksum of Python header
+_pyheader_code_cache = {}
+
+
+def _is_safe_code_cache_path(path):
+    """
+    Check whether specified path in the on-disk cache for compiled Python headers is safe,
+    i.e. whether it is owned by the current user and not writable by group or others.
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError as err:
+        _log.debug("Failed to stat %s: %s", path, err)
+        return False
+
+    return path_stat.st_uid == os.geteuid() and not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
 
 def build_easyconfig_constants_dict():
     """Make a dictionary with all constants that can be used"""
@@ -84,6 +113,105 @@ def build_easyconfig_variables_dict():
     return vars_dict
 
 
+def get_easyconfig_env(allowed_builtins=None):
+    """
+    Return (cached) dict with all constants and variables that can be used in easyconfig files,
+    and the specified builtins (if any); the returned dict should not be modified, make a copy first.
+
+    :param allowed_builtins: list of names of allowed builtins (None implies no restrictions)
+    """
+    key = None if allowed_builtins is None else tuple(allowed_builtins)
+    if key not in _pyheader_env_cache:
+        env = {}
+        # all variables
+        env.update(build_easyconfig_variables_dict())
+        # all constants
+        env.update(build_easyconfig_constants_dict())
+
+        # allowed builtins
+        if allowed_builtins is not None:
+            current_builtins = globals()['__builtins__']
+            builtins = {}
+            for name in allowed_builtins:
+                if hasattr(current_builtins, name):
+                    builtins[name] = getattr(current_builtins, name)
+                elif isinstance(current_builtins, dict) and name in current_builtins:
+                    builtins[name] = current_builtins[name]
+                else:
+                    _log.warning('No builtin %s found.' % name)
+            env['__builtins__'] = builtins
+            _log.debug("Available builtins: %s" % env['__builtins__'])
+
+        _pyheader_env_cache[key] = env
+
+    return _pyheader_env_cache[key]
+
+
+def compile_pyheader(pyheader):
+    """
+    Compile specified Python header of an easyconfig file.
+
+    Compiled code is cached in memory, and also stored on disk (marshalled) if a cache directory is specified
+    (cfr. --cache-dir), indexed by checksum of the Python header, such that Python headers are only compiled once.
+
+    Since loading compiled code from disk implies running it, it is only done if the cache directory,
+    the subdirectories in it and the file with compiled code are owned by the current user,
+    and are not writable by group or others.
+
+    :param pyheader: Python header (string) to compile
+    :return: code object
+    """
+    if isinstance(pyheader, unicode):
+        checksum = hashlib.sha256(pyheader.encode('utf-8')).hexdigest()
+    else:
+        checksum = hashlib.sha256(pyheader).hexdigest()
+
+    code = _pyheader_code_cache.get(checksum)
+    if code is None:
+        cache_dir = build_option('cache_dir', default=None)
+        if cache_dir:
+            # marshal format is specific to Python version, so use separate subdirectory per Python bytecode version
+            code_dir = os.path.join(cache_dir, PYHEADER_CODE_CACHE_DIRNAME, imp.get_magic().encode('hex'))
+            code_path = os.path.join(code_dir, checksum)
+        else:
+            code_path = None
+
+        if code_path and os.path.exists(code_path):
+            paths = [cache_dir, os.path.dirname(code_dir), code_dir, code_path]
+            if all(_is_safe_code_cache_path(path) for path in paths):
+                try:
+                    code = marshal.loads(read_file(code_path))
+                except (EOFError, TypeError, ValueError) as err:
+                    _log.warning("Ignoring compiled code in %s which could not be loaded: %s", code_path, err)
+            else:
+                _log.warning("Ignoring compiled code in %s, since (a parent directory of) it is not owned by "
+                             "the current user or is writable by group/others", code_path)
+
+        if code is None:
+            code = compile(pyheader, '<string>', 'exec')
+            if code_path:
+                # write to temporary file first, to avoid that a partially written file is picked up
+                tmp_path = '%s.%s' % (code_path, os.getpid())
+                try:
+                    mkdir(code_dir, parents=True)
+                    # only current user should be able to modify compiled code
+                    for path in [os.path.dirname(code_dir), code_dir]:
+                        path_stat = os.stat(path)
+                        if path_stat.st_uid == os.geteuid():
+                            os.chmod(path, stat.S_IMODE(path_stat.st_mode) & ~(stat.S_IWGRP | stat.S_IWOTH))
+                    handle = open(tmp_path, 'wb')
+                    os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR)
+                    handle.write(marshal.dumps(code))
+                    handle.close()
+                    os.rename(tmp_path, code_path)
+                except (IOError, OSError) as err:
+                    _log.warning("Failed to store compiled code in %s: %s", code_path, err)
+
+        _pyheader_code_cache[checksum] = code
+
+    return code
+
+
 class EasyConfigFormatConfigObj(EasyConfigFormat):
     """
     Extended EasyConfig format, with support for a header and sections that are actually parsed (as opposed to exec'ed).
@@ -112,6 +240,9 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
         Pre-process txt to extract header, docstring and pyheader
         Then create the configobj instance by parsing the remainder
         """
+        # configobj is only imported when an easyconfig file is actually parsed, to keep startup time low
+        from easybuild.tools.configobj import ConfigObj
+
         # where is the first section?
         sectionmarker_pattern = ConfigObj._sectionmarker.pattern
         if strict_section_markers:
@@ -152,7 +283,7 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
                 if not format_version == self.VERSION:
                     raise EasyBuildError("Invalid format version %s for current format class", format_version)
                 else:
-                    self.log.info("Valid format version %s found" % format_version)
+                    self.log.info("Valid format version %s found", format_version)
                 # version is not part of header
                 continue
 
@@ -169,15 +300,15 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
     def parse_header(self, header):
         """Parse the header, assign to self.header"""
         # FIXME: do something with the header
-        self.log.debug("Found header %s" % header)
+        self.log.debug("Found header %s", header)
         self.header = header
 
     def parse_pyheader(self, pyheader):
         """Parse the python header, assign to docstring and cfg"""
         global_vars, local_vars = self.pyheader_env()
-        self.log.debug("pyheader initial global_vars %s" % global_vars)
-        self.log.debug("pyheader initial local_vars %s" % local_vars)
-        self.log.debug("pyheader text being exec'ed: %s" % pyheader)
+        self.log.debug("pyheader initial global_vars %s", global_vars)
+        self.log.debug("pyheader initial local_vars %s", local_vars)
+        self.log.debug("pyheader text being exec'ed: %s", pyheader)
 
         # check for use of deprecated magic easyconfigs variables
         for magic_var in build_easyconfig_variables_dict():
@@ -185,7 +316,7 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
                 _log.nosupport("Magic 'global' easyconfigs variable %s should no longer be used" % magic_var, '2.0')
 
         try:
-            exec(pyheader, global_vars, local_vars)
+            exec(compile_pyheader(pyheader), global_vars, local_vars)
         except Exception as err:  # pylint: disable=broad-except
             err_msg = str(err)
             exc_tb = sys.exc_info()[2]
@@ -193,8 +324,8 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
                 err_msg += " (line %d)" % exc_tb.tb_next.tb_lineno
             raise EasyBuildError("Parsing easyconfig file failed: %s",  err_msg)
 
-        self.log.debug("pyheader final global_vars %s" % global_vars)
-        self.log.debug("pyheader final local_vars %s" % local_vars)
+        self.log.debug("pyheader final global_vars %s", global_vars)
+        self.log.debug("pyheader final local_vars %s", local_vars)
 
         if '__doc__' in local_vars:
             self.docstring = local_vars.pop('__doc__')
@@ -206,26 +337,8 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
     def pyheader_env(self):
         """Create the global/local environment to use with eval/execfile"""
         local_vars = {}
-        global_vars = {}
-
-        # all variables
-        global_vars.update(build_easyconfig_variables_dict())
-        # all constants
-        global_vars.update(build_easyconfig_constants_dict())
-
-        # allowed builtins
-        if self.PYHEADER_ALLOWED_BUILTINS is not None:
-            current_builtins = globals()['__builtins__']
-            builtins = {}
-            for name in self.PYHEADER_ALLOWED_BUILTINS:
-                if hasattr(current_builtins, name):
-                    builtins[name] = getattr(current_builtins, name)
-                elif isinstance(current_builtins, dict) and name in current_builtins:
-                    builtins[name] = current_builtins[name]
-                else:
-                    self.log.warning('No builtin %s found.' % name)
-            global_vars['__builtins__'] = builtins
-            self.log.debug("Available builtins: %s" % global_vars['__builtins__'])
+        # copy cached environment, since it is modified when Python header is exec'ed
+        global_vars = dict(get_easyconfig_env(allowed_builtins=self.PYHEADER_ALLOWED_BUILTINS))
 
         return global_vars, local_vars
 
@@ -256,9 +369,10 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
 
     def parse_section_block(self, section):
         """Parse the section block by trying to convert it into a ConfigObj instance"""
+        from easybuild.tools.configobj import ConfigObj
         try:
             self.configobj = ConfigObj(section.split('\n'))
         except SyntaxError, err:
             raise EasyBuildError('Failed to convert section text %s: %s', section, err)
 
-        self.log.debug("Found ConfigObj instance %s" % self.configobj)
+        self.log.debug("Found ConfigObj instance %s", self.configobj)
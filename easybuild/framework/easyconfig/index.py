@@ -0,0 +1,370 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Index of easyconfig files, used to search for easyconfig files (cfr. --search).
+
+The index keeps track of the files and subdirectories for each directory in the search path,
+so it can be refreshed incrementally: only directories of which the modification time changed are listed again.
+Metadata (name, version, toolchain, ...) for easyconfig files is extracted on demand (only for structured queries),
+and is refreshed whenever the easyconfig file changes.
+
+The index can be persisted as a JSON file (cfr. --cache-dir).
+"""
+import fnmatch
+import json
+import os
+import re
+import socket
+from distutils.version import LooseVersion
+from multiprocessing.pool import ThreadPool
+from vsc.utils import fancylogger
+
+from easybuild.framework.easyconfig.parser import parse_easyconfig_header
+from easybuild.framework.easyconfig.toolchain_graph import file_stamp
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file
+
+
+_log = fancylogger.getLogger('easyconfig.index', fname=False)
+
+EASYCONFIG_INDEX_FILENAME = 'easyconfig_index.json'
+EASYCONFIG_INDEX_FORMAT_VERSION = 2
+
+# easyconfig parameters that can be used in structured search queries, e.g. 'name=GCC toolchain=foss/2018a'
+SEARCH_FIELDS = ['moduleclass', 'name', 'toolchain', 'version', 'versionsuffix']
+
+
+def parse_search_query(query):
+    """
+    Parse search query: split into <field>=<value> terms and regular expressions for filenames.
+
+    Queries that do not include any <field>=<value> terms are retained as is (i.e. as a single regular expression).
+
+    :param query: search query
+    :return: tuple with dict of values for specified fields, and list of regular expressions
+    """
+    terms, regexes = {}, []
+    for token in query.split():
+        key, sep, value = token.partition('=')
+        if sep and key in SEARCH_FIELDS:
+            terms[key] = value
+        else:
+            regexes.append(token)
+
+    if not terms:
+        regexes = [query]
+
+    return terms, regexes
+
+
+def match_value(value, pattern, key):
+    """
+    Check whether value for easyconfig parameter matches specified pattern (case-insensitive, may include wildcards).
+
+    :param value: value for easyconfig parameter (None if unknown)
+    :param pattern: pattern to match
+    :param key: name of easyconfig parameter
+    """
+    if value is None:
+        res = False
+    else:
+        # toolchains can be specified by name only
+        if key == 'toolchain' and '/' not in pattern:
+            value = value.split('/')[0]
+        res = fnmatch.fnmatch(value.lower(), pattern.lower())
+    return res
+
+
+def extract_metadata(path):
+    """
+    Extract metadata from easyconfig file, without fully parsing it.
+
+    :param path: path to easyconfig file
+    :return: dict with values for name, version, versionsuffix, toolchain and moduleclass (None if unknown)
+    """
+    try:
+        res = parse_easyconfig_header(read_file(path), params=SEARCH_FIELDS)
+    except EasyBuildError as err:
+        _log.debug("Failed to extract metadata from %s: %s", path, err)
+        res = dict((key, None) for key in SEARCH_FIELDS)
+
+    # toolchain is specified as a dict, represent it as <name>/<version>
+    toolchain = res['toolchain']
+    if isinstance(toolchain, dict) and 'name' in toolchain and 'version' in toolchain:
+        res['toolchain'] = '%s/%s' % (toolchain['name'], toolchain['version'])
+    else:
+        res['toolchain'] = None
+
+    # only retain string values
+    for key in res:
+        if not isinstance(res[key], basestring):
+            res[key] = None
+
+    if res['versionsuffix'] is None:
+        res['versionsuffix'] = ''
+
+    return res
+
+
+def scan_dir(dirpath, entry):
+    """
+    Scan specified directory for files and subdirectories, unless its modification time did not change.
+
+    :param dirpath: path to directory
+    :param entry: index entry for directory (or None)
+    :return: tuple with path to directory and (updated) index entry, or None if the directory doesn't exist
+    """
+    try:
+        mtime = os.stat(dirpath).st_mtime
+    except OSError:
+        return (dirpath, None)
+
+    if entry is None or entry['mtime'] != mtime:
+        files, subdirs = [], []
+        for name in os.listdir(dirpath):
+            path = os.path.join(dirpath, name)
+            if os.path.isdir(path):
+                # symlinks to directories are not followed (cfr. os.walk)
+                if not os.path.islink(path):
+                    subdirs.append(name)
+            else:
+                files.append(name)
+
+        entry = {'files': sorted(files), 'mtime': mtime, 'subdirs': sorted(subdirs)}
+
+    return (dirpath, entry)
+
+
+def _scan_dir(args):
+    """Wrapper for scan_dir, for use with ThreadPool.map."""
+    return scan_dir(*args)
+
+
+class EasyconfigIndex(object):
+    """Index of files in directories that are searched for easyconfig files."""
+
+    def __init__(self, path=None):
+        """
+        Create a new (empty) easyconfig index.
+
+        :param path: location of file to persist index in (if any)
+        """
+        self.path = path
+        self.dirs = {}
+        self.metadata = {}
+        self.changed = False
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load easyconfig index from specified file; an empty index is returned if the file can't be used.
+
+        :param path: location of index file
+        """
+        index = cls(path=path)
+
+        if os.path.isfile(path):
+            try:
+                data = json.loads(read_file(path))
+            except ValueError as err:
+                _log.warning("Ignoring easyconfig index %s which could not be parsed: %s", path, err)
+                data = {}
+
+            if data.get('version') == EASYCONFIG_INDEX_FORMAT_VERSION:
+                index.dirs = data['dirs']
+                index.metadata = data['metadata']
+                _log.info("Loaded easyconfig index %s (%d directories)", path, len(index.dirs))
+            else:
+                _log.info("Ignoring easyconfig index %s with format version %s (expected: %s)",
+                          path, data.get('version'), EASYCONFIG_INDEX_FORMAT_VERSION)
+
+        return index
+
+    def save(self):
+        """
+        Write easyconfig index to disk (if it was changed), via a temporary file that is unique per host and process
+        (multiple sessions may share the same cache directory); failing to write the index only results in a warning.
+        """
+        if self.path is None:
+            raise EasyBuildError("No location specified to save easyconfig index to")
+
+        if self.changed:
+            data = {
+                'dirs': self.dirs,
+                'metadata': self.metadata,
+                'version': EASYCONFIG_INDEX_FORMAT_VERSION,
+            }
+            tmp_path = '%s.tmp.%s.%d' % (self.path, socket.gethostname(), os.getpid())
+            try:
+                mkdir(os.path.dirname(self.path), parents=True)
+                handle = open(tmp_path, 'w')
+                handle.write(json.dumps(data, sort_keys=True))
+                handle.close()
+                os.rename(tmp_path, self.path)
+                self.changed = False
+            except (EasyBuildError, IOError, OSError) as err:
+                _log.warning("Failed to write easyconfig index %s: %s", self.path, err)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def update(self, paths, ignore_dirs=None, threads=1):
+        """
+        Update index for specified paths; only directories of which the modification time changed are listed again.
+
+        :param paths: list of paths to (recursively) update the index for
+        :param ignore_dirs: list of directory names to ignore
+        :param threads: number of threads to use for scanning directories
+        """
+        ignore_dirs = ignore_dirs or []
+        paths = [os.path.abspath(p) for p in paths]
+
+        pool = None
+        if threads > 1:
+            pool = ThreadPool(threads)
+
+        seen = {}
+        try:
+            # scan directories level by level, so directories at the same level can be scanned in parallel
+            todo = [p for p in paths if os.path.isdir(p)]
+            while todo:
+                args = [(dirpath, self.dirs.get(dirpath)) for dirpath in todo]
+                if pool is None:
+                    results = [scan_dir(*arg) for arg in args]
+                else:
+                    results = pool.map(_scan_dir, args)
+
+                todo = []
+                for dirpath, entry in results:
+                    if entry is not None and dirpath not in seen:
+                        seen[dirpath] = entry
+                        todo.extend(os.path.join(dirpath, d) for d in entry['subdirs'] if d not in ignore_dirs)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # drop entries for directories (and files in them) that no longer exist
+        for dirpath in self.dirs.keys():
+            if dirpath not in seen and any(dirpath == p or dirpath.startswith(p + os.path.sep) for p in paths):
+                del self.dirs[dirpath]
+                self.changed = True
+
+        for dirpath, entry in seen.items():
+            if self.dirs.get(dirpath) is not entry:
+                self.dirs[dirpath] = entry
+                self.changed = True
+
+        # drop metadata for easyconfig files that no longer exist
+        if self.changed:
+            for filepath in self.metadata.keys():
+                entry = self.dirs.get(os.path.dirname(filepath))
+                if entry is None or os.path.basename(filepath) not in entry['files']:
+                    del self.metadata[filepath]
+
+        _log.debug("Updated easyconfig index for %s (threads: %s): %d directories", paths, threads, len(seen))
+
+    def files(self, path, ignore_dirs=None):
+        """
+        Return list of all files located in specified path (recursively), according to the index.
+
+        :param path: path to obtain files for
+        :param ignore_dirs: list of directory names to ignore
+        """
+        ignore_dirs = ignore_dirs or []
+        res = []
+        todo = [os.path.abspath(path)]
+        while todo:
+            dirpath = todo.pop()
+            entry = self.dirs.get(dirpath)
+            if entry is not None:
+                res.extend(os.path.join(dirpath, fn) for fn in entry['files'])
+                todo.extend(os.path.join(dirpath, d) for d in entry['subdirs'] if d not in ignore_dirs)
+        return res
+
+    def get_metadata(self, path):
+        """
+        Return metadata for specified easyconfig file; it is (re)extracted if the file changed since it was indexed.
+
+        :param path: path to easyconfig file
+        """
+        stamp = file_stamp(path)
+        entry = self.metadata.get(path)
+        if entry is None or entry['stamp'] != stamp:
+            entry = extract_metadata(path)
+            entry['stamp'] = stamp
+            self.metadata[path] = entry
+            self.changed = True
+        return entry
+
+    def search(self, path, query, ignore_dirs=None, filename_only=False):
+        """
+        Search for files in specified path (according to the index) that match specified query.
+
+        Queries are regular expressions that are matched with filenames (case-insensitive), unless they include
+        <field>=<value> terms (cfr. SEARCH_FIELDS) to match with metadata of easyconfig files.
+        Values may include wildcards ('*', '?'), and are matched case-insensitive.
+        Toolchains are specified as <name>/<version>, or just <name>.
+
+        For structured queries, results are ranked by name, latest version first; otherwise results are sorted.
+
+        :param path: path to search in
+        :param query: search query
+        :param ignore_dirs: list of directory names to ignore
+        :param filename_only: only return filenames, not file paths
+        """
+        terms, regexes = parse_search_query(query)
+        regexes = [re.compile(regex, re.I) for regex in regexes]
+
+        hits = []
+        for filepath in self.files(path, ignore_dirs=ignore_dirs):
+            filename = os.path.basename(filepath)
+            if not all(regex.search(filename) for regex in regexes):
+                continue
+
+            if terms:
+                if not filename.endswith('.eb'):
+                    continue
+                metadata = self.get_metadata(filepath)
+                if not all(match_value(metadata[key], value, key) for (key, value) in terms.items()):
+                    continue
+                sort_key = ((metadata['name'] or '').lower(), LooseVersion(metadata['version'] or '0'))
+                hits.append((sort_key, filepath))
+            else:
+                hits.append(filepath)
+
+        if terms:
+            # rank by name (alphabetically), then by version (latest first), then by path;
+            # sorting is stable, so sort by least significant key first
+            hits.sort(key=lambda hit: hit[1])
+            hits.sort(key=lambda hit: hit[0][1], reverse=True)
+            hits.sort(key=lambda hit: hit[0][0])
+            hits = [hit[1] for hit in hits]
+        else:
+            hits.sort()
+
+        if filename_only:
+            hits = [os.path.basename(hit) for hit in hits]
+
+        return hits
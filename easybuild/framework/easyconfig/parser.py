@@ -29,13 +29,17 @@ The parser is format version aware
 
 :author: Stijn De Weirdt (Ghent University)
 """
+import ast
+import operator
 import os
 import re
 from vsc.utils import fancylogger
 
 from easybuild.framework.easyconfig.format.format import FORMAT_DEFAULT_VERSION
 from easybuild.framework.easyconfig.format.format import get_format_version, get_format_version_classes
+from easybuild.framework.easyconfig.format.pyheaderconfigobj import get_easyconfig_env
 from easybuild.framework.easyconfig.format.yeb import FormatYeb, is_yeb_format
+from easybuild.framework.easyconfig.templates import template_constant_dict
 from easybuild.framework.easyconfig.types import PARAMETER_TYPES, check_type_of_param_value
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import read_file, write_file
@@ -53,6 +57,19 @@ REPLACED_PARAMETERS = {
     'premakeopts': 'prebuildopts',
 }
 
+# easyconfig parameters that are determined by a lightweight parse (cfr. parse_easyconfig_header)
+HEADER_PARAMETERS = ['dependencies', 'easyblock', 'moduleclass', 'name', 'toolchain', 'version', 'versionsuffix']
+
+HEADER_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Mod: operator.mod,
+}
+HEADER_BUILTIN_NAMES = {
+    'False': False,
+    'None': None,
+    'True': True,
+}
+
 _log = fancylogger.getLogger('easyconfig.parser', fname=False)
 
 
@@ -70,10 +87,146 @@ def fetch_parameters_from_easyconfig(rawtxt, params):
             param_values.append(res.group('param').strip("'\""))
         else:
             param_values.append(None)
-    _log.debug("Obtained parameters value for %s: %s" % (params, param_values))
+    _log.debug("Obtained parameters value for %s: %s", params, param_values)
     return param_values
 
 
+class UnresolvedHeaderValue(Exception):
+    """Value of easyconfig parameter can not be determined via a static analysis of easyconfig file contents."""
+    pass
+
+
+def _eval_header_node(node, env):
+    """
+    Evaluate (a subset of) Python expressions that are typically used to define easyconfig parameters.
+
+    :param node: AST node to evaluate
+    :param env: dict with values for known names
+    """
+    if isinstance(node, ast.Str):
+        res = node.s
+    elif isinstance(node, ast.Num):
+        res = node.n
+    elif isinstance(node, ast.Name):
+        if env.get(node.id, UnresolvedHeaderValue) is not UnresolvedHeaderValue:
+            res = env[node.id]
+        elif node.id in HEADER_BUILTIN_NAMES:
+            res = HEADER_BUILTIN_NAMES[node.id]
+        else:
+            raise UnresolvedHeaderValue(node.id)
+    elif isinstance(node, ast.Tuple):
+        res = tuple(_eval_header_node(elt, env) for elt in node.elts)
+    elif isinstance(node, ast.List):
+        res = [_eval_header_node(elt, env) for elt in node.elts]
+    elif isinstance(node, ast.Dict):
+        res = dict((_eval_header_node(key, env), _eval_header_node(val, env))
+                   for (key, val) in zip(node.keys, node.values))
+    elif isinstance(node, ast.BinOp) and type(node.op) in HEADER_BINARY_OPERATORS:
+        left, right = _eval_header_node(node.left, env), _eval_header_node(node.right, env)
+        try:
+            res = HEADER_BINARY_OPERATORS[type(node.op)](left, right)
+        except (KeyError, TypeError, ValueError) as err:
+            raise UnresolvedHeaderValue(err)
+    else:
+        raise UnresolvedHeaderValue(node.__class__.__name__)
+
+    return res
+
+
+def parse_easyconfig_header(rawtxt, params=None, strict=False):
+    """
+    Lightweight parse of the given easyconfig file contents, which only determines the values of a couple of
+    (header) parameters via a static analysis of the syntax tree: the easyconfig file is not exec'ed,
+    no easyblocks are imported, and no validation or templating (except for versionsuffix) is done.
+
+    Only top-level assignments are taken into account; values can be literals, or expressions that use
+    constants, (local) variables defined earlier, string formatting and concatenation.
+    The value for parameters that are not defined, or that can not be determined statically, is None.
+
+    :param rawtxt: contents of the easyconfig file
+    :param params: list of parameter names to determine values for (default: HEADER_PARAMETERS)
+    :param strict: raise an error if the value for a parameter that is defined can not be determined
+    :return: dict with parameter values
+    """
+    if params is None:
+        params = HEADER_PARAMETERS
+
+    # easyconfig files in another format than plain Python syntax are parsed the regular way
+    format_version = get_format_version(rawtxt)
+    if is_yeb_format(None, rawtxt) or (format_version is not None and format_version.version[0] > 1):
+        cfg = EasyConfigParser(rawcontent=rawtxt).get_config_dict(validate=False)
+        return dict((param, cfg.get(param)) for param in params)
+
+    try:
+        tree = ast.parse(rawtxt)
+    except SyntaxError as err:
+        raise EasyBuildError("Failed to parse easyconfig file contents: %s", err)
+
+    env = dict(get_easyconfig_env())
+    for stmt in tree.body:
+        # only the part before the first block marker (e.g. '[block]') is considered
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.List) and len(stmt.value.elts) == 1:
+            if isinstance(stmt.value.elts[0], ast.Name):
+                if strict:
+                    raise EasyBuildError("Lightweight parse not supported for easyconfig files with blocks")
+                break
+
+        # values for variables that are (re)defined in statements other than simple assignments become unknown
+        names = [node.id for node in ast.walk(stmt) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)]
+        value = UnresolvedHeaderValue
+
+        if isinstance(stmt, ast.Assign) and all(isinstance(target, ast.Name) for target in stmt.targets):
+            node = stmt.value
+        elif isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+            node = ast.BinOp(left=ast.Name(id=stmt.target.id, ctx=ast.Load()), op=stmt.op, right=stmt.value)
+        else:
+            # also consider variables that are modified in place, e.g. via "toolchain['version'] = ..."
+            if isinstance(stmt, (ast.Assign, ast.AugAssign)):
+                targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+                names.extend(node.id for target in targets for node in ast.walk(target) if isinstance(node, ast.Name))
+            node = None
+
+        if node is not None:
+            try:
+                value = _eval_header_node(node, env)
+            except UnresolvedHeaderValue as err:
+                _log.debug("Failed to determine value for %s statically: %s", names, err)
+
+        for name in names:
+            env[name] = value
+
+    res = {}
+    for param in params:
+        value = env.get(param)
+        if value is UnresolvedHeaderValue:
+            if strict:
+                raise EasyBuildError("Failed to determine value for easyconfig parameter '%s' statically", param)
+            value = None
+        res[param] = value
+
+    # resolve templates in versionsuffix, which is required to determine the full version
+    if isinstance(res.get('versionsuffix'), basestring) and '%(' in res['versionsuffix']:
+        cfg = {'toolchain': env.get('toolchain')}
+        for key in ['name', 'version', 'versionprefix', 'versionsuffix']:
+            value = env.get(key)
+            if isinstance(value, basestring):
+                cfg[key] = value
+            else:
+                cfg[key] = None
+        if not isinstance(cfg['toolchain'], dict):
+            cfg['toolchain'] = None
+        try:
+            res['versionsuffix'] = res['versionsuffix'] % template_constant_dict(cfg, skip_lower=False)
+        except (KeyError, TypeError, ValueError) as err:
+            if strict:
+                raise EasyBuildError("Failed to resolve templates in versionsuffix '%s': %s", res['versionsuffix'], err)
+            _log.debug("Failed to resolve templates in versionsuffix '%s': %s", res['versionsuffix'], err)
+            res['versionsuffix'] = None
+
+    _log.debug("Obtained header parameter values: %s", res)
+    return res
+
+
 class EasyConfigParser(object):
     """Read the easyconfig file, return a parsed config object
         Can contain references to multiple version and toolchain/toolchain versions
@@ -143,7 +296,7 @@ class EasyConfigParser(object):
             self.get_fn = (read_file, (fn,))
             self.set_fn = (write_file, (fn, self.rawcontent))
 
-        self.log.debug("Process filename %s with get function %s, set function %s" % (fn, self.get_fn, self.set_fn))
+        self.log.debug("Process filename %s with get function %s, set function %s", fn, self.get_fn, self.set_fn)
 
         if self.get_fn is None:
             raise EasyBuildError('Failed to determine get function for filename %s', fn)
@@ -170,7 +323,7 @@ class EasyConfigParser(object):
             self.format_version = get_format_version(self.rawcontent)
             if self.format_version is None:
                 self.format_version = FORMAT_DEFAULT_VERSION
-                self.log.debug('No version found, using default %s' % self.format_version)
+                self.log.debug('No version found, using default %s', self.format_version)
 
     def _get_format_version_class(self):
         """Locate the class matching the version"""
@@ -28,12 +28,23 @@ Style tests for easyconfig files using pycodestyle.
 
 :author: Ward Poelmans (Ghent University)
 """
+import json
+import multiprocessing
+import os
+import pipes
 import re
 import sys
+from StringIO import StringIO
 from vsc.utils import fancylogger
+from vsc.utils.missing import nub
 
-from easybuild.tools.build_log import print_msg
+from easybuild.tools.build_log import EasyBuildError, print_msg
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, read_file, write_file
+from easybuild.tools.run import run_cmd
+from easybuild.tools.systemtools import get_avail_core_count
 from easybuild.tools.utilities import only_if_module_is_available
+from easybuild.tools.version import VERSION
 
 try:
     import pycodestyle
@@ -53,6 +64,8 @@ EB_CHECK = '_eb_check_'
 COMMENT_REGEX = re.compile(r'^\s*#')
 PARAM_DEF_REGEX = re.compile(r"^(?P<key>[a-z_]+)\s*=\s*")
 
+STYLE_CHECK_CACHE_FILENAME = 'style_check.json'
+
 
 # Any function starting with _eb_check_ (see EB_CHECK variable) will be
 # added to the tests if the test number is added to the select list.
@@ -142,21 +155,175 @@ def check_easyconfigs_style(easyconfigs, verbose=False):
     return result.total_errors
 
 
+def _check_easyconfig_style_captured(path):
+    """
+    Run style check on specified easyconfig file, capturing the output (for use in worker processes)
+
+    :param path: path to easyconfig file to check
+    :return: tuple with number of warnings and errors, and output of style check
+    """
+    orig_stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        res = check_easyconfigs_style([path])
+        out = sys.stdout.getvalue()
+    finally:
+        sys.stdout = orig_stdout
+
+    return (res, out)
+
+
+def det_git_toplevel(path):
+    """Determine top-level directory of Git working copy that specified path is located in (or None)."""
+    res = None
+    dirpath = os.path.dirname(os.path.realpath(path))
+    while dirpath:
+        if os.path.exists(os.path.join(dirpath, '.git')):
+            res = dirpath
+            break
+        parent = os.path.dirname(dirpath)
+        dirpath = parent if parent != dirpath else None
+
+    return res
+
+
+def filter_changed_paths(paths, base_ref):
+    """
+    Filter list of paths to files that were changed relative to the specified Git reference (incl. untracked files);
+    files that are not located in a Git working copy are always retained.
+
+    :param paths: list of paths to easyconfig files
+    :param base_ref: Git reference (commit, branch, tag) to compare with
+    """
+    # Git reference is passed to 'git diff', so make sure it can't be interpreted as an option
+    if base_ref.startswith('-'):
+        raise EasyBuildError("Invalid Git reference to determine changed files: %s", base_ref)
+
+    toplevels = dict((path, det_git_toplevel(path)) for path in paths)
+
+    changed = set()
+    for toplevel in nub(t for t in toplevels.values() if t is not None):
+        cmds = [
+            # quote Git reference, and make sure it can't be interpreted as a path
+            "git diff --name-only %s --" % pipes.quote(base_ref),
+            "git ls-files --others --exclude-standard",
+        ]
+        for cmd in cmds:
+            out, ec = run_cmd(cmd, path=toplevel, simple=False, log_ok=False, log_all=False, trace=False)
+            if ec:
+                raise EasyBuildError("Failed to determine changed files in %s relative to %s: %s",
+                                     toplevel, base_ref, out)
+            changed.update(os.path.join(toplevel, fn) for fn in out.strip().splitlines())
+
+    return [p for p in paths if toplevels[p] is None or os.path.realpath(p) in changed]
+
+
+@only_if_module_is_available(('pycodestyle', 'pep8'))
+def style_check_fingerprint():
+    """Return fingerprint for style check, which determines whether cached style check results can be reused."""
+    if 'pycodestyle' in sys.modules:
+        checker = 'pycodestyle-%s' % pycodestyle.__version__
+    else:
+        checker = 'pep8-%s' % pep8.__version__
+    return '%s_easybuild-%s' % (checker, VERSION)
+
+
+def load_style_check_cache(path):
+    """
+    Load cache for style check results: set of checksums for easyconfig files that passed the style check.
+
+    :param path: location of cache file
+    """
+    res = set()
+    if os.path.isfile(path):
+        try:
+            data = json.loads(read_file(path))
+        except ValueError as err:
+            _log.warning("Ignoring style check cache %s which could not be parsed: %s", path, err)
+            data = {}
+
+        if data.get('fingerprint') == style_check_fingerprint():
+            res = set(data['passed'])
+        else:
+            _log.info("Ignoring style check cache %s for other style check: %s", path, data.get('fingerprint'))
+
+    return res
+
+
+def save_style_check_cache(path, passed):
+    """
+    Save cache for style check results.
+
+    :param path: location of cache file
+    :param passed: set of checksums for easyconfig files that passed the style check
+    """
+    data = {
+        'fingerprint': style_check_fingerprint(),
+        'passed': sorted(passed),
+    }
+    write_file(path, json.dumps(data, indent=2, sort_keys=True))
+
+
 def cmdline_easyconfigs_style_check(paths):
     """
     Run easyconfigs style check of each of the specified paths, triggered from 'eb' command line
 
+    Easyconfig files are checked in parallel (cfr. --check-style-jobs); if a cache directory is specified
+    (cfr. --cache-dir), easyconfig files which already passed the style check before are not checked again.
+
     :param paths: list of paths to easyconfig files to check
     :return: True when style check passed on all easyconfig files, False otherwise
     """
+    base_ref = build_option('check_style_base_ref')
+    if base_ref:
+        changed_paths = filter_changed_paths(paths, base_ref)
+        print_msg("Skipping style check for %d easyconfig(s) not changed relative to %s" %
+                  (len(paths) - len(changed_paths), base_ref), prefix=False)
+        paths = changed_paths
+
     print_msg("Running style check on %d easyconfig(s)..." % len(paths), prefix=False)
+
+    cache_dir = build_option('cache_dir')
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, STYLE_CHECK_CACHE_FILENAME)
+        passed = load_style_check_cache(cache_path)
+    else:
+        passed = set()
+
+    checksums = dict((path, compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)) for path in paths)
+    todo = [path for path in paths if checksums[path] not in passed]
+    todo_paths = set(todo)
+
+    jobs = min(build_option('check_style_jobs') or get_avail_core_count(), len(todo))
+    if jobs > 1:
+        _log.info("Running style check on %d easyconfig(s) using %d processes", len(todo), jobs)
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(_check_easyconfig_style_captured, todo)
+    else:
+        pool = None
+        results = (_check_easyconfig_style_captured(path) for path in todo)
+
     style_check_passed = True
-    for path in paths:
-        if check_easyconfigs_style([path]) == 0:
-            res = 'PASS'
-        else:
-            res = 'FAIL'
-            style_check_passed = False
-        print_msg('[%s] %s' % (res, path), prefix=False)
+    try:
+        for path in paths:
+            if path in todo_paths:
+                res, out = next(results)
+                sys.stdout.write(out)
+                if res == 0:
+                    passed.add(checksums[path])
+                    msg = 'PASS'
+                else:
+                    style_check_passed = False
+                    msg = 'FAIL'
+            else:
+                msg = 'PASS'
+            print_msg('[%s] %s' % (msg, path), prefix=False)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if cache_dir:
+        save_style_check_cache(cache_path, passed)
 
     return style_check_passed
@@ -0,0 +1,173 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Toolchain graph: maps each toolchain (version) to its direct subtoolchain (version),
+which allows to determine toolchain hierarchies without parsing easyconfig files over and over again.
+
+The graph can be persisted as a JSON file (cfr. --cache-dir); each edge in the graph records the easyconfig files
+that were consulted to determine it (and the directories in which they were searched for),
+so stale edges are detected (and discarded) when any of those files or directories changes.
+"""
+import json
+import os
+import socket
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file
+
+
+_log = fancylogger.getLogger('easyconfig.toolchain_graph', fname=False)
+
+TOOLCHAIN_GRAPH_FILENAME = 'toolchain_graph.json'
+TOOLCHAIN_GRAPH_FORMAT_VERSION = 1
+
+
+def file_stamp(path):
+    """
+    Return stamp for specified file or directory (modification time + size), or None if it doesn't exist (anymore).
+    """
+    try:
+        stat = os.stat(path)
+        res = [int(stat.st_mtime), stat.st_size]
+    except OSError:
+        res = None
+    return res
+
+
+class ToolchainGraph(object):
+    """Graph of toolchains, with an edge from each toolchain (version) to its direct subtoolchain (version)."""
+
+    def __init__(self, search_paths, path=None):
+        """
+        Create a new (empty) toolchain graph.
+
+        :param search_paths: list of paths that are searched for easyconfig files (in order)
+        :param path: location of file to persist toolchain graph in (if any)
+        """
+        self.search_paths = list(search_paths)
+        self.path = path
+        self.edges = {}
+        self.changed = False
+
+    @classmethod
+    def load(cls, path, search_paths):
+        """
+        Load toolchain graph from specified file;
+        an empty graph is returned if the file doesn't exist, can't be parsed or is for other search paths.
+
+        :param path: location of toolchain graph file
+        :param search_paths: list of paths that are searched for easyconfig files (in order)
+        """
+        tc_graph = cls(search_paths, path=path)
+
+        if os.path.isfile(path):
+            try:
+                data = json.loads(read_file(path))
+            except ValueError as err:
+                _log.warning("Ignoring toolchain graph %s which could not be parsed: %s", path, err)
+                data = {}
+
+            if data.get('version') != TOOLCHAIN_GRAPH_FORMAT_VERSION:
+                _log.info("Ignoring toolchain graph %s with format version %s (expected: %s)",
+                          path, data.get('version'), TOOLCHAIN_GRAPH_FORMAT_VERSION)
+            elif data.get('search_paths') != tc_graph.search_paths:
+                _log.info("Ignoring toolchain graph %s for other search paths: %s", path, data.get('search_paths'))
+            else:
+                for edge in data['edges']:
+                    key = (str(edge['name']), str(edge['version']))
+                    subtc = (str(edge['subtoolchain'][0]), str(edge['subtoolchain'][1]))
+                    tc_graph.edges[key] = (subtc, dict((str(p), s) for (p, s) in edge['files'].items()))
+                _log.info("Loaded toolchain graph %s (%d edges)", path, len(tc_graph.edges))
+
+        return tc_graph
+
+    def save(self):
+        """
+        Write toolchain graph to disk (if it was changed); a uniquely named temporary file is used,
+        so the file is never left half-written, not even when multiple sessions share the same cache directory.
+
+        Since the toolchain graph is only a cache, failing to write it only results in a warning.
+        """
+        if self.path is None:
+            raise EasyBuildError("No location specified to save toolchain graph to")
+
+        if not self.changed:
+            return
+
+        edges = []
+        for (name, version), (subtc, files) in sorted(self.edges.items()):
+            edges.append({'name': name, 'version': version, 'subtoolchain': list(subtc), 'files': files})
+
+        data = {
+            'version': TOOLCHAIN_GRAPH_FORMAT_VERSION,
+            'search_paths': self.search_paths,
+            'edges': edges,
+        }
+
+        tmp_path = '%s.tmp.%s.%d' % (self.path, socket.gethostname(), os.getpid())
+        try:
+            mkdir(os.path.dirname(self.path), parents=True)
+            handle = open(tmp_path, 'w')
+            handle.write(json.dumps(data, indent=2, sort_keys=True))
+            handle.close()
+            os.rename(tmp_path, self.path)
+            self.changed = False
+        except (EasyBuildError, IOError, OSError) as err:
+            _log.warning("Failed to write toolchain graph %s: %s", self.path, err)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_subtoolchain(self, name, version):
+        """
+        Return name and version of direct subtoolchain for specified toolchain,
+        or None if it is unknown or if any of the easyconfig files it was derived from was changed.
+        """
+        res = None
+        key = (name, version)
+        if key in self.edges:
+            subtc, files = self.edges[key]
+            if all(file_stamp(path) == stamp for (path, stamp) in files.items()):
+                res = subtc
+            else:
+                _log.info("Discarding stale edge for toolchain %s/%s in toolchain graph", name, version)
+                del self.edges[key]
+                self.changed = True
+        return res
+
+    def add_subtoolchain(self, name, version, subtc_name, subtc_version, paths):
+        """
+        Add edge from specified toolchain to its direct subtoolchain to the graph.
+
+        :param name: toolchain name
+        :param version: toolchain version
+        :param subtc_name: subtoolchain name
+        :param subtc_version: subtoolchain version
+        :param paths: list of paths to easyconfig files from which the subtoolchain was derived,
+                      and to directories in which these easyconfig files were searched for
+        """
+        files = dict((path, file_stamp(path)) for path in paths)
+        self.edges[(name, version)] = ((subtc_name, subtc_version), files)
+        self.changed = True
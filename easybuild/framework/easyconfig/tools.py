@@ -48,15 +48,17 @@ from vsc.utils import fancylogger
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
 from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, EasyConfig
 from easybuild.framework.easyconfig.easyconfig import create_paths, get_easyblock_class, process_easyconfig
+from easybuild.framework.easyconfig.fingerprint import det_build_fingerprint, read_build_fingerprint
 from easybuild.framework.easyconfig.format.yeb import quote_yaml_special_chars
+from easybuild.framework.easyconfig.parser import parse_easyconfig_header
 from easybuild.tools.build_log import EasyBuildError, print_msg
 from easybuild.tools.config import build_option
 from easybuild.tools.environment import restore_env
-from easybuild.tools.filetools import find_easyconfigs, is_patch_file, resolve_path, which, write_file
-from easybuild.tools.github import fetch_easyconfigs_from_pr, download_repo
+from easybuild.tools.filetools import find_easyconfigs, is_patch_file, read_file, resolve_path, which, write_file
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.multidiff import multidiff
 from easybuild.tools.ordereddict import OrderedDict
+from easybuild.tools.systemtools import check_os_dependencies
 from easybuild.tools.toolchain import DUMMY_TOOLCHAIN_NAME
 from easybuild.tools.utilities import only_if_module_is_available, quote_str
 from easybuild.tools.version import VERSION as EASYBUILD_VERSION
@@ -93,9 +95,36 @@ def skip_available(easyconfigs, modtool):
     retained_easyconfigs = []
     for ec, mod_name, mod_exists in zip(easyconfigs, module_names, modules_exist):
         if mod_exists:
-            _log.info("%s is already installed (module found), skipping" % mod_name)
+            _log.info("%s is already installed (module found), skipping", mod_name)
         else:
-            _log.debug("%s is not installed yet, so retaining it" % mod_name)
+            _log.debug("%s is not installed yet, so retaining it", mod_name)
+            retained_easyconfigs.append(ec)
+    return retained_easyconfigs
+
+
+def skip_up_to_date(easyconfigs, modtool):
+    """
+    Skip building easyconfigs for existing modules for which the installation is up-to-date,
+    i.e. for which the build fingerprint did not change (cfr. --rebuild-stale).
+
+    Easyconfigs must be ordered such that dependencies come first, since the build fingerprints of dependencies
+    being rebuilt are taken into account: if an installation is stale, so are the installations that depend on it.
+    """
+    module_names = [ec['full_mod_name'] for ec in easyconfigs]
+    modules_exist = modtool.exist(module_names)
+    fingerprints = {}
+    retained_easyconfigs = []
+    for ec, mod_name, mod_exists in zip(easyconfigs, module_names, modules_exist):
+        fingerprint = det_build_fingerprint(ec['ec'], dep_fingerprints=fingerprints)['fingerprint']
+        fingerprints[mod_name] = fingerprint
+        if not mod_exists:
+            _log.debug("%s is not installed yet, so retaining it", mod_name)
+            retained_easyconfigs.append(ec)
+        elif read_build_fingerprint(ec['ec']) == fingerprint:
+            _log.info("%s is already installed and up-to-date (build fingerprint %s), skipping", mod_name, fingerprint)
+        else:
+            _log.info("Installation for %s is stale (build fingerprint changed to %s), retaining it", mod_name,
+                      fingerprint)
             retained_easyconfigs.append(ec)
     return retained_easyconfigs
 
@@ -152,7 +181,7 @@ def find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=F
 
         # if all dependencies have been resolved, add module for this easyconfig in the list of available modules
         if not easyconfig['dependencies']:
-            _log.debug("Adding easyconfig %s to final list" % easyconfig['spec'])
+            _log.debug("Adding easyconfig %s to final list", easyconfig['spec'])
             ordered_ecs.append(easyconfig)
             mod_name = easyconfig['full_mod_name']
             avail_modules.append(mod_name)
@@ -308,6 +337,8 @@ def det_easyconfig_paths(orig_paths):
     ec_files = orig_paths[:]
 
     if from_pr is not None:
+        # GitHub support is only imported when it's used, since that is relatively expensive
+        from easybuild.tools.github import fetch_easyconfigs_from_pr
         pr_files = fetch_easyconfigs_from_pr(from_pr)
 
         if ec_files:
@@ -368,6 +399,8 @@ def parse_easyconfigs(paths, validate=True):
     """
     easyconfigs = []
     generated_ecs = False
+    ec_files = []
+    ignore_dirs = build_option('ignore_dirs')
     for (path, generated) in paths:
         path = os.path.abspath(path)
         # keep track of whether any files were generated
@@ -375,20 +408,50 @@ def parse_easyconfigs(paths, validate=True):
         if not os.path.exists(path):
             raise EasyBuildError("Can't find path %s", path)
         try:
-            ec_files = find_easyconfigs(path, ignore_dirs=build_option('ignore_dirs'))
-            for ec_file in ec_files:
-                # only pass build specs when not generating easyconfig files
-                kwargs = {'validate': validate}
-                if not build_option('try_to_generate'):
-                    kwargs['build_specs'] = build_option('build_specs')
-                ecs = process_easyconfig(ec_file, **kwargs)
-                easyconfigs.extend(ecs)
+            ec_files.extend((path, ec_file) for ec_file in find_easyconfigs(path, ignore_dirs=ignore_dirs))
+        except IOError, err:
+            raise EasyBuildError("Processing easyconfigs in path %s failed: %s", path, err)
+
+    # check OS dependencies of all easyconfig files at once, rather than when validating each of them
+    if validate and build_option('validate') and build_option('check_osdeps') and len(ec_files) > 1:
+        check_os_deps_easyconfigs([ec_file for (_, ec_file) in ec_files])
+
+    for (path, ec_file) in ec_files:
+        try:
+            # only pass build specs when not generating easyconfig files
+            kwargs = {'validate': validate}
+            if not build_option('try_to_generate'):
+                kwargs['build_specs'] = build_option('build_specs')
+            ecs = process_easyconfig(ec_file, **kwargs)
+            easyconfigs.extend(ecs)
         except IOError, err:
             raise EasyBuildError("Processing easyconfigs in path %s failed: %s", path, err)
 
     return easyconfigs, generated_ecs
 
 
+def check_os_deps_easyconfigs(ec_files):
+    """
+    Check OS dependencies of all specified easyconfig files at once, rather than one easyconfig at a time
+    when easyconfig files are validated (results are retained in host profile, cfr. check_os_dependencies).
+
+    :param ec_files: list of paths to easyconfig files
+    """
+    os_deps = set()
+    for ec_file in ec_files:
+        # only a lightweight parse is done here, since the easyconfig files are fully parsed afterwards anyway;
+        # OS dependencies that can not be determined statically are checked when the easyconfig is validated
+        osdeps = parse_easyconfig_header(read_file(ec_file), params=['osdependencies'])['osdependencies']
+        for dep in osdeps or []:
+            if isinstance(dep, basestring):
+                os_deps.add(dep)
+            elif isinstance(dep, tuple):
+                os_deps.update(dep)
+
+    _log.info("Checking %d distinct OS dependencies of %d easyconfig files", len(os_deps), len(ec_files))
+    return check_os_dependencies(sorted(os_deps))
+
+
 def stats_to_str(stats, isyeb=False):
     """
     Pretty print build statistics to string.
@@ -483,6 +546,9 @@ def review_pr(paths=None, pr=None, colored=True, branch='develop'):
     :param colored: boolean indicating whether a colored multi-diff should be generated
     :param branch: easybuild-easyconfigs branch to compare with
     """
+    # GitHub support is only imported when it's used, since that is relatively expensive
+    from easybuild.tools.github import download_repo, fetch_easyconfigs_from_pr
+
     tmpdir = tempfile.mkdtemp()
 
     download_repo_path = download_repo(branch=branch, path=tmpdir)
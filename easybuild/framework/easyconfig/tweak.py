@@ -43,7 +43,8 @@ from vsc.utils import fancylogger
 from vsc.utils.missing import nub
 
 from easybuild.framework.easyconfig.default import get_easyconfig_parameter_default
-from easybuild.framework.easyconfig.easyconfig import EasyConfig, create_paths, process_easyconfig
+from easybuild.framework.easyconfig.easyconfig import EasyConfig, create_paths, find_toolchains_with_easyconfig
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import read_file, write_file
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
@@ -266,6 +267,9 @@ def tweak_one(src_fn, target_fn, tweaks, targetdir=None):
     write_file(target_fn, ectxt)
     _log.info("Tweaked easyconfig file written to %s" % target_fn)
 
+    # tweaked easyconfig file may provide a dependency for a toolchain for which no easyconfig file was found before
+    find_toolchains_with_easyconfig.clear()
+
     return target_fn
 
 
@@ -50,18 +50,16 @@ import easybuild.tools.config as config
 import easybuild.tools.options as eboptions
 from easybuild.framework.easyblock import EasyBlock, build_and_install_one, inject_checksums
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
-from easybuild.framework.easyconfig.easyconfig import verify_easyconfig_filename
-from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
+from easybuild.framework.easyconfig.easyconfig import save_toolchain_graphs, verify_easyconfig_filename
 from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, categorize_files_by_type, dep_graph
 from easybuild.framework.easyconfig.tools import det_easyconfig_paths, dump_env_script, get_paths_for
-from easybuild.framework.easyconfig.tools import parse_easyconfigs, review_pr, skip_available
+from easybuild.framework.easyconfig.tools import parse_easyconfigs, review_pr, skip_available, skip_up_to_date
 from easybuild.framework.easyconfig.tweak import obtain_ec_for, tweak
 from easybuild.tools.config import find_last_log, get_repository, get_repositorypath, build_option
 from easybuild.tools.docs import list_software
 from easybuild.tools.filetools import adjust_permissions, cleanup, write_file
-from easybuild.tools.github import check_github, find_easybuild_easyconfig, install_github_token
-from easybuild.tools.github import new_pr, merge_pr, update_pr
 from easybuild.tools.hooks import START, END, load_hooks, run_hook
+from easybuild.tools.journal import SessionJournal
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.options import parse_external_modules_metadata, process_software_build_specs, use_color
 from easybuild.tools.robot import check_conflicts, det_robot_path, dry_run, resolve_dependencies, search_easyconfigs
@@ -105,7 +103,7 @@ def find_easyconfigs_by_specs(build_specs, robot_path, try_to_generate, testing=
     return [(ec_file, generated)]
 
 
-def build_and_install_software(ecs, init_session_state, exit_on_failure=True, hooks=None):
+def build_and_install_software(ecs, init_session_state, exit_on_failure=True, hooks=None, journal=None):
     """
     Build and install software for all provided parsed easyconfig files.
 
@@ -113,6 +111,7 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True, ho
     :param init_session_state: initial session state, to use in test reports
     :param exit_on_failure: whether or not to exit on installation failure
     :param hooks: list of defined pre- and post-step hooks
+    :param journal: session journal to keep track of progress in (SessionJournal instance)
     """
     # obtain a copy of the starting environment so each build can start afresh
     # we shouldn't use the environment from init_session_state, since relevant env vars might have been set since
@@ -121,11 +120,16 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True, ho
 
     run_hook(START, hooks)
 
+    if journal is not None:
+        journal.register(ecs)
+
     res = []
     for ec in ecs:
         ec_res = {}
+        if journal is not None:
+            journal.install_started(ec['full_mod_name'])
         try:
-            (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env, hooks=hooks)
+            (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env, hooks=hooks, journal=journal)
             ec_res['log_file'] = app_log
             if not ec_res['success']:
                 ec_res['err'] = EasyBuildError(err)
@@ -135,6 +139,9 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True, ho
             ec_res['err'] = err
             ec_res['traceback'] = traceback.format_exc()
 
+        if journal is not None:
+            journal.install_ended(ec['full_mod_name'], ec_res['success'])
+
         # keep track of success/total count
         if ec_res['success']:
             test_msg = "Successfully built %s" % ec['spec']
@@ -194,6 +201,17 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     :param do_build: whether or not to actually perform the build
     :param testing: enable testing mode
     """
+    # determine whether to profile before doing anything else (incl. parsing options),
+    # so the profiled run is not preceded by a partial non-profiled one
+    profile, trace_hotpaths = eboptions.scan_profiling_options(args)
+    profiled = profile or trace_hotpaths
+    if profiled:
+        # only import profiling support when it's used, since that involves importing cProfile & pstats
+        from easybuild.tools.profiling import profiling_active, run_profiled
+        if not profiling_active():
+            kwargs = {'args': args, 'logfile': logfile, 'do_build': do_build, 'testing': testing, 'modtool': modtool}
+            return run_profiled(main, kwargs=kwargs, pstats_file=profile, trace_hotpaths=trace_hotpaths)
+
     # purposely session state very early, to avoid modules loaded by EasyBuild meddling in
     init_session_state = session_state()
 
@@ -202,6 +220,10 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     options = eb_go.options
     orig_paths = eb_go.args
 
+    if (options.profile or options.trace_hotpaths) and not profiled:
+        print_warning("Profiling is only enabled when --profile/--trace-hotpaths are specified on the command line "
+                      "or via $EASYBUILD_PROFILE/$EASYBUILD_TRACE_HOTPATHS, not in configuration files")
+
     # set umask (as early as possible)
     if options.umask is not None:
         new_umask = int(options.umask, 8)
@@ -215,7 +237,8 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     # initialise logging for main
     global _log
     _log, logfile = init_logging(logfile, logtostdout=options.logtostdout,
-                                 silent=(testing or options.terse or search_query), colorize=options.color)
+                                 silent=(testing or options.terse or search_query), colorize=options.color,
+                                 background=options.background_logging)
 
     # disallow running EasyBuild as root (by default)
     check_root_usage(allow_use_as_root=options.allow_use_as_root_and_accept_consequences)
@@ -227,6 +250,18 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     if options.umask is not None:
         _log.info("umask set to '%s' (used to be '%s')" % (oct(new_umask), oct(old_umask)))
 
+    # set up session journal, either to resume an interrupted session or to keep track of progress in a new one
+    journal = None
+    if options.resume:
+        if orig_paths:
+            raise EasyBuildError("Resuming an interrupted session can not be combined with specifying easyconfigs")
+        journal = SessionJournal.load(options.resume)
+        journal.check_options(eb_go.generate_cmd_line())
+        _log.info("Resuming session that was started with command line: %s", journal.data['command_line'])
+    elif options.session_journal:
+        journal = SessionJournal(options.session_journal, command_line=eb_cmd_line,
+                                 options=eb_go.generate_cmd_line())
+
     # process software build specifications (if any), i.e.
     # software name/version, toolchain name/version, extra patches, ...
     (try_to_generate, build_specs) = process_software_build_specs(options)
@@ -279,12 +314,15 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
 
     # GitHub options that warrant a silent cleanup & exit
     if options.check_github:
+        from easybuild.tools.github import check_github
         check_github()
 
     elif options.install_github_token:
+        from easybuild.tools.github import install_github_token
         install_github_token(options.github_user, silent=build_option('silent'))
 
     elif options.merge_pr:
+        from easybuild.tools.github import merge_pr
         merge_pr(options.merge_pr)
 
     elif options.review_pr:
@@ -329,6 +367,7 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
             raise EasyBuildError("Installing the latest EasyBuild release can not be combined with installing "
                                  "other easyconfigs")
         else:
+            from easybuild.tools.github import find_easybuild_easyconfig
             eb_file = find_easybuild_easyconfig()
             orig_paths.append(eb_file)
 
@@ -340,7 +379,10 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
 
     # determine paths to easyconfigs
     determined_paths = det_easyconfig_paths(categorized_paths['easyconfigs'])
-    if determined_paths:
+    if options.resume:
+        # only consider easyconfigs for which the installation was not completed yet in the interrupted session
+        paths = [(p, False) for p in journal.unfinished_specs()]
+    elif determined_paths:
         # transform paths into tuples, use 'False' to indicate the corresponding easyconfig files were not generated
         paths = [(p, False) for p in determined_paths]
     else:
@@ -365,6 +407,8 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
             sys.exit(31)  # exit -> 3x1t -> 31
 
     if options.check_style:
+        # style checks require pycodestyle, which is only imported when it is needed
+        from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
         _log.debug("Running style check...")
         if cmdline_easyconfigs_style_check([path[0] for path in paths]):
             print_msg("All style checks passed!", prefix=False)
@@ -392,7 +436,12 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     dry_run_mode = options.dry_run or options.dry_run_short
 
     # skip modules that are already installed unless forced, or unless an option is used that warrants not skipping
-    if not (forced or dry_run_mode or options.extended_dry_run or new_update_preview_pr or options.inject_checksums):
+    # when resuming a session, the installations that were completed are known already
+    skip_opts = [forced, dry_run_mode, options.extended_dry_run, new_update_preview_pr, options.inject_checksums,
+                 options.resume]
+    # with --rebuild-stale, installations are only skipped if they are up-to-date (see below)
+    rebuild_stale = options.rebuild_stale and not any(skip_opts)
+    if not any(skip_opts) and not rebuild_stale:
         retained_ecs = skip_available(easyconfigs, modtool)
         if not testing:
             for skipped_ec in [ec for ec in easyconfigs if ec not in retained_ecs]:
@@ -403,19 +452,37 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     if len(easyconfigs) > 0:
         # resolve dependencies if robot is enabled, except in dry run mode
         # one exception: deps *are* resolved with --new-pr or --update-pr when dry run mode is enabled
-        if options.robot and (not dry_run_mode or new_update_preview_pr):
+        # resolved dependencies are recorded in the session journal, and already in the right order
+        if options.resume:
+            ordered_ecs = easyconfigs
+        elif options.robot and (not dry_run_mode or new_update_preview_pr):
             print_msg("resolving dependencies ...", log=_log, silent=testing)
-            ordered_ecs = resolve_dependencies(easyconfigs, modtool)
+            # with --rebuild-stale, all dependencies are retained, since installations for them may be stale
+            ordered_ecs = resolve_dependencies(easyconfigs, modtool, retain_all_deps=rebuild_stale)
         else:
             ordered_ecs = easyconfigs
+
+        if rebuild_stale:
+            retained_ecs = skip_up_to_date(ordered_ecs, modtool)
+            if not testing:
+                for skipped_ec in [ec for ec in ordered_ecs if ec not in retained_ecs]:
+                    print_msg("%s is already installed and up-to-date, skipping" % skipped_ec['full_mod_name'])
+            ordered_ecs = retained_ecs
+            if not ordered_ecs:
+                print_msg("No easyconfigs left to be built.", log=_log, silent=testing)
     elif new_update_preview_pr:
         ordered_ecs = None
     else:
         print_msg("No easyconfigs left to be built.", log=_log, silent=testing)
         ordered_ecs = []
 
+    # persist toolchain graph(s) once, now that toolchain hierarchies were determined (cfr. --cache-dir)
+    save_toolchain_graphs()
+
     # creating/updating PRs
     if new_update_preview_pr:
+        # GitHub support is only imported when it's used, since that involves importing keyring, GitPython, ...
+        from easybuild.tools.github import new_pr, update_pr
         if options.new_pr:
             new_pr(categorized_paths, ordered_ecs, title=options.pr_title, descr=options.pr_descr,
                    commit_msg=options.pr_commit_msg)
@@ -470,7 +537,7 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
         hooks = load_hooks(options.hooks)
 
         ecs_with_res = build_and_install_software(ordered_ecs, init_session_state,
-                                                  exit_on_failure=exit_on_failure, hooks=hooks)
+                                                  exit_on_failure=exit_on_failure, hooks=hooks, journal=journal)
     else:
         ecs_with_res = [(ec, {}) for ec in ordered_ecs]
 
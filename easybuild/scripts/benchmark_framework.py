@@ -0,0 +1,944 @@
+#!/usr/bin/env python
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Benchmark suite for overhead of the EasyBuild framework itself.
+
+A synthetic tree of easyconfig files (and module files for a part of them) is generated,
+which is then used to benchmark framework hot paths (parsing easyconfigs, resolving dependencies,
+checking for conflicts, module availability checks, determining toolchain hierarchies, generating module files,
+running commands),
+as well as the startup time of eb for informational commands.
+
+By default, a fake modules tool is used that serves module commands in-process from the module files in $MODULEPATH,
+so the benchmarks can be run offline and without a modules tool being available,
+and only measure the overhead of the framework itself; an actual modules tool can be used via --modules-tool.
+
+Results are reported as text, and can be written to a JSON file (--json) and compared with earlier results (--compare).
+"""
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from vsc.utils import fancylogger
+from vsc.utils.generaloption import simple_option
+
+import easybuild.tools.config as config
+import easybuild.tools.options as eboptions
+from easybuild.framework.easyblock import EasyBlock
+from easybuild.framework.easyconfig import easyconfig
+from easybuild.framework.easyconfig.format import pyheaderconfigobj
+from easybuild.framework.easyconfig.easyconfig import ActiveMNS, get_toolchain_hierarchy, process_easyconfig
+from easybuild.framework.easyconfig.parser import parse_easyconfig_header
+from easybuild.main import main as eb_main
+from easybuild.tools.build_log import EasyBuildError, stop_logging
+from easybuild.tools.environment import restore_env
+from easybuild.tools.filetools import mkdir, read_file, write_file
+from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, dependencies_for
+from easybuild.tools.module_naming_scheme import toolchain as mns_toolchain
+from easybuild.tools.modules import ModulesTool, curr_module_paths, modules_tool, reset_module_caches
+from easybuild.tools.options import parse_external_modules_metadata
+from easybuild.tools.robot import check_conflicts, resolve_dependencies
+from easybuild.tools.run import run_cmd
+from easybuild.tools.systemtools import check_os_dependencies, check_os_dependency, reset_host_profile
+from easybuild.tools.toolchain.utilities import search_toolchain
+from easybuild.tools.version import VERSION
+
+
+# version of format used for JSON output
+BENCHMARK_FORMAT_VERSION = 1
+
+# easyblock used for all generated easyconfigs, only requires the framework
+EASYBLOCK = 'easybuild.framework.easyblock.EasyBlock'
+
+# toolchain hierarchy used for generated easyconfigs (from most minimal to most capable), cfr. EasyBuildMNS
+# each entry: toolchain name/version, dependencies and toolchain of easyconfig for the toolchain itself
+TOOLCHAIN_HIERARCHY = [
+    ('GCCcore', '6.4.0'),
+    ('GCC', '6.4.0'),
+    ('gompi', '2017b'),
+]
+TOOLCHAIN_ECS = [
+    # (name, version, toolchain, dependencies)
+    ('GCCcore', '6.4.0', None, []),
+    ('GCC', '6.4.0', None, [('GCCcore', '6.4.0')]),
+    ('OpenMPI', '2.1.1', ('GCC', '6.4.0'), []),
+    ('gompi', '2017b', None, [('GCC', '6.4.0'), ('OpenMPI', '2.1.1', '', ('GCC', '6.4.0'))]),
+]
+
+# number of compilers, MPI libraries per compiler and packages per compiler/MPI combination
+# in module tree for hierarchical module naming scheme used in 'path_to_top_of_module_tree' benchmarks
+HMNS_TREE_SIZE = (4, 2, 10)
+
+# toolchain used in 'toolchain_variables' benchmark, and its components (for which a fake installation is created)
+TOOLCHAIN_VARIABLES_TC = ('foss', '2016a')
+TOOLCHAIN_VARIABLES_COMPS = [
+    ('GCC', '4.9.3'),
+    ('OpenMPI', '1.10.2'),
+    ('OpenBLAS', '0.2.15'),
+    ('FFTW', '3.3.4'),
+    ('ScaLAPACK', '2.0.2'),
+    ('BLACS', '1.1'),
+]
+
+# OS dependencies (with alternatives) checked for every easyconfig file in 'validate_os_deps' benchmarks
+OS_DEPENDENCIES = [
+    ('openssl-devel', 'libssl-dev', 'libopenssl-devel'),
+    ('zlib-devel', 'zlib1g-dev'),
+]
+
+# informational eb commands used in 'startup' benchmark (only rely on the framework itself)
+STARTUP_CMDS = [
+    ['--version'],
+    ['--show-config'],
+    ['--avail-easyconfig-params', '--easyblock=%s' % EASYBLOCK],
+    ['--list-toolchains'],
+]
+
+
+class FakeModulesTool(ModulesTool):
+    """
+    Fake modules tool, which serves module commands in-process from the module files in $MODULEPATH,
+    without spawning any subprocesses; only a minimal subset of Tcl module file syntax is supported
+    ('module load', 'module use', 'setenv', 'prepend-path').
+    """
+    COMMAND = 'true'
+    VERSION_REGEXP = r'^FakeModulesTool (?P<version>\d\S*)'
+
+    LOAD_REGEX = re.compile(r'^\s*module\s+load\s+(?P<mod_name>\S+)', re.M)
+    PREPEND_PATH_REGEX = re.compile(r'^\s*prepend-path\s+(?P<key>\S+)\s+"?(?P<val>[^"\s]+)"?', re.M)
+    SETENV_REGEX = re.compile(r'^\s*setenv\s+(?P<key>\S+)\s+"?(?P<val>[^"\n]*)"?', re.M)
+    USE_REGEX = re.compile(r'^\s*module\s+use\s+"?(?P<path>[^"\s]+)"?', re.M)
+
+    def check_module_function(self, *args, **kwargs):
+        """There is no 'module' function to check for the fake modules tool."""
+        self.log.debug("Not checking 'module' function for fake modules tool")
+
+    def _find_module_file(self, mod_name):
+        """Find module file for specified module in $MODULEPATH (or return None)."""
+        for mod_path in curr_module_paths():
+            mod_file = os.path.join(mod_path, mod_name)
+            if os.path.isfile(mod_file):
+                return mod_file
+        return None
+
+    def _avail(self, mod_name):
+        """Return list of module names available in $MODULEPATH that start with specified (partial) name."""
+        mod_names = []
+        for mod_path in curr_module_paths():
+            for (dirpath, dirnames, filenames) in os.walk(mod_path):
+                for filename in filenames:
+                    if not filename.startswith('.'):
+                        full_mod_name = os.path.relpath(os.path.join(dirpath, filename), mod_path)
+                        if full_mod_name.startswith(mod_name):
+                            mod_names.append(full_mod_name)
+        return mod_names
+
+    def _loaded(self):
+        """Return list of loaded modules, and list of corresponding module files."""
+        mods = [x for x in os.environ.get('LOADEDMODULES', '').split(os.pathsep) if x]
+        mod_files = [x for x in os.environ.get('_LMFILES_', '').split(os.pathsep) if x]
+        return mods, mod_files
+
+    def _prepend_env_path(self, key, path):
+        """Prepend specified path to path-like environment variable."""
+        paths = [x for x in os.environ.get(key, '').split(os.pathsep) if x and x != path]
+        os.environ[key] = os.pathsep.join([path] + paths)
+
+    def _remove_env_path(self, key, path):
+        """Remove specified path from path-like environment variable."""
+        os.environ[key] = os.pathsep.join(x for x in os.environ.get(key, '').split(os.pathsep) if x and x != path)
+
+    def _load(self, mod_name):
+        """Load specified module."""
+        mods, mod_files = self._loaded()
+        if mod_name in mods:
+            return
+
+        mod_file = self._find_module_file(mod_name)
+        if mod_file is None:
+            raise EasyBuildError("Unable to locate a modulefile for '%s'", mod_name)
+        txt = read_file(mod_file)
+
+        for dep in self.LOAD_REGEX.finditer(txt):
+            self._load(dep.group('mod_name'))
+        for res in self.SETENV_REGEX.finditer(txt):
+            os.environ[res.group('key')] = res.group('val')
+        for res in self.PREPEND_PATH_REGEX.finditer(txt):
+            self._prepend_env_path(res.group('key'), res.group('val'))
+        for res in self.USE_REGEX.finditer(txt):
+            self._prepend_env_path('MODULEPATH', res.group('path'))
+
+        mods, mod_files = self._loaded()
+        os.environ['LOADEDMODULES'] = os.pathsep.join(mods + [mod_name])
+        os.environ['_LMFILES_'] = os.pathsep.join(mod_files + [mod_file])
+
+    def _unload(self, mod_name):
+        """Unload specified module."""
+        mods, mod_files = self._loaded()
+        if mod_name not in mods:
+            return
+
+        idx = mods.index(mod_name)
+        txt = read_file(mod_files[idx])
+        for res in self.SETENV_REGEX.finditer(txt):
+            if res.group('key') in os.environ:
+                del os.environ[res.group('key')]
+        for res in self.PREPEND_PATH_REGEX.finditer(txt):
+            self._remove_env_path(res.group('key'), res.group('val'))
+
+        os.environ['LOADEDMODULES'] = os.pathsep.join(mods[:idx] + mods[idx+1:])
+        os.environ['_LMFILES_'] = os.pathsep.join(mod_files[:idx] + mod_files[idx+1:])
+
+    def run_module(self, *args, **kwargs):
+        """Run module command, in-process."""
+        if isinstance(args[0], (list, tuple)):
+            args = args[0]
+        subcmd, args = args[0], [arg for arg in args[1:] if arg and not arg.startswith('-')]
+        self.log.debug("Running fake module command '%s' with arguments %s", subcmd, args)
+
+        res = []
+        if subcmd == '--version':
+            res = "FakeModulesTool 1.0"
+        elif subcmd in ['avail', 'available']:
+            res = [{'mod_name': mod_name, 'default': None} for mod_name in self._avail(''.join(args))]
+        elif subcmd == 'list':
+            res = [{'mod_name': mod_name, 'default': None} for mod_name in self._loaded()[0]]
+        elif subcmd == 'show':
+            mod_file = self._find_module_file(args[0])
+            if mod_file is None:
+                res = "ERROR: Unable to locate a modulefile for '%s'\n" % args[0]
+            else:
+                res = "-------------------\n%s:\n\n%s" % (mod_file, read_file(mod_file))
+        elif subcmd == 'load':
+            for mod_name in args:
+                self._load(mod_name)
+        elif subcmd == 'unload':
+            for mod_name in args:
+                self._unload(mod_name)
+        elif subcmd == 'purge':
+            for mod_name in self._loaded()[0][::-1]:
+                self._unload(mod_name)
+        elif subcmd == 'use':
+            for path in args[::-1]:
+                self._prepend_env_path('MODULEPATH', path)
+        elif subcmd == 'unuse':
+            for path in args:
+                self._remove_env_path('MODULEPATH', path)
+        else:
+            raise EasyBuildError("Module command '%s' is not supported by fake modules tool", subcmd)
+
+        if kwargs.get('return_output', False) and not isinstance(res, basestring):
+            res = '\n'.join(mod['mod_name'] for mod in res)
+
+        return res
+
+
+def det_full_mod_name(name, version, toolchain):
+    """Determine module name for specified software name/version/toolchain, cfr. EasyBuildMNS."""
+    if toolchain is None:
+        res = os.path.join(name, version)
+    else:
+        res = os.path.join(name, '%s-%s-%s' % (version, toolchain[0], toolchain[1]))
+    return res
+
+
+def easyconfig_txt(name, version, toolchain, deps):
+    """Compose contents of easyconfig file with specified name/version/toolchain/dependencies."""
+    if toolchain is None:
+        toolchain = ('dummy', 'dummy')
+    lines = [
+        "easyblock = '%s'" % EASYBLOCK,
+        '',
+        "name = '%s'" % name,
+        "version = '%s'" % version,
+        '',
+        "homepage = 'https://example.com/%s'" % name,
+        "description = \"Synthetic easyconfig for %s v%s\"" % (name, version),
+        '',
+        "toolchain = {'name': '%s', 'version': '%s'}" % toolchain,
+        '',
+        "sources = [SOURCE_TAR_GZ]",
+        '',
+        "dependencies = [",
+    ] + ["    %s," % (dep,) for dep in deps] + [
+        ']',
+        '',
+        "sanity_check_paths = {",
+        "    'files': ['bin/%s']," % name.lower(),
+        "    'dirs': ['lib'],",
+        "}",
+        '',
+        "moduleclass = 'tools'",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def module_file_txt(name, version, installdir, deps):
+    """Compose contents of Tcl module file for specified software."""
+    lines = [
+        "#%Module",
+        "proc ModulesHelp { } {",
+        "    puts stderr {Synthetic module for %s v%s}" % (name, version),
+        "}",
+        '',
+        "module-whatis {Description: synthetic module for %s v%s}" % (name, version),
+        '',
+        "conflict %s" % name,
+        '',
+    ]
+    for dep in deps:
+        lines.extend([
+            "if { ![ is-loaded %s ] } {" % dep,
+            "    module load %s" % dep,
+            "}",
+            '',
+        ])
+    env_name = re.sub('[^A-Z0-9_]', '_', name.upper())
+    lines.extend([
+        "prepend-path\tPATH\t\t%s" % os.path.join(installdir, 'bin'),
+        "prepend-path\tLD_LIBRARY_PATH\t\t%s" % os.path.join(installdir, 'lib'),
+        '',
+        "setenv\tEBROOT%s\t\t\"%s\"" % (env_name, installdir),
+        "setenv\tEBVERSION%s\t\t\"%s\"" % (env_name, version),
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def generate_easyconfig_tree(path, num_packages, depth, fanout, installed=0.5, seed=42):
+    """
+    Generate synthetic tree of easyconfig files, and module files for part of them.
+
+    Packages are spread across <depth> levels of the dependency graph; packages at level N depend on
+    <fanout> packages at lower levels (at least one of which is at level N-1).
+    The toolchain of each package is at least as capable as the toolchains of its dependencies.
+
+    :param path: location to generate tree in ('easyconfigs' and 'modules/all' subdirectories are created)
+    :param num_packages: number of packages to generate easyconfigs for (next to toolchain easyconfigs)
+    :param depth: depth of the dependency graph
+    :param fanout: number of dependencies for each package (except for those at lowest level)
+    :param installed: fraction of packages for which a module file is generated (in the lowest levels first)
+    :param seed: seed for random number generator (the same seed yields the same tree)
+    :return: dictionary with lists of easyconfig files, top-level easyconfig files and full module names
+    """
+    rand = random.Random(seed)
+    ecs_path = os.path.join(path, 'easyconfigs')
+    mods_path = os.path.join(path, 'modules', 'all')
+    installdir_prefix = os.path.join(path, 'software')
+
+    # (name, version, toolchain, deps, level)
+    specs = [(name, version, tc, deps, -1) for (name, version, tc, deps) in TOOLCHAIN_ECS]
+
+    levels = [[] for _ in range(depth)]
+    for idx in range(num_packages):
+        level = min(idx * depth // max(num_packages, 1), depth - 1)
+        name, version = 'pkg%05d' % idx, '1.%d' % rand.randint(0, 9)
+
+        deps = []
+        if level > 0 and levels[level - 1]:
+            cands = [x for lvl in levels[:level] for x in lvl]
+            deps = [rand.choice(levels[level - 1])]
+            deps.extend(rand.sample(cands, min(fanout, len(cands)) - 1) if fanout > 1 else [])
+            deps = sorted(set(deps))
+
+        # toolchain is at least as capable as toolchains of dependencies
+        min_tc_idx = max([specs[dep][2][0] for dep in deps] + [0])
+        tc_idx = min(min_tc_idx + rand.randint(0, 1), len(TOOLCHAIN_HIERARCHY) - 1)
+        specs.append((name, version, (tc_idx, TOOLCHAIN_HIERARCHY[tc_idx]), deps, level))
+        levels[level].append(len(specs) - 1)
+
+    res = {'ec_files': [], 'top_ec_files': [], 'mod_names': []}
+    num_installed = int(installed * num_packages)
+    for idx, (name, version, tc, deps, level) in enumerate(specs):
+        if level >= 0:
+            tc = tc[1]
+            dep_specs = [(specs[dep][0], specs[dep][1], '', specs[dep][2][1]) for dep in deps]
+        else:
+            dep_specs = deps
+
+        full_mod_name = det_full_mod_name(name, version, tc)
+        ec_file = os.path.join(ecs_path, name[0].lower(), name, '%s.eb' % full_mod_name.replace(os.path.sep, '-'))
+        write_file(ec_file, easyconfig_txt(name, version, tc, dep_specs))
+        res['ec_files'].append(ec_file)
+        if level == depth - 1:
+            res['top_ec_files'].append(ec_file)
+
+        # generate module files for toolchains and for first part of packages (lowest levels first)
+        if level < 0 or idx - len(TOOLCHAIN_ECS) < num_installed:
+            dep_mod_names = [det_full_mod_name(dep[0], dep[1], dep[3] if len(dep) > 3 else None) for dep in dep_specs]
+            installdir = os.path.join(installdir_prefix, full_mod_name)
+            mod_txt = module_file_txt(name, version, installdir, dep_mod_names)
+            write_file(os.path.join(mods_path, full_mod_name), mod_txt)
+            res['mod_names'].append(full_mod_name)
+
+    return res
+
+
+def easybuild_config_args(workdir, robot_path, modules_tool=None):
+    """Return list of command line arguments that specify EasyBuild configuration to use for benchmarks."""
+    if modules_tool is None:
+        modules_tool = FakeModulesTool.__name__
+    return [
+        '--buildpath=%s' % os.path.join(workdir, 'build'),
+        '--installpath=%s' % workdir,
+        '--module-syntax=Tcl',
+        '--modules-tool=%s' % modules_tool,
+        '--robot-paths=%s' % robot_path,
+        '--sourcepath=%s' % os.path.join(workdir, 'sources'),
+        '--tmpdir=%s' % os.path.join(workdir, 'tmp'),
+    ]
+
+
+def init_easybuild_config(workdir, robot_path, modules_tool=None):
+    """Initialize EasyBuild configuration to use for benchmarks."""
+    eb_go = eboptions.parse_options(args=easybuild_config_args(workdir, robot_path, modules_tool=modules_tool))
+    config.init(eb_go.options, eb_go.get_options_by_section('config'))
+    build_options = {
+        'external_modules_metadata': parse_external_modules_metadata(None),
+        'robot_path': [robot_path],
+        'silent': True,
+        'valid_module_classes': config.module_classes(),
+        'valid_stops': [x[0] for x in EasyBlock.get_steps()],
+    }
+    config.init_build_options(build_options=build_options, cmdline_options=eb_go.options)
+
+    # parsing EasyBuild options (re)configures logging, only report errors during benchmarks
+    fancylogger.logToScreen(enable=False)
+    fancylogger.setLogLevelError()
+
+
+def reset_caches():
+    """Reset framework caches, so each benchmark repetition starts from a clean slate."""
+    easyconfig._easyconfigs_cache.clear()
+    easyconfig._easyconfig_files_cache.clear()
+    easyconfig.find_toolchains_with_easyconfig.clear()
+    easyconfig._toolchain_graphs.clear()
+    get_toolchain_hierarchy.clear()
+    mns_toolchain._toolchain_details_cache.clear()
+    pyheaderconfigobj._pyheader_code_cache.clear()
+    reset_module_caches()
+    reset_host_profile()
+
+
+def max_rss():
+    """Return maximum resident set size of current process (high-water mark, in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Benchmarks(object):
+    """Benchmarks for framework hot paths."""
+
+    def __init__(self, tree, modtool, run_cmd_count, workdir=None):
+        """
+        Constructor
+
+        :param tree: synthetic easyconfig tree (see generate_easyconfig_tree)
+        :param modtool: modules tool to use
+        :param run_cmd_count: number of commands to run in 'run_cmd' benchmark
+        :param workdir: working directory in which synthetic easyconfig tree was generated
+        """
+        self.tree = tree
+        self.modtool = modtool
+        self.run_cmd_count = run_cmd_count
+        self.workdir = workdir
+
+    def names(self):
+        """Return list of benchmark names, in order of execution."""
+        return sorted(attr[len('bench_'):] for attr in dir(self) if attr.startswith('bench_'))
+
+    def setup(self, name):
+        """Set up for benchmark with specified name (not timed); returns state passed to benchmark method."""
+        reset_caches()
+        setup_method = getattr(self, 'setup_%s' % name, None)
+        if setup_method is None:
+            res = None
+        else:
+            res = setup_method()
+            reset_caches()
+        return res
+
+    def setup_check_conflicts(self):
+        """Set up for check_conflicts benchmark."""
+        return [ec for ec_file in self.tree['top_ec_files'] for ec in process_easyconfig(ec_file)]
+
+    def bench_check_conflicts(self, ecs):
+        """Check for conflicts in dependency graph of top-level easyconfigs (incl. resolving dependencies)."""
+        if check_conflicts(ecs, self.modtool):
+            raise EasyBuildError("Unexpected conflicts found in synthetic easyconfig tree")
+        return len(ecs)
+
+    def bench_dependencies_for(self, _):
+        """Determine (recursive) dependencies of all available modules via dependencies_for."""
+        for mod_name in self.tree['mod_names']:
+            dependencies_for(mod_name, self.modtool)
+        return len(self.tree['mod_names'])
+
+    def bench_dry_run(self, _):
+        """Full-stack 'eb --dry-run --robot' for top-level easyconfigs (in-process, output discarded)."""
+        robot_path = os.path.join(self.workdir, 'easyconfigs')
+        modules_tool = self.modtool.__class__.__name__
+        args = easybuild_config_args(self.workdir, robot_path, modules_tool=modules_tool) + [
+            '--allow-use-as-root-and-accept-consequences',
+            '--dry-run',
+            '--robot',
+        ]
+        logfile = os.path.join(self.workdir, 'dry_run.log')
+        orig_stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            eb_main(args=args + self.tree['top_ec_files'], logfile=logfile, modtool=self.modtool)
+        except SystemExit as err:
+            if err.code:
+                raise EasyBuildError("'eb --dry-run' failed with exit code %s", err.code)
+        finally:
+            sys.stdout.close()
+            sys.stdout = orig_stdout
+            stop_logging(logfile)
+            # restore configuration used for other benchmarks
+            init_easybuild_config(self.workdir, robot_path, modules_tool=modules_tool)
+        return len(self.tree['top_ec_files'])
+
+    def setup_make_module_req(self):
+        """Set up for make_module_req benchmark: create installation directories with a typical layout."""
+        apps = self._apps()
+        for app in apps:
+            for subdir in ['bin', 'include', 'lib', os.path.join('lib', 'pkgconfig'), os.path.join('share', 'man')]:
+                mkdir(os.path.join(app.installdir, subdir), parents=True)
+            write_file(os.path.join(app.installdir, 'lib', 'lib%s.so' % app.name), '')
+        return apps
+
+    def bench_make_module_req(self, apps):
+        """Generate module file statements for installation directories via EasyBlock.make_module_req."""
+        for app in apps:
+            app.make_module_req()
+        return len(apps)
+
+    def bench_module_load(self, _):
+        """Load and unload all available modules via ModulesTool.load/unload (single module command for all)."""
+        mod_names = self.tree['mod_names']
+        self.modtool.load(mod_names)
+        self.modtool.unload(mod_names[::-1])
+        return len(mod_names)
+
+    def bench_module_load_baseline(self, _):
+        """Load and unload all available modules one by one, as baseline for module_load benchmark."""
+        mod_names = self.tree['mod_names']
+        for mod_name in mod_names:
+            self.modtool.run_module('load', mod_name)
+        for mod_name in mod_names[::-1]:
+            self.modtool.run_module('unload', mod_name)
+        return len(mod_names)
+
+    def bench_module_avail(self, _):
+        """'module avail' via ModulesTool.available."""
+        self.modtool.available()
+        return 1
+
+    def bench_module_exist(self, _):
+        """Check existence of modules via ModulesTool.exist (available modules + as many missing modules)."""
+        mod_names = self.tree['mod_names'] + [m + '-missing' for m in self.tree['mod_names']]
+        self.modtool.exist(mod_names)
+        return len(mod_names)
+
+    def setup_module_generator_lua(self):
+        """Set up for module_generator_lua benchmark."""
+        return [ModuleGeneratorLua(app) for app in self._apps()]
+
+    def bench_module_generator_lua(self, generators):
+        """Generate Lua module files."""
+        return self._generate_modules(generators)
+
+    def setup_module_generator_tcl(self):
+        """Set up for module_generator_tcl benchmark."""
+        return [ModuleGeneratorTcl(app) for app in self._apps()]
+
+    def bench_module_generator_tcl(self, generators):
+        """Generate Tcl module files."""
+        return self._generate_modules(generators)
+
+    def _apps(self):
+        """Return list of easyblock instances for all generated easyconfigs."""
+        apps = []
+        for ec_file in self.tree['ec_files']:
+            app = EasyBlock(process_easyconfig(ec_file, validate=False)[0]['ec'])
+            app.close_log()
+            apps.append(app)
+        return apps
+
+    def _generate_modules(self, generators):
+        """Generate module file contents using specified module generators."""
+        for mod_gen in generators:
+            app = mod_gen.app
+            txt = mod_gen.get_description()
+            for dep in app.cfg.dependencies():
+                txt += mod_gen.load_module(dep['short_mod_name'])
+            txt += mod_gen.prepend_paths('PATH', ['bin'])
+            txt += mod_gen.prepend_paths('LD_LIBRARY_PATH', ['lib', 'lib64'])
+            txt += mod_gen.set_environment('EBROOT%s' % app.name.upper(), app.installdir)
+            txt += mod_gen.set_environment('EBVERSION%s' % app.name.upper(), app.version)
+            txt += mod_gen.msg_on_load("loaded %s" % app.name)
+        return len(generators)
+
+    def bench_parse(self, _):
+        """Parse easyconfig files via process_easyconfig."""
+        for ec_file in self.tree['ec_files']:
+            process_easyconfig(ec_file)
+        return len(self.tree['ec_files'])
+
+    def bench_parse_header(self, _):
+        """Lightweight parse of easyconfig files via parse_easyconfig_header."""
+        for ec_file in self.tree['ec_files']:
+            parse_easyconfig_header(read_file(ec_file))
+        return len(self.tree['ec_files'])
+
+    def setup_path_to_top_of_module_tree(self):
+        """Set up for path_to_top_of_module_tree benchmarks: generate module tree for a hierarchical naming scheme."""
+        top_path = os.path.join(self.workdir, 'modules_hmns', 'all')
+        core = os.path.join(top_path, 'Core')
+        num_compilers, num_mpis, num_pkgs = HMNS_TREE_SIZE
+
+        queries = []
+        for comp_idx in range(num_compilers):
+            comp = 'GCC/%d.0' % comp_idx
+            comp_subdir = os.path.join(top_path, 'Compiler', comp)
+            write_file(os.path.join(core, comp), "#%%Module\nmodule use %s\n" % comp_subdir)
+            for mpi_idx in range(num_mpis):
+                mpi = 'OpenMPI/%d.0' % mpi_idx
+                mpi_subdir = os.path.join(top_path, 'MPI', comp, mpi)
+                write_file(os.path.join(comp_subdir, mpi), "#%%Module\nmodule use %s\n" % mpi_subdir)
+                for pkg_idx in range(num_pkgs):
+                    pkg = 'pkg%d/1.0' % pkg_idx
+                    write_file(os.path.join(mpi_subdir, pkg), "#%Module\n")
+                    queries.append((pkg, mpi_subdir, [comp, mpi]))
+
+        return {'top_paths': [top_path, core], 'queries': queries}
+
+    def _path_to_top_of_module_tree(self, state, static):
+        """
+        Determine path to top of hierarchical module tree for all queries, with dependency modules loaded
+        (like when a module file is generated during an installation); environment is restored afterwards.
+        """
+        orig_env = os.environ.copy()
+        os.environ['MODULEPATH'] = state['top_paths'][1]
+        try:
+            for (mod_name, mod_subdir, deps) in state['queries']:
+                self.modtool.load(deps)
+                if static:
+                    self.modtool.path_to_top_of_module_tree(state['top_paths'], mod_name, mod_subdir, deps)
+                else:
+                    modpath_exts = dict((k, v) for (k, v) in self.modtool.modpath_extensions_for(deps).items() if v)
+                    self.modtool.path_to_top_of_module_tree(state['top_paths'], mod_name, mod_subdir, deps,
+                                                            modpath_exts=modpath_exts)
+                self.modtool.unload(deps[::-1])
+        finally:
+            restore_env(orig_env)
+        return len(state['queries'])
+
+    def bench_path_to_top_of_module_tree(self, state):
+        """Determine path to top of hierarchical module tree via ModulesTool.path_to_top_of_module_tree."""
+        return self._path_to_top_of_module_tree(state, True)
+
+    def setup_path_to_top_of_module_tree_baseline(self):
+        """Set up for path_to_top_of_module_tree_baseline benchmark."""
+        return self.setup_path_to_top_of_module_tree()
+
+    def bench_path_to_top_of_module_tree_baseline(self, state):
+        """Determine path to top of hierarchical module tree by loading modules, as baseline."""
+        return self._path_to_top_of_module_tree(state, False)
+
+    def setup_resolve_dependencies(self):
+        """Set up for resolve_dependencies benchmark."""
+        return [ec for ec_file in self.tree['top_ec_files'] for ec in process_easyconfig(ec_file)]
+
+    def bench_resolve_dependencies(self, ecs):
+        """Resolve dependencies of top-level easyconfigs, retaining all dependencies."""
+        return len(resolve_dependencies(ecs, self.modtool, retain_all_deps=True))
+
+    def bench_run_cmd(self, _):
+        """Run trivial command via run_cmd."""
+        for _ in range(self.run_cmd_count):
+            run_cmd('true', log_all=False, log_output=False, simple=True, trace=False)
+        return self.run_cmd_count
+
+    def bench_run_cmd_baseline(self, _):
+        """Run trivial command via subprocess, as baseline for run_cmd benchmark."""
+        for _ in range(self.run_cmd_count):
+            subprocess.call(['true'])
+        return self.run_cmd_count
+
+    def _run_python(self, args):
+        """Run Python interpreter with specified arguments in a subprocess, discarding its output."""
+        devnull = open(os.devnull, 'w')
+        try:
+            exit_code = subprocess.call([sys.executable] + args, stdout=devnull, stderr=devnull)
+        finally:
+            devnull.close()
+        if exit_code:
+            raise EasyBuildError("Running '%s' failed (exit code %s)", ' '.join(args), exit_code)
+
+    def bench_startup(self, _):
+        """Run informational eb commands (--version, --show-config, ...), each in a fresh Python interpreter."""
+        for args in STARTUP_CMDS:
+            self._run_python(['-m', 'easybuild.main'] + args)
+        return len(STARTUP_CMDS)
+
+    def bench_startup_baseline(self, _):
+        """Start a fresh Python interpreter, as baseline for startup benchmarks."""
+        self._run_python(['-c', 'pass'])
+        return 1
+
+    def bench_startup_import(self, _):
+        """Import easybuild.main in a fresh Python interpreter."""
+        self._run_python(['-c', 'import easybuild.main'])
+        return 1
+
+    def _toolchain_prepare(self, snapshot):
+        """
+        Prepare build environment for most capable toolchain, and again for every easyconfig file
+        (like for every extension that is installed); environment is restored afterwards.
+        """
+        orig_env = os.environ.copy()
+        # OpenMPI toolchain component requires $TMPDIR to be defined
+        os.environ.setdefault('TMPDIR', tempfile.gettempdir())
+        try:
+            name, version = TOOLCHAIN_HIERARCHY[-1]
+            tc_class, _ = search_toolchain(name)
+            tc = tc_class(version=version, mns=ActiveMNS(), modtool=self.modtool)
+            tc.set_options({})
+            tc.prepare(silent=True)
+            for _ in self.tree['ec_files']:
+                if snapshot:
+                    tc.prepare_from_snapshot(silent=True)
+                else:
+                    tc.prepare(silent=True, loadmod=False)
+        finally:
+            restore_env(orig_env)
+        return len(self.tree['ec_files'])
+
+    def bench_toolchain_prepare(self, _):
+        """Prepare build environment for toolchain for every extension via Toolchain.prepare_from_snapshot."""
+        return self._toolchain_prepare(True)
+
+    def bench_toolchain_prepare_baseline(self, _):
+        """Prepare build environment for toolchain for every extension via Toolchain.prepare, as baseline."""
+        return self._toolchain_prepare(False)
+
+    def setup_toolchain_variables(self):
+        """Set up for toolchain_variables benchmark: create fake installations for toolchain components."""
+        env = {}
+        for name, version in TOOLCHAIN_VARIABLES_COMPS:
+            installdir = os.path.join(self.workdir, 'software', name, version)
+            for subdir in ['include', 'lib', 'lib64']:
+                mkdir(os.path.join(installdir, subdir), parents=True)
+            env['EBROOT%s' % name.upper()] = installdir
+            env['EBVERSION%s' % name.upper()] = version
+        return env
+
+    def bench_toolchain_variables(self, env):
+        """Define (and query) toolchain variables via Toolchain.set_variables & co, like for every extension."""
+        orig_env = os.environ.copy()
+        os.environ.update(env)
+        try:
+            tc_class, _ = search_toolchain(TOOLCHAIN_VARIABLES_TC[0])
+            for _ in self.tree['ec_files']:
+                tc = tc_class(version=TOOLCHAIN_VARIABLES_TC[1], mns=ActiveMNS(), modtool=self.modtool)
+                tc.set_options({})
+                tc.set_variables()
+                tc._add_dependency_variables()
+                tc.generate_vars()
+                for var in ['CC', 'CFLAGS', 'CPPFLAGS', 'LDFLAGS', 'LIBLAPACK', 'LIBSCALAPACK', 'LIBFFT']:
+                    tc.get_variable(var)
+        finally:
+            restore_env(orig_env)
+        return len(self.tree['ec_files'])
+
+    def bench_toolchain_hierarchy(self, _):
+        """Determine toolchain hierarchy for most capable toolchain via get_toolchain_hierarchy."""
+        name, version = TOOLCHAIN_HIERARCHY[-1]
+        return len(get_toolchain_hierarchy({'name': name, 'version': version}))
+
+    def bench_validate_os_deps(self, _):
+        """Check OS dependencies for every easyconfig file like EasyConfig.validate_os_deps (via host profile)."""
+        for _ in self.tree['ec_files']:
+            found = check_os_dependencies([cand_dep for dep in OS_DEPENDENCIES for cand_dep in dep])
+            [any(found[cand_dep] for cand_dep in dep) for dep in OS_DEPENDENCIES]
+        return len(self.tree['ec_files'])
+
+    def bench_validate_os_deps_baseline(self, _):
+        """Check OS dependencies for every easyconfig file one at a time via check_os_dependency, as baseline."""
+        for _ in self.tree['ec_files']:
+            [any([check_os_dependency(cand_dep) for cand_dep in dep]) for dep in OS_DEPENDENCIES]
+        return len(self.tree['ec_files'])
+
+
+def run_benchmarks(benchmarks, names, repeat):
+    """
+    Run specified benchmarks.
+
+    :param benchmarks: Benchmarks instance
+    :param names: names of benchmarks to run
+    :param repeat: number of repetitions for each benchmark
+    :return: dictionary with results for each benchmark
+    """
+    results = {}
+    for name in names:
+        bench_method = getattr(benchmarks, 'bench_%s' % name)
+        rss_before = max_rss()
+        timings = []
+        for _ in range(repeat):
+            state = benchmarks.setup(name)
+            start = time.time()
+            count = bench_method(state)
+            timings.append(time.time() - start)
+
+        timings.sort()
+        results[name] = {
+            'count': count,
+            'description': bench_method.__doc__.strip(),
+            'max_rss_increase_kb': max_rss() - rss_before,
+            'mean': round(sum(timings) / len(timings), 6),
+            'median': round(timings[len(timings) // 2], 6),
+            'min': round(timings[0], 6),
+            'repeat': repeat,
+        }
+
+    return results
+
+
+def format_results(results, previous=None):
+    """
+    Format benchmark results as text; include comparison with previous results if available.
+
+    :param results: benchmark results
+    :param previous: previous benchmark results to compare with (in same format)
+    """
+    header = ('benchmark', 'count', 'min (s)', 'median (s)', 'per op (ms)', 'RSS (KiB)')
+    lines = ["%-28s %8s %12s %12s %12s %10s" % header]
+    for name in sorted(results):
+        res = results[name]
+        per_op = 1000.0 * res['min'] / max(res['count'], 1)
+        line = "%-28s %8d %12.4f %12.4f %12.4f %10d" % (name, res['count'], res['min'], res['median'], per_op,
+                                                        res['max_rss_increase_kb'])
+        if previous and name in previous and previous[name]['min'] > 0:
+            line += "  (%+.1f%% vs previous)" % (100.0 * (res['min'] - previous[name]['min']) / previous[name]['min'])
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main():
+    """Generate synthetic easyconfig tree, and run benchmarks on it."""
+    options = {
+        'benchmarks': ("Comma-separated list of benchmarks to run (default: all)", 'strlist', 'store', None, 'b'),
+        'compare': ("Compare results with earlier results (in JSON format)", None, 'store', None, 'c'),
+        'depth': ("Depth of dependency graph in synthetic easyconfig tree", int, 'store', 5),
+        'fanout': ("Number of dependencies per package in synthetic easyconfig tree", int, 'store', 3, 'f'),
+        'installed': ("Fraction of packages for which a module file is available", float, 'store', 0.5),
+        'json': ("Write results to specified file (in JSON format)", None, 'store', None, 'j'),
+        'list': ("List available benchmarks", None, 'store_true', False, 'l'),
+        'modules-tool': ("Modules tool to use (default: in-process fake modules tool)", None, 'store',
+                         FakeModulesTool.__name__, 'm'),
+        'packages': ("Number of packages in synthetic easyconfig tree", int, 'store', 200, 'n'),
+        'repeat': ("Number of repetitions for each benchmark", int, 'store', 3, 'r'),
+        'run-cmd-count': ("Number of commands to run in run_cmd benchmarks", int, 'store', 50),
+        'seed': ("Seed for generating synthetic easyconfig tree", int, 'store', 42, 's'),
+        'workdir': ("Directory to use (default: temporary directory, removed afterwards)", None, 'store', None, 'w'),
+    }
+    go = simple_option(options)
+    opts = go.options
+
+    benchmarks = Benchmarks(None, None, opts.run_cmd_count)
+    if opts.list:
+        for name in benchmarks.names():
+            print "%-28s %s" % (name, getattr(benchmarks, 'bench_%s' % name).__doc__.strip())
+        return
+
+    names = opts.benchmarks or benchmarks.names()
+    unknown = [name for name in names if name not in benchmarks.names()]
+    if unknown:
+        raise EasyBuildError("Unknown benchmark(s): %s (known: %s)", ', '.join(unknown), ', '.join(benchmarks.names()))
+
+    previous = None
+    if opts.compare:
+        previous = json.loads(read_file(opts.compare))['results']
+
+    workdir = opts.workdir
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='eb-benchmark-')
+
+    orig_env = os.environ.copy()
+    try:
+        params = {
+            'depth': opts.depth,
+            'fanout': opts.fanout,
+            'installed': opts.installed,
+            'modules_tool': opts.modules_tool,
+            'packages': opts.packages,
+            'repeat': opts.repeat,
+            'run_cmd_count': opts.run_cmd_count,
+            'seed': opts.seed,
+        }
+        init_easybuild_config(workdir, os.path.join(workdir, 'easyconfigs'), modules_tool=opts.modules_tool)
+        mkdir(workdir, parents=True)
+        tree = generate_easyconfig_tree(workdir, opts.packages, opts.depth, opts.fanout, installed=opts.installed,
+                                        seed=opts.seed)
+
+        os.environ['MODULEPATH'] = os.path.join(workdir, 'modules', 'all')
+        benchmarks = Benchmarks(tree, modules_tool(), opts.run_cmd_count, workdir=workdir)
+
+        results = run_benchmarks(benchmarks, names, opts.repeat)
+    finally:
+        os.environ.clear()
+        os.environ.update(orig_env)
+        if opts.workdir is None:
+            shutil.rmtree(workdir)
+
+    print format_results(results, previous=previous)
+
+    if opts.json:
+        report = {
+            'easybuild_version': str(VERSION),
+            'format_version': BENCHMARK_FORMAT_VERSION,
+            'params': params,
+            'python_version': platform.python_version(),
+            'results': results,
+            'timestamp': int(time.time()),
+        }
+        write_file(opts.json, json.dumps(report, indent=2, separators=(',', ': '), sort_keys=True) + '\n')
+        print "Results written to %s" % opts.json
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except EasyBuildError as err:
+        sys.stderr.write("ERROR: %s\n" % err.msg)
+        sys.exit(1)
@@ -0,0 +1,339 @@
+##
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Cache of installation artifacts (cfr. --artifact-cache), which can be shared across hosts (e.g., on NFS).
+
+Each artifact is a compressed tarball of an installation directory and the corresponding module file,
+along with a metadata file (JSON format), both named after the artifact key of the installation,
+which combines the build fingerprint with the properties of the host & module configuration that affect
+the installation (cfr. det_artifact_key).
+"""
+import hashlib
+import json
+import os
+import socket
+import tarfile
+import time
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import build_option, get_module_naming_scheme, get_module_syntax, get_modules_tool
+from easybuild.tools.config import log_path
+from easybuild.tools.filetools import mkdir, read_file, remove_file, write_file
+from easybuild.tools.systemtools import get_cpu_architecture, get_cpu_family, get_cpu_features, get_cpu_model
+from easybuild.tools.systemtools import get_glibc_version, get_host_profile_value, get_os_name, get_os_version
+
+
+_log = fancylogger.getLogger('tools.artifact_cache', fname=False)
+
+ARTIFACT_EXT = '.tar.gz'
+ARTIFACT_METADATA_EXT = '.json'
+
+# names of top-level entries in artifact tarball
+ARTIFACT_MODULE = 'module'
+ARTIFACT_SOFTWARE = 'software'
+
+# size of chunks that are read when checking whether installation can be relocated
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def det_artifact_key_components(fingerprint):
+    """
+    Determine components of artifact key for specified build fingerprint.
+
+    The build fingerprint only covers the inputs of an installation, so the properties of the host (CPU, OS, glibc)
+    and of the module configuration that affect the installation directory and the module file are included too.
+
+    :param fingerprint: build fingerprint of installation (hex digest)
+    :return: dict with artifact key components
+    """
+    optarch = build_option('optarch')
+    components = {
+        'cpu_arch': get_host_profile_value('cpu_arch', get_cpu_architecture),
+        'fingerprint': fingerprint,
+        'glibc_version': get_host_profile_value('glibc_version', get_glibc_version),
+        'module_naming_scheme': get_module_naming_scheme(),
+        'module_syntax': get_module_syntax(),
+        'modules_tool': get_modules_tool(),
+        'optarch': optarch,
+        'os_name': get_host_profile_value('os_name', get_os_name),
+        'os_version': get_host_profile_value('os_version', get_os_version),
+        'suffix_modules_path': build_option('suffix_modules_path'),
+    }
+    # without a (single) fixed value for optarch, compilers optimize for the host CPU (e.g. -march=native)
+    if not isinstance(optarch, basestring) or not optarch:
+        components.update({
+            'cpu_family': get_host_profile_value('cpu_family', get_cpu_family),
+            'cpu_features': get_host_profile_value('cpu_features', get_cpu_features),
+            'cpu_model': get_host_profile_value('cpu_model', get_cpu_model),
+        })
+
+    return components
+
+
+def det_artifact_key(fingerprint):
+    """
+    Determine artifact key for specified build fingerprint (cfr. det_artifact_key_components).
+
+    :param fingerprint: build fingerprint of installation (hex digest)
+    :return: tuple with artifact key (hex digest) and dict with artifact key components
+    """
+    components = det_artifact_key_components(fingerprint)
+    key = hashlib.sha256(json.dumps(components, sort_keys=True)).hexdigest()
+    _log.debug("Artifact key for build fingerprint %s: %s (components: %s)", fingerprint, key, components)
+    return key, components
+
+
+def artifact_paths(cache_dir, key):
+    """
+    Determine paths to artifact tarball and metadata file for specified artifact key.
+
+    :param cache_dir: location of artifact cache
+    :param key: artifact key (hex digest, cfr. det_artifact_key)
+    :return: tuple with path to artifact tarball and path to metadata file
+    """
+    # use subdirectory based on first 2 characters of artifact key, to avoid huge directories
+    base_path = os.path.join(cache_dir, key[:2], key)
+    return (base_path + ARTIFACT_EXT, base_path + ARTIFACT_METADATA_EXT)
+
+
+def find_artifact(cache_dir, key):
+    """
+    Find artifact for specified artifact key in artifact cache.
+
+    :return: metadata for artifact (dict), or None if no (complete) artifact is available
+    """
+    res = None
+    archive, metadata_path = artifact_paths(cache_dir, key)
+    if os.path.isfile(archive) and os.path.isfile(metadata_path):
+        try:
+            res = json.loads(read_file(metadata_path))
+        except ValueError as err:
+            _log.warning("Ignoring artifact %s with metadata that could not be parsed: %s", archive, err)
+
+    _log.debug("Artifact for artifact key %s in %s: %s", key, cache_dir, res)
+    return res
+
+
+def store_artifact(cache_dir, key, installdir, mod_filepath, metadata=None):
+    """
+    Store installation (directory + module file) in artifact cache, if no artifact is available yet.
+
+    Artifacts are first written to a temporary file that is renamed afterwards,
+    so concurrent sessions (possibly on other hosts) never see incomplete artifacts.
+
+    :param cache_dir: location of artifact cache
+    :param key: artifact key of installation (cfr. det_artifact_key)
+    :param installdir: installation directory
+    :param mod_filepath: path to module file
+    :param metadata: additional metadata to store with artifact
+    :return: path to artifact tarball
+    """
+    archive, metadata_path = artifact_paths(cache_dir, key)
+    if os.path.exists(archive):
+        _log.info("Artifact for artifact key %s already available at %s, not storing it again", key, archive)
+        return archive
+
+    mkdir(os.path.dirname(archive), parents=True)
+
+    tmp_suffix = '.tmp.%s.%d' % (socket.gethostname(), os.getpid())
+    tmp_archive = archive + tmp_suffix
+    try:
+        tar = tarfile.open(tmp_archive, 'w:gz')
+        tar.add(installdir, arcname=ARTIFACT_SOFTWARE)
+        tar.add(mod_filepath, arcname=ARTIFACT_MODULE)
+        tar.close()
+        os.rename(tmp_archive, archive)
+    except (IOError, OSError, tarfile.TarError) as err:
+        if os.path.exists(tmp_archive):
+            remove_file(tmp_archive)
+        raise EasyBuildError("Failed to store %s in artifact cache at %s: %s", installdir, archive, err)
+
+    full_metadata = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'host': socket.gethostname(),
+        'installdir': installdir,
+        'key': key,
+    }
+    full_metadata.update(metadata or {})
+
+    # metadata file signals that artifact is complete, so only write it after tarball is in place
+    write_file(metadata_path + tmp_suffix, json.dumps(full_metadata, indent=2, sort_keys=True))
+    try:
+        os.rename(metadata_path + tmp_suffix, metadata_path)
+    except OSError as err:
+        raise EasyBuildError("Failed to move metadata file for artifact %s into place: %s", archive, err)
+
+    _log.info("Installation in %s stored in artifact cache at %s", installdir, archive)
+    return archive
+
+
+def _is_unsafe_path(path):
+    """Check whether specified path (relative to installation directory) may point outside of it."""
+    return os.path.isabs(path) or '..' in os.path.normpath(path).split(os.path.sep)
+
+
+def _software_members(tar, old_installdir):
+    """
+    Return list of tarball members for installation directory, with paths relative to installation directory.
+
+    Artifacts may be shared across hosts and users, so only regular files, directories, hard links and symbolic links
+    are accepted, and none of them may point (or lead, via a symbolic link) outside of the installation directory.
+
+    :param tar: artifact tarball (opened tarfile.TarFile instance)
+    :param old_installdir: original installation directory (symbolic links with an absolute target must point in it)
+    """
+    res = []
+    # (member name, path) tuples for paths (relative to installation directory) that must not lead via a symlink
+    checks = []
+    prefix = ARTIFACT_SOFTWARE + os.path.sep
+    for member in tar.getmembers():
+        if member.name.startswith(prefix):
+            member.name = member.name[len(prefix):]
+            if _is_unsafe_path(member.name):
+                raise EasyBuildError("Found unsafe path in artifact: %s", member.name)
+            checks.append((member.name, member.name))
+
+            if member.islnk():
+                linkname = member.linkname[len(prefix):]
+                if not member.linkname.startswith(prefix) or _is_unsafe_path(linkname):
+                    raise EasyBuildError("Hard link %s points outside of installation: %s", member.name,
+                                         member.linkname)
+                member.linkname = linkname
+                checks.append((member.name, linkname))
+
+            elif member.issym():
+                if os.path.isabs(member.linkname):
+                    target = os.path.normpath(member.linkname)
+                    unsafe = target != old_installdir and not target.startswith(old_installdir + os.path.sep)
+                    target = target[len(old_installdir) + 1:]
+                else:
+                    # relative targets are resolved against the directory that holds the symbolic link
+                    target = os.path.join(os.path.dirname(member.name), member.linkname)
+                    unsafe = _is_unsafe_path(target)
+                if unsafe:
+                    raise EasyBuildError("Symbolic link %s points outside of installation: %s", member.name,
+                                         member.linkname)
+                checks.append((member.name, target))
+
+            elif not (member.isfile() or member.isdir()):
+                raise EasyBuildError("Found unsupported type of entry in artifact: %s", member.name)
+
+            res.append(member)
+        elif member.name != ARTIFACT_SOFTWARE and member.name != ARTIFACT_MODULE:
+            raise EasyBuildError("Found unexpected entry in artifact: %s", member.name)
+
+    # entries must not be extracted (or point) via a symbolic link, since that could lead outside of the installation
+    symlinks = set(os.path.normpath(member.name) for member in res if member.issym())
+    for name, path in checks:
+        parts = path.split(os.path.sep)
+        for idx in range(1, len(parts)):
+            parent = os.path.normpath(os.path.join(*parts[:idx]))
+            if parent in symlinks:
+                raise EasyBuildError("Found entry in artifact that leads via symbolic link %s: %s", parent, name)
+
+    return res
+
+
+def check_relocatable(tar, members, old_installdir):
+    """
+    Check whether installation in artifact can be relocated, i.e. whether it does not hardcode the original
+    installation directory anywhere (except in log files & co, and in the module file which is patched on restore).
+
+    :param tar: artifact tarball (opened tarfile.TarFile instance)
+    :param members: list of tarball members for installation directory (cfr. _software_members)
+    :param old_installdir: original installation directory
+    :return: list of (paths to) files that hardcode the original installation directory
+    """
+    res = []
+    needle = old_installdir.encode('utf-8') if isinstance(old_installdir, unicode) else old_installdir
+    skip_prefix = log_path() + os.path.sep
+
+    for member in members:
+        if member.isfile() and not member.name.startswith(skip_prefix):
+            fileobj = tar.extractfile(member)
+            tail = ''
+            while True:
+                chunk = fileobj.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if needle in tail + chunk:
+                    res.append(member.name)
+                    break
+                # retain end of chunk, to also catch matches that span 2 chunks
+                tail = chunk[-len(needle):]
+            fileobj.close()
+        elif member.issym() and member.linkname.startswith(old_installdir):
+            res.append(member.name)
+
+    return res
+
+
+def restore_artifact(cache_dir, key, installdir, mod_filepath):
+    """
+    Restore installation (directory + module file) from artifact cache.
+
+    If the installation directory differs from the one the artifact was created for, the artifact is only restored
+    if the installation does not hardcode its original location, and the module file is patched accordingly.
+
+    :param cache_dir: location of artifact cache
+    :param key: artifact key of installation (cfr. det_artifact_key)
+    :param installdir: installation directory to restore to
+    :param mod_filepath: path to module file to restore
+    :return: True if installation was restored, False if no (relocatable) artifact is available
+    """
+    metadata = find_artifact(cache_dir, key)
+    if metadata is None:
+        return False
+
+    archive = artifact_paths(cache_dir, key)[0]
+    old_installdir = metadata['installdir']
+
+    try:
+        tar = tarfile.open(archive, 'r:gz')
+        try:
+            members = _software_members(tar, old_installdir)
+
+            if old_installdir != installdir:
+                hardcoded = check_relocatable(tar, members, old_installdir)
+                if hardcoded:
+                    _log.warning("Artifact %s can not be relocated from %s to %s, original location is hardcoded "
+                                 "in: %s", archive, old_installdir, installdir, ', '.join(hardcoded))
+                    return False
+                _log.info("Relocating artifact %s from %s to %s", archive, old_installdir, installdir)
+
+            mkdir(installdir, parents=True)
+            tar.extractall(installdir, members=members)
+
+            modtxt = tar.extractfile(ARTIFACT_MODULE).read()
+        finally:
+            tar.close()
+    except (IOError, OSError, KeyError, tarfile.TarError) as err:
+        raise EasyBuildError("Failed to restore %s from artifact cache at %s: %s", installdir, archive, err)
+
+    write_file(mod_filepath, modtxt.replace(old_installdir, installdir))
+
+    _log.info("Installation in %s restored from artifact cache at %s", installdir, archive)
+    return True
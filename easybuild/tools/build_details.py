@@ -51,6 +51,7 @@ def get_build_stats(app, start_time, command_line):
         ('install_size', det_size(app.installdir)),
         ('command_line', command_line),
         ('modules_tool', app.modules_tool.buildstats()),
+        ('resource_usage', app.resource_usage),
     ])
     for key, val in sorted(get_system_info().items()):
         buildstats.update({key: val})
@@ -36,6 +36,8 @@ import os
 import re
 import sys
 import tempfile
+import threading
+import time
 from copy import copy
 from datetime import datetime
 from vsc.utils import fancylogger
@@ -168,6 +170,131 @@ class EasyBuildLog(fancylogger.FancyLogger):
         fancylogger.FancyLogger.exception(self, ebmsg + msg, *args)
 
 
+class LazyLogValue(object):
+    """
+    Value for a log message argument that is only computed when the log message is actually emitted,
+    to avoid that (expensive) work is done for log messages below the active log level.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        """
+        Constructor
+
+        :param func: function to call to compute value
+        """
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._value = None
+        self._computed = False
+
+    def value(self):
+        """Compute value (only once, since log message may be composed by multiple log handlers)."""
+        if not self._computed:
+            self._value = self.func(*self.args, **self.kwargs)
+            self._computed = True
+        return self._value
+
+    def __str__(self):
+        """String representation of (computed) value."""
+        return str(self.value())
+
+    def __repr__(self):
+        """Representation of (computed) value."""
+        return repr(self.value())
+
+
+class BackgroundFileLogHandler(logging.FileHandler):
+    """
+    Log handler that buffers log records, and writes them to file in batches (with a single flush per batch)
+    from a background thread, so formatting and writing of log records is taken out of the code paths that log.
+    """
+
+    def __init__(self, filename, mode='a', interval=0.05):
+        """
+        Constructor
+
+        :param filename: path to log file
+        :param mode: mode to use to open log file
+        :param interval: time interval (in seconds) between writing batches of buffered log records
+        """
+        logging.FileHandler.__init__(self, filename, mode=mode)
+        self.interval = interval
+        self.records = []
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name='EasyBuildLogWriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def emit(self, record):
+        """Buffer log record (handler lock is held by caller)."""
+        try:
+            # log message must be composed right away, since arguments may be changed after the log call returns
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.records.append(record)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _write_records(self):
+        """Format and write buffered log records to log file in one go (handler lock must be held)."""
+        records, self.records = self.records, []
+        if records:
+            lines = []
+            for record in records:
+                try:
+                    line = self.format(record)
+                    if isinstance(line, unicode):
+                        line = line.encode('utf-8', 'replace')
+                    lines.append(line + '\n')
+                except Exception:
+                    self.handleError(record)
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(''.join(lines))
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[0])
+
+    def _run(self):
+        """Periodically write buffered log records, until handler is closed."""
+        while True:
+            time.sleep(self.interval)
+            self.acquire()
+            try:
+                if self.stopped:
+                    break
+                self._write_records()
+            finally:
+                self.release()
+
+    def flush(self):
+        """Write buffered log records."""
+        self.acquire()
+        try:
+            self._write_records()
+        finally:
+            self.release()
+
+    def close(self):
+        """Write remaining log records, stop background thread and close log file."""
+        self.acquire()
+        try:
+            self.stopped = True
+            self._write_records()
+        finally:
+            self.release()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
+        logging.FileHandler.close(self)
+
+
 # set format for logger
 LOGGING_FORMAT = EB_MSG_PREFIX + ' %(asctime)s %(filename)s:%(lineno)s %(levelname)s %(message)s'
 fancylogger.setLogFormat(LOGGING_FORMAT)
@@ -186,8 +313,16 @@ fancylogger.logToFile(filename=os.devnull, max_bytes=0)
 _init_easybuildlog = fancylogger.getLogger(fname=False)
 
 
-def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.Colorize.AUTO):
-    """Initialize logging."""
+def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.Colorize.AUTO, background=False):
+    """
+    Initialize logging.
+
+    :param logfile: path to log file (temporary log file is created if None)
+    :param logtostdout: log to stdout rather than to log file
+    :param silent: be silent (don't print location of log file)
+    :param colorize: whether or not to colorize log messages printed to stdout
+    :param background: write log file in a background thread (see BackgroundFileLogHandler)
+    """
     if logtostdout:
         fancylogger.logToScreen(enable=True, stdout=True, colorize=colorize)
     else:
@@ -196,7 +331,12 @@ def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.
             fd, logfile = tempfile.mkstemp(suffix='.log', prefix='easybuild-')
             os.close(fd)
 
-        fancylogger.logToFile(logfile, max_bytes=0)
+        filehandler = None
+        if background:
+            filehandler = BackgroundFileLogHandler(logfile)
+            filehandler.setFormatter(logging.Formatter(LOGGING_FORMAT))
+
+        fancylogger.logToFile(logfile, filehandler=filehandler, max_bytes=0)
         print_msg('temporary log file in case of crash %s' % (logfile), log=None, silent=silent)
 
     log = fancylogger.getLogger(fname=False)
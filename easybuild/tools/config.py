@@ -60,6 +60,7 @@ UNSET = 'unset'
 WARN = 'warn'
 
 PKG_TOOL_FPM = 'fpm'
+PKG_TOOL_NATIVE = 'native'
 PKG_TYPE_RPM = 'rpm'
 
 
@@ -82,6 +83,8 @@ DEFAULT_PKG_RELEASE = '1'
 DEFAULT_PKG_TOOL = PKG_TOOL_FPM
 DEFAULT_PKG_TYPE = PKG_TYPE_RPM
 DEFAULT_PNS = 'EasyBuildPNS'
+DEFAULT_PR_TARGET_ACCOUNT = 'easybuilders'
+DEFAULT_PR_TARGET_REPO = 'easybuild-easyconfigs'
 DEFAULT_PREFIX = os.path.join(os.path.expanduser('~'), ".local", "easybuild")
 DEFAULT_REPOSITORY = 'FileRepository'
 
@@ -109,7 +112,11 @@ def mk_full_default_path(name, prefix=DEFAULT_PREFIX):
 BUILD_OPTIONS_CMDLINE = {
     None: [
         'aggregate_regtest',
+        'artifact_cache',
         'backup_modules',
+        'cache_dir',
+        'check_style_base_ref',
+        'check_style_jobs',
         'download_timeout',
         'dump_test_report',
         'easyblock',
@@ -131,6 +138,7 @@ BUILD_OPTIONS_CMDLINE = {
         'job_output_dir',
         'job_polling_interval',
         'job_target_resource',
+        'list_software_jobs',
         'modules_footer',
         'modules_header',
         'mpi_cmd_template',
@@ -176,6 +184,7 @@ BUILD_OPTIONS_CMDLINE = {
         'robot',
         'rpath',
         'search_paths',
+        'search_threads',
         'sequential',
         'set_gid_bit',
         'skip_test_cases',
@@ -405,6 +414,11 @@ def init_build_options(build_options=None, cmdline_options=None):
     return BuildOptions(bo)
 
 
+def build_options_initialized():
+    """Check whether build options were initialized already (without initializing them)."""
+    return BuildOptions in Singleton._instances
+
+
 def build_option(key, **kwargs):
     """Obtain value specified build option."""
     build_options = BuildOptions()
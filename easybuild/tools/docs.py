@@ -36,6 +36,8 @@ Documentation-related functionality
 """
 import copy
 import inspect
+import json
+import multiprocessing
 import os
 import re
 import string
@@ -48,9 +50,9 @@ from vsc.utils.missing import nub
 from easybuild.framework.easyconfig.default import DEFAULT_CONFIG, HIDDEN, sorted_categories
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.constants import EASYCONFIG_CONSTANTS
-from easybuild.framework.easyconfig.easyconfig import EasyConfig, get_easyblock_class, process_easyconfig
+from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, get_easyblock_class, process_easyconfig
 from easybuild.framework.easyconfig.licenses import EASYCONFIG_LICENSES_DICT
-from easybuild.framework.easyconfig.parser import EasyConfigParser
+from easybuild.framework.easyconfig.parser import EasyConfigParser, parse_easyconfig_header
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_CONFIG, TEMPLATE_NAMES_EASYCONFIG
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_LOWER, TEMPLATE_NAMES_LOWER_TEMPLATE
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RUN_STEP, TEMPLATE_CONSTANTS
@@ -58,13 +60,15 @@ from easybuild.framework.easyconfig.templates import TEMPLATE_SOFTWARE_VERSIONS,
 from easybuild.framework.easyconfig.tweak import find_matching_easyconfigs
 from easybuild.framework.extension import Extension
 from easybuild.tools.build_log import EasyBuildError, print_msg
-from easybuild.tools.config import build_option
-from easybuild.tools.filetools import read_file
+from easybuild.tools.config import build_option, get_module_naming_scheme
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, read_file, write_file
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.ordereddict import OrderedDict
+from easybuild.tools.systemtools import get_avail_core_count
 from easybuild.tools.toolchain import DUMMY_TOOLCHAIN_NAME
 from easybuild.tools.toolchain.utilities import search_toolchain
 from easybuild.tools.utilities import import_available_modules, quote_str
+from easybuild.tools.version import VERSION
 
 
 _log = fancylogger.getLogger('tools.docs')
@@ -79,6 +83,9 @@ SIMPLE = 'simple'
 FORMAT_TXT = 'txt'
 FORMAT_RST = 'rst'
 
+LIST_SOFTWARE_CACHE_FILENAME = 'list_software.json'
+LIST_SOFTWARE_PARAMETERS = ['description', 'homepage', 'name', 'toolchain', 'version', 'versionsuffix']
+
 
 def generate_doc(name, params):
     """Generate documentation by calling function with specified name, using supplied parameters."""
@@ -524,10 +531,133 @@ def gen_list_easyblocks(list_easyblocks, format_strings):
     return '\n'.join(txt)
 
 
+def det_software_metadata(ec_path, only_installed=False):
+    """
+    Determine metadata for list of software for specified easyconfig file.
+
+    :param ec_path: path to easyconfig file
+    :param only_installed: also determine module name (requires full EasyConfig instance)
+    :return: dict with name, version, versionsuffix, toolchain, description, homepage (and module name)
+    """
+    # full EasyConfig instance is only required when module name is needed
+    # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser,
+    # which in turn is slower than a lightweight parse that only determines the relevant parameters (if possible)
+    if only_installed:
+        ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
+    else:
+        try:
+            ec = parse_easyconfig_header(read_file(ec_path), params=LIST_SOFTWARE_PARAMETERS, strict=True)
+        except EasyBuildError as err:
+            _log.debug("Lightweight parse of %s failed, falling back to full parse: %s", ec_path, err)
+            ec = None
+
+        if ec is not None:
+            toolchain = ec['toolchain']
+            if not all(isinstance(ec[key], basestring) for key in ['description', 'homepage', 'name', 'version']):
+                ec = None
+            elif not isinstance(toolchain, dict) or 'name' not in toolchain or 'version' not in toolchain:
+                ec = None
+
+        if ec is None:
+            ec = EasyConfigParser(filename=ec_path).get_config_dict()
+
+    if ec['toolchain']['name'] == DUMMY_TOOLCHAIN_NAME:
+        toolchain = DUMMY_TOOLCHAIN_NAME
+    else:
+        toolchain = '%s/%s' % (ec['toolchain']['name'], ec['toolchain']['version'])
+
+    versionsuffix = ec.get('versionsuffix') or ''
+
+    # make sure versionsuffix gets properly templated
+    if versionsuffix and isinstance(ec, dict):
+        template_values = template_constant_dict(ec)
+        versionsuffix = versionsuffix % template_values
+
+    res = {
+        'description': ec['description'],
+        'homepage': ec['homepage'],
+        'name': ec['name'],
+        'toolchain': toolchain,
+        'version': ec['version'],
+        'versionsuffix': versionsuffix,
+    }
+    if only_installed:
+        res['mod_name'] = ec.full_mod_name
+
+    return res
+
+
+def _det_software_metadata(args):
+    """Wrapper for det_software_metadata, for use with multiprocessing.Pool.imap."""
+    return det_software_metadata(*args)
+
+
+def list_software_cache_key(checksum, only_installed=False):
+    """
+    Determine key in list of software cache for easyconfig file with specified checksum.
+
+    :return: cache key, or None if metadata for easyconfig file should not be cached
+    """
+    # module names depend on active module naming scheme
+    if only_installed:
+        # module names generated by a module naming scheme that relies on toolchain details (e.g. HierarchicalMNS)
+        # also depend on other easyconfig files/modules, so they are not cached
+        if ActiveMNS().mns.requires_toolchain_details():
+            key = None
+        else:
+            key = '%s_%s' % (checksum, get_module_naming_scheme())
+    else:
+        key = checksum
+    return key
+
+
+def load_list_software_cache(path):
+    """
+    Load cache for list of software: metadata for easyconfig files, indexed by checksum.
+
+    :param path: location of cache file
+    """
+    res = {}
+    if os.path.isfile(path):
+        try:
+            data = json.loads(read_file(path))
+        except ValueError as err:
+            _log.warning("Ignoring list of software cache %s which could not be parsed: %s", path, err)
+            data = {}
+
+        # parsing of easyconfig files may be different in other EasyBuild versions
+        if data.get('easybuild_version') == str(VERSION):
+            # JSON strings are loaded as unicode values, while metadata obtained by parsing are regular strings
+            for key, metadata in data['metadata'].items():
+                res[str(key)] = dict((str(k), v.encode('utf-8')) for (k, v) in metadata.items())
+        else:
+            _log.info("Ignoring list of software cache %s for EasyBuild version %s",
+                      path, data.get('easybuild_version'))
+
+    return res
+
+
+def save_list_software_cache(path, metadata):
+    """
+    Save cache for list of software.
+
+    :param path: location of cache file
+    :param metadata: metadata for easyconfig files, indexed by checksum
+    """
+    data = {
+        'easybuild_version': str(VERSION),
+        'metadata': metadata,
+    }
+    write_file(path, json.dumps(data, indent=2, sort_keys=True))
+
+
 def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False):
     """
     Show list of supported software
 
+    Easyconfig files are parsed in parallel (cfr. --list-software-jobs); if a cache directory is specified
+    (cfr. --cache-dir), metadata for easyconfig files that were parsed before (with identical contents) is reused.
+
     :param output_format: output format to use
     :param detailed: whether or not to return detailed information (incl. version, versionsuffix, toolchain info)
     :param only_installed: only retain software for which a corresponding module is available
@@ -536,46 +666,60 @@ def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False
     silent = build_option('silent')
 
     ec_paths = find_matching_easyconfigs('*', '*', build_option('robot_path') or [])
+
+    cache_dir = build_option('cache_dir')
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, LIST_SOFTWARE_CACHE_FILENAME)
+        cache = load_list_software_cache(cache_path)
+    else:
+        cache = {}
+
+    checksums = [compute_checksum(ec_path, checksum_type=CHECKSUM_TYPE_SHA256) for ec_path in ec_paths]
+    keys = [list_software_cache_key(checksum, only_installed=only_installed) for checksum in checksums]
+    todo = [ec_path for (ec_path, key) in zip(ec_paths, keys) if key is None or key not in cache]
+    _log.info("Reusing cached metadata for %d out of %d easyconfigs", len(ec_paths) - len(todo), len(ec_paths))
+
+    jobs = min(build_option('list_software_jobs') or get_avail_core_count(), len(todo))
+    if jobs > 1:
+        _log.info("Parsing %d easyconfigs using %d processes", len(todo), jobs)
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(_det_software_metadata, [(ec_path, only_installed) for ec_path in todo])
+    else:
+        pool = None
+        results = (det_software_metadata(ec_path, only_installed=only_installed) for ec_path in todo)
+
     ecs = []
     cnt = len(ec_paths)
-    for idx, ec_path in enumerate(ec_paths):
-        # full EasyConfig instance is only required when module name is needed
-        # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser
-        if only_installed:
-            ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
-        else:
-            ec = EasyConfigParser(filename=ec_path).get_config_dict()
-
-        ecs.append(ec)
-        print_msg('\r', prefix=False, newline=False, silent=silent)
-        print_msg("Processed %d/%d easyconfigs..." % (idx+1, cnt), newline=False, silent=silent)
+    try:
+        for idx, key in enumerate(keys):
+            if key is None:
+                ecs.append(next(results))
+            else:
+                if key not in cache:
+                    cache[key] = next(results)
+                ecs.append(cache[key])
+            print_msg('\r', prefix=False, newline=False, silent=silent)
+            print_msg("Processed %d/%d easyconfigs..." % (idx+1, cnt), newline=False, silent=silent)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
     print_msg('', prefix=False, silent=silent)
 
+    if cache_dir:
+        # only retain cached metadata for easyconfig files that are still around
+        checksums = set(checksums)
+        for key in list(cache.keys()):
+            if key.split('_')[0] not in checksums:
+                del cache[key]
+        save_list_software_cache(cache_path, cache)
+
     software = {}
     for ec in ecs:
-        software.setdefault(ec['name'], [])
-        if ec['toolchain']['name'] == DUMMY_TOOLCHAIN_NAME:
-            toolchain = DUMMY_TOOLCHAIN_NAME
-        else:
-            toolchain = '%s/%s' % (ec['toolchain']['name'], ec['toolchain']['version'])
-
-        versionsuffix = ec.get('versionsuffix', '')
-
-        # make sure versionsuffix gets properly templated
-        if versionsuffix and isinstance(ec, dict):
-            template_values = template_constant_dict(ec)
-            versionsuffix = versionsuffix % template_values
-
-        software[ec['name']].append({
-            'description': ec['description'],
-            'homepage': ec['homepage'],
-            'toolchain': toolchain,
-            'version': ec['version'],
-            'versionsuffix': versionsuffix,
-        })
-
+        entry = dict((key, ec[key]) for key in ['description', 'homepage', 'toolchain', 'version', 'versionsuffix'])
         if only_installed:
-            software[ec['name']][-1].update({'mod_name': ec.full_mod_name})
+            entry['mod_name'] = ec['mod_name']
+        software.setdefault(ec['name'], []).append(entry)
 
     print_msg("Found %d different software packages" % len(software), silent=silent)
 
@@ -184,6 +184,56 @@ def restore_env(env):
     modify_env(os.environ, env, verbose=False)
 
 
+def det_env_changes(old, new):
+    """
+    Determine changes between two environments (e.g., copies of os.environ).
+
+    :param old: dict with original environment
+    :param new: dict with changed environment
+    :return: dict with (value, prepended) tuple for each changed environment variable (prepended is True if value
+             was prepended to original value as a path, in which case value is the prepended part),
+             and None for each environment variable that was undefined
+    """
+    res = {}
+    for key, val in new.items():
+        old_val = old.get(key)
+        if val != old_val:
+            if old_val and val.endswith(os.pathsep + old_val):
+                res[key] = (val[:-len(old_val)], True)
+            else:
+                res[key] = (val, False)
+
+    for key in old:
+        if key not in new:
+            res[key] = None
+
+    return res
+
+
+def apply_env_changes(changes, verbose=True):
+    """
+    Apply environment changes (as obtained via det_env_changes) to active environment:
+    paths that were prepended are prepended again (unless they already are), other values are (re)defined,
+    and environment variables that were undefined are undefined again.
+
+    :param changes: environment changes, see det_env_changes
+    :param verbose: include messages in dry run output for (un)defining environment variables
+    """
+    for key, change in sorted(changes.items()):
+        if change is None:
+            unset_env_vars([key], verbose=verbose)
+        else:
+            val, prepended = change
+            curr_val = os.environ.get(key)
+            if prepended and curr_val:
+                if not curr_val.startswith(val):
+                    setvar(key, val + curr_val, verbose=verbose)
+            elif prepended:
+                setvar(key, val.rstrip(os.pathsep), verbose=verbose)
+            elif curr_val != val:
+                setvar(key, val, verbose=verbose)
+
+
 def sanitize_env():
     """
     Sanitize environment.
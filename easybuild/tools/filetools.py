@@ -40,6 +40,7 @@ Set of file tools.
 import datetime
 import difflib
 import fileinput
+import fnmatch
 import glob
 import hashlib
 import os
@@ -543,10 +544,7 @@ def search_file(paths, query, short=False, ignore_dirs=None, silent=False, filen
     # compile regex, case-insensitive
     query = re.compile(query, re.I)
 
-    var_defs = []
-    hits = []
-    var_index = 1
-    var = None
+    hits_per_path = []
     for path in paths:
         path_hits = []
         if not terse:
@@ -555,9 +553,6 @@ def search_file(paths, query, short=False, ignore_dirs=None, silent=False, filen
         for (dirpath, dirnames, filenames) in os.walk(path, topdown=True):
             for filename in filenames:
                 if query.search(filename):
-                    if not path_hits:
-                        var = "CFGS%d" % var_index
-                        var_index += 1
                     if filename_only:
                         path_hits.append(filename)
                     else:
@@ -569,9 +564,27 @@ def search_file(paths, query, short=False, ignore_dirs=None, silent=False, filen
             # see http://stackoverflow.com/questions/13454164/os-walk-without-hidden-folders
             dirnames[:] = [d for d in dirnames if d not in ignore_dirs]
 
-        path_hits = sorted(path_hits)
+        hits_per_path.append(sorted(path_hits))
+
+    return shorten_search_hits(hits_per_path, short=short, terse=terse)
+
+
+def shorten_search_hits(hits_per_path, short=False, terse=False):
+    """
+    Combine search hits for different paths, and factor out common prefix of hits for each path if desired.
 
+    :param hits_per_path: list with list of hits for each path that was searched
+    :param short: figure out common prefix of hits, use variable to factor it out
+    :param terse: stick to terse (machine-readable) output, as opposed to pretty-printing
+    :return: tuple with list of variable definitions for common prefixes, and list of (shortened) hits
+    """
+    var_defs = []
+    hits = []
+    var_index = 1
+    for path_hits in hits_per_path:
         if path_hits:
+            var = "CFGS%d" % var_index
+            var_index += 1
             common_prefix = det_common_path_prefix(path_hits)
             if not terse and short and common_prefix is not None and len(common_prefix) > len(var) * 2:
                 var_defs.append((var, common_prefix))
@@ -1148,6 +1161,64 @@ def expand_glob_paths(glob_paths):
     return nub(paths)
 
 
+def find_glob_matches(root, patterns):
+    """
+    Find paths matching each of the specified (relative) glob patterns in the given directory.
+
+    This is equivalent to running glob.glob for each of the patterns (in the given directory),
+    but is done in a single pass in which each (sub)directory that is involved is only listed once,
+    which matters when a large number of patterns with common prefixes is used.
+
+    :param root: directory to look for matches in
+    :param patterns: list of glob patterns, relative to specified directory
+    :return: dict with sorted list of matching (relative) paths for each pattern
+    """
+    listings = {}
+
+    def listdir(subdir):
+        """Return (cached) list and set of entries in specified subdirectory of root (empty if it can't be listed)."""
+        if subdir not in listings:
+            try:
+                entries = os.listdir(os.path.join(root, subdir))
+            except OSError:
+                entries = []
+            listings[subdir] = (entries, set(entries))
+        return listings[subdir]
+
+    res = {}
+    for pattern in patterns:
+        parts = pattern.split(os.path.sep)
+        if not pattern:
+            res[pattern] = []
+
+        elif os.path.isabs(pattern):
+            res[pattern] = sorted(glob.glob(pattern))
+
+        elif '' in parts or os.curdir in parts or os.pardir in parts:
+            # fall back to glob.glob for patterns that are not in normalized form, or that refer to parent directories
+            prefix = os.path.join(root, '')
+            res[pattern] = sorted(p[len(prefix):] for p in glob.glob(os.path.join(prefix, pattern)))
+
+        else:
+            matches = ['']
+            for part in parts:
+                magic = glob.has_magic(part)
+                new_matches = []
+                for match in matches:
+                    entries, entries_set = listdir(match)
+                    if magic:
+                        # same as glob.glob: hidden files are only matched by patterns that start with '.'
+                        for name in fnmatch.filter(entries, part):
+                            if part[0] == '.' or name[0] != '.':
+                                new_matches.append(os.path.join(match, name))
+                    elif part in entries_set:
+                        new_matches.append(os.path.join(match, part))
+                matches = new_matches
+            res[pattern] = sorted(matches)
+
+    return res
+
+
 def weld_paths(path1, path2):
     """Weld two paths together, taking into account overlap between tail of 1st path with head of 2nd path."""
     # strip path1 for use in comparisons
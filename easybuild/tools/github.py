@@ -49,7 +49,7 @@ from easybuild.framework.easyconfig.easyconfig import copy_easyconfigs, copy_pat
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
 from easybuild.framework.easyconfig.format.yeb import YEB_FORMAT_EXTENSION
 from easybuild.tools.build_log import EasyBuildError, print_msg, print_warning
-from easybuild.tools.config import build_option
+from easybuild.tools.config import DEFAULT_PR_TARGET_ACCOUNT, DEFAULT_PR_TARGET_REPO, build_option
 from easybuild.tools.filetools import apply_patch, copy_dir, det_patched_files, download_file, extract_file
 from easybuild.tools.filetools import mkdir, read_file, which, write_file
 from easybuild.tools.systemtools import UNKNOWN, get_tool_version
@@ -83,8 +83,8 @@ except ImportError as err:
 GITHUB_URL = 'https://github.com'
 GITHUB_API_URL = 'https://api.github.com'
 GITHUB_DIR_TYPE = u'dir'
-GITHUB_EB_MAIN = 'easybuilders'
-GITHUB_EASYCONFIGS_REPO = 'easybuild-easyconfigs'
+GITHUB_EB_MAIN = DEFAULT_PR_TARGET_ACCOUNT
+GITHUB_EASYCONFIGS_REPO = DEFAULT_PR_TARGET_REPO
 GITHUB_FILE_TYPE = u'file'
 GITHUB_MAX_PER_PAGE = 100
 GITHUB_MERGEABLE_STATE_CLEAN = 'clean'
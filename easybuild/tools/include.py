@@ -35,19 +35,8 @@ from vsc.utils import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import expand_glob_paths, symlink
 # these are imported just to we can reload them later
+# (toolchain & easyblock packages are only imported when needed, to keep startup time low)
 import easybuild.tools.module_naming_scheme
-import easybuild.toolchains
-import easybuild.toolchains.compiler
-import easybuild.toolchains.fft
-import easybuild.toolchains.linalg
-import easybuild.toolchains.mpi
-# importing easyblocks namespace may fail if easybuild-easyblocks is not available
-# for now, we don't really care
-try:
-    import easybuild.easyblocks
-    import easybuild.easyblocks.generic
-except ImportError:
-    pass
 
 
 _log = fancylogger.getLogger('tools.include', fname=False)
@@ -144,6 +133,14 @@ def verify_imports(pymods, pypkg, from_path):
 
 def include_easyblocks(tmpdir, paths):
     """Include generic and software-specific easyblocks found in specified locations."""
+    # importing easyblocks namespace may fail if easybuild-easyblocks is not available
+    # for now, we don't really care
+    try:
+        import easybuild.easyblocks
+        import easybuild.easyblocks.generic
+    except ImportError:
+        pass
+
     easyblocks_path = os.path.join(tmpdir, 'included-easyblocks')
 
     set_up_eb_package(easyblocks_path, 'easybuild.easyblocks',
@@ -227,6 +224,13 @@ def include_module_naming_schemes(tmpdir, paths):
 
 def include_toolchains(tmpdir, paths):
     """Include toolchains and toolchain components at specified locations."""
+    # make sure easybuild.toolchains(.*) packages are imported, so their location can be hard injected below
+    import easybuild.toolchains
+    import easybuild.toolchains.compiler
+    import easybuild.toolchains.fft
+    import easybuild.toolchains.linalg
+    import easybuild.toolchains.mpi
+
     toolchains_path = os.path.join(tmpdir, 'included-toolchains')
     toolchain_subpkgs = ['compiler', 'fft', 'linalg', 'mpi']
 
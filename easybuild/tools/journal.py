@@ -0,0 +1,218 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Session journal support: keep track of progress made in an EasyBuild session,
+so an interrupted session can be resumed (cfr. --session-journal and --resume).
+
+The journal is a JSON file that records the (resolved) list of easyconfigs to install, in order,
+together with the installation state of each of them and the last step that was completed,
+and the configuration options that were used (an interrupted session can only be resumed using the same options).
+"""
+import json
+import os
+import time
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file
+
+
+_log = fancylogger.getLogger('journal', fname=False)
+
+JOURNAL_FORMAT_VERSION = 2
+
+# configuration options that do not affect installations, and hence may differ when resuming a session
+RESUME_IGNORED_OPTIONS = ['background-logging', 'color', 'debug', 'info', 'logtostdout', 'profile', 'quiet',
+                          'resume', 'session-journal', 'terse', 'trace', 'trace-hotpaths', 'unittest-file']
+
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATE_PENDING = 'pending'
+STATE_RUNNING = 'running'
+
+UNFINISHED_STATES = [STATE_FAILED, STATE_PENDING, STATE_RUNNING]
+
+
+class SessionJournal(object):
+    """Journal of progress made in an EasyBuild session."""
+
+    def __init__(self, path, command_line=None, options=None):
+        """
+        Create a new (empty) session journal.
+
+        :param path: location of journal file
+        :param command_line: command line used for the session
+        :param options: configuration options used for the session (cfr. EasyBuildOptions.generate_cmd_line)
+        """
+        self.path = os.path.abspath(path)
+        self.data = {
+            'version': JOURNAL_FORMAT_VERSION,
+            'command_line': command_line,
+            'options': options or [],
+            'created': int(time.time()),
+            'easyconfigs': [],
+        }
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load existing session journal from specified file.
+
+        :param path: location of journal file
+        """
+        if not os.path.isfile(path):
+            raise EasyBuildError("Session journal %s does not exist", path)
+
+        try:
+            data = json.loads(read_file(path))
+        except ValueError as err:
+            raise EasyBuildError("Failed to parse session journal %s: %s", path, err)
+
+        if data.get('version') != JOURNAL_FORMAT_VERSION:
+            raise EasyBuildError("Unsupported format version for session journal %s: %s (expected: %s)",
+                                 path, data.get('version'), JOURNAL_FORMAT_VERSION)
+
+        journal = cls(path)
+        journal.data = data
+        _log.info("Loaded session journal %s (%d easyconfigs)", path, len(data['easyconfigs']))
+        return journal
+
+    def save(self):
+        """Write session journal to disk; a temporary file is used so the journal is never left half-written."""
+        tmp_path = '%s.tmp' % self.path
+        try:
+            mkdir(os.path.dirname(self.path), parents=True)
+            handle = open(tmp_path, 'w')
+            handle.write(json.dumps(self.data, indent=2, sort_keys=True))
+            handle.close()
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as err:
+            raise EasyBuildError("Failed to write session journal %s: %s", self.path, err)
+
+    def check_options(self, options):
+        """
+        Check whether specified configuration options match the ones used for the session recorded in this journal,
+        since resuming a session with a different configuration would result in inconsistent installations.
+
+        :param options: configuration options to resume session with (cfr. EasyBuildOptions.generate_cmd_line)
+        """
+        def relevant_options(opts):
+            """Filter out options that do not affect installations."""
+            return set(opt for opt in opts if opt.lstrip('-').split('=')[0] not in RESUME_IGNORED_OPTIONS)
+
+        recorded, current = relevant_options(self.data['options']), relevant_options(options)
+        if current != recorded:
+            raise EasyBuildError("Configuration options differ from those used for session %s, not resuming it "
+                                 "(missing: %s; unexpected: %s); session was started with: %s", self.path,
+                                 ' '.join(sorted(recorded - current)) or '(none)',
+                                 ' '.join(sorted(current - recorded)) or '(none)', ' '.join(self.data['command_line']))
+
+    def entries(self):
+        """Return list of journal entries, in order of installation."""
+        return self.data['easyconfigs']
+
+    def get_entry(self, full_mod_name):
+        """Return journal entry for specified module name (or None if there is none)."""
+        for entry in self.data['easyconfigs']:
+            if entry['full_mod_name'] == full_mod_name:
+                return entry
+        return None
+
+    def unfinished_specs(self):
+        """Return list of paths to easyconfig files for which the installation was not completed (yet)."""
+        return [entry['spec'] for entry in self.data['easyconfigs'] if entry['state'] in UNFINISHED_STATES]
+
+    def register(self, ecs):
+        """
+        Register (resolved) list of easyconfigs to install in journal;
+        entries that are already known (when resuming a session) are retained as they are.
+
+        :param ecs: list of parsed easyconfigs, in order of installation
+        """
+        for ec in ecs:
+            if self.get_entry(ec['full_mod_name']) is None:
+                self.data['easyconfigs'].append({
+                    'builddir': None,
+                    'full_mod_name': ec['full_mod_name'],
+                    'spec': os.path.abspath(ec['spec']),
+                    'src_finalpaths': [],
+                    'state': STATE_PENDING,
+                    'step': None,
+                    'step_idx': None,
+                })
+        self.save()
+
+    def _set_state(self, full_mod_name, state):
+        """Update state for specified module name in journal."""
+        entry = self.get_entry(full_mod_name)
+        if entry is None:
+            raise EasyBuildError("No entry found for %s in session journal %s", full_mod_name, self.path)
+        entry['state'] = state
+        self.save()
+        return entry
+
+    def install_started(self, full_mod_name):
+        """Record that installation of specified module has started."""
+        self._set_state(full_mod_name, STATE_RUNNING)
+
+    def install_ended(self, full_mod_name, success):
+        """Record outcome of installation of specified module."""
+        if success:
+            self._set_state(full_mod_name, STATE_DONE)
+        else:
+            self._set_state(full_mod_name, STATE_FAILED)
+
+    def step_completed(self, app, step_idx, step_name):
+        """
+        Record that specified step was completed for the installation performed by the given easyblock instance.
+
+        :param app: EasyBlock instance
+        :param step_idx: index of completed step in list of steps
+        :param step_name: name of completed step
+        """
+        entry = self.get_entry(app.full_mod_name)
+        if entry is None:
+            raise EasyBuildError("No entry found for %s in session journal %s", app.full_mod_name, self.path)
+
+        entry.update({
+            'builddir': app.builddir,
+            'src_finalpaths': [src.get('finalpath') for src in app.src],
+            'step': step_name,
+            'step_idx': step_idx,
+        })
+        self.save()
+
+    def resume_state(self, full_mod_name):
+        """
+        Return state to resume installation for specified module from (if any).
+
+        :return: dict with build directory, last completed step (+ index) and paths to unpacked sources, or None
+        """
+        entry = self.get_entry(full_mod_name)
+        if entry is None or entry['state'] not in UNFINISHED_STATES or entry['step_idx'] is None:
+            res = None
+        else:
+            res = dict((key, entry[key]) for key in ['builddir', 'src_finalpaths', 'step', 'step_idx'])
+        return res
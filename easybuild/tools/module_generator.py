@@ -44,8 +44,9 @@ from vsc.utils.missing import get_subclasses
 
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option, get_module_syntax, install_path
-from easybuild.tools.filetools import convert_name, mkdir, read_file, remove_file, resolve_path, symlink, write_file
-from easybuild.tools.modules import ROOT_ENV_VAR_NAME_PREFIX, modules_tool
+from easybuild.tools.filetools import convert_name, mkdir, remove_file, resolve_path, symlink, write_file
+from easybuild.tools.modules import MODULE_LOAD_REGEX_LUA, MODULE_LOAD_REGEX_TCL, ROOT_ENV_VAR_NAME_PREFIX
+from easybuild.tools.modules import modules_tool
 from easybuild.tools.utilities import quote_str
 
 
@@ -90,25 +91,79 @@ def dependencies_for(mod_name, modtool, depth=sys.maxint):
     Obtain a list of dependencies for the given module, determined recursively, up to a specified depth (optionally)
     :param depth: recursion depth (default is sys.maxint, which should be equivalent to infinite recursion depth)
     """
-    mod_filepath = modtool.modulefile_path(mod_name)
-    modtxt = read_file(mod_filepath)
-    loadregex = module_load_regex(mod_filepath)
-    mods = loadregex.findall(modtxt)
-
-    if depth > 0:
-        # recursively determine dependencies for these dependency modules, until depth is non-positive
-        moddeps = [dependencies_for(mod, modtool, depth=depth - 1) for mod in mods]
-    else:
-        # ignore any deeper dependencies
-        moddeps = []
+    # dependencies are memoized per module (and remaining depth, if recursion depth is limited), to avoid traversing
+    # the same part of the dependency graph over and over again when a module is reached via multiple paths
+    # (e.g. foss -> gompi -> GCC and foss -> GCC); a depth of None indicates unlimited recursion depth
+    if depth >= sys.maxint:
+        depth = None
+    memo = {}
+
+    def deps_for(mod_name, depth):
+        """Determine list of dependencies for specified module, up to specified depth."""
+        key = (mod_name, depth)
+        if key not in memo:
+            # guard against cycles in the dependency graph
+            memo[key] = []
+
+            # module files are only read once, see ModulesTool.module_deps_info
+            direct_deps = modtool.module_deps_info(mod_name)[1]
+            mods = direct_deps[:]
+
+            if depth is None or depth > 0:
+                # recursively determine dependencies for these dependency modules, until depth is non-positive;
+                # add dependencies of dependency modules only if they're not there yet
+                if depth is None:
+                    dep_depth = None
+                else:
+                    dep_depth = depth - 1
+                for mod in direct_deps:
+                    for dep in deps_for(mod, dep_depth):
+                        if dep not in mods:
+                            mods.append(dep)
+
+            memo[key] = mods
 
-    # add dependencies of dependency modules only if they're not there yet
-    for moddepdeps in moddeps:
-        for dep in moddepdeps:
-            if not dep in mods:
-                mods.append(dep)
+        return memo[key]
 
-    return mods
+    return deps_for(mod_name, depth)[:]
+
+
+class ModuleStatements(object):
+    """
+    Syntax-independent (intermediate) representation of a series of module file statements, which can be
+    rendered into module file contents in a single pass by any module generator (see ModuleGenerator.render).
+    """
+    # type of statement for raw text, which is included as is
+    TEXT = 'text'
+
+    # types of statements, which correspond to the ModuleGenerator method used to render them
+    STATEMENT_TYPES = ['append_paths', 'comment', 'load_module', 'msg_on_load', 'prepend_paths', 'set_alias',
+                       'set_environment', 'swap_module', 'unload_module', 'use']
+
+    def __init__(self):
+        """ModuleStatements constructor."""
+        self.statements = []
+
+    def __len__(self):
+        """Return number of statements."""
+        return len(self.statements)
+
+    def add(self, statement_type, *args, **kwargs):
+        """
+        Add module file statement of specified type.
+
+        :param statement_type: type of statement, see STATEMENT_TYPES
+        :param args: positional arguments for ModuleGenerator method that corresponds to statement type
+        :param kwargs: named arguments for ModuleGenerator method that corresponds to statement type
+        """
+        if statement_type not in self.STATEMENT_TYPES:
+            raise EasyBuildError("Unknown type of module file statement '%s' (known: %s)",
+                                 statement_type, ', '.join(self.STATEMENT_TYPES))
+        self.statements.append((statement_type, args, kwargs))
+
+    def add_text(self, txt):
+        """Add raw text, which is included as is (so must be in the correct module syntax)."""
+        self.statements.append((self.TEXT, (txt,), {}))
 
 
 class ModuleGenerator(object):
@@ -197,6 +252,20 @@ class ModuleGenerator(object):
         """
         return self.update_paths(key, paths, prepend=True, allow_abs=allow_abs, expand_relpaths=expand_relpaths)
 
+    def render(self, mod_stmts):
+        """
+        Render given module file statements into module file contents, in a single pass.
+
+        :param mod_stmts: ModuleStatements instance
+        """
+        res = []
+        for (statement_type, args, kwargs) in mod_stmts.statements:
+            if statement_type == ModuleStatements.TEXT:
+                res.append(args[0])
+            else:
+                res.append(getattr(self, statement_type)(*args, **kwargs))
+        return ''.join(res)
+
     # From this point on just not implemented methods
 
     def check_group(self, group, error_msg=None):
@@ -403,7 +472,7 @@ class ModuleGeneratorTcl(ModuleGenerator):
     MODULE_SHEBANG = '#%Module'
     CHARS_TO_ESCAPE = ['$']
 
-    LOAD_REGEX = r"^\s*module\s+load\s+(\S+)"
+    LOAD_REGEX = MODULE_LOAD_REGEX_TCL
     LOAD_TEMPLATE = "module load %(mod_name)s"
 
     def check_group(self, group, error_msg=None):
@@ -668,7 +737,7 @@ class ModuleGeneratorLua(ModuleGenerator):
     MODULE_SHEBANG = ''  # no 'shebang' in Lua module files
     CHARS_TO_ESCAPE = []
 
-    LOAD_REGEX = r'^\s*load\("(\S+)"'
+    LOAD_REGEX = MODULE_LOAD_REGEX_LUA
     LOAD_TEMPLATE = 'load("%(mod_name)s")'
 
     PATH_JOIN_TEMPLATE = 'pathJoin(root, "%s")'
@@ -44,13 +44,14 @@ from subprocess import PIPE
 from vsc.utils import fancylogger
 from vsc.utils.missing import get_subclasses
 
-from easybuild.tools.build_log import EasyBuildError, print_warning
+from easybuild.tools.build_log import EasyBuildError, LazyLogValue, print_warning
 from easybuild.tools.config import ERROR, IGNORE, PURGE, UNLOAD, UNSET, WARN
 from easybuild.tools.config import EBROOT_ENV_VAR_ACTIONS, LOADED_MODULES_ACTIONS
 from easybuild.tools.config import build_option, get_modules_tool, install_path
 from easybuild.tools.environment import ORIG_OS_ENVIRON, restore_env, setvar, unset_env_vars
 from easybuild.tools.filetools import convert_name, mkdir, path_matches, read_file, which
 from easybuild.tools.module_naming_scheme import DEVEL_MODULE_SUFFIX
+from easybuild.tools.resource_usage import count_subprocess
 from easybuild.tools.run import run_cmd
 from vsc.utils.missing import nub
 
@@ -120,6 +121,34 @@ OUTPUT_MATCHES = {
 MODULE_AVAIL_CACHE = {}
 MODULE_SHOW_CACHE = {}
 
+# cache for module dependency graph, see ModulesTool.module_deps_info
+# key: tuple with $MODULEPATH and module name
+# value: tuple with path to module file, list of modules loaded in module file, list of $MODULEPATH extensions
+MODULE_DEPS_CACHE = {}
+
+# cache for $MODULEPATH extensions made by module files, see ModulesTool.modpath_extensions_in_modfile
+# key: path to module file
+# value: tuple with (modification time, size) of module file, and list of (resolved) $MODULEPATH extensions
+MODFILE_MODPATH_EXTS_CACHE = {}
+
+# cache for index of $MODULEPATH extensions made by module files in a module tree, see ModulesTool.modpath_exts_index
+# key: tuple with (resolved) paths to top of module tree
+# value: tuple with index (dict) and set of names of all modules in the module tree
+MODPATH_EXTS_INDEX_CACHE = {}
+
+# regular expressions for 'module load' statements in Tcl/Lua module files
+MODULE_LOAD_REGEX_LUA = r'^\s*load\("(\S+)"'
+MODULE_LOAD_REGEX_TCL = r"^\s*module\s+load\s+(\S+)"
+
+# regex for $MODULEPATH extensions;
+# via 'module use ...' or 'prepend-path MODULEPATH' in Tcl modules,
+# or 'prepend_path("MODULEPATH", ...) in Lua modules
+MODPATH_EXT_REGEX = re.compile(r'|'.join([
+    r'^\s*module\s+use\s+(?P<tcl_use>.+)',                         # 'module use' in Tcl module files
+    r'^\s*prepend-path\s+MODULEPATH\s+(?P<tcl_prepend>.+)',        # prepend to $MODULEPATH in Tcl modules
+    r'^\s*prepend_path\(\"MODULEPATH\",\s*(?P<lua_prepend>.+)\)',  # prepend to $MODULEPATH in Lua modules
+]), re.M)
+
 # cache for modules tool version
 # cache key: module command
 # value: corresponding (validated) module version
@@ -148,6 +177,8 @@ class ModulesTool(object):
     VERSION_REGEXP = None
     # modules tool user cache directory
     USER_CACHE_DIR = None
+    # extensions for module files, in order of preference (when module files for same module are in same directory)
+    MODULE_FILE_EXTENSIONS = ['']
 
     def __init__(self, mod_paths=None, testing=False):
         """
@@ -510,10 +541,11 @@ class ModulesTool(object):
             full_mod_path = os.path.join(install_path('mod'), build_option('suffix_modules_path'), mod_path)
             self.prepend_module_path(full_mod_path)
 
-        loaded_modules = self.loaded_modules()
-        for mod in modules:
-            if allow_reload or mod not in loaded_modules:
-                self.run_module('load', mod)
+        if not allow_reload:
+            loaded_modules = self.loaded_modules()
+            modules = [mod for mod in modules if mod not in loaded_modules]
+
+        self.run_module_batch('load', modules)
 
     def unload(self, modules=None):
         """
@@ -522,8 +554,30 @@ class ModulesTool(object):
         if modules is None:
             self.log.nosupport("Unloading modules listed in _modules class variable", '2.0')
 
+        self.run_module_batch('unload', modules)
+
+    def run_module_batch(self, subcmd, modules):
+        """
+        Run specified module subcommand (e.g. 'load', 'unload') for all specified modules,
+        using a single module command (i.e., 'module load a b c ...').
+
+        If the module command fails, it is run again for each of the modules separately (in order),
+        such that the error that is reported is specific to the module that is to blame.
+
+        :param subcmd: module subcommand to run
+        :param modules: list of module names
+        """
+        modules = list(modules)
+        if len(modules) > 1:
+            try:
+                self.run_module(subcmd, *modules)
+                return
+            except EasyBuildError as err:
+                self.log.debug("Running 'module %s' for %d modules at once failed, retrying one by one: %s",
+                               subcmd, len(modules), err)
+
         for mod in modules:
-            self.run_module('unload', mod)
+            self.run_module(subcmd, mod)
 
     def purge(self):
         """
@@ -581,6 +635,58 @@ class ModulesTool(object):
 
         return modpath
 
+    def locate_modulefile(self, mod_name):
+        """
+        Locate the module file for the specified module by checking the entries in $MODULEPATH (in order) directly,
+        i.e. without running 'module show'.
+
+        :param mod_name: (full) module name
+        :return: path to module file, or None if no module file was found (e.g. for a partial module name)
+        """
+        for mod_path in curr_module_paths():
+            for ext in self.MODULE_FILE_EXTENSIONS:
+                modfilepath = os.path.join(mod_path, mod_name + ext)
+                if os.path.isfile(modfilepath):
+                    return modfilepath
+        return None
+
+    def module_deps_info(self, mod_name):
+        """
+        Determine path to module file, list of loaded modules and list of $MODULEPATH extensions for specified module,
+        by reading the module file directly.
+        All 'module load' statements and $MODULEPATH extensions are included,
+        even the ones guarded by a condition (which is not checked).
+
+        Results are cached per $MODULEPATH, so each module file is only processed once,
+        regardless of how many times it is reached when traversing the module dependency graph;
+        the lists in the result should not be modified.
+
+        :param mod_name: module name
+        :return: tuple with path to module file, list of loaded modules and list of $MODULEPATH extensions
+        """
+        key = self.mk_module_cache_key(mod_name)
+        if key in MODULE_DEPS_CACHE:
+            res = MODULE_DEPS_CACHE[key]
+            self.log.debug("Found cached module dependency info for %s with key '%s': %s", mod_name, key, res)
+        else:
+            modfilepath = self.locate_modulefile(mod_name)
+            if modfilepath is None:
+                # fall back to 'module show', which also takes into account default module versions, etc.
+                modfilepath = self.modulefile_path(mod_name)
+            modtxt = read_file(modfilepath)
+
+            if modfilepath.endswith('.lua'):
+                load_regex = MODULE_LOAD_REGEX_LUA
+            else:
+                load_regex = MODULE_LOAD_REGEX_TCL
+            loads = re.findall(load_regex, modtxt, re.M)
+
+            res = (modfilepath, loads, self.parse_modpath_extensions(modtxt))
+            MODULE_DEPS_CACHE[key] = res
+            self.log.debug("Cached module dependency info for %s with key '%s': %s", mod_name, key, res)
+
+        return res
+
     def set_path_env_var(self, key, paths):
         """Set path environment variable to the given list of paths."""
         setvar(key, os.pathsep.join(paths), verbose=False)
@@ -638,7 +744,7 @@ class ModulesTool(object):
         if module_path_key is not None:
             self.log.nosupport("Use of '%s' named argument in 'run_module'" % module_path_key, '2.0')
 
-        self.log.debug('Current MODULEPATH: %s' % os.environ.get('MODULEPATH', ''))
+        self.log.debug('Current MODULEPATH: %s', os.environ.get('MODULEPATH', ''))
 
         # restore selected original environment variables before running module command
         environ = os.environ.copy()
@@ -649,13 +755,14 @@ class ModulesTool(object):
 
         cmd_list = self.compose_cmd_list(args)
         full_cmd = ' '.join(cmd_list)
-        self.log.debug("Running module command '%s' from %s" % (full_cmd, os.getcwd()))
+        self.log.debug("Running module command '%s' from %s", full_cmd, LazyLogValue(os.getcwd))
 
+        count_subprocess('run_module')
         proc = subprocess.Popen(cmd_list, stdout=PIPE, stderr=PIPE, env=environ)
         # stdout will contain python code (to change environment etc)
         # stderr will contain text (just like the normal module command)
         (stdout, stderr) = proc.communicate()
-        self.log.debug("Output of module command '%s': stdout: %s; stderr: %s" % (full_cmd, stdout, stderr))
+        self.log.debug("Output of module command '%s': stdout: %s; stderr: %s", full_cmd, stdout, stderr)
 
         # also catch and check exit code
         exit_code = proc.returncode
@@ -692,7 +799,7 @@ class ModulesTool(object):
                 curr_ld_val = os.environ.get(key, '').split(os.pathsep)
                 new_ld_val = [x for x in nub(prev_ld_values[key] + curr_ld_val[::-1]) if x][::-1]
 
-                self.log.debug("Correcting paths in $%s from %s to %s" % (key, curr_ld_val, new_ld_val))
+                self.log.debug("Correcting paths in $%s from %s to %s", key, curr_ld_val, new_ld_val)
                 self.set_path_env_var(key, new_ld_val)
 
             # Process stderr
@@ -849,6 +956,98 @@ class ModulesTool(object):
 
         return res
 
+    def parse_modpath_extensions(self, modtxt):
+        """
+        Determine list of $MODULEPATH extensions in specified module file contents.
+        All potential $MODULEPATH extensions are included, even the ones guarded by a condition (which is not checked).
+
+        :param modtxt: module file contents (in Tcl or Lua syntax)
+        """
+        exts = []
+        for modpath_ext in MODPATH_EXT_REGEX.finditer(modtxt):
+            for key, raw_ext in modpath_ext.groupdict().iteritems():
+                if raw_ext is not None:
+                    # need to expand environment variables and join paths, e.g. when --subdir-user-modules is used
+                    if key in ['tcl_prepend', 'tcl_use']:
+                        ext = self.interpret_raw_path_tcl(raw_ext)
+                    else:
+                        ext = self.interpret_raw_path_lua(raw_ext)
+                    exts.append(ext)
+        return exts
+
+    def modpath_extensions_in_modfile(self, modfilepath):
+        """
+        Determine list of (resolved) $MODULEPATH extensions made by specified module file.
+        Results are cached, the module file is only read again if it was modified.
+
+        :param modfilepath: path to module file
+        """
+        modfile_stat = os.stat(modfilepath)
+        modfile_id = (modfile_stat.st_mtime, modfile_stat.st_size)
+
+        cached = MODFILE_MODPATH_EXTS_CACHE.get(modfilepath)
+        if cached is not None and cached[0] == modfile_id:
+            exts = cached[1]
+        else:
+            exts = [os.path.realpath(ext) for ext in self.parse_modpath_extensions(read_file(modfilepath))]
+            MODFILE_MODPATH_EXTS_CACHE[modfilepath] = (modfile_id, exts)
+
+        return exts
+
+    def modpath_exts_index(self, top_paths):
+        """
+        Index the $MODULEPATH extensions made by all module files in the module tree at the specified top paths,
+        via static analysis of the module files (i.e. without loading any modules).
+
+        The module subdirectory of each module file (and hence its module name) is determined as the deepest
+        parent directory that is either a top path, or a $MODULEPATH extension made by any of the module files.
+
+        :param top_paths: list of paths to the top of the module tree (e.g., <prefix>/modules/all and <prefix>/Core)
+        :return: tuple with index and set of names of all modules in module tree; index is a dict with
+                 (resolved) $MODULEPATH extensions as keys and lists of (module name, module subdir) tuples as values
+        """
+        top_paths = nub([os.path.realpath(path) for path in top_paths])
+        key = tuple(sorted(top_paths))
+
+        if key in MODPATH_EXTS_INDEX_CACHE:
+            self.log.debug("Found cached index of $MODULEPATH extensions for module tree at %s", top_paths)
+        else:
+            # only walk top paths that are not located in another top path
+            roots = [p for p in top_paths if not any(p.startswith(q + os.path.sep) for q in top_paths)]
+
+            modfile_exts = []
+            for root in roots:
+                for (dirpath, dirnames, filenames) in os.walk(root):
+                    dirnames.sort()
+                    for filename in sorted(filenames):
+                        # skip files that specify default module version, aliases, etc.
+                        if filename.startswith('.modulerc') or filename.startswith('.version'):
+                            continue
+                        modfilepath = os.path.join(dirpath, filename)
+                        modfile_exts.append((modfilepath, self.modpath_extensions_in_modfile(modfilepath)))
+
+            mod_subdirs = set(top_paths + [ext for (_, exts) in modfile_exts for ext in exts])
+
+            index, mod_names = {}, set()
+            for modfilepath, exts in modfile_exts:
+                mod_subdir = os.path.dirname(modfilepath)
+                while mod_subdir not in mod_subdirs:
+                    mod_subdir = os.path.dirname(mod_subdir)
+
+                mod_name = os.path.relpath(modfilepath, mod_subdir)
+                if mod_name.endswith('.lua'):
+                    mod_name = os.path.splitext(mod_name)[0]
+                mod_names.add(mod_name)
+
+                for ext in exts:
+                    index.setdefault(ext, []).append((mod_name, mod_subdir))
+
+            MODPATH_EXTS_INDEX_CACHE[key] = (index, mod_names)
+            self.log.debug("Indexed $MODULEPATH extensions for %d module files in module tree at %s: %s",
+                           len(modfile_exts), top_paths, index)
+
+        return MODPATH_EXTS_INDEX_CACHE[key]
+
     def modpath_extensions_for(self, mod_names):
         """
         Determine dictionary with $MODULEPATH extensions for specified modules.
@@ -864,31 +1063,9 @@ class ModulesTool(object):
         # copy environment so we can restore it
         env = os.environ.copy()
 
-        # regex for $MODULEPATH extensions;
-        # via 'module use ...' or 'prepend-path MODULEPATH' in Tcl modules,
-        # or 'prepend_path("MODULEPATH", ...) in Lua modules
-        modpath_ext_regex = r'|'.join([
-            r'^\s*module\s+use\s+(?P<tcl_use>.+)',                         # 'module use' in Tcl module files
-            r'^\s*prepend-path\s+MODULEPATH\s+(?P<tcl_prepend>.+)',        # prepend to $MODULEPATH in Tcl modules
-            r'^\s*prepend_path\(\"MODULEPATH\",\s*(?P<lua_prepend>.+)\)',  # prepend to $MODULEPATH in Lua modules
-        ])
-        modpath_ext_regex = re.compile(modpath_ext_regex, re.M)
-
         modpath_exts = {}
         for mod_name in mod_names:
-            modtxt = self.read_module_file(mod_name)
-
-            exts = []
-            for modpath_ext in modpath_ext_regex.finditer(modtxt):
-                for key, raw_ext in modpath_ext.groupdict().iteritems():
-                    if raw_ext is not None:
-                        # need to expand environment variables and join paths, e.g. when --subdir-user-modules is used
-                        if key in ['tcl_prepend', 'tcl_use']:
-                            ext = self.interpret_raw_path_tcl(raw_ext)
-                        else:
-                            ext = self.interpret_raw_path_lua(raw_ext)
-                        exts.append(ext)
-
+            exts = self.module_deps_info(mod_name)[2][:]
             self.log.debug("Found $MODULEPATH extensions for %s: %s", mod_name, exts)
             modpath_exts.update({mod_name: exts})
 
@@ -943,6 +1120,11 @@ class ModulesTool(object):
         self.log.debug("Checking for dependency that extends $MODULEPATH with %s" % full_mod_subdir)
 
         if modpath_exts is None:
+            # try static analysis of module files in module tree first, which doesn't require loading any modules
+            path = self.path_to_top_of_module_tree_static(top_paths, mod_name, full_mod_subdir, deps)
+            if path is not None:
+                return path
+
             # only retain dependencies that have a non-empty lists of $MODULEPATH extensions
             modpath_exts = dict([(k, v) for k, v in self.modpath_extensions_for(deps).items() if v])
             self.log.debug("Non-empty lists of module path extensions for dependencies: %s" % modpath_exts)
@@ -956,7 +1138,10 @@ class ModulesTool(object):
             if path_matches(full_mod_subdir, full_modpath_exts):
 
                 # full path to module subdir of dependency is simply path to module file without (short) module name
-                dep_full_mod_subdir = self.modulefile_path(dep, strip_ext=True)[:-len(dep)-1]
+                dep_modfilepath = self.module_deps_info(dep)[0]
+                if dep_modfilepath.endswith('.lua'):
+                    dep_modfilepath = os.path.splitext(dep_modfilepath)[0]
+                dep_full_mod_subdir = dep_modfilepath[:-len(dep)-1]
                 full_mod_subdirs.append(dep_full_mod_subdir)
 
                 mods_to_top.append(dep)
@@ -988,6 +1173,58 @@ class ModulesTool(object):
         self.log.debug("Path to top of module tree from %s: %s" % (mod_name, path))
         return path
 
+    def path_to_top_of_module_tree_static(self, top_paths, mod_name, full_mod_subdir, deps):
+        """
+        Determine path to the top of the module tree (see path_to_top_of_module_tree) via static analysis,
+        using the index of $MODULEPATH extensions made by the module files in the module tree (see modpath_exts_index).
+        No modules are loaded, and the environment is left untouched.
+
+        :param top_paths: list of potentation 'top of module tree' (absolute) paths
+        :param mod_name: (short) module name for starting point (only used in log messages)
+        :param full_mod_subdir: absolute path to module subdirectory for starting point
+        :param deps: list of dependency modules for module at starting point
+        :return: list of modules on path to top of module tree,
+                 or None if not all dependency modules are located in the module tree
+        """
+        if isinstance(top_paths, basestring):
+            top_paths = [top_paths]
+
+        index, mod_names = self.modpath_exts_index(top_paths)
+
+        missing_deps = [dep for dep in deps if dep not in mod_names]
+        if missing_deps:
+            self.log.debug("Not all dependencies of %s are located in module tree at %s (missing: %s), "
+                           "so path to top of module tree can not be determined statically",
+                           mod_name, top_paths, missing_deps)
+            return None
+
+        def path_to_top(mod_name, full_mod_subdir, deps):
+            """Determine path to top of module tree for specified module, module subdir and dependencies."""
+            if path_matches(full_mod_subdir, top_paths):
+                self.log.debug("Top of module tree reached with %s (module subdir: %s)", mod_name, full_mod_subdir)
+                return []
+
+            dep_mod_subdirs = {}
+            if os.path.exists(full_mod_subdir):
+                for dep, dep_mod_subdir in index.get(os.path.realpath(full_mod_subdir), []):
+                    if dep in deps:
+                        dep_mod_subdirs.setdefault(dep, dep_mod_subdir)
+
+            mods_to_top = [dep for dep in deps if dep in dep_mod_subdirs]
+            self.log.debug("Found modules that extend $MODULEPATH with %s for %s: %s",
+                           full_mod_subdir, mod_name, mods_to_top)
+
+            # climb up the module tree, without considering the modules that were retained already
+            path = mods_to_top[:]
+            remaining_deps = [dep for dep in deps if dep not in mods_to_top]
+            for dep in mods_to_top:
+                path.extend(path_to_top(dep, dep_mod_subdirs[dep], remaining_deps))
+            return path
+
+        path = path_to_top(mod_name, full_mod_subdir, deps)
+        self.log.debug("Path to top of module tree from %s (determined statically): %s", mod_name, path)
+        return path
+
     def update(self):
         """Update after new modules were added."""
         raise NotImplementedError
@@ -1083,6 +1320,8 @@ class Lmod(ModulesTool):
     REQ_VERSION = '5.8'
     VERSION_REGEXP = r"^Modules\s+based\s+on\s+Lua:\s+Version\s+(?P<version>\d\S*)\s"
     USER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.lmod.d', '.cache')
+    # Lmod prefers Lua module files over Tcl module files
+    MODULE_FILE_EXTENSIONS = ['.lua', '']
 
     SHOW_HIDDEN_OPTION = '--show-hidden'
 
@@ -1160,6 +1399,7 @@ class Lmod(ModulesTool):
             cmd = [spider_cmd, '-o', 'moduleT', os.environ['MODULEPATH']]
             self.log.debug("Running command '%s'..." % ' '.join(cmd))
 
+            count_subprocess('run_module')
             proc = subprocess.Popen(cmd, stdout=PIPE, stderr=PIPE, env=os.environ)
             (stdout, stderr) = proc.communicate()
 
@@ -1340,6 +1580,9 @@ def reset_module_caches():
     """Reset module caches."""
     MODULE_AVAIL_CACHE.clear()
     MODULE_SHOW_CACHE.clear()
+    MODULE_DEPS_CACHE.clear()
+    MODFILE_MODPATH_EXTS_CACHE.clear()
+    MODPATH_EXTS_INDEX_CACHE.clear()
 
 
 def invalidate_module_caches_for(path):
@@ -1348,17 +1591,30 @@ def invalidate_module_caches_for(path):
         raise EasyBuildError("Non-existing path specified to invalidate module caches: %s", path)
 
     _log.debug("Invallidating module cache entries for path '%s'", path)
-    for cache, subcmd in [(MODULE_AVAIL_CACHE, 'avail'), (MODULE_SHOW_CACHE, 'show')]:
+    caches = [
+        (MODULE_AVAIL_CACHE, "'module avail'"),
+        (MODULE_SHOW_CACHE, "'module show'"),
+        (MODULE_DEPS_CACHE, "module dependency graph"),
+    ]
+    for cache, descr in caches:
         for key in cache.keys():
             paths_in_key = '='.join(key[0].split('=')[1:]).split(os.pathsep)
-            _log.debug("Paths for 'module %s' key '%s': %s", subcmd, key, paths_in_key)
+            _log.debug("Paths for %s key '%s': %s", descr, key, paths_in_key)
             for path_in_key in paths_in_key:
                 if path == path_in_key or (os.path.exists(path_in_key) and os.path.samefile(path, path_in_key)):
-                    _log.debug("Entry '%s' in 'module %s' cache is evicted, marked as invalid via path '%s': %s",
-                               key, subcmd, path, cache[key])
+                    _log.debug("Entry '%s' in %s cache is evicted, marked as invalid via path '%s': %s",
+                               key, descr, path, cache[key])
                     del cache[key]
                     break
 
+    # index of $MODULEPATH extensions must be rebuilt for module trees that include this path
+    # (module files that were not modified are not processed again, see modpath_extensions_in_modfile)
+    real_path = os.path.realpath(path)
+    for key in MODPATH_EXTS_INDEX_CACHE.keys():
+        if any(real_path == p or real_path.startswith(p + os.path.sep) for p in key):
+            _log.debug("Index of $MODULEPATH extensions for module tree at %s is evicted via path '%s'", key, path)
+            del MODPATH_EXTS_INDEX_CACHE[key]
+
 
 class Modules(EnvironmentModulesC):
     """NO LONGER SUPPORTED: interface to modules tool, use modules_tool from easybuild.tools.modules instead"""
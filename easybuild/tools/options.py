@@ -46,7 +46,7 @@ import vsc.utils.generaloption
 from distutils.version import LooseVersion
 from vsc.utils import fancylogger
 from vsc.utils.fancylogger import setLogLevel
-from vsc.utils.generaloption import GeneralOption
+from vsc.utils.generaloption import CompleterOption, ExtOption, ExtOptionParser, GeneralOption
 from vsc.utils.missing import nub
 
 import easybuild.tools.environment as env
@@ -61,21 +61,18 @@ from easybuild.tools.config import DEFAULT_ALLOW_LOADED_MODULES, DEFAULT_FORCE_D
 from easybuild.tools.config import DEFAULT_LOGFILE_FORMAT, DEFAULT_MAX_FAIL_RATIO_PERMS, DEFAULT_MNS
 from easybuild.tools.config import DEFAULT_MODULE_SYNTAX, DEFAULT_MODULES_TOOL, DEFAULT_MODULECLASSES
 from easybuild.tools.config import DEFAULT_PATH_SUBDIRS, DEFAULT_PKG_RELEASE, DEFAULT_PKG_TOOL, DEFAULT_PKG_TYPE
-from easybuild.tools.config import DEFAULT_PNS, DEFAULT_PREFIX, DEFAULT_REPOSITORY, EBROOT_ENV_VAR_ACTIONS
+from easybuild.tools.config import DEFAULT_PNS, DEFAULT_PR_TARGET_ACCOUNT, DEFAULT_PR_TARGET_REPO, DEFAULT_PREFIX
+from easybuild.tools.config import DEFAULT_REPOSITORY, EBROOT_ENV_VAR_ACTIONS
 from easybuild.tools.config import ERROR, IGNORE, FORCE_DOWNLOAD_CHOICES, LOADED_MODULES_ACTIONS, WARN
-from easybuild.tools.config import get_pretend_installpath, mk_full_default_path
-from easybuild.tools.configobj import ConfigObj, ConfigObjError
+from easybuild.tools.config import PKG_TOOL_FPM, PKG_TOOL_NATIVE, get_pretend_installpath, mk_full_default_path
 from easybuild.tools.docs import FORMAT_TXT, FORMAT_RST
 from easybuild.tools.docs import avail_cfgfile_constants, avail_easyconfig_constants, avail_easyconfig_licenses
 from easybuild.tools.docs import avail_toolchain_opts, avail_easyconfig_params, avail_easyconfig_templates
 from easybuild.tools.docs import list_easyblocks, list_toolchains
 from easybuild.tools.environment import restore_env, unset_env_vars
 from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, CHECKSUM_TYPES, mkdir
-from easybuild.tools.github import GITHUB_EB_MAIN, GITHUB_EASYCONFIGS_REPO, HAVE_GITHUB_API, HAVE_KEYRING
-from easybuild.tools.github import fetch_github_token
 from easybuild.tools.hooks import KNOWN_HOOKS
 from easybuild.tools.include import include_easyblocks, include_module_naming_schemes, include_toolchains
-from easybuild.tools.job.backend import avail_job_backends
 from easybuild.tools.modules import avail_modules_tools
 from easybuild.tools.module_generator import ModuleGeneratorLua, avail_module_generators
 from easybuild.tools.module_naming_scheme import GENERAL_CLASS
@@ -127,6 +124,8 @@ DEFAULT_SYS_CFGFILES = [f for d in XDG_CONFIG_DIRS for f in sorted(glob.glob(os.
 DEFAULT_USER_CFGFILE = os.path.join(XDG_CONFIG_HOME, 'easybuild', 'config.cfg')
 
 
+DEFAULT_PROFILE_PSTATS_FILE = 'eb-profile.pstats'
+
 _log = fancylogger.getLogger('options', fname=False)
 
 
@@ -200,9 +199,35 @@ def use_color(colorize, stream=sys.stdout):
         return False
 
 
+class EasyBuildOption(ExtOption):
+    """
+    ExtOption that shares a single logger across all options:
+    obtaining a logger via fancylogger is costly (it inspects the call stack),
+    and there are several hundreds of options
+    """
+    _log = None
+
+    def __init__(self, *args, **kwargs):
+        """Constructor, (re)uses shared logger"""
+        CompleterOption.__init__(self, *args, **kwargs)
+        if EasyBuildOption._log is None:
+            EasyBuildOption._log = fancylogger.getLogger(self.__class__.__name__)
+        self.log = EasyBuildOption._log
+
+
+class EasyBuildOptionParser(ExtOptionParser):
+    """ExtOptionParser that uses EasyBuildOption as option class"""
+
+    def __init__(self, *args, **kwargs):
+        """Constructor, enforces use of EasyBuildOption"""
+        kwargs['option_class'] = EasyBuildOption
+        ExtOptionParser.__init__(self, *args, **kwargs)
+
+
 class EasyBuildOptions(GeneralOption):
     """Easybuild generaloption class"""
     VERSION = this_is_easybuild()
+    PARSER = EasyBuildOptionParser
 
     DEFAULT_LOGLEVEL = 'INFO'
     DEFAULT_CONFIGFILES = DEFAULT_SYS_CFGFILES[:]
@@ -250,6 +275,7 @@ class EasyBuildOptions(GeneralOption):
         descr = ("Basic options", "Basic runtime options for EasyBuild.")
 
         opts = OrderedDict({
+            'background-logging': ("Write main log file in a background thread, in batches", None, 'store_true', False),
             'dry-run': ("Print build overview incl. dependencies (full paths)", None, 'store_true', False),
             'dry-run-short': ("Print build overview incl. dependencies (short paths)", None, 'store_true', False, 'D'),
             'extended-dry-run': ("Print build environment and (expected) build procedure that will be performed",
@@ -262,12 +288,23 @@ class EasyBuildOptions(GeneralOption):
             'only-blocks': ("Only build listed blocks", 'strlist', 'extend', None, 'b', {'metavar': 'BLOCKS'}),
             'rebuild': ("Rebuild software, even if module already exists (don't skip OS dependencies checks)",
                         None, 'store_true', False),
+            'rebuild-stale': ("Only (re)build software for which no module exists yet, or for which the installation "
+                              "is stale because the build fingerprint changed (incl. the one of dependencies)",
+                              None, 'store_true', False),
+            'resume': ("Resume interrupted session using specified session journal (see --session-journal)",
+                       None, 'store', None, {'metavar': 'JOURNAL'}),
             'robot': ("Enable dependency resolution, using easyconfigs in specified paths",
                       'pathlist', 'store_or_None', [], 'r', {'metavar': 'PATH[%sPATH]' % os.pathsep}),
             'robot-paths': ("Additional paths to consider by robot for easyconfigs (--robot paths get priority)",
                             'pathlist', 'add_flex', self.default_robot_paths, {'metavar': 'PATH[%sPATH]' % os.pathsep}),
+            'session-journal': ("Keep track of installation progress in specified session journal file, "
+                                "which can be used to resume an interrupted session with --resume",
+                                None, 'store', None, {'metavar': 'JOURNAL'}),
             'search-paths': ("Additional locations to consider in --search (next to --robot and --robot-paths paths)",
                              'pathlist', 'store_or_None', [], {'metavar': 'PATH[%sPATH]' % os.pathsep}),
+            'search-threads': ("Number of threads to use for scanning directories in --search (only relevant "
+                               "when easyconfig index is not available yet or outdated, cfr. --cache-dir)",
+                               int, 'store', 1),
             'skip': ("Skip existing software (useful for installing additional packages)",
                      None, 'store_true', False, 'k'),
             'stop': ("Stop the installation after certain step",
@@ -391,6 +428,9 @@ class EasyBuildOptions(GeneralOption):
                          'int', 'store', None),
             'pretend': (("Does the build/installation in a test directory located in $HOME/easybuildinstall"),
                         None, 'store_true', False, 'p'),
+            'profile': ("Profile EasyBuild itself (excluding child processes), print summary and "
+                        "write profiling statistics (pstats format) to specified file",
+                        None, 'store_or_None', DEFAULT_PROFILE_PSTATS_FILE, {'metavar': 'PATH'}),
             'read-only-installdir': ("Set read-only permissions on installation directory after installation",
                                      None, 'store_true', False),
             'rpath': ("Enable use of RPATH for linking with libraries", None, 'store_true', False),
@@ -400,6 +440,8 @@ class EasyBuildOptions(GeneralOption):
             'sticky-bit': ("Set sticky bit on newly created directories", None, 'store_true', False),
             'skip-test-cases': ("Skip running test cases", None, 'store_true', False, 't'),
             'trace': ("Provide more information in output to stdout on progress", None, 'store_true', False, 'T'),
+            'trace-hotpaths': ("Profile EasyBuild itself (excluding child processes), and report framework functions "
+                               "with largest cumulative time", None, 'store_true', False),
             'umask': ("umask to use (e.g. '022'); non-user write permissions on install directories are removed",
                       None, 'store', None),
             'update-modules-tool-cache': ("Update modules tool cache file(s) after generating module file",
@@ -425,6 +467,9 @@ class EasyBuildOptions(GeneralOption):
         descr = ("Configuration options", "Configure EasyBuild behavior.")
 
         opts = OrderedDict({
+            'artifact-cache': ("Directory for (shared) cache of installation artifacts, which are reused across "
+                               "sessions & hosts based on build fingerprint (none if not specified)",
+                               None, 'store', None, {'metavar': "PATH"}),
             'avail-module-naming-schemes': ("Show all supported module naming schemes",
                                             None, 'store_true', False,),
             'avail-modules-tools': ("Show all supported module tools",
@@ -432,6 +477,8 @@ class EasyBuildOptions(GeneralOption):
             'avail-repositories': ("Show all repository types (incl. non-usable)",
                                    None, "store_true", False,),
             'buildpath': ("Temporary build path", None, 'store', mk_full_default_path('buildpath')),
+            'cache-dir': ("Directory to store persistent caches in, e.g. the toolchain graph (none if not specified)",
+                          None, 'store', None, {'metavar': "PATH"}),
             'external-modules-metadata': ("List of files specifying metadata for external modules (INI format)",
                                           'strlist', 'store', None),
             'hooks': ("Location of Python module with hook implementations", 'str', 'store', None),
@@ -448,8 +495,9 @@ class EasyBuildOptions(GeneralOption):
                                     None, 'store', None),
             'installpath-software': ("Install path for software (if None, combine --installpath and --subdir-software)",
                                      None, 'store', None),
-            'job-backend': ("Backend to use for submitting jobs", 'choice', 'store',
-                            DEFAULT_JOB_BACKEND, sorted(avail_job_backends().keys())),
+            # available job backends are only determined when they're needed (cfr. postprocess),
+            # since that involves importing the Python packages they require
+            'job-backend': ("Backend to use for submitting jobs", None, 'store', DEFAULT_JOB_BACKEND),
             # purposely take a copy for the default logfile format
             'logfile-format': ("Directory name and format of the log file",
                                'strtuple', 'store', DEFAULT_LOGFILE_FORMAT[:], {'metavar': 'DIR,FORMAT'}),
@@ -528,14 +576,18 @@ class EasyBuildOptions(GeneralOption):
                                         ['simple', 'detailed']),
             'list-software': ("Show list of supported software", 'choice', 'store_or_None', 'simple',
                               ['simple', 'detailed']),
+            'list-software-jobs': ("Number of processes to use for parsing easyconfigs when listing (installed) "
+                                   "software (default: number of cores)", int, 'store', None),
             'list-toolchains': ("Show list of known toolchains",
                                 None, 'store_true', False),
-            'search': ("Search for easyconfig files in the robot search path, print full paths",
-                       None, 'store', None, {'metavar': 'REGEX'}),
+            'search': ("Search for easyconfig files in the robot search path, print full paths; "
+                       "query is a regular expression for filenames, and/or <field>=<value> terms "
+                       "for name, version, versionsuffix, toolchain or moduleclass (e.g. 'name=GCC toolchain=dummy')",
+                       None, 'store', None, {'metavar': 'QUERY'}),
             'search-filename': ("Search for easyconfig files in the robot search path, print only filenames",
-                                None, 'store', None, {'metavar': 'REGEX'}),
+                                None, 'store', None, {'metavar': 'QUERY'}),
             'search-short': ("Search for easyconfig files in the robot search path, print short paths",
-                             None, 'store', None, 'S', {'metavar': 'REGEX'}),
+                             None, 'store', None, 'S', {'metavar': 'QUERY'}),
             'show-config': ("Show current EasyBuild configuration (only non-default + selected settings)",
                             None, 'store_true', False),
             'show-full-config': ("Show current EasyBuild configuration (all settings)", None, 'store_true', False),
@@ -555,6 +607,11 @@ class EasyBuildOptions(GeneralOption):
         opts = OrderedDict({
             'check-github': ("Check status of GitHub integration, and report back", None, 'store_true', False),
             'check-style': ("Run a style check on the given easyconfigs", None, 'store_true', False),
+            'check-style-base-ref': ("Only run style check on easyconfigs that were changed relative to "
+                                     "specified Git reference (incl. untracked files)", str, 'store', None,
+                                     {'metavar': 'REF'}),
+            'check-style-jobs': ("Number of processes to use for running style check (default: number of cores)",
+                                 int, 'store', None),
             'cleanup-easyconfigs': ("Clean up easyconfig files for pull request", None, 'store_true', True),
             'dump-test-report': ("Dump test report to specified path", None, 'store_or_None', 'test_report.md'),
             'from-pr': ("Obtain easyconfigs from specified PR", int, 'store', None, {'metavar': 'PR#'}),
@@ -568,9 +625,9 @@ class EasyBuildOptions(GeneralOption):
                                str, 'store', None),
             'pr-commit-msg': ("Commit message for new/updated pull request created with --new-pr", str, 'store', None),
             'pr-descr': ("Description for new pull request created with --new-pr", str, 'store', None),
-            'pr-target-account': ("Target account for new PRs", str, 'store', GITHUB_EB_MAIN),
+            'pr-target-account': ("Target account for new PRs", str, 'store', DEFAULT_PR_TARGET_ACCOUNT),
             'pr-target-branch': ("Target branch for new PRs", str, 'store', 'develop'),
-            'pr-target-repo': ("Target repository for new/updating PRs", str, 'store', GITHUB_EASYCONFIGS_REPO),
+            'pr-target-repo': ("Target repository for new/updating PRs", str, 'store', DEFAULT_PR_TARGET_REPO),
             'pr-title': ("Title for new pull request created with --new-pr", str, 'store', None),
             'preview-pr': ("Preview a new pull request", None, 'store_true', False),
             'review-pr': ("Review specified pull request", int, 'store', None, {'metavar': 'PR#'}),
@@ -607,7 +664,8 @@ class EasyBuildOptions(GeneralOption):
 
         opts = OrderedDict({
             'package': ("Enabling packaging", None, 'store_true', False),
-            'package-tool': ("Packaging tool to use", None, 'store', DEFAULT_PKG_TOOL),
+            'package-tool': ("Packaging tool to use ('%s' or '%s')" % (PKG_TOOL_FPM, PKG_TOOL_NATIVE),
+                             None, 'store', DEFAULT_PKG_TOOL),
             'package-tool-options': ("Extra options for packaging tool", None, 'store', ''),
             'package-type': ("Type of package to generate", None, 'store', DEFAULT_PKG_TYPE),
             'package-release': ("Package release iteration number", None, 'store', DEFAULT_PKG_RELEASE),
@@ -735,8 +793,10 @@ class EasyBuildOptions(GeneralOption):
             build_easyconfig_constants_dict()  # runs the easyconfig constants sanity check
             self._postprocess_list_avail()
 
-        # fail early if required dependencies for functionality requiring using GitHub API are not available:
+        # fail early if required dependencies for functionality requiring using GitHub API are not available;
+        # GitHub support is only imported when it's used, since that involves importing keyring, GitPython, ...
         if self.options.from_pr or self.options.upload_test_report:
+            from easybuild.tools.github import HAVE_GITHUB_API
             if not HAVE_GITHUB_API:
                 raise EasyBuildError("Required support for using GitHub API is not available (see warnings).")
 
@@ -751,8 +811,18 @@ class EasyBuildOptions(GeneralOption):
             raise EasyBuildError("Unknown action specified to --detect-loaded-modules: %s (known values: %s)",
                                  self.options.detect_loaded_modules, ', '.join(LOADED_MODULES_ACTIONS))
 
+        # check whether specified job backend is known, but only when submitting jobs,
+        # since determining the available job backends involves importing the Python packages they require
+        if self.options.job:
+            from easybuild.tools.job.backend import avail_job_backends
+            job_backends = sorted(avail_job_backends().keys())
+            if self.options.job_backend not in job_backends:
+                raise EasyBuildError("Unknown job backend specified to --job-backend: %s (known values: %s)",
+                                     self.options.job_backend, ', '.join(job_backends))
+
         # make sure a GitHub token is available when it's required
         if self.options.upload_test_report:
+            from easybuild.tools.github import HAVE_KEYRING, fetch_github_token
             if not HAVE_KEYRING:
                 raise EasyBuildError("Python 'keyring' module required for obtaining GitHub token is not available.")
             if self.options.github_user is None:
@@ -1092,6 +1162,43 @@ def parse_options(args=None, with_include=True):
     return eb_go
 
 
+def scan_profiling_options(args=None):
+    """
+    Determine whether EasyBuild itself should be profiled (cfr. --profile and --trace-hotpaths),
+    via a light scan of the command line arguments and $EASYBUILD_* environment variables,
+    such that this can be decided before the configuration options are parsed.
+
+    Only the full names of the long options are recognised; configuration files are not taken into account.
+
+    :param args: command line arguments (sys.argv[1:] is used if None)
+    :return: tuple with path to file to dump profiling statistics to (or None) and whether hot paths should be traced
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    env_prefix = CONFIG_ENV_VAR_PREFIX + '_'
+    profile = os.environ.get(env_prefix + 'PROFILE') or None
+    trace_hotpaths = os.environ.get(env_prefix + 'TRACE_HOTPATHS', '0').lower() not in ('0', 'no', 'false')
+
+    for idx, arg in enumerate(args):
+        if arg == '--':
+            break
+        elif arg == '--profile':
+            # value is optional, cfr. 'store_or_None' action
+            if idx + 1 < len(args) and not args[idx + 1].startswith('-'):
+                profile = args[idx + 1]
+            else:
+                profile = DEFAULT_PROFILE_PSTATS_FILE
+        elif arg.startswith('--profile='):
+            profile = arg.split('=', 1)[1] or None
+        elif arg in ['--trace-hotpaths', '--enable-trace-hotpaths']:
+            trace_hotpaths = True
+        elif arg == '--disable-trace-hotpaths':
+            trace_hotpaths = False
+
+    return profile, trace_hotpaths
+
+
 def process_software_build_specs(options):
     """
     Create a dictionary with specified software build options.
@@ -1205,6 +1312,9 @@ def parse_external_modules_metadata(cfgs):
         _log.debug("No metadata provided for external modules.")
         return {}
 
+    # configobj is only imported when it's needed, to keep startup time low
+    from easybuild.tools.configobj import ConfigObj, ConfigObjError
+
     parsed_metadata = ConfigObj()
     for cfg in cfgs:
         if os.path.isfile(cfg):
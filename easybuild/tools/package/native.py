@@ -0,0 +1,574 @@
+##
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Native packaging backend (cfr. --package-tool=native), which creates packages in-process,
+without relying on external tools like fpm or rpmbuild.
+
+Files are read only once, and are streamed straight into the (compressed) package payload;
+(gzip) compression is done in parallel, by compressing blocks of data into separate gzip members.
+"""
+import fnmatch
+import hashlib
+import multiprocessing
+import os
+import socket
+import stat
+import struct
+import tarfile
+import tempfile
+import time
+import zlib
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+
+_log = fancylogger.getLogger('tools.package.native', fname=False)
+
+try:
+    import zstandard
+    HAVE_ZSTANDARD = True
+except ImportError, err:
+    _log.debug("Failed to import 'zstandard' Python module: %s", err)
+    HAVE_ZSTANDARD = False
+
+
+PKG_TYPE_RPM = 'rpm'
+PKG_TYPE_TAR_GZ = 'tar.gz'
+PKG_TYPE_TAR_ZST = 'tar.zst'
+NATIVE_PKG_TYPES = [PKG_TYPE_RPM, PKG_TYPE_TAR_GZ, PKG_TYPE_TAR_ZST]
+
+COMPRESSION_LEVEL = 6
+# size of blocks of data that are compressed separately (in parallel)
+COMPRESSION_BLOCK_SIZE = 4 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+
+# RPM file format, cfr. http://ftp.rpm.org/max-rpm/s1-rpm-file-format-rpm-file-format.html
+RPM_LEAD_MAGIC = '\xed\xab\xee\xdb'
+RPM_HEADER_MAGIC = '\x8e\xad\xe8\x01\x00\x00\x00\x00'
+
+RPM_TYPE_INT16 = 3
+RPM_TYPE_INT32 = 4
+RPM_TYPE_INT64 = 5
+RPM_TYPE_STRING = 6
+RPM_TYPE_BIN = 7
+RPM_TYPE_STRING_ARRAY = 8
+RPM_TYPE_I18NSTRING = 9
+
+RPMTAG_HEADERSIGNATURES = 62
+RPMTAG_HEADERIMMUTABLE = 63
+RPMTAG_HEADERI18NTABLE = 100
+
+RPMSIGTAG_SHA1 = 269
+RPMSIGTAG_LONGSIZE = 270
+RPMSIGTAG_LONGARCHIVESIZE = 271
+RPMSIGTAG_SHA256 = 273
+RPMSIGTAG_SIZE = 1000
+RPMSIGTAG_MD5 = 1004
+RPMSIGTAG_PAYLOADSIZE = 1007
+
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_SUMMARY = 1004
+RPMTAG_DESCRIPTION = 1005
+RPMTAG_BUILDTIME = 1006
+RPMTAG_BUILDHOST = 1007
+RPMTAG_SIZE = 1009
+RPMTAG_LICENSE = 1014
+RPMTAG_GROUP = 1016
+RPMTAG_URL = 1020
+RPMTAG_OS = 1021
+RPMTAG_ARCH = 1022
+RPMTAG_FILESIZES = 1028
+RPMTAG_FILEMODES = 1030
+RPMTAG_FILERDEVS = 1033
+RPMTAG_FILEMTIMES = 1034
+RPMTAG_FILEDIGESTS = 1035
+RPMTAG_FILELINKTOS = 1036
+RPMTAG_FILEFLAGS = 1037
+RPMTAG_FILEUSERNAME = 1039
+RPMTAG_FILEGROUPNAME = 1040
+RPMTAG_SOURCERPM = 1044
+RPMTAG_FILEVERIFYFLAGS = 1045
+RPMTAG_PROVIDENAME = 1047
+RPMTAG_REQUIREFLAGS = 1048
+RPMTAG_REQUIRENAME = 1049
+RPMTAG_REQUIREVERSION = 1050
+RPMTAG_FILEDEVICES = 1095
+RPMTAG_FILEINODES = 1096
+RPMTAG_FILELANGS = 1097
+RPMTAG_PROVIDEFLAGS = 1112
+RPMTAG_PROVIDEVERSION = 1113
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+RPMTAG_PAYLOADFORMAT = 1124
+RPMTAG_PAYLOADCOMPRESSOR = 1125
+RPMTAG_PAYLOADFLAGS = 1126
+RPMTAG_LONGSIZE = 5009
+RPMTAG_FILEDIGESTALGO = 5011
+
+RPM_FILEDIGESTALGO_SHA256 = 8
+RPMSENSE_EQUAL = 0x08
+RPMSENSE_LESS = 0x02
+RPMSENSE_RPMLIB = 0x01000000
+
+# features of rpm that are required to install RPMs created by the native packaging backend
+RPMLIB_REQUIREMENTS = [
+    ('rpmlib(CompressedFileNames)', '3.0.4-1'),
+    ('rpmlib(FileDigests)', '4.6.0-1'),
+    ('rpmlib(PayloadFilesHavePrefix)', '4.0-1'),
+]
+
+# sizes of (at least) 4GiB do not fit in INT32 RPM tags
+RPM_MAX_INT32 = 2 ** 32 - 1
+
+CPIO_NEWC_MAGIC = '070701'
+CPIO_TRAILER = 'TRAILER!!!'
+
+
+def _gzip_block(data):
+    """Compress specified block of data into a separate gzip member (must be module-level, for use in a pool)."""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(object):
+    """
+    File-like object that gzip-compresses data written to it, in parallel.
+
+    Data is split into blocks which are compressed into separate gzip members by a pool of worker processes;
+    concatenated gzip members form a valid gzip stream (cfr. pigz).
+    """
+
+    def __init__(self, fileobj, parallel=1, block_size=COMPRESSION_BLOCK_SIZE):
+        """
+        Constructor
+
+        :param fileobj: file object to write compressed data to
+        :param parallel: number of blocks to compress in parallel
+        :param block_size: size of blocks that are compressed separately
+        """
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.parallel = max(parallel, 1)
+
+        self.buffer = []
+        self.buffer_size = 0
+        self.blocks = []
+
+        if self.parallel > 1:
+            self.pool = multiprocessing.Pool(self.parallel)
+        else:
+            self.pool = None
+
+    def write(self, data):
+        """Write specified data."""
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+
+        if self.buffer_size >= self.block_size:
+            self.blocks.append(''.join(self.buffer))
+            self.buffer, self.buffer_size = [], 0
+
+            if len(self.blocks) >= self.parallel:
+                self._compress_blocks()
+
+    def _compress_blocks(self):
+        """Compress pending blocks of data, and write them out (in order)."""
+        if self.pool is None:
+            compressed_blocks = [_gzip_block(block) for block in self.blocks]
+        else:
+            compressed_blocks = self.pool.map(_gzip_block, self.blocks)
+
+        for compressed_block in compressed_blocks:
+            self.fileobj.write(compressed_block)
+        self.blocks = []
+
+    def close(self):
+        """Compress & write out all remaining data."""
+        if self.buffer_size or not self.blocks:
+            self.blocks.append(''.join(self.buffer))
+            self.buffer, self.buffer_size = [], 0
+        self._compress_blocks()
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+def list_package_files(paths, exclude_globs=None):
+    """
+    Determine (sorted) list of files, directories and symlinks to include in a package.
+
+    :param paths: list of paths to include (directories are included recursively)
+    :param exclude_globs: list of glob patterns for (absolute) paths to exclude
+    """
+    if exclude_globs is None:
+        exclude_globs = []
+
+    res = set()
+    for path in paths:
+        path = os.path.abspath(path)
+        res.add(path)
+        if os.path.isdir(path) and not os.path.islink(path):
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                # symlinks to directories are listed in dirnames, but are not walked into
+                res.update(os.path.join(dirpath, name) for name in dirnames + filenames)
+
+    return sorted(p for p in res if not any(fnmatch.fnmatch(p, glob) for glob in exclude_globs))
+
+
+def stream_file(path, out, digest=None):
+    """Stream contents of specified file to specified file object, while updating specified digest (if any)."""
+    fileobj = open(path, 'rb')
+    try:
+        while True:
+            chunk = fileobj.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+    finally:
+        fileobj.close()
+
+
+class _CountingWriter(object):
+    """File-like object that keeps track of the amount of data written to the file object it wraps."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.size = 0
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.size += len(data)
+
+
+def write_cpio_payload(out, paths):
+    """
+    Write specified files as cpio archive (SVR4 'newc' format, with './' prefix, as expected in RPM payloads).
+
+    :param out: file object to write cpio archive to
+    :param paths: list of (absolute) paths to include in cpio archive
+    :return: tuple with list of metadata for files in cpio archive (dicts), and size of cpio archive
+    """
+    writer = _CountingWriter(out)
+
+    def write_entry(name, ino, mode, mtime, size, nlink=1):
+        """Write header for cpio entry, incl. name."""
+        fields = [ino, mode, 0, 0, nlink, mtime, size, 0, 0, 0, 0, len(name) + 1, 0]
+        writer.write(CPIO_NEWC_MAGIC + ''.join('%08X' % field for field in fields) + name + '\0')
+        writer.write('\0' * (-(110 + len(name) + 1) % 4))
+
+    files = []
+    for ino, path in enumerate(paths, 1):
+        stat_info = os.lstat(path)
+        mode = stat_info.st_mode
+        mtime = int(stat_info.st_mtime)
+        metadata = {'path': path, 'mode': mode, 'mtime': mtime, 'ino': ino, 'digest': '', 'linkto': '', 'size': 0}
+
+        if stat.S_ISLNK(mode):
+            metadata['linkto'] = os.readlink(path)
+            metadata['size'] = len(metadata['linkto'])
+        elif stat.S_ISREG(mode):
+            metadata['size'] = stat_info.st_size
+        elif not stat.S_ISDIR(mode):
+            _log.warning("Not including %s in package, not a regular file, directory or symlink", path)
+            continue
+
+        if metadata['size'] > RPM_MAX_INT32:
+            raise EasyBuildError("Can't include %s in package, files of 4GiB or larger are not supported", path)
+
+        write_entry('.' + path, ino, mode, mtime, metadata['size'], nlink=2 if stat.S_ISDIR(mode) else 1)
+
+        if stat.S_ISLNK(mode):
+            writer.write(metadata['linkto'])
+        elif stat.S_ISREG(mode):
+            digest = hashlib.sha256()
+            stream_file(path, writer, digest=digest)
+            metadata['digest'] = digest.hexdigest()
+
+        writer.write('\0' * (-metadata['size'] % 4))
+        files.append(metadata)
+
+    write_entry(CPIO_TRAILER, 0, 0, 0, 0)
+    # pad cpio archive to a multiple of 512 bytes
+    writer.write('\0' * (-writer.size % 512))
+
+    return (files, writer.size)
+
+
+def _rpm_tag_data(typ, value):
+    """Pack value of specified RPM header type, return packed data and number of items."""
+    if typ == RPM_TYPE_INT16:
+        data, count = struct.pack('>%dH' % len(value), *value), len(value)
+    elif typ == RPM_TYPE_INT32:
+        # negative values are allowed (e.g. -1 for 'all flags set'), values that do not fit in 32 bits are not
+        if any(v < -2 ** 31 or v > RPM_MAX_INT32 for v in value):
+            raise EasyBuildError("Value(s) out of range for 32-bit integer RPM header tag: %s", value)
+        data, count = struct.pack('>%dI' % len(value), *[v & RPM_MAX_INT32 for v in value]), len(value)
+    elif typ == RPM_TYPE_INT64:
+        data, count = struct.pack('>%dQ' % len(value), *value), len(value)
+    elif typ == RPM_TYPE_STRING:
+        data, count = value + '\0', 1
+    elif typ == RPM_TYPE_I18NSTRING:
+        # only a single (default) locale is included, cfr. RPMTAG_HEADERI18NTABLE
+        data, count = value + '\0', 1
+    elif typ == RPM_TYPE_STRING_ARRAY:
+        data, count = ''.join(v + '\0' for v in value), len(value)
+    elif typ == RPM_TYPE_BIN:
+        data, count = value, len(value)
+    else:
+        raise EasyBuildError("Unsupported RPM header type: %s", typ)
+
+    return (data, count)
+
+
+def rpm_header(tags, region_tag):
+    """
+    Compose RPM header structure.
+
+    :param tags: list of (tag, type, value) tuples
+    :param region_tag: tag to use for (immutable) header region (RPMTAG_HEADERIMMUTABLE or RPMTAG_HEADERSIGNATURES)
+    """
+    alignment = {RPM_TYPE_INT16: 2, RPM_TYPE_INT32: 4, RPM_TYPE_INT64: 8}
+
+    index, store = [], ''
+    for tag, typ, value in sorted(tags):
+        store += '\0' * (-len(store) % alignment.get(typ, 1))
+        data, count = _rpm_tag_data(typ, value)
+        index.append(struct.pack('>iiii', tag, typ, len(store), count))
+        store += data
+
+    # region tag comes first in the index, its data is a trailer at the end of the store,
+    # which specifies the (negated) size of the index that is part of the region
+    index_cnt = len(index) + 1
+    index.insert(0, struct.pack('>iiii', region_tag, RPM_TYPE_BIN, len(store), 16))
+    store += struct.pack('>iiii', region_tag, RPM_TYPE_BIN, -index_cnt * 16, 16)
+
+    return RPM_HEADER_MAGIC + struct.pack('>ii', index_cnt, len(store)) + ''.join(index) + store
+
+
+def _rpm_size_tag(size, tag, long_tag):
+    """Return (tag, type, value) tuple for specified size, using 64-bit variant of tag for sizes of 4GiB or more."""
+    if size > RPM_MAX_INT32:
+        res = (long_tag, RPM_TYPE_INT64, [size])
+    else:
+        res = (tag, RPM_TYPE_INT32, [size])
+    return res
+
+
+def _rpm_signature(header_and_payload_size, md5, payload_size, header):
+    """Compose RPM signature header (incl. padding to 8 bytes)."""
+    sig = rpm_header([
+        (RPMSIGTAG_SHA1, RPM_TYPE_STRING, hashlib.sha1(header).hexdigest()),
+        (RPMSIGTAG_SHA256, RPM_TYPE_STRING, hashlib.sha256(header).hexdigest()),
+        _rpm_size_tag(header_and_payload_size, RPMSIGTAG_SIZE, RPMSIGTAG_LONGSIZE),
+        (RPMSIGTAG_MD5, RPM_TYPE_BIN, md5),
+        _rpm_size_tag(payload_size, RPMSIGTAG_PAYLOADSIZE, RPMSIGTAG_LONGARCHIVESIZE),
+    ], RPMTAG_HEADERSIGNATURES)
+    return sig + '\0' * (-len(sig) % 8)
+
+
+def write_rpm(path, metadata, paths, parallel=1):
+    """
+    Write RPM package.
+
+    :param path: location of RPM package to write
+    :param metadata: dict with package metadata: name, version, release, summary, description, url, license, arch
+                     and depends (list of names of packages this package depends on)
+    :param paths: (sorted) list of (absolute) paths to include in package, cfr. list_package_files
+    :param parallel: number of blocks of data to compress in parallel
+    """
+    # payload is written to temporary file first, since (file digests in) header can only be composed afterwards
+    payload_fd, payload_path = tempfile.mkstemp(prefix='eb-rpm-payload-')
+    payload_fh = os.fdopen(payload_fd, 'wb')
+    gzip_writer = ParallelGzipWriter(payload_fh, parallel=parallel)
+    files, payload_size = write_cpio_payload(gzip_writer, paths)
+    gzip_writer.close()
+    payload_fh.close()
+
+    dirnames, dirindexes, dirname_idxs = [], [], {}
+    for item in files:
+        dirname = os.path.dirname(item['path']).rstrip(os.path.sep) + os.path.sep
+        if dirname not in dirname_idxs:
+            dirname_idxs[dirname] = len(dirnames)
+            dirnames.append(dirname)
+        dirindexes.append(dirname_idxs[dirname])
+
+    requires = [(name, '', 0) for name in metadata['depends']]
+    rpmlib_flags = RPMSENSE_RPMLIB | RPMSENSE_LESS | RPMSENSE_EQUAL
+    requires.extend((name, ver, rpmlib_flags) for (name, ver) in RPMLIB_REQUIREMENTS)
+    nvr = '%(name)s-%(version)s-%(release)s' % metadata
+    provides = [(metadata['name'], '%(version)s-%(release)s' % metadata, RPMSENSE_EQUAL)]
+
+    nfiles = len(files)
+    header = rpm_header([
+        (RPMTAG_HEADERI18NTABLE, RPM_TYPE_STRING_ARRAY, ['C']),
+        (RPMTAG_NAME, RPM_TYPE_STRING, metadata['name']),
+        (RPMTAG_VERSION, RPM_TYPE_STRING, metadata['version']),
+        (RPMTAG_RELEASE, RPM_TYPE_STRING, metadata['release']),
+        (RPMTAG_SUMMARY, RPM_TYPE_I18NSTRING, metadata['summary']),
+        (RPMTAG_DESCRIPTION, RPM_TYPE_I18NSTRING, metadata['description']),
+        (RPMTAG_BUILDTIME, RPM_TYPE_INT32, [int(time.time())]),
+        (RPMTAG_BUILDHOST, RPM_TYPE_STRING, socket.gethostname()),
+        _rpm_size_tag(sum(f['size'] for f in files if stat.S_ISREG(f['mode'])), RPMTAG_SIZE, RPMTAG_LONGSIZE),
+        (RPMTAG_LICENSE, RPM_TYPE_STRING, metadata['license']),
+        (RPMTAG_GROUP, RPM_TYPE_I18NSTRING, 'default'),
+        (RPMTAG_URL, RPM_TYPE_STRING, metadata['url']),
+        (RPMTAG_OS, RPM_TYPE_STRING, 'linux'),
+        (RPMTAG_ARCH, RPM_TYPE_STRING, metadata['arch']),
+        (RPMTAG_SOURCERPM, RPM_TYPE_STRING, '%s.src.rpm' % nvr),
+        (RPMTAG_PROVIDENAME, RPM_TYPE_STRING_ARRAY, [p[0] for p in provides]),
+        (RPMTAG_PROVIDEVERSION, RPM_TYPE_STRING_ARRAY, [p[1] for p in provides]),
+        (RPMTAG_PROVIDEFLAGS, RPM_TYPE_INT32, [p[2] for p in provides]),
+        (RPMTAG_REQUIRENAME, RPM_TYPE_STRING_ARRAY, [r[0] for r in requires]),
+        (RPMTAG_REQUIREVERSION, RPM_TYPE_STRING_ARRAY, [r[1] for r in requires]),
+        (RPMTAG_REQUIREFLAGS, RPM_TYPE_INT32, [r[2] for r in requires]),
+        (RPMTAG_FILESIZES, RPM_TYPE_INT32, [f['size'] for f in files]),
+        (RPMTAG_FILEMODES, RPM_TYPE_INT16, [f['mode'] & 0xffff for f in files]),
+        (RPMTAG_FILERDEVS, RPM_TYPE_INT16, [0] * nfiles),
+        (RPMTAG_FILEMTIMES, RPM_TYPE_INT32, [f['mtime'] for f in files]),
+        (RPMTAG_FILEDIGESTS, RPM_TYPE_STRING_ARRAY, [f['digest'] for f in files]),
+        (RPMTAG_FILELINKTOS, RPM_TYPE_STRING_ARRAY, [f['linkto'] for f in files]),
+        (RPMTAG_FILEFLAGS, RPM_TYPE_INT32, [0] * nfiles),
+        (RPMTAG_FILEUSERNAME, RPM_TYPE_STRING_ARRAY, ['root'] * nfiles),
+        (RPMTAG_FILEGROUPNAME, RPM_TYPE_STRING_ARRAY, ['root'] * nfiles),
+        (RPMTAG_FILEVERIFYFLAGS, RPM_TYPE_INT32, [-1] * nfiles),
+        (RPMTAG_FILEDEVICES, RPM_TYPE_INT32, [1] * nfiles),
+        (RPMTAG_FILEINODES, RPM_TYPE_INT32, [f['ino'] for f in files]),
+        (RPMTAG_FILELANGS, RPM_TYPE_STRING_ARRAY, [''] * nfiles),
+        (RPMTAG_DIRINDEXES, RPM_TYPE_INT32, dirindexes),
+        (RPMTAG_BASENAMES, RPM_TYPE_STRING_ARRAY, [os.path.basename(f['path']) for f in files]),
+        (RPMTAG_DIRNAMES, RPM_TYPE_STRING_ARRAY, dirnames),
+        (RPMTAG_PAYLOADFORMAT, RPM_TYPE_STRING, 'cpio'),
+        (RPMTAG_PAYLOADCOMPRESSOR, RPM_TYPE_STRING, 'gzip'),
+        (RPMTAG_PAYLOADFLAGS, RPM_TYPE_STRING, str(COMPRESSION_LEVEL)),
+        (RPMTAG_FILEDIGESTALGO, RPM_TYPE_INT32, [RPM_FILEDIGESTALGO_SHA256]),
+    ], RPMTAG_HEADERIMMUTABLE)
+
+    lead = struct.pack('>4sBBhh66shh16s', RPM_LEAD_MAGIC, 3, 0, 0, 1, nvr[:65], 1, 5, '')
+
+    try:
+        # size of signature only depends on the sizes (which are already known), not on the MD5 checksum,
+        # so it can be filled in once the payload was copied (and its MD5 checksum is known)
+        size = len(header) + os.path.getsize(payload_path)
+        md5 = hashlib.md5(header)
+        sig = _rpm_signature(size, md5.digest(), payload_size, header)
+        rpm = open(path, 'wb')
+        rpm.write(lead + sig + header)
+        stream_file(payload_path, rpm, digest=md5)
+        rpm.seek(len(lead))
+        rpm.write(_rpm_signature(size, md5.digest(), payload_size, header))
+        rpm.close()
+    except (IOError, OSError), err:
+        raise EasyBuildError("Failed to write RPM package %s: %s", path, err)
+    finally:
+        os.remove(payload_path)
+
+    _log.info("RPM package %s written (%d files, payload size %d)", path, nfiles, payload_size)
+
+
+def write_tarball(path, metadata, paths, parallel=1, compression='gz'):
+    """
+    Write package as compressed tarball, to be unpacked in /; package metadata is stored in a global pax header.
+
+    :param path: location of tarball to write
+    :param metadata: dict with package metadata (cfr. write_rpm)
+    :param paths: (sorted) list of (absolute) paths to include in package, cfr. list_package_files
+    :param parallel: number of blocks of data to compress in parallel
+    :param compression: compression to use ('gz' or 'zst')
+    """
+    pax_headers = {}
+    for key, val in metadata.items():
+        if isinstance(val, (list, tuple)):
+            val = ','.join(val)
+        if isinstance(val, str):
+            val = val.decode('utf-8')
+        pax_headers[u'EASYBUILD.%s' % key] = val
+
+    try:
+        fileobj = open(path, 'wb')
+        if compression == 'gz':
+            compressed_fileobj = ParallelGzipWriter(fileobj, parallel=parallel)
+        elif compression == 'zst' and HAVE_ZSTANDARD:
+            compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, threads=parallel)
+            compressed_fileobj = compressor.stream_writer(fileobj)
+        else:
+            raise EasyBuildError("Unsupported compression for tarball %s: %s", path, compression)
+
+        tar = tarfile.open(mode='w|', fileobj=compressed_fileobj, format=tarfile.PAX_FORMAT,
+                           pax_headers=pax_headers)
+        for item in paths:
+            tar.add(item, arcname=item.lstrip(os.path.sep), recursive=False)
+        tar.close()
+
+        compressed_fileobj.close()
+        if not fileobj.closed:
+            fileobj.close()
+    except (IOError, OSError, tarfile.TarError), err:
+        raise EasyBuildError("Failed to write package tarball %s: %s", path, err)
+
+    _log.info("Package tarball %s written (%d files)", path, len(paths))
+
+
+def package_native(pkgdir, pkgtype, metadata, paths, exclude_globs=None, parallel=1):
+    """
+    Create package of specified type in specified directory, using native packaging backend.
+
+    :param pkgdir: directory to create package in
+    :param pkgtype: package type (see NATIVE_PKG_TYPES)
+    :param metadata: dict with package metadata (cfr. write_rpm)
+    :param paths: paths to include in package
+    :param exclude_globs: glob patterns for paths to exclude from package
+    :param parallel: number of blocks of data to compress in parallel
+    :return: path to created package
+    """
+    check_native_pkg_support(pkgtype)
+
+    files = list_package_files(paths, exclude_globs=exclude_globs)
+    nvr = '%(name)s-%(version)s-%(release)s' % metadata
+
+    if pkgtype == PKG_TYPE_RPM:
+        path = os.path.join(pkgdir, '%s.%s.%s' % (nvr, metadata['arch'], pkgtype))
+        write_rpm(path, metadata, files, parallel=parallel)
+    else:
+        path = os.path.join(pkgdir, '%s.%s' % (nvr, pkgtype))
+        write_tarball(path, metadata, files, parallel=parallel, compression=pkgtype.split('.')[-1])
+
+    return path
+
+
+def check_native_pkg_support(pkgtype):
+    """Check whether specified package type is supported by native packaging backend."""
+    if pkgtype not in NATIVE_PKG_TYPES:
+        raise EasyBuildError("Package type '%s' is not supported by native packaging backend (supported: %s)",
+                             pkgtype, ', '.join(NATIVE_PKG_TYPES))
+    if pkgtype == PKG_TYPE_TAR_ZST and not HAVE_ZSTANDARD:
+        raise EasyBuildError("Python module 'zstandard' is required for '%s' packages, but it is not available",
+                             pkgtype)
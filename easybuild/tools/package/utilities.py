@@ -33,6 +33,7 @@ Various utilities related to packaging support.
 :author: Kenneth Hoste (Ghent University)
 """
 import os
+import platform
 import tempfile
 import pprint
 
@@ -40,15 +41,19 @@ from vsc.utils import fancylogger
 from vsc.utils.missing import get_subclasses
 from vsc.utils.patterns import Singleton
 
-from easybuild.tools.config import PKG_TOOL_FPM, PKG_TYPE_RPM, build_option, get_package_naming_scheme, log_path
+from easybuild.tools.config import PKG_TOOL_FPM, PKG_TOOL_NATIVE, PKG_TYPE_RPM, build_option
+from easybuild.tools.config import get_package_naming_scheme, log_path
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import change_dir, which
+from easybuild.tools.package.native import check_native_pkg_support, package_native
 from easybuild.tools.package.package_naming_scheme.pns import PackageNamingScheme
 from easybuild.tools.run import run_cmd
 from easybuild.tools.toolchain import DUMMY_TOOLCHAIN_NAME
 from easybuild.tools.utilities import import_available_modules
 _log = fancylogger.getLogger('tools.package')  # pylint: disable=C0103
 
+# EasyBuild logs and test reports that might be in the installdir (in log_path()) are excluded from packages
+EXCLUDE_LOG_FILES_GLOBS = ["*.log", "*.md"]
 
 
 def avail_package_naming_schemes():
@@ -68,6 +73,8 @@ def package(easyblock):
 
     if pkgtool == PKG_TOOL_FPM:
         pkgdir = package_with_fpm(easyblock)
+    elif pkgtool == PKG_TOOL_NATIVE:
+        pkgdir = package_natively(easyblock)
     else:
         raise EasyBuildError("Unknown packaging tool specified: %s", pkgtool)
 
@@ -112,6 +119,36 @@ def package_with_fpm(easyblock):
     if build_option('debug'):
         cmdlist.append('--debug')
 
+    for dep_pkgname in det_package_dependencies(easyblock):
+        cmdlist.extend(["--depends", dep_pkgname])
+
+    # stripping off leading / to match expected glob in fpm
+    for exclude_files_glob in EXCLUDE_LOG_FILES_GLOBS:
+        exclude_files_glob = os.path.join(easyblock.installdir.lstrip(os.sep), log_path(), exclude_files_glob)
+        cmdlist.extend(['--exclude', exclude_files_glob])
+
+    cmdlist.extend([
+        easyblock.installdir,
+        easyblock.module_generator.get_module_filepath(),
+    ])
+    cmd = ' '.join(cmdlist)
+    _log.debug("The flattened cmdlist looks like: %s", cmd)
+    run_cmd(cmdlist, log_all=True, simple=True, shell=False)
+
+    _log.info("Created %s package(s) in %s", pkgtype, workdir)
+
+    change_dir(origdir)
+
+    return workdir
+
+
+def det_package_dependencies(easyblock):
+    """
+    Determine list of names of packages that the package for the specified installation depends on,
+    i.e. the packages for the toolchain and the (non-external) dependencies.
+    """
+    package_naming_scheme = ActivePNS()
+
     deps = []
     if easyblock.toolchain.name != DUMMY_TOOLCHAIN_NAME:
         toolchain_dict = easyblock.toolchain.as_dict()
@@ -121,34 +158,49 @@ def package_with_fpm(easyblock):
 
     _log.debug("The dependencies to be added to the package are: %s",
                pprint.pformat([easyblock.toolchain.as_dict()] + easyblock.cfg.dependencies()))
+    res = []
     for dep in deps:
         if dep.get('external_module', False):
             _log.debug("Skipping dep marked as external module: %s", dep['name'])
         else:
             _log.debug("The dep added looks like %s ", dep)
-            dep_pkgname = package_naming_scheme.name(dep)
-            cmdlist.extend(["--depends", dep_pkgname])
+            res.append(package_naming_scheme.name(dep))
 
-    # Excluding the EasyBuild logs and test reports that might be in the installdir
-    exclude_files_globs = [
-        os.path.join(log_path(), "*.log"),
-        os.path.join(log_path(), "*.md"),
-    ]
-    # stripping off leading / to match expected glob in fpm
-    for exclude_files_glob in exclude_files_globs:
-        cmdlist.extend(['--exclude', os.path.join(easyblock.installdir.lstrip(os.sep), exclude_files_glob)])
+    return res
 
-    cmdlist.extend([
-        easyblock.installdir,
-        easyblock.module_generator.get_module_filepath(),
-    ])
-    cmd = ' '.join(cmdlist)
-    _log.debug("The flattened cmdlist looks like: %s", cmd)
-    run_cmd(cmdlist, log_all=True, simple=True, shell=False)
 
-    _log.info("Created %s package(s) in %s", pkgtype, workdir)
+def package_natively(easyblock):
+    """
+    Package installed software using the native (in-process) packaging backend,
+    and return the directory where the package is.
+    """
+    workdir = tempfile.mkdtemp(prefix='eb-pkgs-')
+    pkgtype = build_option('package_type')
+    _log.info("Will be creating %s package using native packaging backend in %s", pkgtype, workdir)
 
-    change_dir(origdir)
+    package_naming_scheme = ActivePNS()
+
+    description = easyblock.cfg['description'].strip()
+    sw_license = easyblock.cfg['software_license']
+    metadata = {
+        'name': package_naming_scheme.name(easyblock.cfg),
+        'version': package_naming_scheme.version(easyblock.cfg),
+        'release': package_naming_scheme.release(easyblock.cfg),
+        'summary': description.split('\n')[0],
+        'description': description,
+        'url': easyblock.cfg['homepage'],
+        'license': sw_license.name if sw_license else 'unknown',
+        'arch': platform.machine(),
+        'depends': det_package_dependencies(easyblock),
+    }
+    _log.debug("Package metadata: %s", metadata)
+
+    paths = [easyblock.installdir, easyblock.module_generator.get_module_filepath()]
+    exclude_globs = [os.path.join(easyblock.installdir, log_path(), glob) for glob in EXCLUDE_LOG_FILES_GLOBS]
+    pkg = package_native(workdir, pkgtype, metadata, paths, exclude_globs=exclude_globs,
+                         parallel=easyblock.cfg['parallel'] or 1)
+
+    _log.info("Created %s package %s", pkgtype, pkg)
 
     return workdir
 
@@ -156,6 +208,11 @@ def package_with_fpm(easyblock):
 def check_pkg_support():
     """Check whether packaging is possible, if required dependencies are available."""
     pkgtool = build_option('package_tool')
+
+    if pkgtool == PKG_TOOL_NATIVE:
+        check_native_pkg_support(build_option('package_type'))
+        return
+
     pkgtool_path = which(pkgtool)
     if pkgtool_path:
         _log.info("Selected packaging tool '%s' found at %s", pkgtool, pkgtool_path)
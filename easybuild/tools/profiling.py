@@ -0,0 +1,261 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Support for profiling the Python execution of EasyBuild itself (cfr. --profile and --trace-hotpaths).
+
+Only the EasyBuild process itself is profiled, not the child processes it spawns (build commands, module commands);
+time spent waiting for those is reported separately, via the time spent in run_cmd/run_cmd_qa and run_module.
+"""
+import cProfile
+import os
+import pstats
+import re
+import time
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import print_msg, print_warning
+from easybuild.tools.resource_usage import get_subprocess_counts
+
+
+_log = fancylogger.getLogger('profiling', fname=False)
+
+# rules to determine framework subsystem for profiled functions, first match wins:
+# (subsystem, regex for path to Python module, regex for function name or None to match any function)
+SUBSYSTEM_RULES = [
+    ('templating', r'easybuild/framework/easyconfig/templates\.py$', None),
+    ('templating', r'easybuild/framework/easyconfig/easyconfig\.py$', r'^_?generate_template_values$'),
+    ('templating', r'easybuild/framework/easyconfig/easyconfig\.py$', r'^resolve_template$'),
+    ('robot', r'easybuild/framework/easyconfig/easyconfig\.py$', r'^robot_'),
+    ('easyconfig parsing', r'easybuild/framework/easyconfig/', None),
+    ('robot', r'easybuild/tools/robot\.py$', None),
+    ('modules tool', r'easybuild/tools/modules\.py$', None),
+    ('module generation', r'easybuild/tools/module_generator\.py$', None),
+    ('toolchain', r'easybuild/(tools/toolchain|toolchains)/', None),
+    ('filesystem scans', r'easybuild/tools/filetools\.py$', r'^(find_easyconfigs|search_file|det_size|find_.*)$'),
+    ('filesystem scans', r'(/glob\.py|/genericpath\.py)$', None),
+    ('filesystem scans', r'/(os|posixpath)\.py$', r'^(walk|exists|lexists|isdir|isfile|islink|realpath)$'),
+    ('filesystem scans', r'^~$', r'^<posix\.(access|listdir|lstat|stat)>$'),
+    ('run_cmd', r'easybuild/tools/run\.py$', None),
+]
+SUBSYSTEMS = ['easyconfig parsing', 'templating', 'robot', 'modules tool', 'module generation', 'toolchain',
+              'filesystem scans', 'run_cmd']
+
+# functions that spawn subprocesses, for which time & call counts are aggregated separately:
+# (label, regex for path to Python module, regex for function name)
+SUBPROCESS_FUNCTIONS = [
+    ('run_cmd', r'easybuild/tools/run\.py$', r'^run_cmd(_qa)?$'),
+    ('run_module', r'easybuild/tools/modules\.py$', r'^run_module$'),
+]
+
+# number of functions to report with --trace-hotpaths
+HOTPATHS_CNT = 20
+
+# keep track of whether profiling is active (to avoid profiling recursively)
+_profiling_active = []
+
+
+def profiling_active():
+    """Return whether profiling is active."""
+    return bool(_profiling_active)
+
+
+def det_subsystem(func_key):
+    """
+    Determine framework subsystem for specified function.
+
+    :param func_key: function key, as used in profiling statistics: (filename, line number, function name)
+    :return: name of subsystem (or None if function does not belong to a known subsystem)
+    """
+    filename, _, func_name = func_key
+    filename = filename.replace(os.path.sep, '/')
+    for (subsystem, path_regex, func_regex) in SUBSYSTEM_RULES:
+        if re.search(path_regex, filename) and (func_regex is None or re.search(func_regex, func_name)):
+            return subsystem
+    return None
+
+
+def summarize_subsystems(stats):
+    """
+    Determine cumulative and own time for each framework subsystem, based on provided profiling statistics.
+
+    The cumulative time of a subsystem is the cumulative time of calls into that subsystem from outside of it;
+    the cumulative times of different subsystems may overlap (e.g. robot includes easyconfig parsing).
+    The own time of a subsystem is the time spent in the functions of that subsystem themselves.
+
+    :param stats: pstats.Stats instance
+    :return: dict with (cumulative time, own time) for each subsystem
+    """
+    subsystems = {}
+    for func_key in stats.stats:
+        subsystem = det_subsystem(func_key)
+        if subsystem is not None:
+            subsystems[func_key] = subsystem
+
+    res = dict((subsystem, [0.0, 0.0]) for subsystem in SUBSYSTEMS)
+    for func_key, subsystem in subsystems.items():
+        _, _, tottime, cumtime, callers = stats.stats[func_key]
+        res[subsystem][1] += tottime
+        if callers:
+            res[subsystem][0] += sum(caller_stats[3] for caller_key, caller_stats in callers.items()
+                                     if subsystems.get(caller_key) != subsystem)
+        else:
+            res[subsystem][0] += cumtime
+
+    return dict((subsystem, tuple(times)) for subsystem, times in res.items())
+
+
+def summarize_subprocesses(stats):
+    """
+    Determine number of calls and cumulative time for functions that spawn subprocesses (run_cmd, run_module).
+
+    Calls from a function with the same name (e.g. calls to parent class implementation) are not counted.
+
+    :param stats: pstats.Stats instance
+    :return: dict with (number of calls, cumulative time) for each type of function
+    """
+    res = dict((label, [0, 0.0]) for (label, _, _) in SUBPROCESS_FUNCTIONS)
+    for func_key, (_, ncalls, _, cumtime, callers) in stats.stats.items():
+        filename = func_key[0].replace(os.path.sep, '/')
+        for (label, path_regex, func_regex) in SUBPROCESS_FUNCTIONS:
+            if re.search(path_regex, filename) and re.search(func_regex, func_key[2]):
+                if callers:
+                    for caller_key, caller_stats in callers.items():
+                        if caller_key[2] != func_key[2]:
+                            res[label][0] += caller_stats[0]
+                            res[label][1] += caller_stats[3]
+                else:
+                    res[label][0] += ncalls
+                    res[label][1] += cumtime
+
+    return dict((label, tuple(val)) for label, val in res.items())
+
+
+def hotpaths(stats, cnt=HOTPATHS_CNT):
+    """
+    Determine framework functions with the largest cumulative time.
+
+    :param stats: pstats.Stats instance
+    :param cnt: number of functions to report
+    :return: list of (cumulative time, number of calls, function key) tuples
+    """
+    res = []
+    for func_key, (_, ncalls, _, cumtime, _) in stats.stats.items():
+        if re.search(r'easybuild/(framework|tools|toolchains|main\.py)', func_key[0].replace(os.path.sep, '/')):
+            res.append((cumtime, ncalls, func_key))
+
+    return sorted(res, reverse=True)[:cnt]
+
+
+def format_func_key(func_key):
+    """Format function key as used in profiling statistics as <path>:<line number>(<function name>)."""
+    filename, lineno, func_name = func_key
+    # only retain relative path to Python module within easybuild namespace
+    res = re.search(r'(easybuild/.*)$', filename.replace(os.path.sep, '/'))
+    if res:
+        filename = res.group(1)
+    return '%s:%d(%s)' % (filename, lineno, func_name)
+
+
+def profiling_report(stats, total_time, subprocess_counts, trace_hotpaths=False):
+    """
+    Compose textual summary of profiling statistics.
+
+    :param stats: pstats.Stats instance
+    :param total_time: total (wall) time of profiled run
+    :param subprocess_counts: number of spawned subprocesses during profiled run, by type (cfr. count_subprocess)
+    :param trace_hotpaths: include overview of framework functions with the largest cumulative time
+    """
+    lines = [
+        "profiling summary (total time: %.2fs)" % total_time,
+        "  %-20s %12s %12s" % ('subsystem', 'cumulative', 'own'),
+    ]
+    subsystems = summarize_subsystems(stats)
+    for subsystem in SUBSYSTEMS:
+        lines.append("  %-20s %11.2fs %11.2fs" % ((subsystem,) + subsystems[subsystem]))
+
+    lines.append("subprocesses (time includes waiting for subprocesses to complete):")
+    subprocess_time = 0.0
+    for (label, (ncalls, cumtime)) in sorted(summarize_subprocesses(stats).items()):
+        tup = (label, ncalls, subprocess_counts.get(label, 0), cumtime)
+        lines.append("  %-20s %5d calls, %5d subprocesses, %.2fs" % tup)
+        subprocess_time += cumtime
+    lines.append("time spent outside of run_cmd/run_module: %.2fs" % max(total_time - subprocess_time, 0.0))
+
+    if trace_hotpaths:
+        lines.append("hot paths (framework functions with largest cumulative time):")
+        for (cumtime, ncalls, func_key) in hotpaths(stats):
+            lines.append("  %8.3fs %8d calls  %s" % (cumtime, ncalls, format_func_key(func_key)))
+
+    return '\n'.join(lines)
+
+
+def run_profiled(func, args=None, kwargs=None, pstats_file=None, trace_hotpaths=False):
+    """
+    Run specified function while profiling it, and print profiling summary afterwards
+    (also when function raised an exception, or called sys.exit).
+
+    :param func: function to run
+    :param args: list of positional arguments to pass to function
+    :param kwargs: dict with named arguments to pass to function
+    :param pstats_file: path to file to dump profiling statistics to (in pstats format)
+    :param trace_hotpaths: include overview of framework functions with the largest cumulative time in summary
+    :return: return value of function
+    """
+    if args is None:
+        args = []
+    if kwargs is None:
+        kwargs = {}
+    if pstats_file is not None:
+        # function being profiled may change working directory
+        pstats_file = os.path.abspath(pstats_file)
+
+    profiler = cProfile.Profile()
+    subprocess_counts = get_subprocess_counts()
+    start_time = time.time()
+    _profiling_active.append(True)
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        total_time = time.time() - start_time
+        _profiling_active.pop()
+
+        counts = get_subprocess_counts()
+        for key in counts:
+            counts[key] -= subprocess_counts.get(key, 0)
+
+        stats = pstats.Stats(profiler)
+        print_msg(profiling_report(stats, total_time, counts, trace_hotpaths=trace_hotpaths), log=_log)
+
+        if pstats_file is not None:
+            # don't raise an error here, since that would mask the result (or error) of the profiled function
+            try:
+                stats.dump_stats(pstats_file)
+            except (IOError, OSError) as err:
+                msg = "Failed to write profiling statistics to %s: %s" % (pstats_file, err)
+                _log.warning(msg)
+                print_warning(msg)
+            else:
+                print_msg("profiling statistics written to %s (inspect using 'python -m pstats %s')" %
+                          (pstats_file, pstats_file), log=_log)
@@ -0,0 +1,188 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Tools to keep track of resource usage (wall/CPU time, memory, I/O, subprocesses) of EasyBuild itself,
+and of the subprocesses it spawns.
+"""
+import json
+import os
+import time
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.ordereddict import OrderedDict
+
+
+_log = fancylogger.getLogger('resource_usage', fname=False)
+
+# path to I/O accounting info for current process (Linux only);
+# I/O performed by (terminated) children that were waited for is included
+PROC_SELF_IO = '/proc/self/io'
+
+# number of subprocesses spawned, by kind (e.g. 'run_cmd', 'run_module')
+_subprocess_counts = {}
+
+# maximum resident set size (in KiB on Linux) of each terminated subprocess that was waited for via poll_subprocess
+_subprocess_max_rss = []
+
+
+def count_subprocess(kind):
+    """Keep track of a spawned subprocess of the specified kind."""
+    _subprocess_counts[kind] = _subprocess_counts.get(kind, 0) + 1
+
+
+def get_subprocess_counts():
+    """Return copy of dict with number of spawned subprocesses, by kind."""
+    return dict(_subprocess_counts)
+
+
+def poll_subprocess(proc):
+    """
+    Check whether specified subprocess has terminated (cfr. subprocess.Popen.poll);
+    if so, the resource usage of the subprocess is recorded (via os.wait4).
+
+    :param proc: subprocess.Popen instance
+    :return: exit code of subprocess, or None if it is still running
+    """
+    if proc.returncode is None:
+        try:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        except OSError as err:
+            # subprocess may already have been waited for
+            _log.debug("Failed to wait for subprocess %s via os.wait4: %s", proc.pid, err)
+            return proc.poll()
+
+        if pid == proc.pid:
+            _subprocess_max_rss.append(rusage.ru_maxrss)
+            if os.WIFSIGNALED(status):
+                proc.returncode = -os.WTERMSIG(status)
+            else:
+                proc.returncode = os.WEXITSTATUS(status)
+
+    return proc.returncode
+
+
+def read_io_counters():
+    """
+    Determine number of bytes read/written by current process (and its terminated children),
+    via I/O accounting info in /proc/self/io.
+
+    :return: (bytes_read, bytes_written) tuple, or (None, None) if I/O accounting info is not available
+    """
+    res = (None, None)
+    try:
+        handle = open(PROC_SELF_IO, 'r')
+        txt = handle.read()
+        handle.close()
+    except (IOError, OSError) as err:
+        _log.debug("I/O accounting info not available via %s: %s", PROC_SELF_IO, err)
+    else:
+        counters = {}
+        for line in txt.splitlines():
+            key, _, val = line.partition(':')
+            if val.strip().isdigit():
+                counters[key.strip()] = int(val)
+        res = (counters.get('rchar'), counters.get('wchar'))
+
+    return res
+
+
+def get_resource_usage():
+    """Return snapshot of resource usage of current process and its terminated children."""
+    times = os.times()
+    bytes_read, bytes_written = read_io_counters()
+    return {
+        'bytes_read': bytes_read,
+        'bytes_written': bytes_written,
+        # user + system time for current process and its terminated children
+        'cpu_time': sum(times[:4]),
+        'subprocesses': sum(_subprocess_counts.values()),
+        # number of terminated subprocesses for which resource usage was recorded (cfr. poll_subprocess)
+        'subprocesses_waited': len(_subprocess_max_rss),
+        'wall_time': time.time(),
+    }
+
+
+def resource_usage_since(start, name, kind):
+    """
+    Determine resource usage since specified snapshot.
+
+    'max_rss_children' is the largest maximum resident set size of the subprocesses that terminated
+    in the time span between both snapshots (cfr. poll_subprocess), or None if there are none.
+
+    :param start: snapshot of resource usage to compare with (obtained via get_resource_usage)
+    :param name: name to label obtained resource usage with (e.g. name of installation step or extension)
+    :param kind: kind of entity the resource usage is obtained for (e.g. 'step', 'extension')
+    :return: dictionary with resource usage
+    """
+    end = get_resource_usage()
+
+    def delta(key):
+        """Return difference between end and start values for specified key (None if value is unknown)."""
+        if start[key] is None or end[key] is None:
+            res = None
+        else:
+            res = end[key] - start[key]
+        return res
+
+    max_rss = None
+    max_rss_values = _subprocess_max_rss[start['subprocesses_waited']:end['subprocesses_waited']]
+    if max_rss_values:
+        max_rss = max(max_rss_values)
+
+    return {
+        'bytes_read': delta('bytes_read'),
+        'bytes_written': delta('bytes_written'),
+        'cpu_time': round(delta('cpu_time'), 2),
+        'kind': kind,
+        'max_rss_children': max_rss,
+        'name': name,
+        'subprocesses': delta('subprocesses'),
+        'wall_time': round(delta('wall_time'), 2),
+    }
+
+
+def write_resource_usage_report(path, label, records):
+    """
+    Write machine-readable (JSON) report of resource usage.
+
+    :param path: location of report to write
+    :param label: label for report (e.g. full module name of installed software)
+    :param records: list of resource usage records (obtained via resource_usage_since)
+    """
+    report = OrderedDict([
+        ('label', label),
+        ('timestamp', int(time.time())),
+        ('total_wall_time', round(sum(r['wall_time'] for r in records if r['kind'] == 'step'), 2)),
+        ('records', records),
+    ])
+    try:
+        handle = open(path, 'w')
+        handle.write(json.dumps(report, indent=2))
+        handle.close()
+    except (IOError, OSError) as err:
+        raise EasyBuildError("Failed to write resource usage report to %s: %s", path, err)
+
+    _log.info("Resource usage report for %s written to %s", label, path)
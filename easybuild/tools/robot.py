@@ -33,18 +33,17 @@ Dependency resolution functionality, a.k.a. robot.
 :author: Toon Willems (Ghent University)
 :author: Ward Poelmans (Ghent University)
 """
-import copy
 import os
 import sys
 from vsc.utils import fancylogger
-from vsc.utils.missing import nub
 
 from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, process_easyconfig
 from easybuild.framework.easyconfig.easyconfig import robot_find_easyconfig, verify_easyconfig_filename
+from easybuild.framework.easyconfig.index import EASYCONFIG_INDEX_FILENAME, EasyconfigIndex
 from easybuild.framework.easyconfig.tools import find_resolved_modules, skip_available
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import det_common_path_prefix, search_file
+from easybuild.tools.filetools import det_common_path_prefix, shorten_search_hits
 from easybuild.tools.module_naming_scheme.easybuild_mns import EasyBuildMNS
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 
@@ -53,7 +52,7 @@ _log = fancylogger.getLogger('tools.robot', fname=False)
 def det_robot_path(robot_paths_option, tweaked_ecs_paths, pr_path, auto_robot=False):
     """Determine robot path."""
     robot_path = robot_paths_option[:]
-    _log.info("Using robot path(s): %s" % robot_path)
+    _log.info("Using robot path(s): %s", robot_path)
 
     tweaked_ecs_path, tweaked_ecs_deps_path = None, None
     # paths to tweaked easyconfigs or easyconfigs downloaded from a PR have priority
@@ -67,7 +66,7 @@ def det_robot_path(robot_paths_option, tweaked_ecs_paths, pr_path, auto_robot=Fa
                   tweaked_ecs_deps_path, robot_path)
     if pr_path is not None:
         robot_path.append(pr_path)
-        _log.info("Appended list of robot search paths with %s: %s" % (pr_path, robot_path))
+        _log.info("Appended list of robot search paths with %s: %s", pr_path, robot_path)
 
     return robot_path
 
@@ -91,8 +90,8 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
 
         return (spec['name'], det_full_ec_version(spec))
 
-    # construct a dictionary: (name, installver) tuple to (build) dependencies
-    deps_for, dep_of = {}, {}
+    # construct a dictionary: (name, installver) tuple to direct (build) dependencies
+    direct_deps_for = {}
     for node in ordered_ecs:
         node_key = mk_key(node)
 
@@ -103,39 +102,66 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         # separate runtime deps from build deps
         runtime_deps = [d for d in deps if d not in build_deps]
 
-        deps_for[node_key] = (build_deps, runtime_deps)
-
-        # keep track of reverse deps too
-        for dep in deps:
-            dep_of.setdefault(dep, set()).add(node_key)
+        direct_deps_for[node_key] = (build_deps, runtime_deps)
 
     if check_inter_ec_conflicts:
         # add ghost entry that depends on each of the specified easyconfigs,
         # since we want to check for conflicts between specified easyconfigs too
-        deps_for[(None, None)] = ([], [mk_key(e) for e in easyconfigs])
-
-    # iteratively expand list of dependencies
-    last_deps_for = None
-    while deps_for != last_deps_for:
-        last_deps_for = copy.deepcopy(deps_for)
-        # (Automake, _), [], [(Autoconf, _), (GCC, _)]
-        for (key, (build_deps, runtime_deps)) in last_deps_for.items():
-            # extend runtime dependencies with non-build dependencies of own runtime dependencies
-            # Autoconf
-            for dep in runtime_deps:
-                # [], [M4, GCC]
-                deps_for[key][1].extend([d for d in deps_for[dep][1]])
-
-            # extend build dependencies with non-build dependencies of own build dependencies
-            for dep in build_deps:
-                deps_for[key][0].extend([d for d in deps_for[dep][1]])
-
-            deps_for[key] = (sorted(nub(deps_for[key][0])), sorted(nub(deps_for[key][1])))
-
-            # also track reverse deps (except for ghost entry)
-            if key != (None, None):
-                for dep in build_deps + runtime_deps:
-                    dep_of.setdefault(dep, set()).add(key)
+        direct_deps_for[(None, None)] = ([], [mk_key(e) for e in easyconfigs])
+
+    # assign an id to every (name, installver) tuple, in sorted order;
+    # sets of dependencies are represented as integer bitsets using these ids,
+    # so iterating over the set bits of a bitset yields a sorted list of dependencies
+    keys = set(direct_deps_for.keys())
+    for (build_deps, runtime_deps) in direct_deps_for.values():
+        keys.update(build_deps + runtime_deps)
+    keys = sorted(keys)
+    key_ids = dict((key, idx) for (idx, key) in enumerate(keys))
+    # lookup table for single-bit values (int.bit_length is not available in Python 2.6)
+    keys_by_bit = dict((1 << idx, key) for (idx, key) in enumerate(keys))
+
+    def bitset_to_keys(bitset):
+        """Return sorted list of (name, installver) tuples that correspond to set bits in bitset."""
+        res = []
+        while bitset:
+            low_bit = bitset & -bitset
+            res.append(keys_by_bit[low_bit])
+            bitset ^= low_bit
+        return res
+
+    # determine transitive closure of runtime dependencies for each node, in a single (topological) pass;
+    # ordered_ecs is sorted such that dependencies come first, so the recursion is only a safeguard
+    runtime_closures = {}
+
+    def runtime_closure(key):
+        """Determine bitset for (transitive) runtime dependencies of specified node."""
+        if key not in runtime_closures:
+            bitset = 0
+            for dep in direct_deps_for[key][1]:
+                bitset |= (1 << key_ids[dep]) | runtime_closure(dep)
+            runtime_closures[key] = bitset
+        return runtime_closures[key]
+
+    # build dependencies are extended with (transitive) runtime dependencies of the build dependencies,
+    # runtime dependencies are extended with (transitive) runtime dependencies of runtime dependencies
+    deps_for = {}
+    for (key, (build_deps, _)) in direct_deps_for.items():
+        build_bitset = 0
+        for dep in build_deps:
+            build_bitset |= (1 << key_ids[dep]) | runtime_closure(dep)
+        deps_for[key] = (bitset_to_keys(build_bitset), bitset_to_keys(runtime_closure(key)))
+
+    # reverse dependencies (except for ghost entry) are only required to report conflicts, so determine them lazily
+    dep_of = {}
+
+    def get_dep_of():
+        """Determine reverse dependencies."""
+        if not dep_of:
+            for (key, (build_deps, runtime_deps)) in deps_for.items():
+                if key != (None, None):
+                    for dep in build_deps + runtime_deps:
+                        dep_of.setdefault(dep, set()).add(key)
+        return dep_of
 
     def check_conflict(parent, dep1, dep2):
         """
@@ -151,7 +177,7 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         if conflict:
             vs_msg = "%s-%s vs %s-%s " % (dep1 + dep2)
             for dep in [dep1, dep2]:
-                if dep in dep_of:
+                if dep in get_dep_of():
                     vs_msg += "\n\t%s-%s as dep of: " % dep + ', '.join('%s-%s' % d for d in sorted(dep_of[dep]))
 
             if parent[0] is None:
@@ -164,13 +190,21 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
 
     # for each of the easyconfigs, check whether the dependencies (incl. build deps) contain any conflicts
     res = False
-    for (key, (build_deps, runtime_deps)) in deps_for.items():
-        # also check whether module itself clashes with any of its dependencies
-        for i, dep1 in enumerate(build_deps + runtime_deps + [key]):
-            for dep2 in (build_deps + runtime_deps)[i+1:]:
-                # don't worry about conflicts between module itself and any of its build deps
-                if dep1 != key or dep2 not in build_deps:
-                    res |= check_conflict(key, dep1, dep2)
+    for key in direct_deps_for:
+        all_deps = deps_for[key][0] + deps_for[key][1]
+
+        # only dependencies with the same name can conflict, so group them by name;
+        # nothing to check if there's only a single version for every name
+        if len(set(all_deps)) == len(set(dep[0] for dep in all_deps)):
+            continue
+
+        positions = {}
+        for idx, dep in enumerate(all_deps):
+            positions.setdefault(dep[0], []).append(idx)
+
+        for idx, dep1 in enumerate(all_deps):
+            for dep2 in [all_deps[j] for j in positions[dep1[0]] if j > idx]:
+                res |= check_conflict(key, dep1, dep2)
 
     return res
 
@@ -256,7 +290,7 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False):
     being_installed = [p['full_mod_name'] for p in easyconfigs]
     avail_modules = [m for m in avail_modules if not m in being_installed]
 
-    _log.debug('easyconfigs before resolving deps: %s' % easyconfigs)
+    _log.debug('easyconfigs before resolving deps: %s', easyconfigs)
 
     # resolve all dependencies, put a safeguard in place to avoid an infinite loop (shouldn't occur though)
     irresolvable = []
@@ -305,19 +339,19 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False):
                 if candidates:
                     cand_dep = candidates[0]
                     # find easyconfig, might not find any
-                    _log.debug("Looking for easyconfig for %s" % str(cand_dep))
+                    _log.debug("Looking for easyconfig for %s", cand_dep)
                     # note: robot_find_easyconfig may return None
                     path = robot_find_easyconfig(cand_dep['name'], det_full_ec_version(cand_dep))
 
                     if path is None:
                         # no easyconfig found for dependency, add to list of irresolvable dependencies
                         if cand_dep not in irresolvable:
-                            _log.debug("Irresolvable dependency found: %s" % cand_dep)
+                            _log.debug("Irresolvable dependency found: %s", cand_dep)
                             irresolvable.append(cand_dep)
                         # remove irresolvable dependency from list of dependencies so we can continue
                         entry['dependencies'].remove(cand_dep)
                     else:
-                        _log.info("Robot: resolving dependency %s with %s" % (cand_dep, path))
+                        _log.info("Robot: resolving dependency %s with %s", cand_dep, path)
                         # build specs should not be passed down to resolved dependencies,
                         # to avoid that e.g. --try-toolchain trickles down into the used toolchain itself
                         hidden = cand_dep.get('hidden', False)
@@ -329,10 +363,10 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False):
                         for ec in processed_ecs:
                             if not ec in easyconfigs + additional:
                                 additional.append(ec)
-                                _log.debug("Added %s as dependency of %s" % (ec, entry))
+                                _log.debug("Added %s as dependency of %s", ec, entry)
                 else:
                     mod_name = EasyBuildMNS().det_full_module_name(entry['ec'])
-                    _log.debug("No more candidate dependencies to resolve for %s" % mod_name)
+                    _log.debug("No more candidate dependencies to resolve for %s", mod_name)
 
             # add additional (new) easyconfigs to list of stuff to process
             easyconfigs.extend(additional)
@@ -350,7 +384,7 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False):
         irresolvable_mods = [ActiveMNS().det_full_module_name(dep) for dep in irresolvable]
         raise EasyBuildError("Irresolvable dependencies encountered: %s", ', '.join(irresolvable_mods))
 
-    _log.info("Dependency resolution complete, building as follows: %s" % ordered_ecs)
+    _log.info("Dependency resolution complete, building as follows: %s", ordered_ecs)
     return ordered_ecs
 
 
@@ -364,10 +398,23 @@ def search_easyconfigs(query, short=False, filename_only=False, terse=False):
         search_path.extend(extra_search_paths)
 
     ignore_dirs = build_option('ignore_dirs')
+    if ignore_dirs is None:
+        ignore_dirs = ['.git', '.svn']
+
+    # use (persistent) index of easyconfig files, which is updated incrementally
+    cache_dir = build_option('cache_dir')
+    if cache_dir:
+        index = EasyconfigIndex.load(os.path.join(cache_dir, EASYCONFIG_INDEX_FILENAME))
+    else:
+        index = EasyconfigIndex()
+    index.update(search_path, ignore_dirs=ignore_dirs, threads=build_option('search_threads') or 1)
 
     # note: don't pass down 'filename_only' here, we need the full path to filter out archived easyconfigs
-    var_defs, _hits = search_file(search_path, query, short=short, ignore_dirs=ignore_dirs, terse=terse,
-                                  silent=True, filename_only=False)
+    hits_per_path = [index.search(path, query, ignore_dirs=ignore_dirs) for path in search_path]
+    var_defs, _hits = shorten_search_hits(hits_per_path, short=short, terse=terse)
+
+    if cache_dir:
+        index.save()
 
      # filter out archived easyconfigs, these are handled separately
     hits, archived_hits = [], []
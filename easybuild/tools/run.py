@@ -46,6 +46,7 @@ from vsc.utils import fancylogger
 from easybuild.tools.asyncprocess import PIPE, STDOUT, Popen, recv_some, send_all
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, time_str_since
 from easybuild.tools.config import ERROR, IGNORE, WARN, build_option
+from easybuild.tools.resource_usage import count_subprocess, poll_subprocess
 from easybuild.tools.utilities import trace_msg
 
 
@@ -181,6 +182,7 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
 
     readSize = 1024 * 8
     _log.info('running cmd: %s ' % cmd)
+    count_subprocess('run_cmd')
     try:
         p = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                              stdin=subprocess.PIPE, close_fds=True, executable=exec_cmd)
@@ -190,7 +192,7 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
         p.stdin.write(inp)
     p.stdin.close()
 
-    ec = p.poll()
+    ec = poll_subprocess(p)
     stdouterr = ''
     while ec is None:
         # need to read from time to time.
@@ -199,7 +201,7 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
         if cmd_log:
             cmd_log.write(output)
         stdouterr += output
-        ec = p.poll()
+        ec = poll_subprocess(p)
 
     # read remaining data (all of it)
     output = p.stdout.read()
@@ -344,12 +346,13 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
     if cmd_log:
         cmd_log.write("# output for interactive command: %s\n\n" % cmd)
 
+    count_subprocess('run_cmd')
     try:
         p = Popen(cmd, shell=True, stdout=PIPE, stderr=STDOUT, stdin=PIPE, close_fds=True, executable="/bin/bash")
     except OSError, err:
         raise EasyBuildError("run_cmd_qa init cmd %s failed:%s", cmd, err)
 
-    ec = p.poll()
+    ec = poll_subprocess(p)
     stdout_err = ''
     old_len_out = -1
     hit_count = 0
@@ -424,7 +427,7 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
 
         # the sleep below is required to avoid exiting on unknown 'questions' too early (see above)
         time.sleep(1)
-        ec = p.poll()
+        ec = poll_subprocess(p)
 
     # Process stopped. Read all remaining data
     try:
@@ -30,6 +30,8 @@ Module with useful functions for getting system information
 """
 import fcntl
 import grp  # @UnresolvedImport
+import hashlib
+import json
 import os
 import platform
 import pwd
@@ -39,15 +41,22 @@ import sys
 import termios
 from socket import gethostname
 from vsc.utils import fancylogger
-from vsc.utils.affinity import sched_getaffinity
 
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import is_readable, read_file, which
+from easybuild.tools.config import build_option, build_options_initialized
+from easybuild.tools.filetools import is_readable, read_file, remove_file, which, write_file
 from easybuild.tools.run import run_cmd
 
 
 _log = fancylogger.getLogger('systemtools', fname=False)
 
+# memoized results of probing the host system, cfr. get_host_profile_value
+_host_profile = {}
+# locations of persistent host profiles that were loaded already
+_host_profile_paths = set()
+# keys for values in host profile that should not be retained in persistent host profile
+_host_profile_volatile_keys = set()
+
 # Architecture constants
 AARCH32 = 'AArch32'
 AARCH64 = 'AArch64'
@@ -81,6 +90,15 @@ UNKNOWN = 'UNKNOWN'
 MAX_FREQ_FP = '/sys/devices/system/cpu/cpu0/cpufreq/scaling_max_freq'
 PROC_CPUINFO_FP = '/proc/cpuinfo'
 PROC_MEMINFO_FP = '/proc/meminfo'
+BOOT_ID_FP = '/proc/sys/kernel/random/boot_id'
+MNT_NAMESPACE_FP = '/proc/self/ns/mnt'
+OS_RELEASE_FP = '/etc/os-release'
+
+# template for filename of persistent host profile, one per host (cache directory may be shared across hosts)
+HOST_PROFILE_FILENAME = 'host_profile-%s.json'
+
+# output of 'rpm -q' ("package foo is not installed") or 'dpkg -s' ("package 'foo' is not installed ...")
+OS_PKG_NOT_INSTALLED_REGEX = re.compile(r"package '?(?P<dep>[^\s']+)'? is not installed")
 
 CPU_ARCHITECTURES = [AARCH32, AARCH64, POWER, X86_64]
 CPU_FAMILIES = [AMD, ARM, INTEL, POWER, POWER_LE]
@@ -123,6 +141,16 @@ class SystemToolsException(Exception):
     """raised when systemtools fails"""
 
 
+def sched_getaffinity():
+    """
+    Determine CPU affinity of current process, cfr. vsc.utils.affinity.sched_getaffinity.
+
+    vsc.utils.affinity is only imported when required, since importing it involves locating libc via 'ldconfig'.
+    """
+    from vsc.utils.affinity import sched_getaffinity as vsc_sched_getaffinity
+    return vsc_sched_getaffinity()
+
+
 def get_avail_core_count():
     """
     Returns the number of available CPUs, according to cgroups and taskssets limits
@@ -649,25 +677,260 @@ def get_glibc_version():
         return UNKNOWN
 
 
+def get_boot_id():
+    """
+    Return ID for current boot of this system (or None if it can not be determined).
+    """
+    boot_id = None
+    if is_readable(BOOT_ID_FP):
+        boot_id = read_file(BOOT_ID_FP).strip() or None
+    return boot_id
+
+
+def get_os_identity():
+    """
+    Return identity of the operating system environment EasyBuild is running in,
+    i.e. a checksum of the contents of /etc/os-release and the mount namespace;
+    containers running on the same host (and hence sharing the boot ID and possibly the hostname)
+    have a different OS identity.
+    """
+    sha256 = hashlib.sha256()
+    if is_readable(OS_RELEASE_FP):
+        sha256.update(read_file(OS_RELEASE_FP))
+    try:
+        sha256.update(os.readlink(MNT_NAMESPACE_FP))
+    except OSError as err:
+        _log.debug("Failed to determine mount namespace via %s: %s", MNT_NAMESPACE_FP, err)
+    return sha256.hexdigest()
+
+
+def _host_profile_path():
+    """Return path to persistent host profile (or None if no cache directory is specified)."""
+    # system information may be queried before build options are initialized (cfr. session_state)
+    cache_dir = None
+    if build_options_initialized():
+        cache_dir = build_option('cache_dir', default=None)
+
+    if cache_dir:
+        return os.path.join(cache_dir, HOST_PROFILE_FILENAME % gethostname())
+    else:
+        return None
+
+
+def load_host_profile(path):
+    """
+    Load persistent host profile, which is only retained for the current boot of this system,
+    and for the current operating system environment (cfr. get_os_identity).
+
+    :param path: location of host profile file
+    :return: dict with host profile values (empty if no matching host profile was found)
+    """
+    res = {}
+    if os.path.isfile(path):
+        try:
+            data = json.loads(read_file(path))
+        except ValueError as err:
+            _log.warning("Ignoring host profile %s which could not be parsed: %s", path, err)
+            data = {}
+
+        boot_id = get_boot_id()
+        host_id = (boot_id, gethostname(), get_os_identity())
+        if boot_id and (data.get('boot_id'), data.get('hostname'), data.get('os_id')) == host_id:
+            res = data['profile']
+        else:
+            _log.info("Ignoring host profile %s for other host/boot/OS: %s", path, data.get('boot_id'))
+
+    return res
+
+
+def save_host_profile(path, profile):
+    """
+    Save host profile, tagged with current boot ID, hostname and OS identity
+    (no-op if boot ID can not be determined).
+
+    The host profile is written via a temporary file that is unique per process, which is renamed afterwards,
+    so other processes never see a partially written host profile; failing to save it only results in a warning.
+
+    :param path: location of host profile file
+    :param profile: dict with host profile values
+    """
+    boot_id = get_boot_id()
+    if boot_id:
+        data = {
+            'boot_id': boot_id,
+            'hostname': gethostname(),
+            'os_id': get_os_identity(),
+            'profile': profile,
+        }
+        tmp_path = '%s.tmp.%s.%d' % (path, gethostname(), os.getpid())
+        try:
+            # host profile is a cache, so also save it in (extended) dry run mode
+            write_file(tmp_path, json.dumps(data, indent=2, sort_keys=True), forced=True)
+            os.rename(tmp_path, path)
+        except (EasyBuildError, OSError) as err:
+            _log.warning("Failed to save host profile %s: %s", path, err)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    else:
+        _log.info("Not saving host profile to %s, since boot ID can not be determined", path)
+
+
+def _load_host_profile():
+    """Load persistent host profile into memoized host profile (if not done yet), return path to host profile."""
+    path = _host_profile_path()
+    if path and path not in _host_profile_paths:
+        profile = load_host_profile(path)
+        profile.update(_host_profile)
+        _host_profile.update(profile)
+        _host_profile_paths.add(path)
+    return path
+
+
+def update_host_profile(values, persistent=True):
+    """
+    Update host profile with specified values (and save persistent host profile, if a cache directory is specified).
+
+    :param values: dict with values to retain (must be JSON serializable)
+    :param persistent: also retain values in persistent host profile (if False, only memoize values in this process)
+    """
+    path = _load_host_profile()
+    _host_profile.update(values)
+    _log.debug("Added to host profile: %s", values)
+    if persistent:
+        _host_profile_volatile_keys.difference_update(values)
+        if path and values:
+            profile = dict((k, v) for (k, v) in _host_profile.items() if k not in _host_profile_volatile_keys)
+            save_host_profile(path, profile)
+    else:
+        _host_profile_volatile_keys.update(values)
+
+
+def set_host_profile_value(key, value, persistent=True):
+    """
+    Set value for specified key in host profile (and save persistent host profile, if a cache directory is specified).
+
+    :param key: key for value in host profile (string)
+    :param value: value to retain (must be JSON serializable)
+    :param persistent: also retain value in persistent host profile (if False, value is only memoized in this process)
+    """
+    update_host_profile({key: value}, persistent=persistent)
+
+
+def get_host_profile_value(key, func, *args):
+    """
+    Return value for specified key in host profile; value is obtained by calling specified function (if needed).
+
+    Values are memoized for the current process, and are also retained in a persistent host profile for the current
+    boot of this system if a cache directory is specified (cfr. --cache-dir); see also reset_host_profile.
+
+    :param key: key for value in host profile (string)
+    :param func: function to call to determine value (result must be JSON serializable)
+    :param args: arguments to pass to function
+    """
+    _load_host_profile()
+    if key not in _host_profile:
+        set_host_profile_value(key, func(*args))
+
+    return _host_profile[key]
+
+
+def reset_host_profile(persistent=False):
+    """
+    Reset host profile, so all values are determined again.
+
+    :param persistent: also remove persistent host profile (if a cache directory is specified)
+    """
+    _host_profile.clear()
+    _host_profile_paths.clear()
+    _host_profile_volatile_keys.clear()
+    if persistent:
+        path = _host_profile_path()
+        if path and os.path.exists(path):
+            remove_file(path)
+
+
+def query_os_dependencies(deps):
+    """
+    Check if dependencies are available from OS, using a single query of the package database
+    (cfr. check_os_dependency, which is used as fallback when neither 'rpm' nor 'dpkg' are available).
+
+    :param deps: list of names of OS dependencies
+    :return: dict with whether or not each of the specified OS dependencies was found
+    """
+    res = dict((dep, False) for dep in deps)
+
+    pkg_cmds = [pkg_cmd for pkg_cmd in ['rpm -q', 'dpkg -s'] if which(pkg_cmd.split(' ')[0])]
+    for pkg_cmd in pkg_cmds:
+        todo = [dep for dep in deps if not res[dep]]
+        if todo:
+            cmd = ' '.join([pkg_cmd] + todo)
+            out, ec = run_cmd(cmd, simple=False, log_all=False, log_ok=False, force_in_dry_run=True, trace=False)
+            missing = set(OS_PKG_NOT_INSTALLED_REGEX.findall(out))
+            if ec and not missing:
+                _log.warning("Unexpected output for '%s' (exit code %s), checking one by one: %s", cmd, ec, out)
+                for dep in todo:
+                    res[dep] = run_cmd("%s %s" % (pkg_cmd, dep), simple=True, log_all=False, log_ok=False,
+                                       force_in_dry_run=True, trace=False)
+            else:
+                for dep in todo:
+                    res[dep] = dep not in missing
+
+    if not pkg_cmds:
+        for dep in deps:
+            res[dep] = bool(check_os_dependency(dep))
+
+    return res
+
+
+def check_os_dependencies(deps):
+    """
+    Check if dependencies are available from OS, using host profile;
+    OS dependencies that were not checked yet are checked via a single query of the package database.
+
+    :param deps: list of names of OS dependencies
+    :return: dict with whether or not each of the specified OS dependencies was found
+    """
+    _load_host_profile()
+    keys = dict((dep, 'os_dependency:%s' % dep) for dep in deps)
+
+    todo = sorted(set(dep for dep in deps if keys[dep] not in _host_profile))
+    if todo:
+        found = query_os_dependencies(todo)
+        update_host_profile(dict((keys[dep], True) for dep in todo if found[dep]))
+        # missing OS dependencies may be installed at any time, so don't retain them across sessions
+        update_host_profile(dict((keys[dep], False) for dep in todo if not found[dep]), persistent=False)
+
+    return dict((dep, _host_profile[keys[dep]]) for dep in deps)
+
+
+def check_os_dependency_cached(dep):
+    """
+    Check if dependency is available from OS, using host profile.
+    """
+    return check_os_dependencies([dep])[dep]
+
+
 def get_system_info():
     """Return a dictionary with system information."""
     python_version = '; '.join(sys.version.split('\n'))
+    system_gcc_path = which('gcc')
     return {
         'core_count': get_avail_core_count(),
-        'total_memory': get_total_memory(),
-        'cpu_model': get_cpu_model(),
-        'cpu_speed': get_cpu_speed(),
-        'cpu_vendor': get_cpu_vendor(),
-        'gcc_version': get_tool_version('gcc', version_option='-v'),
+        'total_memory': get_host_profile_value('total_memory', get_total_memory),
+        'cpu_model': get_host_profile_value('cpu_model', get_cpu_model),
+        'cpu_speed': get_host_profile_value('cpu_speed', get_cpu_speed),
+        'cpu_vendor': get_host_profile_value('cpu_vendor', get_cpu_vendor),
+        # 'gcc' command being used may change (e.g. when a GCC module is loaded)
+        'gcc_version': get_host_profile_value('gcc_version:%s' % system_gcc_path, get_tool_version, 'gcc', '-v'),
         'hostname': gethostname(),
-        'glibc_version': get_glibc_version(),
-        'os_name': get_os_name(),
+        'glibc_version': get_host_profile_value('glibc_version', get_glibc_version),
+        'os_name': get_host_profile_value('os_name', get_os_name),
         'os_type': get_os_type(),
-        'os_version': get_os_version(),
+        'os_version': get_host_profile_value('os_version', get_os_version),
         'platform_name': get_platform_name(),
         'python_version': python_version,
         'system_python_path': which('python'),
-        'system_gcc_path': which('gcc'),
+        'system_gcc_path': system_gcc_path,
     }
 
 
@@ -45,7 +45,6 @@ from easybuild.framework.easyconfig.tools import skip_available
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
 from easybuild.tools.filetools import find_easyconfigs, mkdir, read_file, write_file
-from easybuild.tools.github import create_gist, post_comment_in_issue
 from easybuild.tools.jenkins import aggregate_xml_in_dirs
 from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel
 from easybuild.tools.robot import resolve_dependencies
@@ -182,6 +181,8 @@ def create_test_report(msg, ecs_with_res, init_session_state, pr_nr=None, gist_l
                 if pr_nr is not None:
                     descr += " (PR #%s)" % pr_nr
                 fn = '%s_partial.log' % os.path.basename(ec['spec'])[:-3]
+                # GitHub support is only imported when it's used, since that is relatively expensive
+                from easybuild.tools.github import create_gist
                 gist_url = create_gist(partial_log_txt, fn, descr=descr, github_user=user)
                 test_log = "(partial log available at %s)" % gist_url
 
@@ -241,6 +242,8 @@ def upload_test_report_as_gist(test_report, descr=None, fn=None):
 
     user = build_option('github_user')
 
+    # GitHub support is only imported when it's used, since that is relatively expensive
+    from easybuild.tools.github import create_gist
     gist_url = create_gist(test_report, descr=descr, fn=fn, github_user=user)
     return gist_url
 
@@ -272,6 +275,7 @@ def post_easyconfigs_pr_test_report(pr_nr, test_report, msg, init_session_state,
         "See %s for a full test report." % gist_url,
     ]
     comment = '\n'.join(comment_lines)
+    from easybuild.tools.github import post_comment_in_issue
     post_comment_in_issue(pr_nr, comment, github_user=user)
 
     msg = "Test report uploaded to %s and mentioned in a comment in easyconfigs PR#%s" % (gist_url, pr_nr)
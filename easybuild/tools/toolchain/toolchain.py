@@ -41,7 +41,7 @@ from vsc.utils.missing import nub
 import easybuild.tools.toolchain
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg
 from easybuild.tools.config import build_option, install_path
-from easybuild.tools.environment import setvar
+from easybuild.tools.environment import apply_env_changes, det_env_changes, setvar
 from easybuild.tools.filetools import adjust_permissions, find_eb_script, mkdir, read_file, which, write_file
 from easybuild.tools.module_generator import dependencies_for
 from easybuild.tools.modules import get_software_root, get_software_root_env_var_name
@@ -137,6 +137,9 @@ class Toolchain(object):
 
         self.use_rpath = False
 
+        # snapshot of build environment defined by prepare, see prepare_from_snapshot
+        self.env_snapshot = None
+
         self.mns = mns
         self.mod_full_name = None
         self.mod_short_name = None
@@ -708,6 +711,58 @@ class Toolchain(object):
             else:
                 self.log.info("Not putting RPATH wrappers in place, disabled via 'rpath' toolchain option")
 
+    def env_fingerprint(self, prepare_args):
+        """
+        Return fingerprint of everything that determines the build environment defined by prepare:
+        the arguments passed to prepare, the toolchain options, toolchain variables and dependencies,
+        and the $EBROOT*/$EBVERSION* environment variables; None if it can not be determined
+
+        :param prepare_args: dict with (named) arguments passed to prepare
+        """
+        variables = {}
+        for name, value in self.variables.items():
+            variables[name] = value.str_signature()
+            if variables[name] is None:
+                self.log.debug("Failed to determine signature for toolchain variable %s: %s", name, value)
+                return None
+
+        prefixes = (get_software_root_env_var_name(''), get_software_version_env_var_name(''))
+        ebvars = sorted((key, val) for (key, val) in os.environ.items() if key.startswith(prefixes))
+
+        return (prepare_args, dict(self.options), variables, self.dependencies, ebvars)
+
+    def prepare_from_snapshot(self, onlymod=None, silent=False, rpath_filter_dirs=None, rpath_include_dirs=None):
+        """
+        Prepare build environment like prepare does (without (re)loading modules), but reuse the snapshot of
+        the environment changes made by an earlier call if the toolchain (options, variables, ...) did not change;
+        a full prepare is done otherwise (and the snapshot is updated)
+
+        Intended to be used when the same toolchain is prepared over and over again, e.g. for every extension.
+        See prepare for a description of the arguments.
+        """
+        prepare_args = {
+            'onlymod': onlymod,
+            'rpath_filter_dirs': rpath_filter_dirs,
+            'rpath_include_dirs': rpath_include_dirs,
+        }
+
+        if self.env_snapshot is not None:
+            fingerprint, changes = self.env_snapshot
+            if fingerprint is not None and fingerprint == self.env_fingerprint(prepare_args):
+                self.log.debug("Applying snapshot of build environment for %s/%s toolchain", self.name, self.version)
+                apply_env_changes(changes, verbose=not silent)
+                return
+
+            self.log.debug("Toolchain changed since snapshot of build environment was taken, full prepare required")
+
+        orig_env = os.environ.copy()
+        self.prepare(loadmod=False, silent=silent, **prepare_args)
+
+        # fingerprint (and snapshot) must be taken after prepare, since variables are defined by it;
+        # a (deep) copy is retained, so changes made later to e.g. the toolchain options are noticed
+        self.env_snapshot = (copy.deepcopy(self.env_fingerprint(prepare_args)),
+                             det_env_changes(orig_env, os.environ))
+
     def comp_cache_compilers(self, cache_tool):
         """
         Determine list of relevant compilers for specified compiler caching tool.
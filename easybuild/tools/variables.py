@@ -38,6 +38,47 @@ from easybuild.tools.build_log import EasyBuildError
 
 _log = fancylogger.getLogger('variables', fname=False)
 
+# values of these types are shared rather than copied when making a (structural) copy
+IMMUTABLE_TYPES = (basestring, int, long, float, bool, type(None))
+
+# loggers for (generated) classes, by class name
+_CLASS_LOGGERS = {}
+
+# classes generated by Variables.get_instance, by (Variables class, variable name)
+_INSTANCE_CLASSES = {}
+
+# protected classes/instances for ListOfLists classes, by class
+_PROTECTED = {}
+
+
+def get_class_logger(klass):
+    """Return (shared) logger for specified class."""
+    name = klass.__name__
+    log = _CLASS_LOGGERS.get(name)
+    if log is None:
+        log = fancylogger.getLogger(name, fname=False)
+        _CLASS_LOGGERS[name] = log
+    return log
+
+
+def attrs_signature(obj):
+    """Return signature for instance attributes of specified object (nested StrList instances are taken into account)"""
+    return tuple((key, val.str_signature() if isinstance(val, StrList) else val) for key, val in obj.__dict__.items())
+
+
+def copy_value(value):
+    """
+    Return a copy of the specified value: StrList/ListOfLists instances are copied structurally,
+    immutable values are shared, anything else is deep-copied.
+    """
+    if isinstance(value, (StrList, ListOfLists)):
+        res = value.copy()
+    elif isinstance(value, IMMUTABLE_TYPES):
+        res = value
+    else:
+        res = copy.deepcopy(value)
+    return res
+
 
 def get_class(name, default_class, map_class=None):
     """Return class based on default
@@ -85,6 +126,7 @@ def join_map_class(map_classes):
 
 class StrList(list):
     """List of strings"""
+    # no __slots__ here: class constants like BEGIN/END/PREFIX/SEPARATOR/POSITION are overruled per instance
     SEPARATOR = ' '
 
     PREFIX = None
@@ -98,9 +140,10 @@ class StrList(list):
 
     JOIN_BEGIN_END = False
 
-    def __init__(self, *args, **kwargs):
-        super(StrList, self).__init__(*args, **kwargs)
-        self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
+    @property
+    def log(self):
+        """Logger for this class."""
+        return get_class_logger(self.__class__)
 
     def str_convert(self, x):
         """Convert members of list to string (no prefix of begin and end)"""
@@ -118,24 +161,33 @@ class StrList(list):
     def sanitize(self):
         """Sanitize self"""
 
+    def str_signature(self):
+        """
+        Return signature for current state of self, which determines the string representation:
+        the class, the elements and the instance attributes (nested StrList instances are taken into account)
+        """
+        return (self.__class__, tuple(self), attrs_signature(self))
+
     def __str__(self):
         """_str_self and support for BEGIN/END"""
         self.sanitize()
         xs = [self.BEGIN] + self._str_self() + [self.END]
         return str(self.SEPARATOR).join([str(x) for x in xs if self._str_ok(x)])
 
-    def __getattribute__(self, attr_name):
-        """Filter out function calls from Variables class"""
-        if attr_name == 'nappend_el':
-            return self.append
-        elif attr_name == 'nextend_el':
-            return self.extend
-        else:
-            return super(StrList, self).__getattribute__(attr_name)
+    def nappend_el(self, value):
+        """Append element (counterpart of Variables.nappend_el)"""
+        self.append(value)
+
+    def nextend_el(self, values):
+        """Extend with elements (counterpart of Variables.nextend_el)"""
+        self.extend(values)
 
     def copy(self):
-        """Return copy of self"""
-        return copy.deepcopy(self)
+        """Return (structural) copy of self"""
+        res = self.__class__(copy_value(x) for x in self)
+        for key, val in self.__dict__.items():
+            setattr(res, key, copy_value(val))
+        return res
 
     def try_remove(self, values):
         """Remove without ValueError in case of missing element"""
@@ -203,6 +255,9 @@ class AbsPathList(StrList):
 
 class ListOfLists(list):
     """List of lists"""
+    # class constants like SEPARATOR may be overruled per instance, so __dict__ is still supported
+    __slots__ = ('__dict__', '_first', '_str_cache')
+
     DEFAULT_CLASS = StrList
     PROTECTED_CLASSES = []  # classes that are not converted to DEFAULT_CLASS
     # PROTECTED_INSTANCES = [AbsPathList, LibraryList]
@@ -220,17 +275,39 @@ class ListOfLists(list):
 
     def __init__(self, *args, **kwargs):
         super(ListOfLists, self).__init__(*args, **kwargs)
-        self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
         self._first = None
 
-        self.protected_classes = self.PROTECTED_CLASSES[:]
-        if self.PROTECT_CLASS_SELF:
-            if not self.DEFAULT_CLASS in self.protected_classes:
-                self.protected_classes.append(self.DEFAULT_CLASS)
-        self.protected_instances = self.PROTECTED_INSTANCES[:]
-        if self.PROTECT_INSTANCE_SELF:
-            if not self.DEFAULT_CLASS in self.protected_instances:
-                self.protected_instances.append(self.DEFAULT_CLASS)
+    @property
+    def log(self):
+        """Logger for this class."""
+        return get_class_logger(self.__class__)
+
+    def _protected(self):
+        """Return classes/instances that are protected from conversion to default class (determined once per class)"""
+        klass = self.__class__
+        res = _PROTECTED.get(klass)
+        if res is None:
+            protected_classes = self.PROTECTED_CLASSES[:]
+            if self.PROTECT_CLASS_SELF:
+                if not self.DEFAULT_CLASS in protected_classes:
+                    protected_classes.append(self.DEFAULT_CLASS)
+            protected_instances = self.PROTECTED_INSTANCES[:]
+            if self.PROTECT_INSTANCE_SELF:
+                if not self.DEFAULT_CLASS in protected_instances:
+                    protected_instances.append(self.DEFAULT_CLASS)
+            res = (tuple(protected_classes), tuple(protected_instances))
+            _PROTECTED[klass] = res
+        return res
+
+    @property
+    def protected_classes(self):
+        """Classes that are protected from conversion to default class"""
+        return list(self._protected()[0])
+
+    @property
+    def protected_instances(self):
+        """Instances of these classes are protected from conversion to default class"""
+        return list(self._protected()[1])
 
     def append_empty(self):
         """Initialise MAP_CLASS instance"""
@@ -256,16 +333,9 @@ class ListOfLists(list):
 
     def _is_protected(self, value):
         """Check if value is protected from conversion to default class"""
-        res = False
-
-        if type(value) in self.protected_classes:
-            self.log.devel("_is_protected: %s value %s (%s)", self.protected_classes, value, type(value))
-            res = True
-        elif isinstance(value, tuple(self.protected_instances)):
-            self.log.devel("_is_protected: %s value %s (%s)", self.protected_instances, value, type(value))
-            res = True
-
-        self.log.devel("_is_protected: %s value %s (%s)", res, value, value.__repr__())
+        protected_classes, protected_instances = self._protected()
+        res = type(value) in protected_classes or isinstance(value, protected_instances)
+        self.log.devel("_is_protected: %s value %r (%s)", res, value, type(value))
         return res
 
     def nappend(self, value, **kwargs):
@@ -295,12 +365,10 @@ class ListOfLists(list):
             newvalue.POSITION = position
         if self._str_ok(newvalue) or append_empty:
             self.append(newvalue)
-            self.log.devel("nappend: value %s newvalue %s position %s",
-                           value.__repr__(), newvalue.__repr__(), position)
+            self.log.devel("nappend: value %r newvalue %r position %s", value, newvalue, position)
             return newvalue
         else:
-            self.log.devel("nappend: ignoring value %s newvalue %s (not _str_ok)",
-                           value.__repr__(), newvalue.__repr__())
+            self.log.devel("nappend: ignoring value %r newvalue %r (not _str_ok)", value, newvalue)
 
     def nextend(self, value=None, **kwargs):
         """Named extend, value is list type (TODO: tighten the allowed values)
@@ -314,7 +382,7 @@ class ListOfLists(list):
         else:
             for el in value:
                 if not self._str_ok(el):
-                    self.log.devel("nextend: ignoring el %s from value %s (not _str_ok)", el, value.__repr__())
+                    self.log.devel("nextend: ignoring el %s from value %r (not _str_ok)", el, value)
                     continue
 
                 if type(el) in self.PROTECTED_CLASSES:
@@ -336,7 +404,7 @@ class ListOfLists(list):
                 res.append(newvalue)
 
         self.extend(res)
-        self.log.devel("nextend: value %s res %s", value.__repr__(), res.__repr__())
+        self.log.devel("nextend: value %r res %r", value, res)
         return res
 
     def str_convert(self, x):
@@ -369,7 +437,7 @@ class ListOfLists(list):
                         to_remove.extend(all_idx[:-1])
 
             to_remove = sorted(list(set(to_remove)), reverse=True)
-            self.log.devel("sanitize: to_remove in %s %s", self.__repr__(), to_remove)
+            self.log.devel("sanitize: to_remove in %r %s", self, to_remove)
             for idx in to_remove:
                 del self[idx]
 
@@ -396,21 +464,51 @@ class ListOfLists(list):
                 res.extend(x)
         return res
 
+    def str_signature(self):
+        """
+        Return signature for current state of self, which determines the string representation;
+        None if it can not be determined (i.e. if not all elements are StrList instances)
+        """
+        res = [self.__class__, attrs_signature(self)]
+        for el in self:
+            if isinstance(el, StrList):
+                if el.__dict__:
+                    res.append(el.str_signature())
+                else:
+                    # inlined version of StrList.str_signature, since instance attributes are rarely set
+                    res.append((el.__class__, tuple(el), None))
+            else:
+                return None
+        return res
+
     def __str__(self):
+        # sanitizing (and rendering) yields the same result if nothing changed since last time,
+        # so cached string is returned if signature for current state matches
+        signature = self.str_signature()
+        if signature is not None:
+            try:
+                cached_signature, txt = self._str_cache
+                if cached_signature == signature:
+                    return txt
+            except AttributeError:
+                pass
+
         self._first = self.get_first()
         self.sanitize()
-        sep = ''  # default no separator
 
         if self._first is None:
             # return empty string
-            self.log.devel("__str__: first is None (self %s)", self.__repr__())
-            return ''
+            self.log.devel("__str__: first is None (self %r)", self)
+            txt = ''
         else:
             sep = self.SEPARATOR
 
             txt = str(sep).join([self.str_convert(x) for x in self if self._str_ok(x)])
-            self.log.devel("__str__: return %s (self: %s)", txt, self.__repr__())
-            return txt
+            self.log.devel("__str__: return %s (self: %r)", txt, self)
+
+        # sanitizing may have changed the state, so determine signature again
+        self._str_cache = (self.str_signature(), txt)
+        return txt
 
     def try_function_on_element(self, function_name, names=None, args=None, kwargs=None):
         """Try to run function function_name on each element"""
@@ -428,8 +526,11 @@ class ListOfLists(list):
         self.try_function_on_element('try_remove', args=[values])
 
     def copy(self):
-        """Return copy of self"""
-        return copy.deepcopy(self)
+        """Return (structural) copy of self"""
+        res = self.__class__(copy_value(x) for x in self)
+        for key, val in self.__dict__.items():
+            setattr(res, key, copy_value(val))
+        return res
 
 
 class Variables(dict):
@@ -443,15 +544,18 @@ class Variables(dict):
         Most items are of same DEFAULT_CLASS
             but are in different classes
     """
+    __slots__ = ()
+
     DEFAULT_LISTCLASS = ListOfLists
     MAP_LISTCLASS = {}  # map between variable name and ListOfList classes (ie not the (default) class for the variable)
 
     DEFAULT_CLASS = StrList
     MAP_CLASS = {}  # predefined map to specify (default) mapping between variables and classes
 
-    def __init__(self, *args, **kwargs):
-        super(Variables, self).__init__(*args, **kwargs)
-        self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
+    @property
+    def log(self):
+        """Logger for this class."""
+        return get_class_logger(self.__class__)
 
     def get_list_class(self, name):
         """Return the class associated with the name according to the DEFAULT_LISTCLASS and MAP_LISTCLASS"""
@@ -463,21 +567,29 @@ class Variables(dict):
 
     def get_instance(self, name=None):
         """Return an instance of the class"""
-        list_class = self.get_list_class(name)
-        element_class = self.get_element_class(name)
+        # generated class only depends on the (class of) self and the name, so only create it once
+        key = (self.__class__, name)
+        klass = _INSTANCE_CLASSES.get(key)
+        if klass is None:
+            list_class = self.get_list_class(name)
+            element_class = self.get_element_class(name)
 
-        class klass(list_class):
-            DEFAULT_CLASS = element_class
+            class klass(list_class):
+                __slots__ = ()
 
-            SEPARATOR = element_class.SEPARATOR
+                DEFAULT_CLASS = element_class
 
-            SANITIZE_REMOVE_DUPLICATE = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP is not None
-            SANITIZE_REMOVE_DUPLICATE_KEEP = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP
+                SEPARATOR = element_class.SEPARATOR
 
-            JOIN_BEGIN_END = element_class.JOIN_BEGIN_END
+                SANITIZE_REMOVE_DUPLICATE = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP is not None
+                SANITIZE_REMOVE_DUPLICATE_KEEP = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP
+
+                JOIN_BEGIN_END = element_class.JOIN_BEGIN_END
+
+            # better log messages (most use self.__class__.__name__; would give klass otherwise)
+            klass.__name__ = "%s_%s" % (self.__class__.__name__, name)
+            _INSTANCE_CLASSES[key] = klass
 
-        # better log messages (most use self.__class__.__name__; would give klass otherwise)
-        klass.__name__ = "%s_%s" % (self.__class__.__name__, name)
         return klass()
 
     def join(self, name, *others):
@@ -492,7 +604,7 @@ class Variables(dict):
 
         for other in others:
             if other in self:
-                self.log.devel("join other %s in self: other %s", other, self.get(other).__repr__())
+                self.log.devel("join other %s in self: other %r", other, self.get(other))
                 for el in self.get(other):
                     self.nappend(name, el)
             else:
@@ -531,33 +643,44 @@ class Variables(dict):
             self.log.devel("try_function_el: name %s function_name %s", name, function_name)
             self[name].try_function_on_element(function_name, args=args, kwargs=kwargs)
 
-    def __getattribute__(self, attr_name):
-        # allow for pass-through
-        if attr_name in ['nappend', 'nextend', 'append_empty', 'first', 'get_class']:
-            self.log.devel("Passthrough to LISTCLASS function %s", attr_name)
-
-            def _passthrough(name, *args, **kwargs):
-                """functions that pass through to LISTCLASS instances"""
-                current = self.setdefault(name)
-                actual_function = getattr(current, attr_name)
-                res = actual_function(*args, **kwargs)
-                return res
-            return _passthrough
-        elif attr_name in ['nappend_el', 'nextend_el', 'append_exists', 'append_subdirs']:
-            self.log.devel("Passthrough to LISTCLASS element function %s", attr_name)
-
-            def _passthrough(name, *args, **kwargs):
-                """"Functions that pass through to elements of LISTCLASS (accept idx as index)"""
-                idx = kwargs.pop('idx', -1)
-                if attr_name in ['append_exists', 'append_subdirs']:
-                    current = self.setdefault(name)
-                    current.append_empty()  # always add empty
-                else:
-                    current = self.setdefault(name, append_empty=True)
-                actual_function = getattr(current[idx], attr_name)
-                res = actual_function(*args, **kwargs)
-                return res
-            return _passthrough
-        else:
-            return super(Variables, self).__getattribute__(attr_name)
+    def nappend(self, name, *args, **kwargs):
+        """Named append to element name (see ListOfLists.nappend)"""
+        return self.setdefault(name).nappend(*args, **kwargs)
+
+    def nextend(self, name, *args, **kwargs):
+        """Named extend of element name (see ListOfLists.nextend)"""
+        return self.setdefault(name).nextend(*args, **kwargs)
+
+    def append_empty(self, name):
+        """Append empty element to element name"""
+        return self.setdefault(name).append_empty()
 
+    def _get_list_element(self, name, idx, append_empty=False):
+        """
+        Return element at index idx of element name
+        :param append_empty: always add an empty element first (rather than only if element name is empty)
+        """
+        if append_empty:
+            current = self.setdefault(name)
+            current.append_empty()
+        else:
+            current = self.setdefault(name, append_empty=True)
+        return current[idx]
+
+    def nappend_el(self, name, value, idx=-1):
+        """Append value to (last, or idx-th) list element of element name"""
+        return self._get_list_element(name, idx).nappend_el(value)
+
+    def nextend_el(self, name, values, idx=-1):
+        """Extend (last, or idx-th) list element of element name with values"""
+        return self._get_list_element(name, idx).nextend_el(values)
+
+    def append_exists(self, name, *args, **kwargs):
+        """Add new list element to element name, and add first existing path to it (see AbsPathList.append_exists)"""
+        idx = kwargs.pop('idx', -1)
+        return self._get_list_element(name, idx, append_empty=True).append_exists(*args, **kwargs)
+
+    def append_subdirs(self, name, *args, **kwargs):
+        """Add new list element to element name, and add existing (sub)dirs to it (see AbsPathList.append_subdirs)"""
+        idx = kwargs.pop('idx', -1)
+        return self._get_list_element(name, idx, append_empty=True).append_subdirs(*args, **kwargs)
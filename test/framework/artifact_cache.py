@@ -0,0 +1,178 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for artifact_cache.py
+"""
+import json
+import os
+import sys
+import tarfile
+from StringIO import StringIO
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
+from unittest import TextTestRunner
+
+from easybuild.tools.artifact_cache import artifact_paths, det_artifact_key, restore_artifact, store_artifact
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file, write_file
+
+
+class ArtifactCacheTest(EnhancedTestCase):
+    """Tests for artifact cache support."""
+
+    def setUp(self):
+        """Set up test."""
+        super(ArtifactCacheTest, self).setUp()
+        self.cache_dir = os.path.join(self.test_prefix, 'artifacts')
+        self.installdir = os.path.join(self.test_prefix, 'software', 'foo', '1.0')
+        self.mod_filepath = os.path.join(self.test_prefix, 'modules', 'all', 'foo', '1.0')
+
+    def make_artifact(self, key, entries):
+        """Create artifact for specified key, with specified (TarInfo, contents) entries for installation."""
+        archive, metadata_path = artifact_paths(self.cache_dir, key)
+        mkdir(os.path.dirname(archive), parents=True)
+        tar = tarfile.open(archive, 'w:gz')
+        for tarinfo, contents in entries + [(tarfile.TarInfo('module'), 'module for %s' % self.installdir)]:
+            if contents is not None:
+                tarinfo.size = len(contents)
+                contents = StringIO(contents)
+            tar.addfile(tarinfo, contents)
+        tar.close()
+        write_file(metadata_path, json.dumps({'installdir': self.installdir}))
+
+    def test_det_artifact_key(self):
+        """Test det_artifact_key function."""
+        key, components = det_artifact_key('123abc')
+        self.assertEqual(components['fingerprint'], '123abc')
+        expected_keys = ['cpu_arch', 'cpu_family', 'cpu_features', 'cpu_model', 'fingerprint', 'glibc_version',
+                         'module_naming_scheme', 'module_syntax', 'modules_tool', 'optarch', 'os_name', 'os_version',
+                         'suffix_modules_path']
+        self.assertEqual(sorted(components.keys()), expected_keys)
+        self.assertEqual(det_artifact_key('123abc')[0], key)
+        self.assertNotEqual(det_artifact_key('456def')[0], key)
+
+        # CPU model & co are only taken into account if no fixed optarch value is specified
+        init_config(build_options={'optarch': 'GENERIC'})
+        optarch_key, components = det_artifact_key('123abc')
+        self.assertNotEqual(optarch_key, key)
+        self.assertFalse('cpu_model' in components)
+
+        init_config(build_options={'optarch': {'GCC': 'march=sandybridge'}})
+        self.assertTrue('cpu_model' in det_artifact_key('123abc')[1])
+
+        # module configuration is taken into account
+        init_config(build_options={'suffix_modules_path': 'foo'})
+        self.assertNotEqual(det_artifact_key('123abc')[0], key)
+        init_config(args=['--module-naming-scheme=HierarchicalMNS'])
+        self.assertNotEqual(det_artifact_key('123abc')[0], key)
+
+    def test_store_restore_artifact(self):
+        """Test storing & restoring artifacts."""
+        write_file(os.path.join(self.installdir, 'bin', 'foo'), 'foo')
+        os.symlink('bin', os.path.join(self.installdir, 'sbin'))
+        write_file(self.mod_filepath, 'prepend_path("PATH", "%s/bin")' % self.installdir)
+
+        self.assertEqual(restore_artifact(self.cache_dir, 'a1b2c3', self.installdir, self.mod_filepath), False)
+        archive = store_artifact(self.cache_dir, 'a1b2c3', self.installdir, self.mod_filepath, metadata={'x': 1})
+        self.assertEqual(archive, os.path.join(self.cache_dir, 'a1', 'a1b2c3.tar.gz'))
+        metadata = json.loads(read_file(os.path.join(self.cache_dir, 'a1', 'a1b2c3.json')))
+        self.assertEqual((metadata['installdir'], metadata['key'], metadata['x']), (self.installdir, 'a1b2c3', 1))
+
+        other_installdir = os.path.join(self.test_prefix, 'other', 'foo', '1.0')
+        other_mod_filepath = os.path.join(self.test_prefix, 'other', 'modules', 'foo', '1.0')
+        self.assertTrue(restore_artifact(self.cache_dir, 'a1b2c3', other_installdir, other_mod_filepath))
+        self.assertEqual(read_file(os.path.join(other_installdir, 'bin', 'foo')), 'foo')
+        self.assertEqual(os.readlink(os.path.join(other_installdir, 'sbin')), 'bin')
+        self.assertEqual(read_file(other_mod_filepath), 'prepend_path("PATH", "%s/bin")' % other_installdir)
+
+    def test_restore_unsafe_artifact(self):
+        """Test whether unsafe artifacts are refused when being restored."""
+        outside = os.path.join(self.test_prefix, 'outside')
+
+        def symlink(name, target):
+            """Create TarInfo instance for symbolic link."""
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.type = tarfile.SYMTYPE
+            tarinfo.linkname = target
+            return tarinfo
+
+        def hardlink(name, target):
+            """Create TarInfo instance for hard link."""
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.type = tarfile.LNKTYPE
+            tarinfo.linkname = target
+            return tarinfo
+
+        def fifo(name):
+            """Create TarInfo instance for FIFO."""
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.type = tarfile.FIFOTYPE
+            return tarinfo
+
+        tests = [
+            ([(tarfile.TarInfo('software/../outside'), 'oops')], r"Found unsafe path in artifact: \.\./outside"),
+            ([(tarfile.TarInfo('foo'), 'oops')], "Found unexpected entry in artifact: foo"),
+            ([(symlink('software/lib', outside), None)], "Symbolic link lib points outside of installation"),
+            ([(symlink('software/lib', '../../..'), None)], "Symbolic link lib points outside of installation"),
+            ([(symlink('software/bin/lib', '../../lib'), None)], "Symbolic link bin/lib points outside"),
+            ([(hardlink('software/lib', '/etc/passwd'), None)], "Hard link lib points outside of installation"),
+            ([(hardlink('software/lib', 'software/../x'), None)], "Hard link lib points outside of installation"),
+            ([(fifo('software/fifo'), None)], "Found unsupported type of entry in artifact: fifo"),
+            # entries via a symbolic link that points inside the installation are also refused
+            ([(symlink('software/lib', '.'), None), (tarfile.TarInfo('software/lib/foo'), 'foo')],
+             "leads via symbolic link lib: lib/foo"),
+            ([(tarfile.TarInfo('software/lib/foo'), 'foo'), (symlink('software/lib', 'bin'), None)],
+             "leads via symbolic link lib: lib/foo"),
+            ([(symlink('software/lib', '.'), None), (symlink('software/up', 'lib/..'), None)],
+             "leads via symbolic link lib: up"),
+            ([(symlink('software/lib', '.'), None), (hardlink('software/foo', 'software/lib/foo'), None)],
+             "leads via symbolic link lib: foo"),
+        ]
+        for idx, (entries, error_regex) in enumerate(tests):
+            key = 'a1b2c3%d' % idx
+            self.make_artifact(key, entries)
+            args = (self.cache_dir, key, self.installdir, self.mod_filepath)
+            self.assertErrorRegex(EasyBuildError, error_regex, restore_artifact, *args)
+            self.assertFalse(os.path.exists(outside))
+            self.assertFalse(os.path.exists(self.mod_filepath))
+
+        # symbolic links in installation are fine, as are absolute symbolic links pointing into installation
+        entries = [
+            (symlink('software/lib64', 'lib'), None),
+            (symlink('software/bin/foo', os.path.join(self.installdir, 'lib', 'foo')), None),
+            (tarfile.TarInfo('software/lib/foo'), 'foo'),
+        ]
+        self.make_artifact('d4e5f6', entries)
+        self.assertTrue(restore_artifact(self.cache_dir, 'd4e5f6', self.installdir, self.mod_filepath))
+        self.assertEqual(read_file(os.path.join(self.installdir, 'bin', 'foo')), 'foo')
+        self.assertEqual(read_file(os.path.join(self.installdir, 'lib64', 'foo')), 'foo')
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(ArtifactCacheTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    TextTestRunner(verbosity=1).run(suite())
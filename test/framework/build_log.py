@@ -27,6 +27,7 @@ Unit tests for EasyBuild log infrastructure
 
 @author: Kenneth Hoste (Ghent University)
 """
+import logging
 import os
 import re
 import sys
@@ -37,7 +38,8 @@ from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_
 from unittest import TextTestRunner
 from vsc.utils.fancylogger import getLogger, getRootLoggerName, logToFile, setLogFormat
 
-from easybuild.tools.build_log import LOGGING_FORMAT, EasyBuildError, print_msg, print_warning, time_str_since
+from easybuild.tools.build_log import LOGGING_FORMAT, BackgroundFileLogHandler, EasyBuildError, LazyLogValue
+from easybuild.tools.build_log import init_logging, print_msg, print_warning, stop_logging, time_str_since
 from easybuild.tools.filetools import read_file, write_file
 
 
@@ -217,6 +219,86 @@ class BuildLogTest(EnhancedTestCase):
         logtxt_regex = re.compile(r'^%s' % expected_logtxt, re.M)
         self.assertTrue(logtxt_regex.search(logtxt), "Pattern '%s' found in %s" % (logtxt_regex.pattern, logtxt))
 
+    def test_lazy_log_value(self):
+        """Test LazyLogValue and deferred formatting of log messages."""
+        fd, tmplog = tempfile.mkstemp()
+        os.close(fd)
+
+        calls = []
+
+        def compute(x, y=0):
+            """Compute value to log (and keep track of calls)."""
+            calls.append((x, y))
+            return x + y
+
+        value = LazyLogValue(compute, 1, y=2)
+        self.assertEqual(calls, [])
+        self.assertEqual(str(value), '3')
+        self.assertEqual(repr(value), '3')
+        # value is only computed once
+        self.assertEqual(calls, [(1, 2)])
+
+        setLogFormat("%(name)s [%(levelname)s] :: %(message)s")
+        logToFile(tmplog, enable=True)
+        log = getLogger('test_lazy_log_value')
+
+        # value is not computed for log messages below the active log level
+        calls[:] = []
+        log.setLevelName('INFO')
+        log.debug("value: %s", LazyLogValue(compute, 3, y=4))
+        self.assertEqual(calls, [])
+        log.info("value: %s", LazyLogValue(compute, 5, y=6))
+        self.assertEqual(calls, [(5, 6)])
+
+        logToFile(tmplog, enable=False)
+        logtxt = read_file(tmplog)
+        self.assertFalse(re.search("value: 7", logtxt))
+        self.assertTrue(re.search(r"test_lazy_log_value \[INFO\] :: value: 11$", logtxt, re.M))
+
+    def test_background_log_handler(self):
+        """Test BackgroundFileLogHandler."""
+        tmplog = os.path.join(self.test_prefix, 'background.log')
+
+        handler = BackgroundFileLogHandler(tmplog, interval=60)
+        handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+        log = getLogger('test_background_log_handler')
+        log.addHandler(handler)
+        log.setLevelName('DEBUG')
+
+        # log message is composed when it is logged, even though it is only written later
+        data = {'foo': 'bar'}
+        log.info("data: %s", data)
+        data['foo'] = 'baz'
+        log.debug("unicode: %s", u'\u2014')
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            log.warning("caught exception", exc_info=True)
+
+        # records are buffered, and written in batches (here: at flush time, since interval is very large)
+        self.assertEqual(read_file(tmplog), '')
+        handler.flush()
+        logtxt = read_file(tmplog)
+        self.assertTrue(re.search(r"^\[INFO\] data: {'foo': 'bar'}$", logtxt, re.M))
+        self.assertTrue(re.search(r"^\[DEBUG\] unicode: \xe2\x80\x94$", logtxt, re.M))
+        regex = re.compile(r"^\[WARNING\] caught exception\nTraceback.*\nValueError: oops$", re.M | re.S)
+        self.assertTrue(regex.search(logtxt), "Pattern '%s' found in: %s" % (regex.pattern, logtxt))
+
+        # remaining records are written when handler is closed, background thread is stopped
+        log.info("one more thing")
+        log.removeHandler(handler)
+        handler.close()
+        self.assertFalse(handler.thread.is_alive())
+        self.assertTrue(read_file(tmplog).endswith("[INFO] one more thing\n"))
+
+        # background logging can be enabled via init_logging
+        tmplog = os.path.join(self.test_prefix, 'init_logging.log')
+        log, logfile = init_logging(tmplog, silent=True, background=True)
+        self.assertEqual(logfile, tmplog)
+        log.info("logging in background")
+        stop_logging(logfile)
+        self.assertTrue(re.search("INFO logging in background", read_file(tmplog)))
+
     def test_print_warning(self):
         """Test print_warning"""
         self.mock_stderr(True)
@@ -26,13 +26,16 @@
 Unit tests for docs.py.
 """
 import inspect
+import json
 import os
 import re
 import sys
 from unittest import TextTestRunner
 
 from easybuild.tools.config import module_classes
+from easybuild.tools.docs import LIST_SOFTWARE_CACHE_FILENAME
 from easybuild.tools.docs import avail_easyconfig_licenses, gen_easyblocks_overview_rst, list_software
+from easybuild.tools.filetools import copy_dir, read_file, remove_file, write_file
 from easybuild.tools.utilities import import_available_modules
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 
@@ -275,6 +278,67 @@ class DocsTest(EnhancedTestCase):
         expected_found = any([lines[i:i+len(expected)] == expected for i in range(len(lines))])
         self.assertTrue(expected_found, "%s found in: %s" % (expected, lines))
 
+    def test_list_software_parallel_cached(self):
+        """Test list_software using multiple processes and cache for parsed metadata."""
+        test_ecs = os.path.join(self.test_prefix, 'ecs')
+        copy_dir(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'v1.0'), test_ecs)
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        cache_path = os.path.join(cache_dir, LIST_SOFTWARE_CACHE_FILENAME)
+
+        build_options = {
+            'robot_path': [test_ecs],
+            'silent': True,
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+        expected = list_software(output_format='txt', detailed=True)
+
+        build_options.update({
+            'cache_dir': cache_dir,
+            'list_software_jobs': 2,
+        })
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='txt', detailed=True), expected)
+        self.assertTrue(os.path.exists(cache_path))
+        cache = json.loads(read_file(cache_path))
+        self.assertEqual(len(cache['metadata']), 5)
+
+        # cached metadata is used when available
+        for metadata in cache['metadata'].values():
+            if metadata['name'] == 'GCC':
+                metadata['description'] = 'cached description of GCC'
+        write_file(cache_path, json.dumps(cache))
+        txt = list_software(output_format='txt', detailed=True)
+        self.assertTrue(re.search('^cached description of GCC$', txt, re.M), "Pattern found in: %s" % txt)
+
+        # changed easyconfig files are parsed again, stale entries are removed from cache
+        gcc_ec = os.path.join(test_ecs, 'g', 'GCC', 'GCC-4.6.3.eb')
+        write_file(gcc_ec, read_file(gcc_ec).replace('4.6.3', '4.7.0'))
+        txt = list_software(output_format='txt', detailed=True)
+        self.assertFalse(re.search('cached description', txt), "Pattern not found in: %s" % txt)
+        self.assertTrue(re.search(r'^\s*\* GCC v4.7.0: dummy$', txt, re.M), "Pattern found in: %s" % txt)
+        cache = json.loads(read_file(cache_path))
+        self.assertEqual(len(cache['metadata']), 5)
+        self.assertFalse(any(m['description'].startswith('cached') for m in cache['metadata'].values()))
+
+        # module names are cached for a flat module naming scheme, but not for a hierarchical one,
+        # since module names then also depend on other easyconfig files
+        # (only retain easyconfig files for which module names can be determined with HierarchicalMNS)
+        for ec_fn in ['gzip-1.5-goolf-1.4.10.eb', 'gzip-1.5-ictce-4.1.13.eb']:
+            remove_file(os.path.join(test_ecs, 'g', 'gzip', ec_fn))
+        expected = list_software(output_format='txt', detailed=True, only_installed=True)
+        cache = json.loads(read_file(cache_path))
+        self.assertTrue(any(key.endswith('_EasyBuildMNS') for key in cache['metadata']))
+
+        init_config(args=['--module-naming-scheme=HierarchicalMNS'], build_options=build_options)
+        list_software(output_format='txt', detailed=True, only_installed=True)
+        cache = json.loads(read_file(cache_path))
+        self.assertFalse(any(key.endswith('_HierarchicalMNS') for key in cache['metadata']))
+        self.assertTrue(any(key.endswith('_EasyBuildMNS') for key in cache['metadata']))
+
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='txt', detailed=True, only_installed=True), expected)
+
 
 def suite():
     """ returns all test cases in this module """
@@ -44,6 +44,8 @@ from vsc.utils.fancylogger import setLogLevelDebug, logToScreen
 
 import easybuild.tools.build_log
 import easybuild.framework.easyconfig as easyconfig
+import easybuild.framework.easyconfig.tools as ectools
+import easybuild.tools.systemtools as st
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.constants import EXTERNAL_MODULE_MARKER
 from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, create_paths, copy_easyconfigs
@@ -2152,6 +2154,60 @@ class EasyConfigTest(EnhancedTestCase):
         res = get_paths_for(subdir='easyconfigs', robot_path=None)
         self.assertTrue(os.path.samefile(test_ecs, res[0]))
 
+    def test_parse_easyconfigs_osdeps(self):
+        """Test checking of OS dependencies of all easyconfig files at once in parse_easyconfigs."""
+        ec_txt = '\n'.join([
+            "easyblock = 'ConfigureMake'",
+            "name = '%s'",
+            "version = '1.0'",
+            "homepage = 'http://example.com'",
+            "description = 'test'",
+            "toolchain = {'name': 'dummy', 'version': 'dummy'}",
+            "osdependencies = %s",
+        ])
+        ec_files = []
+        for name, osdeps in [('foo', "['found-dep1', ('missing-dep', 'found-dep2')]"), ('bar', "['found-dep1']"),
+                             ('baz', "[('openssl-devel', 'found-dep3')]")]:
+            ec_file = os.path.join(self.test_prefix, '%s-1.0.eb' % name)
+            write_file(ec_file, ec_txt % (name, osdeps))
+            ec_files.append((ec_file, False))
+
+        queries = []
+
+        def mocked_query_os_dependencies(deps):
+            """Mocked version of query_os_dependencies, which keeps track of queries."""
+            queries.append(deps)
+            return dict((dep, dep.startswith('found')) for dep in deps)
+
+        processed = []
+
+        def mocked_process_easyconfig(path, *args, **kwargs):
+            """Wrapper for process_easyconfig, which keeps track of processed easyconfig files."""
+            processed.append(path)
+            return orig_process_easyconfig(path, *args, **kwargs)
+
+        orig_query_os_dependencies = st.query_os_dependencies
+        st.query_os_dependencies = mocked_query_os_dependencies
+        orig_process_easyconfig = ectools.process_easyconfig
+        ectools.process_easyconfig = mocked_process_easyconfig
+        try:
+            ecs, _ = parse_easyconfigs(ec_files)
+            self.assertEqual([ec['ec']['name'] for ec in ecs], ['foo', 'bar', 'baz'])
+            # package database is queried only once, for all OS dependencies
+            self.assertEqual(queries, [['found-dep1', 'found-dep2', 'found-dep3', 'missing-dep', 'openssl-devel']])
+            # easyconfig files are only processed once
+            self.assertEqual(processed, [ec_file for (ec_file, _) in ec_files])
+
+            # missing OS dependencies are still reported when easyconfig file is validated
+            ec_file = os.path.join(self.test_prefix, 'qux-1.0.eb')
+            write_file(ec_file, ec_txt % ('qux', "['found-dep1', ('missing-dep', 'openssl-devel')]"))
+            error_pattern = r"OS dependencies were not found: \[\('missing-dep', 'openssl-devel'\)\]"
+            self.assertErrorRegex(EasyBuildError, error_pattern, parse_easyconfigs, ec_files[:2] + [(ec_file, False)])
+            self.assertEqual(len(queries), 1)
+        finally:
+            st.query_os_dependencies = orig_query_os_dependencies
+            ectools.process_easyconfig = orig_process_easyconfig
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -27,19 +27,23 @@ Unit tests for easyconfig/parser.py
 
 @author: Stijn De Weirdt (Ghent University)
 """
+import glob
+import marshal
 import os
+import stat
 import sys
-from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 from vsc.utils.fancylogger import setLogLevelDebug, logToScreen
 
 import easybuild.tools.build_log
 from easybuild.framework.easyconfig.format.format import Dependency
-from easybuild.framework.easyconfig.format.pyheaderconfigobj import build_easyconfig_constants_dict
+import easybuild.framework.easyconfig.format.pyheaderconfigobj as pyheaderconfigobj
+from easybuild.framework.easyconfig.format.pyheaderconfigobj import build_easyconfig_constants_dict, get_easyconfig_env
 from easybuild.framework.easyconfig.format.version import EasyVersion
-from easybuild.framework.easyconfig.parser import EasyConfigParser
+from easybuild.framework.easyconfig.parser import EasyConfigParser, parse_easyconfig_header
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import read_file
+from easybuild.tools.filetools import read_file, write_file
 
 
 TESTDIRBASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs')
@@ -199,6 +203,137 @@ class EasyConfigParserTest(EnhancedTestCase):
         ecdict = ecp.get_config_dict()
         self.assertEqual(ecdict['version'], '1.4')
 
+    def test_parse_easyconfig_header(self):
+        """Test lightweight parse of easyconfig files via parse_easyconfig_header."""
+        params = ['easyblock', 'moduleclass', 'name', 'toolchain', 'version', 'versionsuffix']
+        test_ecs = glob.glob(os.path.join(TESTDIRBASE, 'test_ecs', '*', '*', '*.eb'))
+        self.assertTrue(len(test_ecs) > 40)
+        for test_ec in test_ecs:
+            header = parse_easyconfig_header(read_file(test_ec))
+            ecdict = EasyConfigParser(test_ec).get_config_dict()
+            for param in params:
+                if param == 'version' and os.path.basename(test_ec) == 'gzip-1.4-broken.eb':
+                    # no type checking/conversion for lightweight parse
+                    self.assertEqual(header[param], 1.4)
+                elif param == 'versionsuffix' and os.path.basename(test_ec) == 'toy-0.0-multiple.eb':
+                    # only part before first block is considered
+                    self.assertEqual(header[param], '-multiple')
+                else:
+                    self.assertEqual(header[param], ecdict.get(param), "%s value in %s" % (param, test_ec))
+
+        toy_ec = os.path.join(TESTDIRBASE, 'test_ecs', 't', 'toy', 'toy-0.0-deps.eb')
+        ecdict = parse_easyconfig_header(read_file(toy_ec))
+        self.assertEqual(ecdict['dependencies'], [('ictce', '4.1.13', '', True), ('GCC/4.7.2', 'EXTERNAL_MODULE')])
+
+        # local variables, string formatting & concatenation, templates & constants are supported
+        ectxt = '\n'.join([
+            "local_ver = '1.2'",
+            "name = 'test'",
+            "version = local_ver + '.3'",
+            "versionsuffix = '-%(version_major_minor)s-' + local_ver",
+            "versionsuffix += '-' + OS_TYPE",
+            "toolchain = {'name': 'GCC', 'version': '4.9.2'}",
+            "dependencies = [('foo', local_ver, '', ('GCC', '4.9.2')), ('bar', '1.0', '', True)]",
+            "sources = [SOURCE_TAR_GZ]",
+        ])
+        res = parse_easyconfig_header(ectxt)
+        self.assertEqual(res, {
+            'dependencies': [('foo', '1.2', '', ('GCC', '4.9.2')), ('bar', '1.0', '', True)],
+            'easyblock': None,
+            'moduleclass': None,
+            'name': 'test',
+            'toolchain': {'name': 'GCC', 'version': '4.9.2'},
+            'version': '1.2.3',
+            'versionsuffix': '-1.2-1.2-Linux',
+        })
+        res = parse_easyconfig_header(ectxt, params=['name', 'sources'])
+        self.assertEqual(res, {'name': 'test', 'sources': ['%(name)s-%(version)s.tar.gz']})
+
+        # values that can not be determined statically are None, or result in an error in strict mode
+        ectxt = '\n'.join([
+            "import os",
+            "name = 'test'",
+            "version = os.getenv('TEST_VERSION')",
+            "toolchain = {'name': 'dummy', 'version': ''}",
+            "if True:",
+            "    toolchain = {'name': 'GCC', 'version': '4.9.2'}",
+            "versionsuffix = '-%s' % version",
+        ])
+        res = parse_easyconfig_header(ectxt, params=['name', 'toolchain', 'version', 'versionsuffix'])
+        self.assertEqual(res, {'name': 'test', 'toolchain': None, 'version': None, 'versionsuffix': None})
+        error_pattern = "Failed to determine value for easyconfig parameter 'version' statically"
+        self.assertErrorRegex(EasyBuildError, error_pattern, parse_easyconfig_header, ectxt, params=['version'],
+                              strict=True)
+        # parameters that are not defined at all are not a problem in strict mode
+        res = parse_easyconfig_header(ectxt, params=['name', 'easyblock'], strict=True)
+        self.assertEqual(res, {'name': 'test', 'easyblock': None})
+
+        error_pattern = "Lightweight parse not supported for easyconfig files with blocks"
+        ectxt = read_file(os.path.join(TESTDIRBASE, 'test_ecs', 't', 'toy', 'toy-0.0-multiple.eb'))
+        self.assertErrorRegex(EasyBuildError, error_pattern, parse_easyconfig_header, ectxt, strict=True)
+
+        error_pattern = "Failed to parse easyconfig file contents"
+        self.assertErrorRegex(EasyBuildError, error_pattern, parse_easyconfig_header, "name = 'test")
+
+    def test_cached_pyheader_env_code(self):
+        """Test caching of environment and compiled code used to exec Python headers of easyconfig files."""
+        env = get_easyconfig_env()
+        self.assertTrue(get_easyconfig_env() is env)
+        self.assertEqual(env['SOURCE_TAR_GZ'], '%(name)s-%(version)s.tar.gz')
+        self.assertFalse('__builtins__' in env)
+        env = get_easyconfig_env(allowed_builtins=['len'])
+        self.assertEqual(sorted(env['__builtins__'].keys()), ['len'])
+
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        init_config(build_options={'cache_dir': cache_dir})
+
+        test_ec = os.path.join(TESTDIRBASE, 'v1.0', 'g', 'GCC', 'GCC-4.6.3.eb')
+        ec = EasyConfigParser(test_ec).get_config_dict()
+        self.assertEqual(ec['name'], 'GCC')
+        # environment used to exec Python header is not modified
+        self.assertFalse('name' in get_easyconfig_env())
+
+        # compiled code is cached in memory and on disk
+        self.assertEqual(len(pyheaderconfigobj._pyheader_code_cache), 1)
+        code_files = glob.glob(os.path.join(cache_dir, pyheaderconfigobj.PYHEADER_CODE_CACHE_DIRNAME, '*', '*'))
+        self.assertEqual(len(code_files), 1)
+
+        ec = EasyConfigParser(test_ec).get_config_dict()
+        self.assertEqual(ec['name'], 'GCC')
+        self.assertEqual(len(pyheaderconfigobj._pyheader_code_cache), 1)
+
+        # compiled code stored on disk is used (if it's not cached in memory)
+        pyheaderconfigobj._pyheader_code_cache.clear()
+        write_file(code_files[0], marshal.dumps(compile("name = 'cached'", '<string>', 'exec')))
+        ec = EasyConfigParser(test_ec).get_config_dict(validate=False)
+        self.assertEqual(ec['name'], 'cached')
+
+        # only current user can modify compiled code stored on disk
+        code_dir = os.path.dirname(code_files[0])
+        for path in [code_dir, os.path.dirname(code_dir)]:
+            self.assertFalse(os.stat(path).st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+        # compiled code stored on disk is not used if it could have been modified by others
+        for path in [cache_dir, code_dir, code_files[0]]:
+            orig_mode = stat.S_IMODE(os.stat(path).st_mode)
+            os.chmod(path, orig_mode | stat.S_IWGRP)
+            pyheaderconfigobj._pyheader_code_cache.clear()
+            ec = EasyConfigParser(test_ec).get_config_dict(validate=False)
+            self.assertEqual(ec['name'], 'GCC')
+            os.chmod(path, orig_mode)
+            write_file(code_files[0], marshal.dumps(compile("name = 'cached'", '<string>', 'exec')))
+
+        pyheaderconfigobj._pyheader_code_cache.clear()
+        ec = EasyConfigParser(test_ec).get_config_dict(validate=False)
+        self.assertEqual(ec['name'], 'cached')
+
+        # errors are still reported correctly
+        ectxt = read_file(test_ec) + "\nfoo = bar\n"
+        error_pattern = r"Parsing easyconfig file failed: name 'bar' is not defined \(line [0-9]+\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, EasyConfigParser, rawcontent=ectxt)
+        error_pattern = "Parsing easyconfig file failed: invalid syntax"
+        self.assertErrorRegex(EasyBuildError, error_pattern, EasyConfigParser, rawcontent=ectxt + "foo = (\n")
+
 
 def suite():
     """ returns all the testcases in this module """
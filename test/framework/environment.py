@@ -71,6 +71,32 @@ class EnvironmentTest(EnhancedTestCase):
         self.assertEqual(os.environ['FOO'], 'barfoo')
         self.assertEqual(txt, '')
 
+    def test_env_changes(self):
+        """Test det_env_changes and apply_env_changes functions."""
+        old = {'FOO': 'foo', 'BAR': 'bar', 'PATH': '/usr/bin:/bin', 'TEST_UNDEF': 'undef'}
+        new = {'FOO': 'foo', 'BAR': 'barbar', 'PATH': '/tmp/wrappers:/usr/bin:/bin', 'TEST_NEW': 'new'}
+        changes = env.det_env_changes(old, new)
+        expected = {
+            'BAR': ('barbar', False),
+            'PATH': ('/tmp/wrappers:', True),
+            'TEST_NEW': ('new', False),
+            'TEST_UNDEF': None,
+        }
+        self.assertEqual(changes, expected)
+
+        os.environ['BAR'] = 'bar'
+        os.environ['PATH'] = '/opt/bin:' + os.environ['PATH']
+        os.environ['TEST_UNDEF'] = 'undef'
+        orig_path = os.environ['PATH']
+        env.apply_env_changes(changes)
+        self.assertEqual(os.environ['BAR'], 'barbar')
+        self.assertEqual(os.environ['TEST_NEW'], 'new')
+        self.assertFalse('TEST_UNDEF' in os.environ)
+        # path is prepended to current value, but only once
+        self.assertEqual(os.environ['PATH'], '/tmp/wrappers:' + orig_path)
+        env.apply_env_changes(changes)
+        self.assertEqual(os.environ['PATH'], '/tmp/wrappers:' + orig_path)
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -796,6 +796,34 @@ class FileToolsTest(EnhancedTestCase):
         self.assertEqual(ft.weld_paths('/foo/bar', '/foo/bar'), '/foo/bar/')
         self.assertEqual(ft.weld_paths('/foo', '/foo/bar/baz'), '/foo/bar/baz/')
 
+    def test_find_glob_matches(self):
+        """Test find_glob_matches function."""
+        for subdir in ['bin', 'include', 'lib', os.path.join('lib64', 'pkgconfig'), os.path.join('share', 'man')]:
+            ft.mkdir(os.path.join(self.test_prefix, subdir), parents=True)
+        for filename in ['foo.jar', 'bar.jar', '.hidden.jar', os.path.join('lib', 'libfoo.so')]:
+            ft.write_file(os.path.join(self.test_prefix, filename), '')
+
+        patterns = ['bin', 'sbin', 'lib', 'lib32', 'lib64', '*.jar', '.*.jar', 'lib*', 'lib/*.so', '*/pkgconfig',
+                    'lib/pkgconfig', 'share/man', 'share/*', 'foo.jar/bar', 'lib/', './bin', '',
+                    os.path.join(self.test_prefix, 'bin')]
+        res = ft.find_glob_matches(self.test_prefix, patterns)
+
+        self.assertEqual(sorted(res.keys()), sorted(patterns))
+        self.assertEqual(res['bin'], ['bin'])
+        self.assertEqual(res['sbin'], [])
+        self.assertEqual(res['*.jar'], ['bar.jar', 'foo.jar'])
+        self.assertEqual(res['.*.jar'], ['.hidden.jar'])
+        self.assertEqual(res['lib*'], ['lib', 'lib64'])
+        self.assertEqual(res['*/pkgconfig'], ['lib64/pkgconfig'])
+        self.assertEqual(res['share/*'], ['share/man'])
+        self.assertEqual(res['foo.jar/bar'], [])
+        self.assertEqual(res[os.path.join(self.test_prefix, 'bin')], [os.path.join(self.test_prefix, 'bin')])
+
+        # results are the same as for glob.glob in the given directory
+        ft.change_dir(self.test_prefix)
+        for pattern in patterns:
+            self.assertEqual(res[pattern], sorted(glob.glob(pattern)))
+
     def test_expand_glob_paths(self):
         """Test expand_glob_paths function."""
         for dirname in ['empty_dir', 'test_dir']:
@@ -0,0 +1,129 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for journal.py
+"""
+import json
+import os
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import read_file, write_file
+from easybuild.tools.journal import SessionJournal
+
+
+class MockApp(object):
+    """Mock EasyBlock instance, providing what's needed by SessionJournal.step_completed."""
+
+    def __init__(self, full_mod_name, builddir, src):
+        self.full_mod_name = full_mod_name
+        self.builddir = builddir
+        self.src = src
+
+
+class JournalTest(EnhancedTestCase):
+    """Tests for session journal support."""
+
+    def test_session_journal(self):
+        """Test creating, updating and loading a session journal."""
+        journal_path = os.path.join(self.test_prefix, 'subdir', 'journal.json')
+        journal = SessionJournal(journal_path, command_line=['eb', 'foo.eb', '--robot'])
+        self.assertFalse(os.path.exists(journal_path))
+
+        ecs = [
+            {'spec': '/tmp/bar-1.0.eb', 'full_mod_name': 'bar/1.0'},
+            {'spec': '/tmp/foo-2.0.eb', 'full_mod_name': 'foo/2.0'},
+        ]
+        journal.register(ecs)
+        self.assertTrue(os.path.exists(journal_path))
+        self.assertEqual(journal.unfinished_specs(), ['/tmp/bar-1.0.eb', '/tmp/foo-2.0.eb'])
+
+        # registering same easyconfigs again doesn't result in duplicate entries
+        journal.register(ecs)
+        self.assertEqual(len(journal.entries()), 2)
+
+        journal.install_started('bar/1.0')
+        journal.install_ended('bar/1.0', True)
+        self.assertEqual(journal.unfinished_specs(), ['/tmp/foo-2.0.eb'])
+        self.assertEqual(journal.resume_state('bar/1.0'), None)
+
+        journal.install_started('foo/2.0')
+        self.assertEqual(journal.resume_state('foo/2.0'), None)
+
+        app = MockApp('foo/2.0', '/tmp/build/foo/2.0', [{'name': 'foo.tgz', 'finalpath': '/tmp/build/foo/2.0/foo'}])
+        journal.step_completed(app, 3, 'patch')
+
+        # journal is updated on disk as progress is made
+        journal_data = json.loads(read_file(journal_path))
+        self.assertEqual([e['state'] for e in journal_data['easyconfigs']], ['done', 'running'])
+
+        journal = SessionJournal.load(journal_path)
+        self.assertEqual(journal.data['command_line'], ['eb', 'foo.eb', '--robot'])
+        self.assertEqual(journal.unfinished_specs(), ['/tmp/foo-2.0.eb'])
+        expected = {
+            'builddir': '/tmp/build/foo/2.0',
+            'src_finalpaths': ['/tmp/build/foo/2.0/foo'],
+            'step': 'patch',
+            'step_idx': 3,
+        }
+        self.assertEqual(journal.resume_state('foo/2.0'), expected)
+
+        journal.install_ended('foo/2.0', False)
+        self.assertEqual(journal.unfinished_specs(), ['/tmp/foo-2.0.eb'])
+        self.assertEqual(journal.resume_state('foo/2.0'), expected)
+
+        self.assertErrorRegex(EasyBuildError, "No entry found for nosuchmod/1.0", journal.install_started,
+                              'nosuchmod/1.0')
+
+        # configuration options used for the session are recorded, and checked when resuming it
+        journal = SessionJournal(journal_path, command_line=['eb', 'foo.eb', '--robot', '--debug'],
+                                 options=['--robot', '--debug', "--session-journal='%s'" % journal_path])
+        journal.register(ecs)
+        journal = SessionJournal.load(journal_path)
+        journal.check_options(['--robot', "--resume='%s'" % journal_path])
+        error_pattern = r"Configuration options differ .* \(missing: --robot; unexpected: --force\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, journal.check_options, ['--force'])
+
+    def test_load_broken_journal(self):
+        """Test loading non-existing or broken session journal."""
+        journal_path = os.path.join(self.test_prefix, 'journal.json')
+        self.assertErrorRegex(EasyBuildError, "does not exist", SessionJournal.load, journal_path)
+
+        write_file(journal_path, "this is not JSON")
+        self.assertErrorRegex(EasyBuildError, "Failed to parse session journal", SessionJournal.load, journal_path)
+
+        write_file(journal_path, '{"version": 1234, "easyconfigs": []}')
+        self.assertErrorRegex(EasyBuildError, "Unsupported format version", SessionJournal.load, journal_path)
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(JournalTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    TextTestRunner(verbosity=1).run(suite())
@@ -40,7 +40,8 @@ from easybuild.framework.easyconfig.tools import process_easyconfig
 from easybuild.tools import config
 from easybuild.tools.filetools import mkdir, read_file, write_file
 from easybuild.tools.modules import curr_module_paths
-from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl
+from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, ModuleStatements
+from easybuild.tools.module_generator import dependencies_for
 from easybuild.tools.module_naming_scheme.utilities import is_valid_module_name
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.easyconfig import EasyConfig, ActiveMNS
@@ -503,6 +504,39 @@ class ModuleGeneratorTest(EnhancedTestCase):
         else:
             self.assertEqual('set_alias("key", "value")\n', self.modgen.set_alias("key", "value"))
 
+    def test_render(self):
+        """Test rendering of (syntax-independent) module file statements."""
+        mod_stmts = ModuleStatements()
+        mod_stmts.add('comment', "test")
+        mod_stmts.add('load_module', 'foo/1.2.3')
+        mod_stmts.add('prepend_paths', 'PATH', ['bin', 'sbin'])
+        mod_stmts.add_text('\n')
+        mod_stmts.add('set_environment', 'EBROOTFOO', '', relpath=True)
+        mod_stmts.add('set_alias', 'foo', 'bar')
+        self.assertEqual(len(mod_stmts), 6)
+
+        # rendering is equivalent to calling the corresponding module generator methods
+        expected = ''.join([
+            self.modgen.comment("test"),
+            self.modgen.load_module('foo/1.2.3'),
+            self.modgen.prepend_paths('PATH', ['bin', 'sbin']),
+            '\n',
+            self.modgen.set_environment('EBROOTFOO', '', relpath=True),
+            self.modgen.set_alias('foo', 'bar'),
+        ])
+        self.assertEqual(self.modgen.render(mod_stmts), expected)
+
+        # same statements can be rendered by any module generator
+        other_modgen_class = [ModuleGeneratorLua, ModuleGeneratorTcl][self.MODULE_GENERATOR_CLASS == ModuleGeneratorLua]
+        other_txt = other_modgen_class(self.eb).render(mod_stmts)
+        self.assertTrue(other_txt != expected)
+        self.assertTrue('foo/1.2.3' in other_txt)
+
+        self.assertEqual(self.modgen.render(ModuleStatements()), '')
+
+        error_pattern = "Unknown type of module file statement 'foo'"
+        self.assertErrorRegex(EasyBuildError, error_pattern, mod_stmts.add, 'foo', 'bar')
+
     def test_conditional_statement(self):
         """Test formatting of conditional statements."""
         if self.MODULE_GENERATOR_CLASS == ModuleGeneratorTcl:
@@ -567,6 +601,57 @@ class ModuleGeneratorTest(EnhancedTestCase):
         else:
             self.assertTrue(False, "Unknown module syntax")
 
+    def test_dependencies_for(self):
+        """Test dependencies_for function."""
+        self.reset_modulepath([os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules')])
+        modtool = self.modtool
+
+        direct_deps = [
+            'GCC/4.6.3',
+            'OpenMPI/1.4.5-GCC-4.6.3-no-OFED',
+            'ATLAS/3.8.4-gompi-1.1.0-no-OFED-LAPACK-3.4.0',
+            'FFTW/3.3.1-gompi-1.1.0-no-OFED',
+            'BLACS/1.1-gompi-1.1.0-no-OFED',
+            'ScaLAPACK/1.8.0-gompi-1.1.0-no-OFED-ATLAS-3.8.4-LAPACK-3.4.0-BLACS-1.1',
+        ]
+        self.assertEqual(dependencies_for('goalf/1.1.0-no-OFED', modtool, depth=0), direct_deps)
+
+        # gompi & LAPACK are loaded via multiple dependencies, but are only included once
+        expected = direct_deps + ['gompi/1.1.0-no-OFED', 'LAPACK/3.4.0-gompi-1.1.0-no-OFED']
+        self.assertEqual(dependencies_for('goalf/1.1.0-no-OFED', modtool), expected)
+        self.assertEqual(dependencies_for('goalf/1.1.0-no-OFED', modtool, depth=1), expected)
+
+        # result can be modified without affecting later results
+        res = dependencies_for('gompi/1.3.12', modtool)
+        self.assertEqual(res, ['GCC/4.6.4', 'OpenMPI/1.6.4-GCC-4.6.4', 'hwloc/1.6.2-GCC-4.6.4'])
+        res.append('foo')
+        self.assertEqual(dependencies_for('gompi/1.3.12', modtool, depth=0), ['GCC/4.6.4', 'OpenMPI/1.6.4-GCC-4.6.4'])
+
+        # dependencies of modules that are reached via multiple paths are only determined once
+        graph = {
+            'foss': ['GCC', 'gompi', 'OpenBLAS'],
+            'gompi': ['GCC', 'OpenMPI'],
+            'OpenMPI': ['GCC', 'hwloc'],
+            'OpenBLAS': ['GCC'],
+            'hwloc': ['GCC'],
+            'GCC': [],
+        }
+        queried = []
+
+        class MockModulesTool(object):
+            """Mocked modules tool, which keeps track of which modules were queried."""
+            def module_deps_info(self, mod_name):
+                queried.append(mod_name)
+                return (None, graph[mod_name])
+
+        res = dependencies_for('foss', MockModulesTool())
+        self.assertEqual(res, ['GCC', 'gompi', 'OpenBLAS', 'OpenMPI', 'hwloc'])
+        self.assertEqual(sorted(queried), sorted(graph.keys()))
+
+        queried[:] = []
+        self.assertEqual(dependencies_for('foss', MockModulesTool(), depth=1), ['GCC', 'gompi', 'OpenBLAS', 'OpenMPI'])
+        self.assertEqual(sorted(queried), ['GCC', 'OpenBLAS', 'foss', 'gompi'])
+
     def test_load_msg(self):
         """Test including a load message in the module file."""
         if self.MODULE_GENERATOR_CLASS == ModuleGeneratorTcl:
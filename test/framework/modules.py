@@ -208,6 +208,51 @@ class ModulesTest(EnhancedTestCase):
         self.assertEqual(os.environ.get('EBROOTGCC'), None)
         self.assertFalse(loaded_modules[-1] == 'GCC/4.6.4')
 
+    def test_load_unload_batch(self):
+        """Test loading/unloading multiple modules via a single module command."""
+        self.init_testmods()
+
+        module_cmds = []
+        orig_run_module = self.modtool.run_module
+
+        def run_module(*args, **kwargs):
+            """Wrapper for run_module that keeps track of the module commands being run."""
+            module_cmds.append(args)
+            # not all modules tools report an error when a non-existing module is loaded, so mimic that
+            if 'nosuchmoduleavailableanywhere' in args:
+                raise EasyBuildError("Unable to locate a modulefile for 'nosuchmoduleavailableanywhere'")
+            return orig_run_module(*args, **kwargs)
+
+        self.modtool.run_module = run_module
+
+        mods = ['GCC/4.6.4', 'OpenMPI/1.6.4-GCC-4.6.4']
+        self.modtool.load(mods)
+        self.assertEqual(module_cmds, [('load', 'GCC/4.6.4', 'OpenMPI/1.6.4-GCC-4.6.4')])
+        loaded_modules = self.modtool.loaded_modules()
+        self.assertTrue(all(mod in loaded_modules for mod in mods))
+        self.assertTrue(os.environ.get('EBROOTGCC'))
+
+        module_cmds[:] = []
+        self.modtool.unload(mods[::-1])
+        self.assertEqual(module_cmds, [('unload', 'OpenMPI/1.6.4-GCC-4.6.4', 'GCC/4.6.4')])
+        self.assertEqual(os.environ.get('EBROOTGCC'), None)
+
+        # no module command is run if there's nothing to load
+        module_cmds[:] = []
+        self.modtool.load([])
+        self.assertEqual(module_cmds, [])
+
+        # if loading modules at once fails, modules are loaded one by one, to report which module is to blame
+        mods = ['GCC/4.6.4', 'nosuchmoduleavailableanywhere', 'OpenMPI/1.6.4-GCC-4.6.4']
+        error_pattern = "Unable to locate a modulefile for 'nosuchmoduleavailableanywhere'"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.modtool.load, mods)
+        expected = [tuple(['load'] + mods), ('load', 'GCC/4.6.4'), ('load', 'nosuchmoduleavailableanywhere')]
+        self.assertEqual(module_cmds, expected)
+        self.assertTrue(os.environ.get('EBROOTGCC'))
+        self.assertFalse('OpenMPI/1.6.4-GCC-4.6.4' in self.modtool.loaded_modules())
+
+        self.modtool.run_module = orig_run_module
+
     def test_prepend_module_path(self):
         """Test prepend_module_path method."""
         test_path = tempfile.mkdtemp(prefix=self.test_prefix)
@@ -405,6 +450,71 @@ class ModulesTest(EnhancedTestCase):
         path = self.modtool.path_to_top_of_module_tree(init_modpaths, 'FFTW/3.3.3', full_mod_subdir, deps)
         self.assertEqual(path, ['OpenMPI/1.6.4', 'GCC/4.7.2'])
 
+    def test_path_to_top_of_module_tree_static(self):
+        """Test determining path to top of the module tree via static analysis of module files."""
+        self.setup_hierarchical_modules()
+        mod_prefix = os.path.join(self.test_installpath, 'modules', 'all')
+        core = os.path.join(mod_prefix, 'Core')
+        top_paths = [mod_prefix, core]
+
+        gcc_subdir = os.path.join(mod_prefix, 'Compiler', 'GCC', '4.7.2')
+        ompi_subdir = os.path.join(mod_prefix, 'MPI', 'GCC', '4.7.2', 'OpenMPI', '1.6.4')
+        intel_subdir = os.path.join(mod_prefix, 'Compiler', 'intel', '2013.5.192-GCC-4.8.3')
+
+        index, mod_names = self.modtool.modpath_exts_index(top_paths)
+        self.assertEqual(index[os.path.realpath(gcc_subdir)], [('GCC/4.7.2', os.path.realpath(core))])
+        self.assertEqual(index[os.path.realpath(ompi_subdir)], [('OpenMPI/1.6.4', os.path.realpath(gcc_subdir))])
+        self.assertEqual(sorted(m for (m, _) in index[os.path.realpath(intel_subdir)]),
+                         ['icc/2013.5.192-GCC-4.8.3', 'ifort/2013.5.192-GCC-4.8.3'])
+        for mod_name in ['GCC/4.7.2', 'OpenMPI/1.6.4', 'FFTW/3.3.3', 'hwloc/1.6.2']:
+            self.assertTrue(mod_name in mod_names, "%s found in %s" % (mod_name, mod_names))
+
+        # index is cached
+        self.assertTrue(self.modtool.modpath_exts_index(top_paths)[0] is index)
+
+        # no modules are loaded when determining path to top of module tree statically
+        orig_env = os.environ.copy()
+        module_cmds = []
+        orig_run_module = self.modtool.run_module
+
+        def run_module(*args, **kwargs):
+            """Wrapper for run_module that keeps track of the module commands being run."""
+            module_cmds.append(args)
+            return orig_run_module(*args, **kwargs)
+
+        self.modtool.run_module = run_module
+
+        deps = ['GCC/4.7.2', 'OpenMPI/1.6.4']
+        path = self.modtool.path_to_top_of_module_tree(top_paths, 'FFTW/3.3.3', ompi_subdir, deps)
+        self.assertEqual(path, ['OpenMPI/1.6.4', 'GCC/4.7.2'])
+        path = self.modtool.path_to_top_of_module_tree(top_paths, 'OpenMPI/1.6.4', gcc_subdir, ['GCC/4.7.2'])
+        self.assertEqual(path, ['GCC/4.7.2'])
+        deps = ['icc/2013.5.192-GCC-4.8.3', 'ifort/2013.5.192-GCC-4.8.3']
+        path = self.modtool.path_to_top_of_module_tree(top_paths, 'impi/4.1.3.049', intel_subdir, deps)
+        self.assertEqual(path, deps)
+        path = self.modtool.path_to_top_of_module_tree(top_paths, 'GCC/4.7.2', core, [])
+        self.assertEqual(path, [])
+
+        self.assertEqual(module_cmds, [])
+        self.assertEqual(os.environ, orig_env)
+
+        self.modtool.run_module = orig_run_module
+
+        # static analysis is not possible if some dependencies are not located in module tree
+        res = self.modtool.path_to_top_of_module_tree_static(top_paths, 'foo/1.0', ompi_subdir, ['bar/1.0'])
+        self.assertEqual(res, None)
+
+        # index is rebuilt after a module file in the module tree is changed
+        write_file(os.path.join(core, 'foo', '1.0'), '#%%Module\nmodule use %s\n' % ompi_subdir)
+        invalidate_module_caches_for(os.path.join(core, 'foo'))
+        index = self.modtool.modpath_exts_index(top_paths)[0]
+        self.assertEqual(sorted(index[os.path.realpath(ompi_subdir)]),
+                         [('OpenMPI/1.6.4', os.path.realpath(gcc_subdir)), ('foo/1.0', os.path.realpath(core))])
+
+        reset_module_caches()
+        self.assertEqual(mod.MODPATH_EXTS_INDEX_CACHE, {})
+        self.assertEqual(mod.MODFILE_MODPATH_EXTS_CACHE, {})
+
     def test_path_to_top_of_module_tree_lua(self):
         """Test path_to_top_of_module_tree function on modules in Lua syntax."""
         if isinstance(self.modtool, Lmod):
@@ -479,6 +589,41 @@ class ModulesTest(EnhancedTestCase):
         tcl_str = '[ file join $env(TEST_VAR) "foo/bar" ]'
         self.assertEqual(self.modtool.interpret_raw_path_tcl(tcl_str), 'test123/foo/bar')
 
+    def test_module_deps_info(self):
+        """Test module_deps_info method."""
+        self.init_testmods()
+        test_mods_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules')
+
+        res = self.modtool.module_deps_info('gompi/1.3.12')
+        self.assertTrue(os.path.samefile(res[0], os.path.join(test_mods_dir, 'gompi', '1.3.12')))
+        self.assertEqual(res[1:], (['GCC/4.6.4', 'OpenMPI/1.6.4-GCC-4.6.4'], []))
+
+        # commented out 'module load' statements are not taken into account
+        res = self.modtool.module_deps_info('goalf/1.1.0-no-OFED-brokenBLACS')
+        self.assertFalse('BLACS/1.1-gompi-1.1.0-no-OFED' in res[1])
+        self.assertEqual(len(res[1]), 5)
+
+        # result is cached, so module file is not processed again
+        self.assertTrue(self.modtool.module_deps_info('goalf/1.1.0-no-OFED-brokenBLACS') is res)
+        self.assertTrue(any(key[-1] == 'goalf/1.1.0-no-OFED-brokenBLACS' for key in mod.MODULE_DEPS_CACHE))
+
+        # module file is located via 'module show' for partial module names (default module version)
+        res = self.modtool.module_deps_info('GCC')
+        self.assertTrue(os.path.samefile(os.path.dirname(res[0]), os.path.join(test_mods_dir, 'GCC')))
+
+        # $MODULEPATH extensions are determined too
+        self.setup_hierarchical_modules()
+        mod_dir = os.path.join(self.test_installpath, 'modules', 'all')
+        res = self.modtool.module_deps_info('GCC/4.7.2')
+        self.assertEqual(res, (os.path.join(mod_dir, 'Core', 'GCC', '4.7.2'), [],
+                               [os.path.join(mod_dir, 'Compiler', 'GCC', '4.7.2')]))
+
+        error_pattern = "Can't get value from a non-existing module"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.modtool.module_deps_info, 'nosuchmodule/1.2')
+
+        reset_module_caches()
+        self.assertEqual(mod.MODULE_DEPS_CACHE, {})
+
     def test_modpath_extensions_for(self):
         """Test modpath_extensions_for method."""
         self.setup_hierarchical_modules()
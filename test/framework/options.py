@@ -31,6 +31,7 @@ import glob
 import os
 import re
 import shutil
+import stat
 import sys
 import tempfile
 from unittest import TextTestRunner
@@ -49,11 +50,13 @@ from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import DEFAULT_MODULECLASSES
 from easybuild.tools.config import find_last_log, get_build_log_path, get_module_syntax, module_classes
 from easybuild.tools.environment import modify_env
-from easybuild.tools.filetools import copy_dir, copy_file, download_file, mkdir, read_file, remove_file, write_file
+from easybuild.tools.filetools import adjust_permissions, copy_dir, copy_file, download_file, mkdir, read_file
+from easybuild.tools.filetools import remove_file, write_file
 from easybuild.tools.github import GITHUB_RAW, GITHUB_EB_MAIN, GITHUB_EASYCONFIGS_REPO, URL_SEPARATOR
 from easybuild.tools.github import fetch_github_token
 from easybuild.tools.modules import Lmod
-from easybuild.tools.options import EasyBuildOptions, parse_external_modules_metadata, set_tmpdir, use_color
+from easybuild.tools.options import EasyBuildOptions, parse_external_modules_metadata, scan_profiling_options
+from easybuild.tools.options import set_tmpdir, use_color
 from easybuild.tools.toolchain.utilities import TC_CONST_PREFIX
 from easybuild.tools.run import run_cmd
 from easybuild.tools.version import VERSION
@@ -684,6 +687,62 @@ class CommandLineOptionsTest(EnhancedTestCase):
         self.mock_stdout(False)
         self.assertTrue(re.search('GCC-4.9.2', txt))
 
+    def test_search_index(self):
+        """Test searching for easyconfigs using structured queries and (persistent) easyconfig index."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        extra_ecs_dir = os.path.join(self.test_prefix, 'ecs')
+        mkdir(extra_ecs_dir)
+
+        def search(query):
+            """Run search with specified query, return output."""
+            args = [
+                '--search-filename=%s' % query,
+                '--search-paths=%s' % extra_ecs_dir,
+                '--cache-dir=%s' % cache_dir,
+                '--search-threads=3',
+                '--terse',
+            ]
+            self.mock_stdout(True)
+            self.eb_main(args, testing=False, raise_error=True)
+            txt = self.get_stdout()
+            self.mock_stdout(False)
+            return txt.strip().split('\n')
+
+        # regular expressions for filenames still work as before
+        self.assertEqual(search('^gcc-4.6'), ['GCC-4.6.3.eb', 'GCC-4.6.4.eb'])
+        self.assertTrue(os.path.exists(os.path.join(cache_dir, 'easyconfig_index.json')))
+
+        # structured queries, results are ranked (latest version first)
+        self.assertEqual(search('name=gcc version=4.6*'), ['GCC-4.6.4.eb', 'GCC-4.6.3.eb'])
+        self.assertEqual(search('name=gzip toolchain=GCC/4.6.3'), ['gzip-1.4-GCC-4.6.3.eb'])
+        self.assertEqual(search('name=gzip toolchain=goolf'), ['gzip-1.5-goolf-1.4.10.eb'])
+        self.assertEqual(search('name=toy versionsuffix=-test gompi'), ['toy-0.0-gompi-1.3.12-test.eb'])
+        self.assertEqual(search('name=no-such-software'), [''])
+
+        # index is updated incrementally
+        gcc_ec_txt = read_file(os.path.join(test_ecs_dir, 'g', 'GCC', 'GCC-4.6.4.eb'))
+        write_file(os.path.join(extra_ecs_dir, 'GCC-4.6.5.eb'), gcc_ec_txt.replace('4.6.4', '4.6.5'))
+        # hits are ranked per search path, robot search path comes first
+        self.assertEqual(search('name=gcc version=4.6*'), ['GCC-4.6.4.eb', 'GCC-4.6.3.eb', 'GCC-4.6.5.eb'])
+        self.assertEqual(search('^gcc-4.6'), ['GCC-4.6.3.eb', 'GCC-4.6.4.eb', 'GCC-4.6.5.eb'])
+
+        # metadata is updated for changed easyconfig files
+        write_file(os.path.join(extra_ecs_dir, 'GCC-4.6.5.eb'), gcc_ec_txt.replace("'compiler'", "'lib'"))
+        self.assertEqual(search('version=4.6* moduleclass=lib'), ['GCC-4.6.5.eb'])
+
+        remove_file(os.path.join(extra_ecs_dir, 'GCC-4.6.5.eb'))
+        self.assertEqual(search('name=gcc version=4.6*'), ['GCC-4.6.4.eb', 'GCC-4.6.3.eb'])
+
+        # failing to save the index (e.g. read-only cache directory) doesn't make the search fail
+        write_file(os.path.join(extra_ecs_dir, 'GCC-4.6.5.eb'), gcc_ec_txt.replace('4.6.4', '4.6.5'))
+        adjust_permissions(cache_dir, stat.S_IWUSR, add=False)
+        try:
+            self.assertEqual(search('^gcc-4.6.5'), ['GCC-4.6.5.eb'])
+        finally:
+            adjust_permissions(cache_dir, stat.S_IWUSR, add=True)
+        self.assertEqual(os.listdir(cache_dir), ['easyconfig_index.json'])
+
     def test_search_archived(self):
         "Test searching for archived easyconfigs"
         args = ['--search-filename=^ictce']
@@ -3547,6 +3606,64 @@ class CommandLineOptionsTest(EnhancedTestCase):
         self.assertEqual(len(toy_tar_backups), 1)
         self.assertTrue(os.path.basename(toy_tar_backups[0]).startswith('toy-0.0.tar.gz.bak_'))
 
+    def test_profile(self):
+        """Test --profile and --trace-hotpaths."""
+        pstats_file = os.path.join(self.test_prefix, 'test.pstats')
+        args = [
+            'gzip-1.4-GCC-4.6.3.eb',
+            '--dry-run',
+            '--profile=%s' % pstats_file,
+            '--trace-hotpaths',
+        ]
+        self.mock_stdout(True)
+        self.eb_main(args, raise_error=True)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        patterns = [
+            r"^== profiling summary \(total time: [0-9.]+s\)$",
+            r"^  easyconfig parsing\s+[0-9.]+s\s+[0-9.]+s$",
+            r"^  robot\s+[0-9.]+s\s+[0-9.]+s$",
+            r"^  run_cmd\s+[0-9]+ calls,\s+[0-9]+ subprocesses, [0-9.]+s$",
+            r"^time spent outside of run_cmd/run_module: [0-9.]+s$",
+            r"^hot paths \(framework functions with largest cumulative time\):$",
+            r"^\s+[0-9.]+s\s+1 calls  easybuild/main.py:[0-9]+\(main\)$",
+            r"^== profiling statistics written to %s" % pstats_file,
+        ]
+        for pattern in patterns:
+            regex = re.compile(pattern, re.M)
+            self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+        self.assertTrue(os.path.exists(pstats_file))
+
+        # without --trace-hotpaths, no overview of hot paths is included
+        self.mock_stdout(True)
+        self.eb_main(args[:-1], raise_error=True)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertTrue("profiling summary" in stdout)
+        self.assertFalse("hot paths" in stdout)
+
+    def test_scan_profiling_options(self):
+        """Test scan_profiling_options function."""
+        self.assertEqual(scan_profiling_options([]), (None, False))
+        self.assertEqual(scan_profiling_options(['toy-0.0.eb', '--profile']), ('eb-profile.pstats', False))
+        self.assertEqual(scan_profiling_options(['--profile', '--robot']), ('eb-profile.pstats', False))
+        self.assertEqual(scan_profiling_options(['--profile', 'test.pstats']), ('test.pstats', False))
+        self.assertEqual(scan_profiling_options(['--profile=test.pstats', '-D']), ('test.pstats', False))
+        self.assertEqual(scan_profiling_options(['--profile=']), (None, False))
+        self.assertEqual(scan_profiling_options(['--trace-hotpaths']), (None, True))
+        self.assertEqual(scan_profiling_options(['--', '--trace-hotpaths']), (None, False))
+
+        os.environ['EASYBUILD_PROFILE'] = 'env.pstats'
+        os.environ['EASYBUILD_TRACE_HOTPATHS'] = '1'
+        self.assertEqual(scan_profiling_options([]), ('env.pstats', True))
+        # command line options have precedence over environment
+        res = scan_profiling_options(['--profile=test.pstats', '--disable-trace-hotpaths'])
+        self.assertEqual(res, ('test.pstats', False))
+
+        os.environ['EASYBUILD_TRACE_HOTPATHS'] = 'no'
+        self.assertEqual(scan_profiling_options([]), ('env.pstats', False))
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -27,10 +27,16 @@ Unit tests for packaging support.
 
 @author: Kenneth Hoste (Ghent University)
 """
+import gzip
+import hashlib
 import os
 import re
 import stat
+import struct
 import sys
+import tarfile
+import zlib
+from StringIO import StringIO
 
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
@@ -38,7 +44,10 @@ from unittest import TextTestRunner
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.tools.config import log_path
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import adjust_permissions, read_file, write_file
+from easybuild.tools.filetools import adjust_permissions, read_file, which, write_file
+from easybuild.tools.package.native import HAVE_ZSTANDARD, RPMTAG_HEADERIMMUTABLE, RPM_TYPE_INT32
+from easybuild.tools.package.native import ParallelGzipWriter, _rpm_signature, rpm_header
+from easybuild.tools.run import run_cmd
 from easybuild.tools.package.utilities import ActivePNS, avail_package_naming_schemes, check_pkg_support, package
 from easybuild.tools.version import VERSION as EASYBUILD_VERSION
 
@@ -138,6 +147,51 @@ fp.close()
 """
 
 
+def parse_rpm_header(data, offset):
+    """Parse RPM header structure at specified offset, return dict with tag values and offset of end of header."""
+    if data[offset:offset + 8] != '\x8e\xad\xe8\x01\x00\x00\x00\x00':
+        raise ValueError("No RPM header found at offset %d" % offset)
+    cnt, size = struct.unpack('>ii', data[offset + 8:offset + 16])
+    store_offset = offset + 16 + cnt * 16
+    store = data[store_offset:store_offset + size]
+
+    tags = {}
+    for idx in range(cnt):
+        tag, typ, off, count = struct.unpack('>iiii', data[offset + 16 + idx * 16:offset + 32 + idx * 16])
+        if typ == 3:
+            tags[tag] = list(struct.unpack('>%dH' % count, store[off:off + 2 * count]))
+        elif typ == 4:
+            tags[tag] = list(struct.unpack('>%dI' % count, store[off:off + 4 * count]))
+        elif typ == 5:
+            tags[tag] = list(struct.unpack('>%dQ' % count, store[off:off + 8 * count]))
+        elif typ in [6, 9]:
+            tags[tag] = store[off:].split('\0')[0]
+        elif typ == 7:
+            tags[tag] = store[off:off + count]
+        elif typ == 8:
+            tags[tag] = store[off:].split('\0')[:count]
+
+    return (tags, store_offset + size)
+
+
+def parse_cpio(data):
+    """Parse cpio archive in SVR4 'newc' format, return dict with (mode, contents) for each entry."""
+    res = {}
+    offset = 0
+    while True:
+        fields = [int(data[offset + 6 + i * 8:offset + 14 + i * 8], 16) for i in range(13)]
+        mode, filesize, namesize = fields[1], fields[6], fields[11]
+        name = data[offset + 110:offset + 110 + namesize - 1]
+        offset += 110 + namesize
+        offset += -offset % 4
+        if name == 'TRAILER!!!':
+            break
+        res[name] = (mode, data[offset:offset + filesize])
+        offset += filesize
+        offset += -offset % 4
+    return res
+
+
 def mock_fpm(tmpdir):
     """Put mocked version of fpm command in place in specified tmpdir."""
     # put mocked 'fpm' command in place, just for testing purposes
@@ -262,6 +316,147 @@ class PackageTest(EnhancedTestCase):
         regex_pkg = re.compile(r"""DESCRIPTION:.*\nand newlines""", re.MULTILINE)
         self.assertTrue(regex_pkg.search(pkgtxt), "Pattern '%s' not found in: %s" % (regex_pkg.pattern, pkgtxt))
 
+    def test_parallel_gzip_writer(self):
+        """Test ParallelGzipWriter."""
+        data = ''.join(str(i) for i in range(100000))
+        for parallel in [1, 3]:
+            out = StringIO()
+            writer = ParallelGzipWriter(out, parallel=parallel, block_size=1000)
+            for idx in range(0, len(data), 333):
+                writer.write(data[idx:idx + 333])
+            writer.close()
+            # result consists of a bunch of gzip members, which form a valid gzip stream
+            self.assertTrue(out.getvalue().count('\x1f\x8b\x08') > 100)
+            self.assertEqual(gzip.GzipFile(fileobj=StringIO(out.getvalue())).read(), data)
+
+        # writing nothing results in a valid (empty) gzip stream too
+        out = StringIO()
+        ParallelGzipWriter(out).close()
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(out.getvalue())).read(), '')
+
+    def test_package_native(self):
+        """Test packaging with native packaging backend."""
+        init_config(build_options={'package_tool': 'native', 'package_type': 'foo', 'silent': True})
+        self.assertErrorRegex(EasyBuildError, "Package type 'foo' is not supported", check_pkg_support)
+        init_config(build_options={'package_tool': 'native', 'package_type': 'tar.zst', 'silent': True})
+        if HAVE_ZSTANDARD:
+            check_pkg_support()
+        else:
+            self.assertErrorRegex(EasyBuildError, "'zstandard' is required", check_pkg_support)
+
+        init_config(build_options={'package_tool': 'native', 'package_type': 'rpm', 'silent': True})
+        # no external tools required
+        orig_path = os.environ['PATH']
+        os.environ['PATH'] = ''
+        check_pkg_support()
+        os.environ['PATH'] = orig_path
+
+        topdir = os.path.dirname(os.path.abspath(__file__))
+        toy_ec = os.path.join(topdir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0-gompi-1.3.12-test.eb')
+        ec = EasyConfig(toy_ec, validate=False)
+
+        # import needs to be done here, since test easyblocks are only included later
+        from easybuild.easyblocks.toy import EB_toy
+        easyblock = EB_toy(ec)
+        easyblock.run_all_steps(False)
+
+        write_file(os.path.join(easyblock.installdir, log_path(), "logfile.log"), "I'm a logfile")
+        os.symlink('toy', os.path.join(easyblock.installdir, 'bin', 'toy_link'))
+        toy_bin = os.path.join(easyblock.installdir, 'bin', 'toy')
+        mod_filepath = easyblock.module_generator.get_module_filepath()
+
+        pkgdir = package(easyblock)
+        pkgs = os.listdir(pkgdir)
+        self.assertEqual(len(pkgs), 1)
+        regex = re.compile(r'^toy-0.0-gompi-1.3.12-test-eb-%s-1\.[^.]+\.rpm$' % EASYBUILD_VERSION)
+        self.assertTrue(regex.match(pkgs[0]), "Pattern '%s' matches '%s'" % (regex.pattern, pkgs[0]))
+
+        rpm = read_file(os.path.join(pkgdir, pkgs[0]))
+        self.assertEqual(rpm[:6], '\xed\xab\xee\xdb\x03\x00')
+
+        sig, offset = parse_rpm_header(rpm, 96)
+        # signature header is padded to multiple of 8 bytes
+        offset += -offset % 8
+        header, payload_offset = parse_rpm_header(rpm, offset)
+
+        # check immutable region trailers
+        self.assertEqual(struct.unpack('>iiii', sig[62]), (62, 7, -6 * 16, 16))
+        self.assertEqual(struct.unpack('>iiii', header[63])[:2], (63, 7))
+
+        # check signature
+        self.assertEqual(sig[1000], [len(rpm) - offset])
+        self.assertEqual(sig[1004], hashlib.md5(rpm[offset:]).digest())
+        self.assertEqual(sig[269], hashlib.sha1(rpm[offset:payload_offset]).hexdigest())
+
+        # check metadata
+        self.assertEqual(header[1000], 'toy-0.0-gompi-1.3.12-test')
+        self.assertEqual(header[1001], 'eb-%s' % EASYBUILD_VERSION)
+        self.assertEqual(header[1002], '1')
+        self.assertEqual(header[1005], "Toy C program, 100% toy.")
+        self.assertEqual(header[1020], 'https://easybuilders.github.io/easybuild')
+        self.assertEqual(header[1049][:2], ['gompi-1.3.12', 'rpmlib(CompressedFileNames)'])
+        self.assertEqual(header[1047], ['toy-0.0-gompi-1.3.12-test'])
+
+        # check file list, log files are excluded
+        paths = [header[1118][idx] + name for idx, name in zip(header[1116], header[1117])]
+        self.assertEqual(paths, sorted(paths))
+        self.assertTrue(easyblock.installdir in paths)
+        self.assertTrue(toy_bin in paths)
+        self.assertTrue(mod_filepath in paths)
+        self.assertFalse(any(p.endswith('.log') for p in paths))
+        toy_idx = paths.index(toy_bin)
+        self.assertEqual(header[1028][toy_idx], os.path.getsize(toy_bin))
+        self.assertEqual(header[1035][toy_idx], hashlib.sha256(read_file(toy_bin)).hexdigest())
+        self.assertEqual(header[1036][paths.index(toy_bin + '_link')], 'toy')
+
+        # check payload: gzip-compressed cpio archive, with same (order of) files as in header
+        payload = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(rpm[payload_offset:])
+        self.assertEqual(sig[1007], [len(payload)])
+        cpio = parse_cpio(payload)
+        self.assertEqual(sorted(cpio.keys()), ['.' + p for p in paths])
+        self.assertEqual(cpio['.' + toy_bin], (os.stat(toy_bin).st_mode, read_file(toy_bin)))
+        self.assertEqual(cpio['.' + toy_bin + '_link'][1], 'toy')
+        self.assertEqual(cpio['.' + mod_filepath][1], read_file(mod_filepath))
+
+        # packaging as tarball
+        init_config(build_options={'package_tool': 'native', 'package_type': 'tar.gz', 'silent': True})
+        pkgdir = package(easyblock)
+        pkg = os.path.join(pkgdir, 'toy-0.0-gompi-1.3.12-test-eb-%s-1.tar.gz' % EASYBUILD_VERSION)
+        self.assertTrue(os.path.exists(pkg))
+        tar = tarfile.open(pkg, 'r:gz')
+        self.assertEqual(sorted('/' + m.name for m in tar.getmembers()), paths)
+        self.assertEqual(tar.extractfile(toy_bin.lstrip(os.path.sep)).read(), read_file(toy_bin))
+        self.assertEqual(tar.pax_headers['EASYBUILD.name'], 'toy-0.0-gompi-1.3.12-test')
+        self.assertEqual(tar.pax_headers['EASYBUILD.depends'], 'gompi-1.3.12')
+        tar.close()
+
+        # verify RPM package with rpm itself, if it's available
+        if which('rpm'):
+            rpm_path = os.path.join(pkgdir, pkgs[0])
+            out, ec = run_cmd("rpm -K --nosignature %s" % rpm_path, simple=False)
+            self.assertEqual(ec, 0)
+            self.assertTrue(re.search(r'(digests|md5) OK', out, re.I), "digests OK in: %s" % out)
+            out, ec = run_cmd("rpm -qpl %s" % rpm_path, simple=False)
+            self.assertEqual(sorted(out.strip().split('\n')), paths)
+
+    def test_rpm_large_sizes(self):
+        """Test use of 64-bit RPM header tags for sizes of 4GiB or more."""
+        header = rpm_header([(1000, 6, 'foo')], RPMTAG_HEADERIMMUTABLE)
+
+        sig = parse_rpm_header(_rpm_signature(123, 'x' * 16, 456, header), 0)[0]
+        self.assertEqual((sig[1000], sig[1007]), ([123], [456]))
+        self.assertFalse(270 in sig or 271 in sig)
+
+        sig_data = _rpm_signature(5 * 2 ** 30, 'x' * 16, 6 * 2 ** 30, header)
+        self.assertEqual(len(sig_data) % 8, 0)
+        sig = parse_rpm_header(sig_data, 0)[0]
+        self.assertEqual((sig[270], sig[271]), ([5 * 2 ** 30], [6 * 2 ** 30]))
+        self.assertFalse(1000 in sig or 1007 in sig)
+
+        # sizes are never silently truncated
+        self.assertErrorRegex(EasyBuildError, "out of range", rpm_header, [(1000, RPM_TYPE_INT32, [2 ** 32])],
+                              RPMTAG_HEADERIMMUTABLE)
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -0,0 +1,149 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for profiling.py
+"""
+import os
+import pstats
+import re
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig
+from easybuild.tools.filetools import find_easyconfigs
+from easybuild.tools.profiling import det_subsystem, format_func_key, profiling_active, run_profiled
+from easybuild.tools.profiling import summarize_subprocesses, summarize_subsystems
+from easybuild.tools.run import run_cmd
+
+
+class ProfilingTest(EnhancedTestCase):
+    """Tests for profiling support."""
+
+    def test_det_subsystem(self):
+        """Test det_subsystem function."""
+        topdir = '/path/to/easybuild-framework'
+        tests = [
+            (('easybuild/framework/easyconfig/easyconfig.py', 1, 'process_easyconfig'), 'easyconfig parsing'),
+            (('easybuild/framework/easyconfig/format/one.py', 1, 'parse'), 'easyconfig parsing'),
+            (('easybuild/framework/easyconfig/easyconfig.py', 1, 'resolve_template'), 'templating'),
+            (('easybuild/framework/easyconfig/templates.py', 1, 'template_constant_dict'), 'templating'),
+            (('easybuild/framework/easyconfig/easyconfig.py', 1, 'robot_find_easyconfig'), 'robot'),
+            (('easybuild/tools/robot.py', 1, 'resolve_dependencies'), 'robot'),
+            (('easybuild/tools/modules.py', 1, 'available'), 'modules tool'),
+            (('easybuild/tools/module_generator.py', 1, 'load_module'), 'module generation'),
+            (('easybuild/tools/toolchain/toolchain.py', 1, 'prepare'), 'toolchain'),
+            (('easybuild/toolchains/gompi.py', 1, '__init__'), 'toolchain'),
+            (('easybuild/tools/filetools.py', 1, 'find_easyconfigs'), 'filesystem scans'),
+            (('easybuild/tools/filetools.py', 1, 'read_file'), None),
+            (('easybuild/tools/run.py', 1, 'run_cmd'), 'run_cmd'),
+            (('easybuild/main.py', 1, 'main'), None),
+        ]
+        for (filename, lineno, func_name), subsystem in tests:
+            self.assertEqual(det_subsystem((os.path.join(topdir, filename), lineno, func_name)), subsystem)
+
+        self.assertEqual(det_subsystem(('/usr/lib/python2.7/os.py', 1, 'walk')), 'filesystem scans')
+        self.assertEqual(det_subsystem(('~', 0, '<posix.listdir>')), 'filesystem scans')
+        self.assertEqual(det_subsystem(('~', 0, '<len>')), None)
+
+        func_key = (os.path.join(topdir, 'easybuild', 'tools', 'robot.py'), 123, 'resolve_dependencies')
+        self.assertEqual(format_func_key(func_key), 'easybuild/tools/robot.py:123(resolve_dependencies)')
+
+    def test_run_profiled(self):
+        """Test run_profiled function."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+
+        def test_func(path, cnt):
+            """Function to profile."""
+            self.assertTrue(profiling_active())
+            for ec_file in find_easyconfigs(path)[:cnt]:
+                process_easyconfig(ec_file)
+            run_cmd("echo foo")
+            run_cmd("echo bar")
+            return 'done'
+
+        pstats_file = os.path.join(self.test_prefix, 'test.pstats')
+        self.mock_stdout(True)
+        res = run_profiled(test_func, args=[test_ecs], kwargs={'cnt': 5}, pstats_file=pstats_file,
+                           trace_hotpaths=True)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        self.assertEqual(res, 'done')
+        self.assertFalse(profiling_active())
+
+        patterns = [
+            r"^== profiling summary \(total time: [0-9.]+s\)$",
+            r"^  easyconfig parsing\s+[0-9.]+s\s+[0-9.]+s$",
+            r"^  filesystem scans\s+[0-9.]+s\s+[0-9.]+s$",
+            r"^  run_cmd\s+2 calls,\s+2 subprocesses, [0-9.]+s$",
+            r"^  run_module\s+[0-9]+ calls,\s+[0-9]+ subprocesses, [0-9.]+s$",
+            r"^time spent outside of run_cmd/run_module: [0-9.]+s$",
+            r"^hot paths \(framework functions with largest cumulative time\):$",
+            r"^\s+[0-9.]+s\s+5 calls  easybuild/framework/easyconfig/easyconfig.py:[0-9]+\(process_easyconfig\)$",
+            r"^== profiling statistics written to %s" % pstats_file,
+        ]
+        for pattern in patterns:
+            regex = re.compile(pattern, re.M)
+            self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+
+        # profiling statistics can be loaded from dumped pstats file
+        stats = pstats.Stats(pstats_file)
+        subsystems = summarize_subsystems(stats)
+        self.assertTrue(subsystems['easyconfig parsing'][0] > 0)
+        self.assertTrue(subsystems['easyconfig parsing'][0] >= subsystems['easyconfig parsing'][1])
+        self.assertEqual(summarize_subprocesses(stats)['run_cmd'][0], 2)
+
+        # summary is also printed when function being profiled raises an error
+        def broken():
+            """Broken function."""
+            raise ValueError("oops")
+
+        self.mock_stdout(True)
+        self.assertErrorRegex(ValueError, "oops", run_profiled, broken)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertTrue(stdout.startswith("== profiling summary"))
+        self.assertFalse(profiling_active())
+
+        # failing to write profiling statistics results in a warning, not an error that masks the original one
+        pstats_file = os.path.join(self.test_prefix, 'nosuchdir', 'test.pstats')
+        self.mock_stdout(True)
+        self.mock_stderr(True)
+        self.assertErrorRegex(ValueError, "oops", run_profiled, broken, pstats_file=pstats_file)
+        stderr = self.get_stderr()
+        self.mock_stdout(False)
+        self.mock_stderr(False)
+        self.assertTrue("WARNING: Failed to write profiling statistics to %s" % pstats_file in stderr)
+        self.assertFalse(os.path.exists(pstats_file))
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(ProfilingTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    TextTestRunner(verbosity=1).run(suite())
@@ -0,0 +1,132 @@
+# #
+# Copyright 2017-2017 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for resource_usage.py
+"""
+import json
+import os
+import subprocess
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.filetools import read_file
+from easybuild.tools.resource_usage import get_resource_usage, get_subprocess_counts, poll_subprocess, read_io_counters
+from easybuild.tools.resource_usage import resource_usage_since, write_resource_usage_report
+from easybuild.tools.run import run_cmd
+
+
+class ResourceUsageTest(EnhancedTestCase):
+    """Tests for resource usage tracking."""
+
+    def test_resource_usage(self):
+        """Test get_resource_usage and resource_usage_since functions."""
+        start = get_resource_usage()
+        for key in ['bytes_read', 'bytes_written', 'cpu_time', 'subprocesses', 'subprocesses_waited', 'wall_time']:
+            self.assertTrue(key in start)
+
+        run_cmd_cnt = get_subprocess_counts().get('run_cmd', 0)
+        run_cmd("echo hello > %s" % os.path.join(self.test_prefix, 'hello.txt'))
+        run_cmd("cat %s" % os.path.join(self.test_prefix, 'hello.txt'))
+        self.assertEqual(get_subprocess_counts()['run_cmd'], run_cmd_cnt + 2)
+
+        usage = resource_usage_since(start, 'foo', 'step')
+        self.assertEqual(usage['name'], 'foo')
+        self.assertEqual(usage['kind'], 'step')
+        self.assertEqual(usage['subprocesses'], 2)
+        self.assertTrue(usage['wall_time'] >= 0)
+        self.assertTrue(usage['cpu_time'] >= 0)
+        self.assertTrue(usage['max_rss_children'] > 0)
+
+        if os.path.exists('/proc/self/io'):
+            self.assertTrue(all(isinstance(x, (int, long)) for x in read_io_counters()))
+            self.assertTrue(usage['bytes_written'] > 0)
+            self.assertTrue(usage['bytes_read'] > 0)
+
+        # max RSS of child processes is only reported if subprocesses terminated in between snapshots
+        start = get_resource_usage()
+        usage = resource_usage_since(start, 'bar', 'extension')
+        self.assertEqual(usage['max_rss_children'], None)
+
+        # max RSS is determined for each subprocess separately, it's not a high-water mark across subprocesses
+        script = "x = ' ' * %d * 1024 * 1024"
+        for size in [64, 1]:
+            start = get_resource_usage()
+            run_cmd("python -c \"%s\"" % (script % size))
+            usage = resource_usage_since(start, 'test%d' % size, 'step')
+            self.assertTrue(usage['max_rss_children'] > 0)
+            if size == 64:
+                max_rss_large = usage['max_rss_children']
+                self.assertTrue(max_rss_large > 64 * 1024)
+            else:
+                self.assertTrue(usage['max_rss_children'] < max_rss_large)
+
+    def test_poll_subprocess(self):
+        """Test poll_subprocess function."""
+        start = get_resource_usage()
+        proc = subprocess.Popen(['sh', '-c', 'read x; exit 3'], stdin=subprocess.PIPE)
+        self.assertEqual(poll_subprocess(proc), None)
+        proc.stdin.write('\n')
+        proc.stdin.close()
+        while poll_subprocess(proc) is None:
+            pass
+        self.assertEqual(proc.returncode, 3)
+        self.assertEqual(poll_subprocess(proc), 3)
+        self.assertEqual(get_resource_usage()['subprocesses_waited'], start['subprocesses_waited'] + 1)
+
+        # exit code for subprocess that was killed by a signal is negative signal number
+        proc = subprocess.Popen(['sh', '-c', 'kill -9 $$'])
+        while poll_subprocess(proc) is None:
+            pass
+        self.assertEqual(proc.returncode, -9)
+
+        # subprocess that was already waited for is handled fine
+        proc = subprocess.Popen(['true'])
+        proc.wait()
+        self.assertEqual(poll_subprocess(proc), 0)
+
+    def test_write_resource_usage_report(self):
+        """Test write_resource_usage_report function."""
+        records = [
+            {'kind': 'step', 'name': 'configure', 'wall_time': 1.5},
+            {'kind': 'extension', 'name': 'bar', 'wall_time': 0.5},
+            {'kind': 'step', 'name': 'extensions', 'wall_time': 0.75},
+        ]
+        report_path = os.path.join(self.test_prefix, 'report.json')
+        write_resource_usage_report(report_path, 'foo/1.0', records)
+
+        report = json.loads(read_file(report_path))
+        self.assertEqual(report['label'], 'foo/1.0')
+        self.assertEqual(report['records'], records)
+        self.assertEqual(report['total_wall_time'], 2.25)
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(ResourceUsageTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    TextTestRunner(verbosity=1).run(suite())
@@ -28,9 +28,11 @@ Unit tests for robot (dependency resolution).
 @author: Toon Willems (Ghent University)
 """
 
+import json
 import os
 import re
 import shutil
+import stat
 import sys
 import tempfile
 from copy import deepcopy
@@ -43,15 +45,16 @@ import easybuild.tools.build_log
 import easybuild.tools.robot as robot
 from easybuild.framework.easyconfig.easyconfig import _easyconfig_files_cache, process_easyconfig, EasyConfig
 from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, find_resolved_modules, parse_easyconfigs
+from easybuild.framework.easyconfig.toolchain_graph import ToolchainGraph
 from easybuild.framework.easyconfig.tweak import tweak
-from easybuild.framework.easyconfig.easyconfig import get_toolchain_hierarchy
+from easybuild.framework.easyconfig.easyconfig import find_toolchains_with_easyconfig, get_toolchain_hierarchy
 from easybuild.framework.easyconfig.easyconfig import robot_find_minimal_toolchain_of_dependency
 from easybuild.framework.easyconfig.tools import skip_available
 from easybuild.tools import config, modules
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import module_classes
 from easybuild.tools.configobj import ConfigObj
-from easybuild.tools.filetools import copy_file, read_file, write_file
+from easybuild.tools.filetools import adjust_permissions, copy_file, read_file, remove_file, write_file
 from easybuild.tools.github import fetch_github_token
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.modules import invalidate_module_caches_for
@@ -771,6 +774,105 @@ class RobotTest(EnhancedTestCase):
         error_msg = "Multiple versions of GCC found in dependencies of toolchain gompi: 4.6.4, 4.7.2"
         self.assertErrorRegex(EasyBuildError, error_msg, get_toolchain_hierarchy, tc)
 
+    def test_toolchain_graph(self):
+        """Test use of (persistent) toolchain graph by get_toolchain_hierarchy."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ecs = os.path.join(self.test_prefix, 'ecs')
+        gompi_ec = os.path.join(test_ecs, 'gompi-1.4.10.eb')
+        copy_file(os.path.join(test_easyconfigs, 'g', 'gompi', 'gompi-1.4.10.eb'), gompi_ec)
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+
+        init_config(build_options={
+            'cache_dir': cache_dir,
+            'external_modules_metadata': ConfigObj(),
+            'valid_module_classes': module_classes(),
+            'robot_path': [test_ecs, test_easyconfigs],
+        })
+        get_toolchain_hierarchy.clear()
+        goolf_hierarchy = get_toolchain_hierarchy({'name': 'goolf', 'version': '1.4.10'})
+        self.assertEqual(goolf_hierarchy, [
+            {'name': 'GCC', 'version': '4.7.2'},
+            {'name': 'gompi', 'version': '1.4.10'},
+            {'name': 'goolf', 'version': '1.4.10'},
+        ])
+
+        # toolchain graph is built in a single pass over all toolchain easyconfigs, and persisted once
+        graph_file = os.path.join(cache_dir, 'toolchain_graph.json')
+        self.assertFalse(os.path.exists(graph_file))
+        ecec.save_toolchain_graphs()
+        self.assertTrue(os.path.exists(graph_file))
+        graph = json.loads(read_file(graph_file))
+        self.assertEqual(graph['search_paths'], [test_ecs, test_easyconfigs])
+        edges = dict(((e['name'], e['version']), e) for e in graph['edges'])
+        self.assertEqual(edges[('goolf', '1.4.10')]['subtoolchain'], ['gompi', '1.4.10'])
+        self.assertEqual(edges[('gompi', '1.4.10')]['subtoolchain'], ['GCC', '4.7.2'])
+        self.assertTrue(gompi_ec in edges[('gompi', '1.4.10')]['files'])
+        # directories in which easyconfig files were searched for are also recorded
+        self.assertTrue(test_ecs in edges[('gompi', '1.4.10')]['files'])
+        self.assertTrue(os.path.join(test_ecs, 'g', 'gompi') in edges[('gompi', '1.4.10')]['files'])
+
+        # graph is only written again when it was changed
+        os.utime(graph_file, (0, 0))
+        ecec.save_toolchain_graphs()
+        self.assertEqual(os.stat(graph_file).st_mtime, 0)
+        self.assertEqual(edges[('iimpi', '5.5.3-GCC-4.8.3')]['subtoolchain'], ['iccifort', '2013.5.192-GCC-4.8.3'])
+        self.assertEqual(edges[('GCC', '4.9.3-2.25')]['subtoolchain'], ['GCCcore', '4.9.3'])
+
+        # with persisted toolchain graph in place, no easyconfigs need to be parsed to determine toolchain hierarchy
+        def mocked_process_easyconfig(*args, **kwargs):
+            raise EasyBuildError("process_easyconfig should not be called")
+
+        get_toolchain_hierarchy.clear()
+        ecec._toolchain_graphs.clear()
+        orig_process_easyconfig = ecec.process_easyconfig
+        ecec.process_easyconfig = mocked_process_easyconfig
+        try:
+            iimpi_hierarchy = get_toolchain_hierarchy({'name': 'iimpi', 'version': '5.5.3-GCC-4.8.3'})
+            self.assertEqual(iimpi_hierarchy, [
+                {'name': 'iccifort', 'version': '2013.5.192-GCC-4.8.3'},
+                {'name': 'iimpi', 'version': '5.5.3-GCC-4.8.3'},
+            ])
+            self.assertEqual(get_toolchain_hierarchy({'name': 'goolf', 'version': '1.4.10'}), goolf_hierarchy)
+        finally:
+            ecec.process_easyconfig = orig_process_easyconfig
+
+        # edges that are derived from easyconfig files that were changed are discarded
+        write_file(gompi_ec, "\ndependencies += [('GCC', '4.6.4')]", append=True)
+        get_toolchain_hierarchy.clear()
+        ecec._easyconfigs_cache.clear()
+        ecec._toolchain_graphs.clear()
+        tc = {'name': 'gompi', 'version': '1.4.10'}
+        error_msg = "Multiple versions of GCC found in dependencies of toolchain gompi: 4.6.4, 4.7.2"
+        self.assertErrorRegex(EasyBuildError, error_msg, get_toolchain_hierarchy, tc)
+
+        # edges are also discarded when an easyconfig file that shadows one that was consulted is added
+        # to an earlier entry in the robot search path
+        write_file(gompi_ec, read_file(os.path.join(test_easyconfigs, 'g', 'gompi', 'gompi-1.4.10.eb')))
+        get_toolchain_hierarchy.clear()
+        ecec._easyconfigs_cache.clear()
+        ecec._easyconfig_files_cache.clear()
+        ecec._toolchain_graphs.clear()
+        self.assertEqual(get_toolchain_hierarchy({'name': 'goolf', 'version': '1.4.10'}), goolf_hierarchy)
+        ecec.save_toolchain_graphs()
+
+        graph = ToolchainGraph.load(graph_file, [test_ecs, test_easyconfigs])
+        self.assertEqual(graph.get_subtoolchain('gompi', '1.4.10'), ('GCC', '4.7.2'))
+
+        copy_file(os.path.join(test_easyconfigs, 'g', 'GCC', 'GCC-4.7.2.eb'), os.path.join(test_ecs, 'GCC-4.7.2.eb'))
+        # make sure that modification time of directory is different
+        os.utime(test_ecs, (0, 0))
+        graph = ToolchainGraph.load(graph_file, [test_ecs, test_easyconfigs])
+        self.assertEqual(graph.get_subtoolchain('gompi', '1.4.10'), None)
+
+        # failing to save toolchain graph only results in a warning
+        remove_file(graph_file)
+        adjust_permissions(cache_dir, stat.S_IWUSR, add=False)
+        try:
+            ecec.save_toolchain_graphs()
+            self.assertFalse(os.path.exists(graph_file))
+        finally:
+            adjust_permissions(cache_dir, stat.S_IWUSR, add=True)
+
     def test_find_resolved_modules(self):
         """Test find_resolved_modules function."""
         nodeps = {
@@ -1047,6 +1149,91 @@ class RobotTest(EnhancedTestCase):
         sqlite = bar.dependencies()[3]
         self.assertEqual(det_full_ec_version(sqlite), '3.8.10.2-goolf-1.4.10')
 
+    def test_find_toolchains_with_easyconfig(self):
+        """Test find_toolchains_with_easyconfig function."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        init_config(build_options={
+            'valid_module_classes': module_classes(),
+            'robot_path': test_easyconfigs,
+        })
+        goolf_hierarchy = get_toolchain_hierarchy({'name': 'goolf', 'version': '1.4.10'})
+        self.assertEqual([tc['name'] for tc in goolf_hierarchy], ['GCC', 'gompi', 'goolf'])
+
+        sqlite = {'name': 'SQLite', 'version': '3.8.10.2', 'toolchain': {'name': 'goolf', 'version': '1.4.10'}}
+        res = find_toolchains_with_easyconfig(sqlite, goolf_hierarchy)
+        self.assertEqual(res, goolf_hierarchy)
+
+        openblas = {
+            'name': 'OpenBLAS',
+            'version': '0.2.6',
+            'versionsuffix': '-LAPACK-3.4.2',
+            'toolchain': {'name': 'goolf', 'version': '1.4.10'},
+        }
+        res = find_toolchains_with_easyconfig(openblas, goolf_hierarchy)
+        self.assertEqual(res, [{'name': 'gompi', 'version': '1.4.10'}])
+
+        # results are cached, which is taken into account by robot_find_minimal_toolchain_of_dependency
+        orig_robot_find_easyconfig = ecec.robot_find_easyconfig
+        lookups = []
+
+        def mocked_robot_find_easyconfig(name, version):
+            lookups.append((name, version))
+            return orig_robot_find_easyconfig(name, version)
+
+        ecec.robot_find_easyconfig = mocked_robot_find_easyconfig
+        try:
+            for _ in range(3):
+                self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), res)
+                tc = robot_find_minimal_toolchain_of_dependency(openblas, self.modtool)
+                self.assertEqual(tc, {'name': 'gompi', 'version': '1.4.10'})
+            self.assertEqual(lookups, [])
+
+            # cache can be cleared
+            find_toolchains_with_easyconfig.clear()
+            self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), res)
+            self.assertEqual(len(lookups), 3)
+
+            # versionsuffix is taken into account
+            openblas['versionsuffix'] = ''
+            self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), [])
+            self.assertEqual(len(lookups), 6)
+
+            # with a cache dir, the easyconfig index is used to only check for easyconfigs that are known to exist
+            cache_dir = os.path.join(self.test_prefix, 'cache')
+            init_config(build_options={
+                'cache_dir': cache_dir,
+                'valid_module_classes': module_classes(),
+                'robot_path': test_easyconfigs,
+            })
+            find_toolchains_with_easyconfig.clear()
+            lookups[:] = []
+            openblas['versionsuffix'] = '-LAPACK-3.4.2'
+            self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), res)
+            self.assertEqual(lookups, [('OpenBLAS', '0.2.6-gompi-1.4.10-LAPACK-3.4.2')])
+            self.assertEqual(find_toolchains_with_easyconfig(sqlite, goolf_hierarchy), goolf_hierarchy)
+            self.assertEqual(len(lookups), 4)
+            self.assertTrue(os.path.exists(os.path.join(cache_dir, 'easyconfig_index.json')))
+
+            # lookup table is refreshed when cache is cleared
+            ec_file = os.path.join(self.test_prefix, 'OpenBLAS-0.2.6-GCC-4.7.2-LAPACK-3.4.2.eb')
+            openblas_ec = os.path.join(test_easyconfigs, 'o', 'OpenBLAS', 'OpenBLAS-0.2.6-gompi-1.4.10-LAPACK-3.4.2.eb')
+            ec_txt = read_file(openblas_ec)
+            write_file(ec_file, ec_txt.replace("{'name': 'gompi', 'version': '1.4.10'}", "('GCC', '4.7.2')"))
+            init_config(build_options={
+                'cache_dir': cache_dir,
+                'valid_module_classes': module_classes(),
+                'robot_path': [self.test_prefix, test_easyconfigs],
+            })
+            find_toolchains_with_easyconfig.clear()
+            self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), goolf_hierarchy[:2])
+
+            # easyconfig files of which the filename doesn't match the metadata are always checked
+            write_file(ec_file, ec_txt)
+            find_toolchains_with_easyconfig.clear()
+            self.assertEqual(find_toolchains_with_easyconfig(openblas, goolf_hierarchy), goolf_hierarchy[:2])
+        finally:
+            ecec.robot_find_easyconfig = orig_robot_find_easyconfig
+
     def test_check_conflicts(self):
         """Test check_conflicts function."""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -27,6 +27,7 @@ Unit tests for scripts
 
 @author: Kenneth Hoste (Ghent University)
 """
+import json
 import os
 import re
 import shutil
@@ -218,6 +219,61 @@ class ScriptsTest(EnhancedTestCase):
         self.assertTrue(EasyConfig(None, rawtxt=new_ec_txt))
         self.assertEqual(read_file('%s.bk' % broken_ec), broken_ec_txt)
 
+    def test_benchmark_framework(self):
+        """Test benchmark_framework.py script."""
+        testdir = os.path.dirname(__file__)
+        topdir = os.path.dirname(os.path.dirname(testdir))
+        script = os.path.join(topdir, 'easybuild', 'scripts', 'benchmark_framework.py')
+
+        out, ec = run_cmd("%s %s --list" % (sys.executable, script), simple=False)
+        benchmarks = ['check_conflicts', 'dependencies_for', 'dry_run', 'make_module_req', 'module_avail',
+                      'module_exist', 'module_generator_lua', 'module_generator_tcl', 'module_load',
+                      'module_load_baseline', 'parse', 'parse_header', 'path_to_top_of_module_tree',
+                      'path_to_top_of_module_tree_baseline', 'resolve_dependencies', 'run_cmd', 'run_cmd_baseline',
+                      'startup', 'startup_baseline', 'startup_import', 'toolchain_hierarchy',
+                      'toolchain_prepare', 'toolchain_prepare_baseline', 'toolchain_variables', 'validate_os_deps',
+                      'validate_os_deps_baseline']
+        self.assertEqual([line.split(' ')[0] for line in out.strip().split('\n')], benchmarks)
+
+        json_file = os.path.join(self.test_prefix, 'bench.json')
+        workdir = os.path.join(self.test_prefix, 'workdir')
+        cmd = "%s %s --packages 20 --depth 3 --repeat 1 --run-cmd-count 2 --json %s --workdir %s"
+        out, ec = run_cmd(cmd % (sys.executable, script, json_file, workdir), simple=False)
+
+        for name in benchmarks:
+            regex = re.compile(r"^%s\s+[0-9]+\s+[0-9.]+" % name, re.M)
+            self.assertTrue(regex.search(out), "Pattern '%s' found in: %s" % (regex.pattern, out))
+
+        report = json.loads(read_file(json_file))
+        self.assertEqual(report['params']['packages'], 20)
+        self.assertEqual(sorted(report['results'].keys()), benchmarks)
+        # 4 toolchain easyconfigs + 20 packages
+        self.assertEqual(report['results']['parse']['count'], 24)
+        self.assertEqual(report['results']['toolchain_hierarchy']['count'], 3)
+        self.assertEqual(report['results']['run_cmd']['count'], 2)
+        self.assertEqual(report['results']['startup']['count'], 4)
+
+        # synthetic easyconfig tree is generated in a deterministic way
+        gcc_ec = os.path.join(workdir, 'easyconfigs', 'g', 'GCC', 'GCC-6.4.0.eb')
+        self.assertTrue("dependencies = [\n    ('GCCcore', '6.4.0'),\n]" in read_file(gcc_ec))
+        self.assertTrue(os.path.exists(os.path.join(workdir, 'modules', 'all', 'gompi', '2017b')))
+        ecs = []
+        for (root, _, files) in os.walk(os.path.join(workdir, 'easyconfigs')):
+            ecs.extend(os.path.join(root, f) for f in files)
+        self.assertEqual(len(ecs), 24)
+
+        # compare with previous results
+        cmd = "%s %s --packages 20 --depth 3 --repeat 1 --benchmarks parse --compare %s"
+        out, ec = run_cmd(cmd % (sys.executable, script, json_file), simple=False)
+        regex = re.compile(r"^parse\s+24\s+.*\(.[0-9.]+% vs previous\)$", re.M)
+        self.assertTrue(regex.search(out), "Pattern '%s' found in: %s" % (regex.pattern, out))
+
+        # unknown benchmark results in an error
+        cmd = "%s %s --benchmarks foo" % (sys.executable, script)
+        out, ec = run_cmd(cmd, simple=False, log_ok=False, log_all=False)
+        self.assertEqual(ec, 1)
+        self.assertTrue("ERROR: Unknown benchmark(s): foo" in out)
+
 def suite():
     """ returns all the testcases in this module """
     return TestLoaderFiltered().loadTestsFromTestCase(ScriptsTest, sys.argv[1:])
@@ -29,12 +29,20 @@ Style tests for easyconfig files.
 """
 
 import glob
+import json
 import os
+import re
 import sys
-from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 from vsc.utils import fancylogger
+
+import easybuild.framework.easyconfig.style as style
 from easybuild.framework.easyconfig.style import _eb_check_trailing_whitespace, check_easyconfigs_style
+from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check, filter_changed_paths
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import compute_checksum, read_file, write_file
+from easybuild.tools.run import run_cmd
 
 try:
     import pycodestyle
@@ -95,6 +103,87 @@ class StyleTest(EnhancedTestCase):
             result = _eb_check_trailing_whitespace(line, lines, line_number, state)
             self.assertEqual(result, expected_result)
 
+    def test_filter_changed_paths(self):
+        """Test filter_changed_paths function."""
+        repo = os.path.join(self.test_prefix, 'repo')
+        paths = [os.path.join(repo, 'a', 'A', 'A-1.0.eb'), os.path.join(repo, 'b', 'B', 'B-1.0.eb')]
+        for path in paths:
+            write_file(path, "name = '%s'\n" % os.path.basename(path)[0])
+
+        git_cmd = "git -c user.name=test -c user.email=test@example.com"
+        for cmd in ["git init", "git add .", git_cmd + " commit -m initial"]:
+            run_cmd(cmd, path=repo, simple=True, log_ok=True, trace=False)
+
+        self.assertEqual(filter_changed_paths(paths, 'HEAD'), [])
+
+        # changed and untracked files are retained
+        write_file(paths[1], "version = '1.0'\n", append=True)
+        paths.append(os.path.join(repo, 'c', 'C', 'C-1.0.eb'))
+        write_file(paths[-1], "name = 'C'\n")
+        self.assertEqual(filter_changed_paths(paths, 'HEAD'), paths[1:])
+
+        # files that are not located in a Git working copy are always retained
+        test_ec = os.path.join(self.test_prefix, 'test.eb')
+        write_file(test_ec, "name = 'test'\n")
+        self.assertEqual(filter_changed_paths([test_ec] + paths, 'HEAD'), [test_ec] + paths[1:])
+
+        error_msg = "Failed to determine changed files in .* relative to nosuchref"
+        self.assertErrorRegex(EasyBuildError, error_msg, filter_changed_paths, paths, 'nosuchref')
+
+        # Git reference is quoted, and can't be used to pass options to 'git diff'
+        error_msg = "Failed to determine changed files in .* relative to HEAD; rm -rf foo"
+        self.assertErrorRegex(EasyBuildError, error_msg, filter_changed_paths, paths, 'HEAD; rm -rf foo')
+        error_msg = "Invalid Git reference to determine changed files: --output=foo"
+        self.assertErrorRegex(EasyBuildError, error_msg, filter_changed_paths, paths, '--output=foo')
+
+    def test_cmdline_easyconfigs_style_check(self):
+        """Test cmdline_easyconfigs_style_check function."""
+        if not ('pycodestyle' in sys.modules or 'pep8' in sys.modules):
+            print "Skipping test_cmdline_easyconfigs_style_check (no pycodestyle or pep8 available)"
+            return
+
+        test_easyconfigs_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        specs = sorted(glob.glob(os.path.join(test_easyconfigs_path, '*', '*', '*.eb')))[:10]
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+
+        # style checks are run in parallel
+        init_config(build_options={'cache_dir': cache_dir, 'check_style_jobs': 3})
+        self.mock_stdout(True)
+        res = cmdline_easyconfigs_style_check(specs)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertTrue(res)
+        self.assertTrue("Running style check on 10 easyconfig(s)" in stdout)
+        self.assertEqual(re.findall(r'^\[PASS\] (.*)$', stdout, re.M), specs)
+
+        # easyconfigs that passed the style check before are not checked again
+        cache = json.loads(read_file(os.path.join(cache_dir, 'style_check.json')))
+        self.assertEqual(len(cache['passed']), len(set(compute_checksum(p, 'sha256') for p in specs)))
+
+        toy = os.path.join(self.test_prefix, 'toy.eb')
+        write_file(toy, read_file(specs[0]) + "\nfoo='bar'  \n")
+
+        checked = []
+
+        def mocked_check_easyconfig_style_captured(path):
+            checked.append(path)
+            return orig_check_easyconfig_style_captured(path)
+
+        orig_check_easyconfig_style_captured = style._check_easyconfig_style_captured
+        style._check_easyconfig_style_captured = mocked_check_easyconfig_style_captured
+        init_config(build_options={'cache_dir': cache_dir, 'check_style_jobs': 1})
+        self.mock_stdout(True)
+        try:
+            res = cmdline_easyconfigs_style_check(specs + [toy])
+        finally:
+            style._check_easyconfig_style_captured = orig_check_easyconfig_style_captured
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertFalse(res)
+        self.assertEqual(checked, [toy])
+        self.assertTrue(re.search(r"^\[FAIL\] %s$" % toy, stdout, re.M))
+        self.assertTrue(re.search(r"toy.eb:.*: E225 missing whitespace around operator", stdout, re.M))
+
 
 def suite():
     """Return all style tests for easyconfigs."""
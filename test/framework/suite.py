@@ -53,6 +53,7 @@ fancylogger.disableDefaultHandlers()
 fancylogger.setLogLevelError()
 
 # toolkit should be first to allow hacks to work
+import test.framework.artifact_cache as ac
 import test.framework.asyncprocess as a
 import test.framework.build_log as bl
 import test.framework.config as c
@@ -70,14 +71,17 @@ import test.framework.general as gen
 import test.framework.github as g
 import test.framework.hooks as h
 import test.framework.include as i
+import test.framework.journal as j
 import test.framework.license as l
 import test.framework.module_generator as mg
 import test.framework.modules as m
 import test.framework.modulestool as mt
 import test.framework.options as o
 import test.framework.parallelbuild as p
+import test.framework.profiling as prof
 import test.framework.package as pkg
 import test.framework.repository as r
+import test.framework.resource_usage as ru
 import test.framework.robot as robot
 import test.framework.run as run
 import test.framework.scripts as sc
@@ -109,7 +113,7 @@ log = fancylogger.getLogger()
 # call suite() for each module and then run them all
 # note: make sure the options unit tests run first, to avoid running some of them with a readily initialized config
 tests = [gen, bl, o, r, ef, ev, ebco, ep, e, mg, m, mt, f, run, a, robot, b, v, g, tcv, tc, t, c, s, l, f_c, sc,
-         tw, p, i, pkg, d, env, et, y, st, h]
+         tw, p, i, pkg, d, env, et, y, st, h, j, ru, prof, ac]
 
 SUITE = unittest.TestSuite([x.suite() for x in tests])
 
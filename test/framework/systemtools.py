@@ -28,15 +28,17 @@ Unit tests for systemtools.py
 @author: Kenneth hoste (Ghent University)
 @author: Ward Poelmans (Ghent University)
 """
+import os
 import re
 import sys
 
 from os.path import exists as orig_os_path_exists
-from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from socket import gethostname
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 
 import easybuild.tools.systemtools as st
-from easybuild.tools.filetools import read_file
+from easybuild.tools.filetools import read_file, write_file
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import CPU_ARCHITECTURES, AARCH32, AARCH64, POWER, X86_64
 from easybuild.tools.systemtools import CPU_FAMILIES, POWER_LE, DARWIN, LINUX, UNKNOWN
@@ -46,6 +48,8 @@ from easybuild.tools.systemtools import det_parallelism, get_avail_core_count, g
 from easybuild.tools.systemtools import get_cpu_features, get_cpu_model, get_cpu_speed, get_cpu_vendor
 from easybuild.tools.systemtools import get_glibc_version, get_os_type, get_os_name, get_os_version, get_platform_name
 from easybuild.tools.systemtools import get_shared_lib_ext, get_system_info, get_total_memory, get_gcc_version
+from easybuild.tools.systemtools import HOST_PROFILE_FILENAME, check_os_dependency_cached, get_host_profile_value
+from easybuild.tools.systemtools import check_os_dependencies, query_os_dependencies, reset_host_profile
 
 
 PROC_CPUINFO_TXT = None
@@ -331,7 +335,11 @@ class SystemToolsTest(EnhancedTestCase):
         self.orig_is_readable = st.is_readable
         self.orig_read_file = st.read_file
         self.orig_run_cmd = st.run_cmd
+        self.orig_which = st.which
         self.orig_platform_uname = st.platform.uname
+        self.orig_query_os_dependencies = st.query_os_dependencies
+        self.orig_get_boot_id = st.get_boot_id
+        self.orig_get_os_identity = st.get_os_identity
 
     def tearDown(self):
         """Cleanup after systemtools test."""
@@ -341,6 +349,10 @@ class SystemToolsTest(EnhancedTestCase):
         st.get_os_type = self.orig_get_os_type
         st.run_cmd = self.orig_run_cmd
         st.platform.uname = self.orig_platform_uname
+        st.query_os_dependencies = self.orig_query_os_dependencies
+        st.which = self.orig_which
+        st.get_boot_id = self.orig_get_boot_id
+        st.get_os_identity = self.orig_get_os_identity
         super(SystemToolsTest, self).tearDown()
 
     def test_avail_core_count_native(self):
@@ -726,6 +738,142 @@ class SystemToolsTest(EnhancedTestCase):
         system_info = get_system_info()
         self.assertTrue(isinstance(system_info, dict))
 
+    def test_get_os_identity(self):
+        """Test get_os_identity function."""
+        os_id = st.get_os_identity()
+        self.assertTrue(re.match('^[0-9a-f]{64}$', os_id))
+        self.assertEqual(st.get_os_identity(), os_id)
+
+    def test_host_profile(self):
+        """Test memoizing of system information via host profile."""
+        calls = []
+
+        def mocked_query_os_dependencies(deps):
+            """Mocked version of query_os_dependencies, which keeps track of calls."""
+            calls.extend(deps)
+            return dict((dep, dep.startswith('found')) for dep in deps)
+
+        st.query_os_dependencies = mocked_query_os_dependencies
+
+        # results are memoized for current process
+        for _ in range(3):
+            self.assertTrue(check_os_dependency_cached('found-dep'))
+            self.assertFalse(check_os_dependency_cached('missing-dep'))
+        self.assertEqual(calls, ['found-dep', 'missing-dep'])
+
+        self.assertEqual(get_host_profile_value('foo', lambda x: x * 2, 'bar'), 'barbar')
+        self.assertEqual(get_host_profile_value('foo', lambda x: x * 3, 'bar'), 'barbar')
+
+        reset_host_profile()
+        self.assertEqual(get_host_profile_value('foo', lambda x: x * 3, 'bar'), 'barbarbar')
+        self.assertTrue(check_os_dependency_cached('found-dep'))
+        self.assertEqual(calls[-1], 'found-dep')
+
+        # host profile is retained for current boot if a cache directory is specified
+        reset_host_profile()
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        host_profile_path = os.path.join(cache_dir, HOST_PROFILE_FILENAME % gethostname())
+        init_config(build_options={'cache_dir': cache_dir})
+        st.get_boot_id = lambda: 'test-boot-id'
+
+        self.assertEqual(get_host_profile_value('foo', lambda: 'foo'), 'foo')
+        self.assertTrue(check_os_dependency_cached('found-dep'))
+        self.assertFalse(check_os_dependency_cached('missing-dep'))
+        self.assertTrue(os.path.exists(host_profile_path))
+
+        # host profile is specific to this host, other hosts may share the same cache directory
+        other_host_profile_path = os.path.join(cache_dir, HOST_PROFILE_FILENAME % 'other-host')
+        write_file(other_host_profile_path, '{}')
+        self.assertEqual(get_host_profile_value('bar', lambda: 'bar'), 'bar')
+        self.assertEqual(read_file(other_host_profile_path), '{}')
+        expected = sorted(os.path.basename(p) for p in [host_profile_path, other_host_profile_path])
+        self.assertEqual(sorted(os.listdir(cache_dir)), expected)
+
+        # missing OS dependencies are not retained in persistent host profile
+        del calls[:]
+        reset_host_profile()
+        self.assertEqual(get_host_profile_value('foo', lambda: 'bar'), 'foo')
+        self.assertTrue(check_os_dependency_cached('found-dep'))
+        self.assertFalse(check_os_dependency_cached('missing-dep'))
+        self.assertEqual(calls, ['missing-dep'])
+
+        # persistent host profile is ignored after reboot
+        reset_host_profile()
+        st.get_boot_id = lambda: 'other-boot-id'
+        self.assertEqual(get_host_profile_value('foo', lambda: 'bar'), 'bar')
+        self.assertTrue(check_os_dependency_cached('found-dep'))
+        self.assertEqual(calls, ['missing-dep', 'found-dep'])
+
+        # persistent host profile is also ignored in a different OS environment (e.g. container) on the same boot
+        reset_host_profile()
+        self.assertEqual(get_host_profile_value('foo', lambda: 'baz'), 'bar')
+        reset_host_profile()
+        st.get_os_identity = lambda: 'other-os-id'
+        self.assertEqual(get_host_profile_value('foo', lambda: 'baz'), 'baz')
+        self.assertTrue(check_os_dependency_cached('found-dep'))
+        self.assertEqual(calls, ['missing-dep', 'found-dep', 'found-dep'])
+
+        # persistent host profile can be invalidated explicitly
+        reset_host_profile(persistent=True)
+        self.assertFalse(os.path.exists(host_profile_path))
+        self.assertEqual(get_host_profile_value('foo', lambda: 'baz'), 'baz')
+
+        # no persistent host profile is saved if boot ID can not be determined
+        reset_host_profile(persistent=True)
+        st.get_boot_id = lambda: None
+        self.assertEqual(get_host_profile_value('foo', lambda: 'foo'), 'foo')
+        self.assertFalse(os.path.exists(host_profile_path))
+
+    def test_check_os_dependencies(self):
+        """Test checking of OS dependencies via a single query of the package database."""
+        cmds = []
+        pkg_cmds = []
+
+        def mocked_run_cmd_osdeps(cmd, **kwargs):
+            """Mocked version of run_cmd, which only knows about OS dependencies that start with 'found'."""
+            cmds.append(cmd)
+            pkg_cmd, deps = cmd.split(' ')[:2], cmd.split(' ')[2:]
+            missing = [dep for dep in deps if not dep.startswith('found')]
+            if pkg_cmd == ['rpm', '-q']:
+                out = '\n'.join(['package %s is not installed' % dep if dep in missing else dep + '-1.0-1.x86_64'
+                                 for dep in deps])
+            else:
+                out = '\n'.join(["dpkg-query: package '%s' is not installed" % dep for dep in missing])
+            if kwargs.get('simple'):
+                return not missing
+            else:
+                return (out, int(bool(missing)))
+
+        st.run_cmd = mocked_run_cmd_osdeps
+        st.which = lambda cmd: cmd in pkg_cmds and '/usr/bin/%s' % cmd
+
+        pkg_cmds[:] = ['rpm']
+        deps = ['found-dep1', 'missing-dep', 'found-dep2']
+        expected = {'found-dep1': True, 'found-dep2': True, 'missing-dep': False}
+        self.assertEqual(query_os_dependencies(deps), expected)
+        self.assertEqual(cmds, ['rpm -q found-dep1 missing-dep found-dep2'])
+
+        # OS dependencies not found via 'rpm' are checked via 'dpkg' too, if it's available
+        del cmds[:]
+        pkg_cmds[:] = ['rpm', 'dpkg']
+        self.assertEqual(query_os_dependencies(deps), expected)
+        self.assertEqual(cmds, ['rpm -q found-dep1 missing-dep found-dep2', 'dpkg -s missing-dep'])
+
+        # results are retained in host profile, only OS dependencies that were not checked yet are queried
+        del cmds[:]
+        pkg_cmds[:] = ['dpkg']
+        self.assertEqual(check_os_dependencies(deps), expected)
+        self.assertEqual(check_os_dependencies(['missing-dep', 'found-dep3']), {'missing-dep': False,
+                                                                                'found-dep3': True})
+        self.assertTrue(check_os_dependency_cached('found-dep1'))
+        self.assertEqual(cmds, ['dpkg -s found-dep1 found-dep2 missing-dep', 'dpkg -s found-dep3'])
+
+        # fall back to checking one by one if output of package query can not be interpreted
+        del cmds[:]
+        st.run_cmd = lambda cmd, **kwargs: mocked_run_cmd_osdeps(cmd, **kwargs) if kwargs.get('simple') else ('', 1)
+        self.assertEqual(query_os_dependencies(deps), expected)
+        self.assertEqual(cmds, ['dpkg -s found-dep1', 'dpkg -s missing-dep', 'dpkg -s found-dep2'])
+
     def test_det_parallelism_native(self):
         """Test det_parallelism function (native calls)."""
         self.assertTrue(det_parallelism() > 0)
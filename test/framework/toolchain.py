@@ -134,6 +134,61 @@ class ToolchainTest(EnhancedTestCase):
         self.assertEqual(tc.get_variable('OMPI_F77'), 'gfortran')
         self.assertEqual(tc.get_variable('OMPI_FC'), 'gfortran')
 
+    def test_prepare_from_snapshot(self):
+        """Test reusing snapshot of build environment via prepare_from_snapshot."""
+        tc = self.get_toolchain("goalf", version="1.1.0-no-OFED")
+        tc.set_options({})
+        tc.prepare()
+
+        prepare_calls = []
+        orig_prepare = tc.prepare
+
+        def counting_prepare(*args, **kwargs):
+            """Wrapper for prepare, which keeps track of calls."""
+            prepare_calls.append(kwargs)
+            return orig_prepare(*args, **kwargs)
+
+        tc.prepare = counting_prepare
+
+        # no snapshot yet, so full prepare is done
+        os.environ['CC'] = 'foo'
+        del os.environ['CFLAGS']
+        tc.prepare_from_snapshot(onlymod=None, silent=True)
+        self.assertEqual(len(prepare_calls), 1)
+        self.assertEqual(prepare_calls[0]['loadmod'], False)
+        self.assertEqual(os.environ['CC'], 'gcc')
+        cflags = os.environ['CFLAGS']
+        ldflags = os.environ['LDFLAGS']
+
+        # snapshot is reapplied if nothing changed, also restores changes made to the environment
+        os.environ['CC'] = 'foo'
+        del os.environ['CFLAGS']
+        tc.prepare_from_snapshot(onlymod=None, silent=True)
+        self.assertEqual(len(prepare_calls), 1)
+        self.assertEqual(os.environ['CC'], 'gcc')
+        self.assertEqual(os.environ['CFLAGS'], cflags)
+        self.assertEqual(os.environ['LDFLAGS'], ldflags)
+
+        # changing a toolchain option implies a full prepare
+        tc.options['pic'] = True
+        tc.prepare_from_snapshot(onlymod=None, silent=True)
+        self.assertEqual(len(prepare_calls), 2)
+        self.assertTrue('-fPIC' in os.environ['CFLAGS'])
+        tc.prepare_from_snapshot(onlymod=None, silent=True)
+        self.assertEqual(len(prepare_calls), 2)
+
+        # same for different arguments, changes to toolchain variables or $EBROOT* environment variables
+        tc.prepare_from_snapshot(onlymod=None, silent=True, rpath_filter_dirs=['/foo'])
+        self.assertEqual(len(prepare_calls), 3)
+        tc.variables.nappend('CFLAGS', 'foo')
+        tc.prepare_from_snapshot(onlymod=None, silent=True, rpath_filter_dirs=['/foo'])
+        self.assertEqual(len(prepare_calls), 4)
+        os.environ['EBROOTFOO'] = '/foo'
+        tc.prepare_from_snapshot(onlymod=None, silent=True, rpath_filter_dirs=['/foo'])
+        self.assertEqual(len(prepare_calls), 5)
+        tc.prepare_from_snapshot(onlymod=None, silent=True, rpath_filter_dirs=['/foo'])
+        self.assertEqual(len(prepare_calls), 5)
+
     def test_get_variable_mpi_compilers(self):
         """Test get_variable function to obtain compiler variables."""
         tc = self.get_toolchain("goalf", version="1.1.0-no-OFED")
@@ -30,11 +30,13 @@ Toy build unit test
 """
 import glob
 import grp
+import json
 import os
 import re
 import shutil
 import stat
 import sys
+import tarfile
 import tempfile
 from distutils.version import LooseVersion
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
@@ -50,6 +52,7 @@ from easybuild.framework.easyconfig.parser import EasyConfigParser
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import get_module_syntax, get_repositorypath
 from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_file, which, write_file
+from easybuild.tools.journal import SessionJournal
 from easybuild.tools.modules import Lmod
 from easybuild.tools.run import run_cmd
 from easybuild.tools.version import VERSION as EASYBUILD_VERSION
@@ -1816,6 +1819,301 @@ class ToyBuildTest(EnhancedTestCase):
         ])
         self.assertEqual(stdout.strip(), expected_output)
 
+    def test_toy_resource_usage(self):
+        """Test collecting resource usage for installation steps & extensions."""
+        test_dir = os.path.abspath(os.path.dirname(__file__))
+        os.environ['MODULEPATH'] = os.path.join(test_dir, 'modules')
+        test_ec = os.path.join(test_dir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0-gompi-1.3.12-test.eb')
+
+        hooks_file = os.path.join(self.test_prefix, 'my_hooks.py')
+        hooks_file_txt = '\n'.join([
+            "def resource_usage_hook(self, usage):",
+            "    print('%(kind)s %(name)s: %(subprocesses)s subprocesses' % usage)",
+        ])
+        write_file(hooks_file, hooks_file_txt)
+
+        self.mock_stdout(True)
+        extra_args = ['--hooks=%s' % hooks_file]
+        self.test_toy_build(ec_file=test_ec, versionsuffix='-gompi-1.3.12-test', extra_args=extra_args)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        for name in ['fetch', 'configure', 'build', 'install', 'extensions', 'sanitycheck', 'module']:
+            regex = re.compile(r"^step %s: [0-9]+ subprocesses$" % name, re.M)
+            self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+        for name in ['bar', 'barbar', 'toy']:
+            regex = re.compile(r"^extension %s: [0-9]+ subprocesses$" % name, re.M)
+            self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+
+        # resource usage is included in JSON report next to log file in install dir
+        toy_ebdir = os.path.join(self.test_installpath, 'software', 'toy', '0.0-gompi-1.3.12-test', 'easybuild')
+        reports = glob.glob(os.path.join(toy_ebdir, 'easybuild-toy-0.0-*_resource_usage.json'))
+        self.assertEqual(len(reports), 1)
+        report = json.loads(read_file(reports[0]))
+        self.assertEqual(report['label'], 'toy/0.0-gompi-1.3.12-test')
+
+        steps = [r for r in report['records'] if r['kind'] == 'step']
+        self.assertEqual(steps[0]['name'], 'fetch')
+        self.assertEqual(steps[-1]['name'], 'package')
+        build_step = [r for r in steps if r['name'] == 'build'][0]
+        self.assertTrue(build_step['subprocesses'] >= 1)
+        self.assertTrue(build_step['wall_time'] >= 0)
+        self.assertTrue(build_step['cpu_time'] >= 0)
+        self.assertTrue(build_step['max_rss_children'] > 0)
+        self.assertTrue(build_step['bytes_read'] is None or build_step['bytes_read'] >= 0)
+
+        exts = [r['name'] for r in report['records'] if r['kind'] == 'extension']
+        self.assertEqual(exts, ['bar', 'barbar', 'toy'])
+
+    def test_toy_resume(self):
+        """Test resuming an interrupted installation using --session-journal and --resume."""
+        journal_path = os.path.join(self.test_prefix, 'journal.json')
+        interrupt_marker = os.path.join(self.test_prefix, 'interrupt')
+        write_file(interrupt_marker, '')
+
+        # interrupt installation right before install step via hook
+        hooks_file = os.path.join(self.test_prefix, 'my_hooks.py')
+        hooks_file_txt = '\n'.join([
+            "import os",
+            "from easybuild.tools.build_log import EasyBuildError",
+            '',
+            "def pre_install_hook(self):",
+            "    if os.path.exists('%s'):" % interrupt_marker,
+            "        raise EasyBuildError('interrupted!')",
+        ])
+        write_file(hooks_file, hooks_file_txt)
+
+        extra_args = ['--hooks=%s' % hooks_file, '--session-journal=%s' % journal_path]
+        self.assertErrorRegex(EasyBuildError, "interrupted!", self.test_toy_build, extra_args=extra_args,
+                              verify=False, fails=True, verbose=False, raise_error=True)
+
+        journal = SessionJournal.load(journal_path)
+        self.assertEqual(len(journal.entries()), 1)
+        toy_entry = journal.get_entry('toy/0.0')
+        self.assertEqual(toy_entry['state'], 'failed')
+        self.assertEqual(toy_entry['step'], 'test')
+        self.assertTrue(os.path.exists(toy_entry['builddir']))
+
+        # resume interrupted session; steps that were already completed are skipped,
+        # patch step would fail if it were performed again
+        remove_file(interrupt_marker)
+        args = [
+            '--sourcepath=%s' % self.test_sourcepath,
+            '--buildpath=%s' % self.test_buildpath,
+            '--installpath=%s' % self.test_installpath,
+            '--unittest-file=%s' % self.logfile,
+            '--hooks=%s' % hooks_file,
+            '--resume=%s' % journal_path,
+        ]
+
+        # session can only be resumed with the same configuration
+        error_pattern = r"Configuration options differ .* \(missing: --force .*--robot=.*; unexpected: .*\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.eb_main, args, raise_error=True)
+        args.append('--force')
+        args.append('--robot=%s' % os.pathsep.join([self.test_buildpath, os.path.dirname(__file__)]))
+        error_pattern = r"Configuration options differ .* \(missing: \(none\); unexpected: --rebuild\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.eb_main, args + ['--rebuild'], raise_error=True)
+
+        # options that do not affect installations may differ
+        args.append('--debug')
+        outtxt = self.eb_main(args, logfile=self.dummylogfn, do_build=True, raise_error=True)
+        self.check_toy(self.test_installpath, outtxt)
+
+        for step in ['unpacking', 'patching', 'configuring', 'building', 'testing']:
+            regex = re.compile(r"INFO %s \[completed in previous session\]$" % step, re.M)
+            self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        regex = re.compile(r"INFO installing\.\.\.$", re.M)
+        self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        self.assertTrue("Reusing existing build dir %s" % toy_entry['builddir'] in outtxt)
+
+        journal = SessionJournal.load(journal_path)
+        self.assertEqual(journal.get_entry('toy/0.0')['state'], 'done')
+        self.assertEqual(journal.unfinished_specs(), [])
+
+        # resuming a completed session is a no-op
+        outtxt = self.eb_main(args, logfile=self.dummylogfn, do_build=True, raise_error=True)
+        self.assertTrue("No easyconfigs left to be built." in outtxt)
+
+        # --resume can not be combined with specifying easyconfigs
+        toy_ec = os.path.join(os.path.dirname(__file__), 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+        error_pattern = "Resuming an interrupted session can not be combined with specifying easyconfigs"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.eb_main, args + [toy_ec], raise_error=True)
+
+    def test_toy_rebuild_stale(self):
+        """Test use of build fingerprints and --rebuild-stale."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec_txt = read_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb'))
+        # drop checksums, to check whether changes to source tarball are picked up (without checksums being updated)
+        toy_ec_txt = re.compile(r'^checksums = \[\[.*?\]\]\n', re.M | re.S).sub('', toy_ec_txt)
+        toy_ec = os.path.join(self.test_prefix, 'toy-0.0.eb')
+        write_file(toy_ec, toy_ec_txt)
+
+        # use copy of sources, since source tarball is changed below
+        sourcepath = os.path.join(self.test_prefix, 'sources')
+        shutil.copytree(os.path.join(self.test_sourcepath, 'toy'), os.path.join(sourcepath, 'toy'))
+
+        # additional toy installation which depends on toy/0.0
+        toy_dep_ec = os.path.join(self.test_prefix, 'toy-0.0-dep.eb')
+        toy_dep_ec_txt = toy_ec_txt + "\nversionsuffix = '-dep'\ndependencies = [('toy', '0.0')]"
+        write_file(toy_dep_ec, toy_dep_ec_txt)
+
+        self.modtool.use(os.path.join(self.test_installpath, 'modules', 'all'))
+
+        args = [
+            toy_dep_ec,
+            '--sourcepath=%s' % sourcepath,
+            '--buildpath=%s' % self.test_buildpath,
+            '--installpath=%s' % self.test_installpath,
+            '--debug',
+            '--unittest-file=%s' % self.logfile,
+            '--robot=%s' % self.test_prefix,
+            '--rebuild-stale',
+        ]
+
+        def check_rebuilt(rebuilt, up_to_date):
+            """Run 'eb --rebuild-stale', check which installations were (not) rebuilt."""
+            write_file(self.logfile, '')
+            outtxt = self.eb_main(args, logfile=self.dummylogfn, do_build=True, raise_error=True)
+            self.assertEqual(len(re.findall("COMPLETED: Installation ended successfully", outtxt)), len(rebuilt))
+            for mod_name in rebuilt:
+                self.assertTrue("building and installing %s..." % mod_name in outtxt)
+            for mod_name in up_to_date:
+                self.assertTrue("%s is already installed and up-to-date" % mod_name in outtxt)
+                self.assertFalse("building and installing %s..." % mod_name in outtxt)
+
+        # toy/0.0 is built as a dependency; build fingerprints are written in installation directories
+        check_rebuilt(['toy/0.0', 'toy/0.0-dep'], [])
+        for subdir in ['0.0', '0.0-dep']:
+            fingerprint_path = os.path.join(self.test_installpath, 'software', 'toy', subdir, 'easybuild',
+                                            'build_fingerprint.json')
+            fingerprint = json.loads(read_file(fingerprint_path))
+            self.assertTrue(re.match('^[0-9a-f]{64}$', fingerprint['fingerprint']))
+        self.assertEqual(sorted(fingerprint['components']['dependencies'].keys()), ['toy/0.0'])
+        self.assertEqual(sorted(fingerprint['components']['patches'].keys()), ['toy-0.0_typo.patch', 'toy-extra.txt'])
+        self.assertTrue(all(fingerprint['components']['patches'].values()))
+        self.assertEqual(fingerprint['components']['sources'].keys(), ['toy-0.0.tar.gz'])
+        self.assertTrue(fingerprint['components']['sources']['toy-0.0.tar.gz'])
+        self.assertEqual(fingerprint['components']['easyblocks'].keys(), ['easybuild.easyblocks.toy'])
+
+        # nothing to do if nothing changed
+        check_rebuilt([], ['toy/0.0', 'toy/0.0-dep'])
+
+        # installation is stale if easyconfig changed
+        write_file(toy_dep_ec, toy_dep_ec_txt + "\nbuildopts = ''")
+        check_rebuilt(['toy/0.0-dep'], ['toy/0.0'])
+
+        # installation is also stale if easyconfig of one of its dependencies changed
+        write_file(toy_ec, toy_ec_txt + "\nbuildopts = ''")
+        check_rebuilt(['toy/0.0', 'toy/0.0-dep'], [])
+
+        # installation is stale if a patch file changed
+        patch_fp = os.path.join(self.test_prefix, 'toy-extra.txt')
+        write_file(patch_fp, "This is a changed version of toy-extra.txt.\n")
+        check_rebuilt(['toy/0.0', 'toy/0.0-dep'], [])
+        check_rebuilt([], ['toy/0.0', 'toy/0.0-dep'])
+
+        # installation is stale if source tarball changed
+        toy_tarball = os.path.join(sourcepath, 'toy', 'toy-0.0.tar.gz')
+        orig_tar = tarfile.open(toy_tarball, 'r:gz')
+        members = [(m, orig_tar.extractfile(m) if m.isfile() else None) for m in orig_tar.getmembers()]
+        new_toy_tarball = os.path.join(self.test_prefix, 'toy-0.0.tar.gz')
+        new_tar = tarfile.open(new_toy_tarball, 'w:gz')
+        for member, fileobj in members:
+            new_tar.addfile(member, fileobj)
+        extra_txt = tarfile.TarInfo('toy-0.0/extra.txt')
+        new_tar.addfile(extra_txt, None)
+        new_tar.close()
+        orig_tar.close()
+        shutil.move(new_toy_tarball, toy_tarball)
+        check_rebuilt(['toy/0.0', 'toy/0.0-dep'], [])
+        check_rebuilt([], ['toy/0.0', 'toy/0.0-dep'])
+
+    def test_toy_artifact_cache(self):
+        """Test storing/restoring installations in/from artifact cache (--artifact-cache)."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')
+        artifact_cache = os.path.join(self.test_prefix, 'artifacts')
+        restored_msg = "restored installation from artifact cache at %s" % artifact_cache
+
+        def run_toy_build(installpath, ec_file=toy_ec, extra_args=None):
+            """Perform toy build with artifact cache enabled, return output."""
+            write_file(self.logfile, '')
+            args = [
+                ec_file,
+                '--sourcepath=%s' % self.test_sourcepath,
+                '--buildpath=%s' % self.test_buildpath,
+                '--installpath=%s' % installpath,
+                '--debug',
+                '--unittest-file=%s' % self.logfile,
+                '--force',
+                '--artifact-cache=%s' % artifact_cache,
+            ] + (extra_args or [])
+            outtxt = self.eb_main(args, logfile=self.dummylogfn, do_build=True, raise_error=True)
+            # not using check_toy, since restored installations also include log of original installation
+            self.assertTrue(re.search("COMPLETED: Installation ended successfully", outtxt))
+            return outtxt
+
+        # first build stores installation in artifact cache
+        outtxt = run_toy_build(self.test_installpath)
+        self.check_toy(self.test_installpath, outtxt)
+        self.assertFalse(restored_msg in outtxt)
+        fingerprint_path = os.path.join(self.test_installpath, 'software', 'toy', '0.0', 'easybuild',
+                                        'build_fingerprint.json')
+        fingerprint = json.loads(read_file(fingerprint_path))['fingerprint']
+        # artifacts are named after artifact key, which combines build fingerprint with host & module configuration
+        artifacts = glob.glob(os.path.join(artifact_cache, '*', '*.tar.gz'))
+        self.assertEqual(len(artifacts), 1)
+        metadata = json.loads(read_file(artifacts[0][:-len('.tar.gz')] + '.json'))
+        self.assertEqual(metadata['full_mod_name'], 'toy/0.0')
+        self.assertEqual(metadata['key'], os.path.basename(artifacts[0])[:-len('.tar.gz')])
+        self.assertEqual(metadata['key_components']['fingerprint'], fingerprint)
+        self.assertEqual(metadata['key_components']['module_syntax'], get_module_syntax())
+        self.assertEqual(metadata['installdir'], os.path.join(self.test_installpath, 'software', 'toy', '0.0'))
+
+        # installation is restored from artifact cache rather than being rebuilt
+        shutil.rmtree(os.path.join(self.test_installpath, 'software'))
+        shutil.rmtree(os.path.join(self.test_installpath, 'modules'))
+        outtxt = run_toy_build(self.test_installpath)
+        self.assertTrue(restored_msg in outtxt)
+        self.assertFalse(re.search("building and installing toy/0.0", outtxt))
+        toy_bin = os.path.join(self.test_installpath, 'software', 'toy', '0.0', 'bin', 'toy')
+        self.assertTrue(os.path.exists(toy_bin))
+        toy_mod_symlink = os.path.join(self.test_installpath, 'modules', 'tools', 'toy', '0.0')
+        if get_module_syntax() == 'Lua':
+            toy_mod_symlink += '.lua'
+        self.assertTrue(os.path.islink(toy_mod_symlink) and os.path.exists(toy_mod_symlink))
+
+        # installation can be relocated, module file is patched accordingly;
+        # permissions are adjusted according to current configuration
+        other_installpath = os.path.join(self.test_prefix, 'other')
+        outtxt = run_toy_build(other_installpath, extra_args=['--read-only-installdir'])
+        self.assertTrue(restored_msg in outtxt)
+        other_installdir = os.path.join(other_installpath, 'software', 'toy', '0.0')
+        self.assertEqual(os.stat(other_installdir).st_mode & 0777, 0555)
+        self.assertFalse(os.stat(os.path.join(other_installdir, 'bin', 'toy')).st_mode & stat.S_IWUSR)
+        adjust_permissions(other_installdir, stat.S_IWUSR, add=True, recursive=True)
+        toy_mod = os.path.join(other_installpath, 'modules', 'all', 'toy', '0.0')
+        if get_module_syntax() == 'Lua':
+            toy_mod += '.lua'
+        toy_mod_txt = read_file(toy_mod)
+        self.assertTrue(os.path.join(other_installpath, 'software', 'toy', '0.0') in toy_mod_txt)
+        self.assertFalse(self.test_installpath in toy_mod_txt)
+
+        # installations that hardcode their location are not relocated
+        test_ec = os.path.join(self.test_prefix, 'toy-0.0-hardcoded.eb')
+        write_file(test_ec, read_file(toy_ec) + '\npostinstallcmds = ["echo %(installdir)s > %(installdir)s/loc"]')
+        outtxt = run_toy_build(self.test_installpath, ec_file=test_ec)
+        self.assertFalse(restored_msg in outtxt)
+        outtxt = run_toy_build(os.path.join(self.test_prefix, 'another'), ec_file=test_ec)
+        self.assertFalse(restored_msg in outtxt)
+        self.assertTrue(re.search("building and installing toy/0.0", outtxt))
+        self.assertTrue(re.search("can not be relocated .* hardcoded in: loc", read_file(self.logfile)))
+
+        # installation is not restored from artifact created with other module configuration
+        outtxt = run_toy_build(os.path.join(self.test_prefix, 'suffix'), extra_args=['--suffix-modules-path=foo'])
+        self.assertFalse(restored_msg in outtxt)
+        self.assertTrue(re.search("building and installing toy/0.0", outtxt))
+
 
 def suite():
     """ return all the tests in this file """
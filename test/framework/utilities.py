@@ -41,6 +41,7 @@ from vsc.utils import fancylogger
 from vsc.utils.patterns import Singleton
 from vsc.utils.testing import EnhancedTestCase as _EnhancedTestCase
 
+import easybuild.framework.easyconfig.format.pyheaderconfigobj as pyheaderconfigobj
 import easybuild.tools.build_log as eb_build_log
 import easybuild.tools.options as eboptions
 import easybuild.tools.toolchain.utilities as tc_utils
@@ -56,6 +57,7 @@ from easybuild.tools.filetools import copy_dir, mkdir, read_file
 from easybuild.tools.module_naming_scheme import GENERAL_CLASS
 from easybuild.tools.modules import curr_module_paths, modules_tool, reset_module_caches
 from easybuild.tools.options import CONFIG_ENV_VAR_PREFIX, EasyBuildOptions, set_tmpdir
+from easybuild.tools.systemtools import reset_host_profile
 
 
 # make sure tests are robust against any non-default configuration settings;
@@ -187,6 +189,7 @@ class EnhancedTestCase(_EnhancedTestCase):
         self.modtool = modules_tool()
         self.reset_modulepath([os.path.join(testdir, 'modules')])
         reset_module_caches()
+        reset_host_profile()
 
     def tearDown(self):
         """Clean up after running testcase."""
@@ -409,7 +412,11 @@ def cleanup():
     tc_utils._initial_toolchain_instances.clear()
     easyconfig._easyconfigs_cache.clear()
     easyconfig._easyconfig_files_cache.clear()
+    easyconfig.find_toolchains_with_easyconfig.clear()
+    easyconfig._toolchain_graphs.clear()
     mns_toolchain._toolchain_details_cache.clear()
+    pyheaderconfigobj._pyheader_env_cache.clear()
+    pyheaderconfigobj._pyheader_code_cache.clear()
 
     # reset to make sure tempfile picks up new temporary directory to use
     tempfile.tempdir = None
@@ -89,6 +89,36 @@ class VariablesTest(EnhancedTestCase):
         v.join('FOOBAR', 'BAR')
         self.assertEqual(v['FOOBAR'], [])
 
+    def test_copy_str_cache(self):
+        """Test (structural) copies and caching of string representation."""
+        v = Variables()
+        v.nappend('FOO', ['one', 'two'])
+        v.nappend_el('FOO', 'three')
+        self.assertEqual(str(v['FOO']), "one two three")
+        # generated classes are only created once
+        self.assertTrue(type(v['FOO']) is type(v.get_instance('FOO')))
+
+        # changes to copies do not affect the original
+        foo = v['FOO'].copy()
+        foo[0].append('four')
+        foo[0].SEPARATOR = ','
+        foo.nappend('five')
+        self.assertEqual(str(foo), "one,two,three,four five")
+        self.assertEqual(str(v['FOO']), "one two three")
+
+        # cached string representation is only used if nothing changed
+        v['FOO'][0].append('four')
+        self.assertEqual(str(v['FOO']), "one two three four")
+        v['FOO'][0].SEPARATOR = ':'
+        self.assertEqual(str(v['FOO']), "one:two:three:four")
+        v['FOO'].nappend('five')
+        self.assertEqual(str(v['FOO']), "one:two:three:four five")
+        v['FOO'].SEPARATOR = ';'
+        self.assertEqual(str(v['FOO']), "one:two:three:four;five")
+        del v['FOO'][0]
+        self.assertEqual(str(v['FOO']), "five")
+
+
 def suite():
     """ return all the tests"""
     return TestLoaderFiltered().loadTestsFromTestCase(VariablesTest, sys.argv[1:])